@@ -418,10 +418,50 @@ async def delete_report(report_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to delete report: {str(e)}")
 
 # Graph endpoints
+_graph_retriever = None
+
+def _get_graph_retriever():
+    """Lazily build the shared Neo4j retriever (with its event network cache)"""
+    global _graph_retriever
+    if _graph_retriever is None:
+        from rag.builder import build_graph_retriever
+        _graph_retriever = build_graph_retriever()
+    return _graph_retriever
+
 @api_router.get("/graph/data")
-async def get_graph_data():
-    """Get graph visualization data"""
+async def get_graph_data(
+    event_id: Optional[str] = Query(None),
+    max_depth: int = Query(2, ge=1, le=4)
+):
+    """Get graph visualization data, centred on event_id when given"""
     try:
+        if event_id:
+            network = await asyncio.to_thread(_get_graph_retriever().get_event_network, event_id, max_depth)
+            return {
+                "nodes": [
+                    {
+                        "id": event.event_id,
+                        "label": event.title,
+                        "type": "mystery",
+                        "properties": {
+                            "date": event.date.isoformat() if event.date else None,
+                            "location": event.location,
+                            "credibility": event.credibility_score
+                        }
+                    }
+                    for event in network["nodes"]
+                ],
+                "links": [
+                    {
+                        "source": edge["source"],
+                        "target": edge["target"],
+                        "type": edge["type"],
+                        "strength": edge["properties"].get("strength", 1.0)
+                    }
+                    for edge in network["edges"]
+                ]
+            }
+        
         # Return mock graph data for now
         return {
             "nodes": [
@@ -450,6 +490,20 @@ async def save_graph_layout(layout_data: Dict[str, Any] = Body(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save graph layout: {str(e)}")
 
+# Storage endpoints
+@api_router.get("/storage/outbox")
+async def get_storage_outbox_stats():
+    """Get per-sink lag metrics of the storage outbox"""
+    try:
+        from config.tools import STORAGE_OUTBOX_ENABLED
+        from tools.graph_storage import get_storage_outbox
+        if not STORAGE_OUTBOX_ENABLED:
+            return {"enabled": False}
+        outbox = await asyncio.to_thread(get_storage_outbox)
+        return await asyncio.to_thread(outbox.get_stats)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get outbox stats: {str(e)}")
+
 # Timeline endpoints
 @api_router.get("/timeline/events")
 async def get_timeline_events(
@@ -0,0 +1,111 @@
+# Copyright (c) 2025 Lingjing Project
+# SPDX-License-Identifier: MIT
+
+"""正文提取基准测试
+
+在 benchmarks/corpus/ 下保存的固定HTML页面上，对比单次lxml解析的文本密度
+提取与readabilipy的吞吐量（文档/秒）和正文重合度。
+
+用法:
+    python benchmarks/bench_extraction.py
+    python benchmarks/bench_extraction.py --rounds 50 --readability-js
+"""
+
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lxml.html
+
+from crawler.content_extractor import extract_page
+
+try:
+    from readabilipy import simple_json_from_html_string
+except ImportError:
+    simple_json_from_html_string = None
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+TOKEN_PATTERN = re.compile(r"[一-鿿]|[A-Za-z0-9]+")
+
+
+def load_corpus(corpus_dir: str):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(corpus_dir, "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+
+def html_text(html: str) -> str:
+    if not html:
+        return ""
+    return " ".join(lxml.html.fromstring(html).text_content().split())
+
+
+def overlap(candidate: str, reference: str) -> float:
+    """以reference为基准的词（中文按字）召回率"""
+    reference_tokens = set(TOKEN_PATTERN.findall(reference.lower()))
+    if not reference_tokens:
+        return 0.0
+    candidate_tokens = set(TOKEN_PATTERN.findall(candidate.lower()))
+    return len(reference_tokens & candidate_tokens) / len(reference_tokens)
+
+
+def time_extractor(func, pages, rounds: int):
+    outputs = {}
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for name, html in pages:
+            outputs[name] = func(html)
+    elapsed = time.perf_counter() - start
+    return outputs, (rounds * len(pages)) / elapsed if elapsed else float("inf")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="正文提取基准测试")
+    parser.add_argument("--corpus", default=CORPUS_DIR, help="HTML语料目录")
+    parser.add_argument("--rounds", type=int, default=20, help="重复轮数")
+    parser.add_argument("--readability-js", action="store_true",
+                        help="readabilipy使用Readability.js（需要Node，每页启动一个子进程）")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus)
+    if not pages:
+        print(f"No HTML pages found in {args.corpus}")
+        return
+
+    fast, fast_rate = time_extractor(lambda html: extract_page(html), pages, args.rounds)
+    print(f"density extractor: {fast_rate:.1f} docs/sec over {len(pages)} pages x {args.rounds} rounds")
+
+    if simple_json_from_html_string is None:
+        print("readabilipy not installed, skipping comparison")
+        for name, page in fast.items():
+            print(f"  {name:<24} confidence={page.confidence:.2f} chars={page.text_length}")
+        return
+
+    # readabilipy（尤其是Readability.js模式）很慢，只跑少量轮次
+    slow_rounds = max(1, args.rounds // 10) if args.readability_js else args.rounds
+    slow, slow_rate = time_extractor(
+        lambda html: simple_json_from_html_string(html, use_readability=args.readability_js),
+        pages, slow_rounds
+    )
+    mode = "Readability.js" if args.readability_js else "python"
+    print(f"readabilipy ({mode}): {slow_rate:.1f} docs/sec over {len(pages)} pages x {slow_rounds} rounds")
+    print(f"speedup: {fast_rate / slow_rate:.1f}x")
+
+    print(f"\n{'page':<24} {'confidence':>10} {'chars':>7} {'ref chars':>9} {'recall':>7}")
+    for name, _ in pages:
+        page = fast[name]
+        reference = html_text(slow[name].get("content") or "")
+        text = html_text(page.content_html)
+        print(f"{name:<24} {page.confidence:>10.2f} {len(text):>7} {len(reference):>9} "
+              f"{overlap(text, reference):>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -40,6 +40,7 @@ class DataSourceConfig:
     reliability_score: float = 0.5  # 可靠性评分 0-1
     requires_login: bool = False
     login_config: Optional[Dict[str, str]] = None
+    feed_urls: List[str] = field(default_factory=list)  # RSS/Atom/新闻站点地图，为空时自动发现
 
 
 @dataclass
@@ -111,13 +112,15 @@ class MysteryEventConfig:
             name="BBC News",
             source_type=DataSourceType.NEWS,
             base_url="https://www.bbc.com",
-            reliability_score=0.9
+            reliability_score=0.9,
+            feed_urls=["https://feeds.bbci.co.uk/news/world/rss.xml"]
         ),
         DataSourceConfig(
             name="CNN",
             source_type=DataSourceType.NEWS,
             base_url="https://www.cnn.com",
-            reliability_score=0.85
+            reliability_score=0.85,
+            feed_urls=["http://rss.cnn.com/rss/edition_world.rss"]
         ),
         DataSourceConfig(
             name="新华网",
@@ -23,6 +23,7 @@ class RAGProvider(enum.Enum):
     RAGFLOW = "ragflow"
     NEO4J = "neo4j"  # 图数据库
     ELASTICSEARCH = "elasticsearch"  # 全文搜索
+    VECTOR = "vector"  # 本地向量索引
 
 
 class AnalysisEngine(enum.Enum):
@@ -67,6 +68,43 @@ NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "password")
 ELASTICSEARCH_HOST = os.getenv("ELASTICSEARCH_HOST", "localhost")
 ELASTICSEARCH_PORT = int(os.getenv("ELASTICSEARCH_PORT", "9200"))
 ELASTICSEARCH_INDEX = os.getenv("ELASTICSEARCH_INDEX", "mystery_events")
+ELASTICSEARCH_URL = os.getenv("ELASTICSEARCH_URL", f"http://{ELASTICSEARCH_HOST}:{ELASTICSEARCH_PORT}")
+ELASTICSEARCH_USER = os.getenv("ELASTICSEARCH_USER", "")
+ELASTICSEARCH_PASSWORD = os.getenv("ELASTICSEARCH_PASSWORD", "")
+ELASTICSEARCH_BULK_CHUNK_BYTES = int(os.getenv("ELASTICSEARCH_BULK_CHUNK_BYTES", str(5 * 1024 * 1024)))
+ELASTICSEARCH_BULK_MAX_ACTIONS = int(os.getenv("ELASTICSEARCH_BULK_MAX_ACTIONS", "500"))
+ELASTICSEARCH_BULK_WORKERS = int(os.getenv("ELASTICSEARCH_BULK_WORKERS", "4"))
+ELASTICSEARCH_PIT_KEEP_ALIVE = os.getenv("ELASTICSEARCH_PIT_KEEP_ALIVE", "1m")  # 深分页point-in-time的保持时间
+ELASTICSEARCH_QUERY_CACHE_TTL = float(os.getenv("ELASTICSEARCH_QUERY_CACHE_TTL", "0"))  # 0为只合并并发查询不缓存
+
+# 爬虫配置
+CRAWL_DATA_DIR = os.getenv("CRAWL_DATA_DIR", "./data/crawl")
+CRAWL_FRONTIER_DB = os.getenv("CRAWL_FRONTIER_DB", os.path.join(CRAWL_DATA_DIR, "frontier.db"))
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "true").lower() == "true"
+HTTP_CACHE_DB = os.getenv("HTTP_CACHE_DB", os.path.join(CRAWL_DATA_DIR, "http_cache.db"))
+
+# 存储发件箱配置：事件先写入本地发件箱，再由后台线程分别投递到Neo4j和Elasticsearch
+STORAGE_OUTBOX_ENABLED = os.getenv("STORAGE_OUTBOX_ENABLED", "true").lower() == "true"
+STORAGE_OUTBOX_DB = os.getenv("STORAGE_OUTBOX_DB", "./data/storage_outbox.db")
+STORAGE_OUTBOX_BATCH_SIZE = int(os.getenv("STORAGE_OUTBOX_BATCH_SIZE", "500"))
+
+# 向量检索配置
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "./data/vector_index")
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "hashing")  # hashing为本地哈希嵌入，其他值为LLM提供商
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+
+# BM25全文索引配置（为空则Neo4j检索器使用CONTAINS扫描）
+BM25_INDEX_DIR = os.getenv("BM25_INDEX_DIR", "")
+
+# 混合检索配置
+HYBRID_RETRIEVER_TIMEOUT = float(os.getenv("HYBRID_RETRIEVER_TIMEOUT", "5.0"))  # 单个检索后端的超时（秒）
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+
+# 事件关系网络邻域缓存配置（EVENT_NETWORK_CACHE_SIZE为0时不缓存）
+EVENT_NETWORK_CACHE_SIZE = int(os.getenv("EVENT_NETWORK_CACHE_SIZE", "1024"))
+EVENT_NETWORK_CACHE_TTL = float(os.getenv("EVENT_NETWORK_CACHE_TTL", "600"))  # 兜底其他进程写入造成的过期（秒）
+EVENT_NETWORK_HUB_MIN_DEGREE = int(os.getenv("EVENT_NETWORK_HUB_MIN_DEGREE", "5"))
+EVENT_NETWORK_WARM_UP_INTERVAL = float(os.getenv("EVENT_NETWORK_WARM_UP_INTERVAL", "300"))  # 0为不启动预热任务
 
 # 分析配置
 CREDIBILITY_THRESHOLD = float(os.getenv("CREDIBILITY_THRESHOLD", "0.6"))
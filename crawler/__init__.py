@@ -2,6 +2,16 @@
 # SPDX-License-Identifier: MIT
 
 from .crawler import Crawler
+from .frontier import CrawlFrontier, FrontierEntry, canonicalize_url
+from .http_cache import HTTPResponseCache, get_shared_http_cache
+from .parser_pool import ParserPool, get_shared_parser_pool
+from .content_extractor import ExtractedPage, extract_page
+from .chunker import TextChunker, TextChunk
+from .feeds import FeedPoller, FeedStore, FeedEntry, parse_feed
+from .ingest import IngestPipeline, JsonlSink
+from .thread_store import ThreadStore, ThreadState, get_shared_thread_store
+from .transport import CrawlTransport, TokenBucket, AdaptiveRateLimiter, get_shared_transport
+from .jina_client import JinaClient, AsyncJinaClient, JinaResult
 from .academic_crawler import AcademicCrawler
 from .mystery_crawler import MysteryCrawler
 from .news_crawler import NewsCrawler
@@ -36,6 +46,33 @@ def build_specialized_crawlers():
 
 __all__ = [
     "Crawler",
+    "CrawlFrontier",
+    "FrontierEntry",
+    "canonicalize_url",
+    "HTTPResponseCache",
+    "get_shared_http_cache",
+    "ParserPool",
+    "get_shared_parser_pool",
+    "ExtractedPage",
+    "extract_page",
+    "TextChunker",
+    "TextChunk",
+    "FeedPoller",
+    "FeedStore",
+    "FeedEntry",
+    "parse_feed",
+    "IngestPipeline",
+    "JsonlSink",
+    "ThreadStore",
+    "ThreadState",
+    "get_shared_thread_store",
+    "CrawlTransport",
+    "TokenBucket",
+    "AdaptiveRateLimiter",
+    "JinaClient",
+    "AsyncJinaClient",
+    "JinaResult",
+    "get_shared_transport",
     "AcademicCrawler", 
     "MysteryCrawler",
     "NewsCrawler",
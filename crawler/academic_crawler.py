@@ -8,6 +8,7 @@ from typing import Dict, List, Optional, Any
 from urllib.parse import quote, urljoin
 
 from crawler.crawler import Crawler
+from crawler.parser_pool import css, make_soup
 from rag.retriever import Document, Chunk
 from config.mystery_config import DataSourceConfig, DataSourceType
 
@@ -15,8 +16,8 @@ from config.mystery_config import DataSourceConfig, DataSourceType
 class AcademicCrawler(Crawler):
     """学术数据库爬虫"""
     
-    def __init__(self, config: DataSourceConfig):
-        super().__init__(config)
+    def __init__(self, config: DataSourceConfig, **kwargs):
+        super().__init__(config, **kwargs)
         self.academic_keywords = [
             "anomalous phenomena", "unexplained events", "atmospheric anomalies",
             "geophysical anomalies", "electromagnetic anomalies", "plasma phenomena",
@@ -30,12 +31,17 @@ class AcademicCrawler(Crawler):
         if not html:
             return None
             
-        parsed_data = self._parse_academic_html(html, url)
+        cached = self._cached_document(url)
+        if cached:
+            return cached
+            
+        parsed_data = await self._parse_off_loop(self._parse_academic_html, html, url)
         if not parsed_data:
             return None
             
         doc_id = hashlib.md5(url.encode()).hexdigest()
         document = self._create_academic_document(parsed_data, doc_id)
+        self._cache_document(url, document)
         
         return document
         
@@ -49,17 +55,15 @@ class AcademicCrawler(Crawler):
         # 模拟不同学术数据库的搜索
         search_urls = self._generate_search_urls(academic_query, limit)
         
-        for url in search_urls:
-            doc = await self.crawl_url(url)
-            if doc:
-                documents.append(doc)
+        # 并发抓取，单主机的并发和速率由共享传输层控制
+        documents.extend(await self.batch_crawl(search_urls))
                 
         return documents[:limit]
         
     def _parse_academic_html(self, html: str, url: str) -> Optional[Dict[str, Any]]:
         """解析学术论文HTML"""
-        from bs4 import BeautifulSoup
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = make_soup(html)
+        self._enqueue_links(soup, url)
         
         # 提取论文标题
         title = self._extract_academic_title(soup)
@@ -124,7 +128,7 @@ class AcademicCrawler(Crawler):
         ]
         
         for selector in title_selectors:
-            title_elem = soup.select_one(selector)
+            title_elem = css(selector).select_one(soup)
             if title_elem:
                 title = title_elem.get_text().strip()
                 if len(title) > 10:  # 确保标题有意义
@@ -143,7 +147,7 @@ class AcademicCrawler(Crawler):
         ]
         
         for selector in abstract_selectors:
-            abstract_elem = soup.select_one(selector)
+            abstract_elem = css(selector).select_one(soup)
             if abstract_elem:
                 return abstract_elem.get_text().strip()
                 
@@ -161,7 +165,7 @@ class AcademicCrawler(Crawler):
         ]
         
         for selector in author_selectors:
-            author_elems = soup.select(selector)
+            author_elems = css(selector).select(soup)
             for elem in author_elems:
                 author_name = elem.get_text().strip()
                 if author_name and author_name not in authors:
@@ -176,7 +180,7 @@ class AcademicCrawler(Crawler):
         # 期刊名称
         journal_selectors = ['.journal-title', '.publication-title', '.source']
         for selector in journal_selectors:
-            journal_elem = soup.select_one(selector)
+            journal_elem = css(selector).select_one(soup)
             if journal_elem:
                 journal_info['name'] = journal_elem.get_text().strip()
                 break
@@ -185,7 +189,7 @@ class AcademicCrawler(Crawler):
         year_pattern = r'\b(19|20)\d{2}\b'
         year_selectors = ['.publication-date', '.year', '.date']
         for selector in year_selectors:
-            date_elem = soup.select_one(selector)
+            date_elem = css(selector).select_one(soup)
             if date_elem:
                 date_text = date_elem.get_text()
                 year_match = re.search(year_pattern, date_text)
@@ -194,7 +198,7 @@ class AcademicCrawler(Crawler):
                     break
                     
         # 卷期页码信息
-        citation_elem = soup.select_one('.citation')
+        citation_elem = css('.citation').select_one(soup)
         if citation_elem:
             citation_text = citation_elem.get_text()
             
@@ -225,7 +229,7 @@ class AcademicCrawler(Crawler):
         ]
         
         for selector in doi_selectors:
-            doi_elem = soup.select_one(selector)
+            doi_elem = css(selector).select_one(soup)
             if doi_elem:
                 doi_text = doi_elem.get('href') or doi_elem.get('data-doi') or doi_elem.get_text()
                 doi_match = re.search(r'10\.\d+/[^\s]+', doi_text)
@@ -246,7 +250,7 @@ class AcademicCrawler(Crawler):
         ]
         
         for selector in keyword_selectors:
-            keyword_elems = soup.select(selector)
+            keyword_elems = css(selector).select(soup)
             for elem in keyword_elems:
                 keyword_text = elem.get_text().strip()
                 # 分割关键词
@@ -276,7 +280,7 @@ class AcademicCrawler(Crawler):
         ]
         
         for selector in content_selectors:
-            content_elem = soup.select_one(selector)
+            content_elem = css(selector).select_one(soup)
             if content_elem:
                 return content_elem.get_text(separator='\n', strip=True)
                 
@@ -299,7 +303,7 @@ class AcademicCrawler(Crawler):
         ]
         
         for selector in citation_selectors:
-            citation_elems = soup.select(selector)
+            citation_elems = css(selector).select(soup)
             for elem in citation_elems:
                 citation_text = elem.get_text().strip()
                 if citation_text:
@@ -323,15 +327,8 @@ class AcademicCrawler(Crawler):
         # 正文内容分块
         content = parsed_data['content']
         if content:
-            # 简单的段落分块
-            paragraphs = [p.strip() for p in content.split('\n\n') if p.strip()]
-            for i, paragraph in enumerate(paragraphs):
-                if len(paragraph) > 100:  # 只保留有意义的段落
-                    chunks.append(Chunk(
-                        content=paragraph,
-                        similarity=0.8,
-                        metadata={'type': 'content', 'paragraph_index': i}
-                    ))
+            # 按章节标题和句子流式分块，长篇全文不做整体复制
+            chunks.extend(self.chunker.chunk(content, similarity=0.8, metadata={'type': 'content'}))
                     
         return Document(
             id=doc_id,
@@ -3,13 +3,108 @@
 
 import re
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from functools import cached_property
+from typing import Optional, Dict, Any, List, FrozenSet
 from urllib.parse import urljoin
 from markdownify import markdownify as md
 
 
+# 事件类型关键词（按顺序匹配，命中的第一个类型即为事件类型）
+EVENT_KEYWORDS = {
+    "UFO": ["ufo", "不明飞行物", "飞碟", "外星人", "alien", "flying saucer"],
+    "cryptid": ["水怪", "神秘生物", "cryptid", "bigfoot", "yeti", "尼斯湖水怪"],
+    "paranormal": ["幽灵", "鬼魂", "paranormal", "ghost", "spirit", "supernatural"],
+    "disappearance": ["失踪", "消失", "disappearance", "missing", "vanished"],
+    "ancient_mystery": ["古代", "文明", "ancient", "civilization", "玛雅", "maya", "金字塔"],
+    "natural_anomaly": ["异常现象", "自然异象", "anomaly", "百慕大", "bermuda"]
+}
+
+MYSTERY_KEYWORDS = [
+    "ufo", "不明飞行物", "飞碟", "外星人", "水怪", "神秘生物",
+    "幽灵", "鬼魂", "失踪", "消失", "古代文明", "金字塔",
+    "百慕大三角", "麦田怪圈", "尼斯湖水怪", "大脚怪", "雪人"
+]
+
+EVIDENCE_KEYWORDS = [
+    "照片", "视频", "录音", "物证", "痕迹", "足迹",
+    "photo", "video", "recording", "evidence", "trace", "footprint"
+]
+
+
+def _build_keyword_scanner(keywords: List[str]):
+    """把所有关键词编译为一个最长优先的交替正则
+
+    命中的词同时蕴含它所包含的其他关键词（如“尼斯湖水怪”包含“水怪”）。
+    交替正则的匹配互不重叠，与命中词部分重叠的关键词（一个的后缀是另一个
+    的前缀）可能被跳过，这些少数候选在扫描后单独确认。
+    """
+    unique = sorted(set(keywords), key=len, reverse=True)
+    pattern = re.compile("|".join(re.escape(keyword) for keyword in unique))
+    implied: Dict[str, FrozenSet[str]] = {
+        token: frozenset(keyword for keyword in unique if keyword in token) for token in unique
+    }
+
+    def overlaps(a: str, b: str) -> bool:
+        return any(a.endswith(b[:i]) or b.endswith(a[:i]) for i in range(1, min(len(a), len(b))))
+
+    overlapping: Dict[str, FrozenSet[str]] = {
+        token: frozenset(
+            keyword for keyword in unique
+            if keyword not in implied[token] and overlaps(token, keyword)
+        )
+        for token in unique
+    }
+    return pattern, implied, overlapping
+
+
+_KEYWORD_PATTERN, _IMPLIED_KEYWORDS, _OVERLAPPING_KEYWORDS = _build_keyword_scanner(
+    [keyword for keywords in EVENT_KEYWORDS.values() for keyword in keywords]
+    + MYSTERY_KEYWORDS + EVIDENCE_KEYWORDS
+)
+
+_TAG_PATTERN = re.compile(r'<[^>]+>')
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+_IMAGE_PATTERN = re.compile(r"!\[.*?\]\((.*?)\)")
+
+# 提及提取的正则，每个正则附带它必然包含的字面量：正文中没有这些字面量时
+# 跳过该正则（纯英文正文不必运行中文正则，反之亦然）
+LOCATION_PATTERNS = [
+    (re.compile(r'在([^，。！？\s]{2,10}[市县区镇村])(?:[，。！？\s])'), ("在",)),
+    (re.compile(r'位于([^，。！？\s]{2,15})(?:[，。！？\s])'), ("位于",)),
+    (re.compile(r'([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*(?:,\s*[A-Z]{2})?)'), None),  # 英文地名
+]
+
+DATE_PATTERNS = [
+    (re.compile(r'\d{4}年\d{1,2}月\d{1,2}日'), ("年",)),
+    (re.compile(r'\d{4}-\d{1,2}-\d{1,2}'), ("-",)),
+    (re.compile(r'\d{1,2}/\d{1,2}/\d{4}'), ("/",)),
+    (re.compile(r'\d{4}年\d{1,2}月'), ("年",)),
+    # 从字母串开头匹配（与逐位置尝试的结果相同），避免对长单词反复回溯
+    (re.compile(r'(?<![A-Za-z])[A-Za-z]+ \d{1,2}, \d{4}'), (", ",)),
+]
+
+WITNESS_PATTERNS = [
+    (re.compile(r'目击者([^，。！？\s]{2,10})'), ("目击者",)),
+    (re.compile(r'证人([^，。！？\s]{2,10})'), ("证人",)),
+    (re.compile(r'witness\s+([A-Za-z\s]{2,20})'), ("witness",)),
+    (re.compile(r'([^，。！？\s]{2,10})(?:声称|表示|说|报告)'), ("声称", "表示", "说", "报告")),
+]
+
+
+def _find_all(patterns, text: str) -> set:
+    found = set()
+    for pattern, literals in patterns:
+        if literals is None or any(literal in text for literal in literals):
+            found.update(pattern.findall(text))
+    return found
+
+
 class Article:
-    """文章类，扩展支持神秘事件信息提取"""
+    """文章类，扩展支持神秘事件信息提取
+
+    纯文本、Markdown和各类提及列表都在首次访问时计算并缓存，
+    只用到标题和URL的调用方构造文章几乎没有开销。
+    """
     
     def __init__(
         self, 
@@ -30,17 +125,65 @@ class Article:
         self.source_type = source_type
         self.credibility_score = credibility_score
         self.metadata = metadata or {}
-        
-        # 神秘事件相关属性
-        self.mystery_keywords = []
-        self.event_type = "unknown"
-        self.location_mentions = []
-        self.date_mentions = []
-        self.witness_mentions = []
-        self.evidence_mentions = []
-        
-        # 自动分析内容
-        self._analyze_content()
+
+    @cached_property
+    def plain_text(self) -> str:
+        """纯文本内容"""
+        # 简单的HTML标签移除
+        text = _TAG_PATTERN.sub(' ', self.html_content)
+        return _WHITESPACE_PATTERN.sub(' ', text).strip()
+
+    @cached_property
+    def markdown_body(self) -> str:
+        """正文的Markdown（不含标题和元数据）"""
+        return md(self.html_content)
+
+    @cached_property
+    def _keyword_hits(self) -> FrozenSet[str]:
+        """一次扫描得到正文中出现的所有事件、神秘和证据关键词"""
+        text = self.plain_text.lower()
+        tokens = set(_KEYWORD_PATTERN.findall(text))
+        hits = set()
+        for token in tokens:
+            hits.update(_IMPLIED_KEYWORDS[token])
+        for token in tokens:
+            hits.update(keyword for keyword in _OVERLAPPING_KEYWORDS[token] - hits if keyword in text)
+        return frozenset(hits)
+
+    @cached_property
+    def event_type(self) -> str:
+        """事件类型"""
+        hits = self._keyword_hits
+        for event_type, keywords in EVENT_KEYWORDS.items():
+            if any(keyword in hits for keyword in keywords):
+                return event_type
+        return "unknown"
+
+    @cached_property
+    def mystery_keywords(self) -> List[str]:
+        """神秘事件关键词"""
+        return [keyword for keyword in MYSTERY_KEYWORDS if keyword in self._keyword_hits]
+
+    @cached_property
+    def evidence_mentions(self) -> List[str]:
+        """证据信息"""
+        return [keyword for keyword in EVIDENCE_KEYWORDS if keyword in self._keyword_hits]
+
+    @cached_property
+    def location_mentions(self) -> List[str]:
+        """地点信息"""
+        locations = _find_all(LOCATION_PATTERNS, self.plain_text)
+        return [loc for loc in locations if len(loc) > 1 and len(loc) < 50]
+
+    @cached_property
+    def date_mentions(self) -> List[str]:
+        """日期信息"""
+        return list(_find_all(DATE_PATTERNS, self.plain_text))
+
+    @cached_property
+    def witness_mentions(self) -> List[str]:
+        """目击者信息"""
+        return list(_find_all(WITNESS_PATTERNS, self.plain_text))[:5]  # 限制数量
 
     def to_markdown(self, including_title: bool = True) -> str:
         """转换为Markdown格式"""
@@ -67,15 +210,13 @@ class Article:
             markdown += f"**地点**: {', '.join(self.location_mentions)}\n\n"
         
         markdown += "---\n\n"
-        markdown += md(self.html_content)
+        markdown += self.markdown_body
         return markdown
 
     def to_message(self) -> list[dict]:
         """转换为消息格式，支持图片和文本"""
-        image_pattern = r"!\[.*?\]\((.*?)\)"
-
         content: list[dict[str, str]] = []
-        parts = re.split(image_pattern, self.to_markdown())
+        parts = _IMAGE_PATTERN.split(self.to_markdown())
 
         for i, part in enumerate(parts):
             if i % 2 == 1:
@@ -99,134 +240,9 @@ class Article:
             "credibility_score": self.credibility_score
         }
     
-    def _analyze_content(self):
-        """分析内容，提取神秘事件相关信息"""
-        content_text = self._get_plain_text()
-        content_lower = content_text.lower()
-        
-        # 识别事件类型
-        self.event_type = self._identify_event_type(content_lower)
-        
-        # 提取关键词
-        self.mystery_keywords = self._extract_mystery_keywords(content_lower)
-        
-        # 提取地点信息
-        self.location_mentions = self._extract_locations(content_text)
-        
-        # 提取日期信息
-        self.date_mentions = self._extract_dates(content_text)
-        
-        # 提取目击者信息
-        self.witness_mentions = self._extract_witnesses(content_text)
-        
-        # 提取证据信息
-        self.evidence_mentions = self._extract_evidence(content_text)
-    
     def _get_plain_text(self) -> str:
         """获取纯文本内容"""
-        # 简单的HTML标签移除
-        text = re.sub(r'<[^>]+>', ' ', self.html_content)
-        text = re.sub(r'\s+', ' ', text).strip()
-        return text
-    
-    def _identify_event_type(self, content: str) -> str:
-        """识别事件类型"""
-        event_keywords = {
-            "UFO": ["ufo", "不明飞行物", "飞碟", "外星人", "alien", "flying saucer"],
-            "cryptid": ["水怪", "神秘生物", "cryptid", "bigfoot", "yeti", "尼斯湖水怪"],
-            "paranormal": ["幽灵", "鬼魂", "paranormal", "ghost", "spirit", "supernatural"],
-            "disappearance": ["失踪", "消失", "disappearance", "missing", "vanished"],
-            "ancient_mystery": ["古代", "文明", "ancient", "civilization", "玛雅", "maya", "金字塔"],
-            "natural_anomaly": ["异常现象", "自然异象", "anomaly", "百慕大", "bermuda"]
-        }
-        
-        for event_type, keywords in event_keywords.items():
-            if any(keyword in content for keyword in keywords):
-                return event_type
-        
-        return "unknown"
-    
-    def _extract_mystery_keywords(self, content: str) -> List[str]:
-        """提取神秘事件关键词"""
-        mystery_keywords = [
-            "ufo", "不明飞行物", "飞碟", "外星人", "水怪", "神秘生物", 
-            "幽灵", "鬼魂", "失踪", "消失", "古代文明", "金字塔", 
-            "百慕大三角", "麦田怪圈", "尼斯湖水怪", "大脚怪", "雪人"
-        ]
-        
-        found_keywords = []
-        for keyword in mystery_keywords:
-            if keyword in content:
-                found_keywords.append(keyword)
-        
-        return found_keywords
-    
-    def _extract_locations(self, content: str) -> List[str]:
-        """提取地点信息"""
-        # 简单的地点提取逻辑
-        location_patterns = [
-            r'在([^，。！？\s]{2,10}[市县区镇村])(?:[，。！？\s])',
-            r'位于([^，。！？\s]{2,15})(?:[，。！？\s])',
-            r'([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*(?:,\s*[A-Z]{2})?)',  # 英文地名
-        ]
-        
-        locations = []
-        for pattern in location_patterns:
-            matches = re.findall(pattern, content)
-            locations.extend(matches)
-        
-        # 去重并过滤
-        unique_locations = list(set(locations))
-        return [loc for loc in unique_locations if len(loc) > 1 and len(loc) < 50]
-    
-    def _extract_dates(self, content: str) -> List[str]:
-        """提取日期信息"""
-        date_patterns = [
-            r'\d{4}年\d{1,2}月\d{1,2}日',
-            r'\d{4}-\d{1,2}-\d{1,2}',
-            r'\d{1,2}/\d{1,2}/\d{4}',
-            r'\d{4}年\d{1,2}月',
-            r'[A-Za-z]+ \d{1,2}, \d{4}'
-        ]
-        
-        dates = []
-        for pattern in date_patterns:
-            matches = re.findall(pattern, content)
-            dates.extend(matches)
-        
-        return list(set(dates))
-    
-    def _extract_witnesses(self, content: str) -> List[str]:
-        """提取目击者信息"""
-        witness_patterns = [
-            r'目击者([^，。！？\s]{2,10})',
-            r'证人([^，。！？\s]{2,10})',
-            r'witness\s+([A-Za-z\s]{2,20})',
-            r'([^，。！？\s]{2,10})(?:声称|表示|说|报告)'
-        ]
-        
-        witnesses = []
-        for pattern in witness_patterns:
-            matches = re.findall(pattern, content)
-            witnesses.extend(matches)
-        
-        return list(set(witnesses))[:5]  # 限制数量
-    
-    def _extract_evidence(self, content: str) -> List[str]:
-        """提取证据信息"""
-        evidence_keywords = [
-            "照片", "视频", "录音", "物证", "痕迹", "足迹", 
-            "photo", "video", "recording", "evidence", "trace", "footprint"
-        ]
-        
-        evidence = []
-        content_lower = content.lower()
-        
-        for keyword in evidence_keywords:
-            if keyword in content_lower:
-                evidence.append(keyword)
-        
-        return list(set(evidence))
+        return self.plain_text
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典格式"""
@@ -237,7 +253,7 @@ class Article:
             "publication_date": self.publication_date.isoformat() if self.publication_date else None,
             "source_type": self.source_type,
             "credibility_score": self.credibility_score,
-            "content": self._get_plain_text(),
+            "content": self.plain_text,
             "mystery_info": self.extract_mystery_info(),
             "metadata": self.metadata
-        }
\ No newline at end of file
+        }
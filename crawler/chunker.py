@@ -0,0 +1,267 @@
+# Copyright (c) 2025 Lingjing Project
+# SPDX-License-Identifier: MIT
+
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from rag.retriever import Chunk
+
+logger = logging.getLogger(__name__)
+
+# 近似的token切分：中日韩单字、拉丁词/数字、单个标点各算一个token
+TOKEN_PATTERN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]|[A-Za-z0-9_]+|[^\sA-Za-z0-9_]")
+
+# 空行分段
+PARAGRAPH_BREAK = re.compile(r"\n[ \t\r\f\v]*\n\s*")
+
+LINE_PATTERN = re.compile(r"[^\n]+")
+
+# 句末：中文句号类标点直接断句；英文.!?后须跟空白或文本结尾。可带右引号/括号
+SENTENCE_END = re.compile(r"(?:[。！？；…]+|[.!?]+(?=\s|$))[”’」』\"')）\]]*")
+
+# 句点后不断句的英文缩写
+ABBREVIATIONS = frozenset({
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "fig", "figs", "eq", "no",
+    "vol", "pp", "al", "approx", "inc", "ltd", "co", "jan", "feb", "mar", "apr",
+    "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec"
+})
+ABBREVIATION_TAIL = re.compile(r"(?<![A-Za-z.])([A-Za-z]+(?:\.[A-Za-z]+)*)\.$")
+
+# 标题行：Markdown标题、中文章节、编号标题、全大写短行
+HEADING_PATTERN = re.compile(
+    r"\s*(?:"
+    r"#{1,6}\s+\S.*"
+    r"|第[一二三四五六七八九十百千\d]+[章节部分篇卷回][\s：:]*.{0,40}"
+    r"|[一二三四五六七八九十]+、.{1,40}"
+    r"|\d+(?:\.\d+)+\.?\s+[A-Z\u4e00-\u9fff][^。.!?！？]{0,80}"
+    r"|\d+\.\s+[A-Z\u4e00-\u9fff][^。.!?！？,，]{0,60}"
+    r"|[A-Z][A-Z0-9 \-:&]{2,60}"
+    r")\s*"
+)
+MAX_HEADING_CHARS = 100
+
+
+def count_tokens(text: str, start: int = 0, end: Optional[int] = None) -> int:
+    """估算text[start:end]的token数（不复制子串）"""
+    end = len(text) if end is None else end
+    return sum(1 for _ in TOKEN_PATTERN.finditer(text, start, end))
+
+
+@dataclass
+class TextChunk:
+    """一个文本块及其在源文本中的位置，text == source[start:end]"""
+    text: str
+    start: int
+    end: int
+    tokens: int
+    index: int
+    section: Optional[str] = None
+
+
+class TextChunker:
+    """内容感知的流式分块器
+
+    按空行分段、按中英文句末标点分句，把句子打包成不超过max_tokens的块，
+    相邻块之间重叠overlap_tokens个token的完整句子。标题行是硬边界：遇到标题
+    时结束当前块，之后的块记录所属章节。论坛帖子逐帖分块，帖子之间不合并。
+
+    iter_chunks是生成器，只按偏移量遍历源文本，除了产出的块外不复制文本，
+    适合数MB的论文全文。
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 384,
+        overlap_tokens: int = 48,
+        min_tokens: int = 8,
+        token_counter: Optional[Callable[[str, int, int], int]] = None
+    ):
+        """初始化分块器
+
+        Args:
+            max_tokens: 每个块的token上限
+            overlap_tokens: 相邻块重叠的token数（以完整句子为单位）
+            min_tokens: 少于此token数的块被丢弃（如孤立的页码、署名），文本只有一个块时除外
+            token_counter: 自定义token计数 (text, start, end) -> int，默认按字/词估算
+        """
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be smaller than max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_tokens = min_tokens
+        self.count_tokens = token_counter or count_tokens
+
+    def iter_chunks(self, text: str, start: int = 0, end: Optional[int] = None) -> Iterator[TextChunk]:
+        """流式产出text[start:end]的分块，偏移量相对于整个text"""
+        end = len(text) if end is None else end
+        window: List[Tuple[int, int, int]] = []  # (start, end, tokens)
+        window_tokens = 0
+        fresh = False  # 窗口中是否有尚未输出过的句子
+        section: Optional[str] = None
+        index = 0
+
+        for kind, span_start, span_end in self._iter_units(text, start, end):
+            if kind == "heading":
+                if fresh:
+                    chunk = self._make_chunk(text, window, window_tokens, index, section)
+                    if chunk:
+                        yield chunk
+                        index += 1
+                window, window_tokens, fresh = [], 0, False
+                section = text[span_start:span_end].strip().lstrip("#").strip()
+                continue
+
+            for piece_start, piece_end, tokens in self._split_oversized(text, span_start, span_end):
+                if window and window_tokens + tokens > self.max_tokens:
+                    if fresh:
+                        chunk = self._make_chunk(text, window, window_tokens, index, section)
+                        if chunk:
+                            yield chunk
+                            index += 1
+                    window, window_tokens = self._overlap(window, tokens)
+                window.append((piece_start, piece_end, tokens))
+                window_tokens += tokens
+                fresh = True
+
+        if fresh:
+            # 整段文本只有一个块时（如简短的论坛回帖）不受min_tokens限制
+            chunk = self._make_chunk(text, window, window_tokens, index, section, keep_short=index == 0)
+            if chunk:
+                yield chunk
+
+    def chunk(
+        self,
+        text: str,
+        similarity: float = 0.8,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> List[Chunk]:
+        """把文本分块为检索用的Chunk，元数据中带有源文本偏移量"""
+        if not text:
+            return []
+        return [
+            Chunk(
+                content=piece.text,
+                similarity=similarity,
+                metadata={
+                    **(metadata or {}),
+                    'chunk_index': piece.index,
+                    'start_offset': piece.start,
+                    'end_offset': piece.end,
+                    'token_count': piece.tokens,
+                    'section': piece.section
+                }
+            )
+            for piece in self.iter_chunks(text)
+        ]
+
+    def _iter_units(self, text: str, start: int, end: int) -> Iterator[Tuple[str, int, int]]:
+        """产出 ("heading" | "sentence", start, end)"""
+        for para_start, para_end in self._iter_paragraphs(text, start, end):
+            run_start = None
+            for line in LINE_PATTERN.finditer(text, para_start, para_end):
+                if self._is_heading(text, line.start(), line.end()):
+                    if run_start is not None:
+                        yield from self._iter_sentences(text, run_start, line.start())
+                        run_start = None
+                    yield ("heading", line.start(), line.end())
+                elif run_start is None:
+                    run_start = line.start()
+            if run_start is not None:
+                yield from self._iter_sentences(text, run_start, para_end)
+
+    @staticmethod
+    def _iter_paragraphs(text: str, start: int, end: int) -> Iterator[Tuple[int, int]]:
+        cursor = start
+        for match in PARAGRAPH_BREAK.finditer(text, start, end):
+            if match.start() > cursor:
+                yield cursor, match.start()
+            cursor = match.end()
+        if cursor < end:
+            yield cursor, end
+
+    @staticmethod
+    def _is_heading(text: str, start: int, end: int) -> bool:
+        if end - start > MAX_HEADING_CHARS:
+            return False
+        return HEADING_PATTERN.fullmatch(text, start, end) is not None
+
+    @staticmethod
+    def _iter_sentences(text: str, start: int, end: int) -> Iterator[Tuple[str, int, int]]:
+        cursor = start
+        for match in SENTENCE_END.finditer(text, start, end):
+            if text[match.start()] == "." and match.end() - match.start() == 1:
+                tail = ABBREVIATION_TAIL.search(text, max(cursor, match.start() - 12), match.end())
+                if tail and (tail.group(1).lower() in ABBREVIATIONS or len(tail.group(1)) == 1 or "." in tail.group(1)):
+                    continue
+            span = _strip_span(text, cursor, match.end())
+            if span:
+                yield ("sentence",) + span
+            cursor = match.end()
+        span = _strip_span(text, cursor, end)
+        if span:
+            yield ("sentence",) + span
+
+    def _split_oversized(self, text: str, start: int, end: int) -> Iterator[Tuple[int, int, int]]:
+        """超过max_tokens的单句按token边界硬切"""
+        tokens = self.count_tokens(text, start, end)
+        if tokens <= self.max_tokens:
+            yield start, end, tokens
+            return
+        piece_start, piece_tokens, last_end = start, 0, start
+        for match in TOKEN_PATTERN.finditer(text, start, end):
+            if piece_tokens == self.max_tokens:
+                yield piece_start, last_end, piece_tokens
+                piece_start, piece_tokens = match.start(), 0
+            piece_tokens += 1
+            last_end = match.end()
+        if piece_tokens:
+            yield piece_start, last_end, piece_tokens
+
+    def _overlap(self, window: List[Tuple[int, int, int]], incoming: int) -> Tuple[List[Tuple[int, int, int]], int]:
+        """保留窗口末尾不超过overlap_tokens的完整句子作为下一块的开头"""
+        kept: List[Tuple[int, int, int]] = []
+        kept_tokens = 0
+        for sentence in reversed(window):
+            if kept_tokens + sentence[2] > self.overlap_tokens:
+                break
+            kept.insert(0, sentence)
+            kept_tokens += sentence[2]
+        # 重叠部分加上新句子仍超限时放弃重叠
+        if kept_tokens + incoming > self.max_tokens:
+            return [], 0
+        return kept, kept_tokens
+
+    def _make_chunk(
+        self,
+        text: str,
+        window: List[Tuple[int, int, int]],
+        tokens: int,
+        index: int,
+        section: Optional[str],
+        keep_short: bool = False
+    ) -> Optional[TextChunk]:
+        if not window or (tokens < self.min_tokens and not keep_short):
+            return None
+        start, end = window[0][0], window[-1][1]
+        return TextChunk(text=text[start:end], start=start, end=end, tokens=tokens, index=index, section=section)
+
+
+def _strip_span(text: str, start: int, end: int) -> Optional[Tuple[int, int]]:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return (start, end) if start < end else None
+
+
+_default_chunker: Optional[TextChunker] = None
+
+
+def get_default_chunker() -> TextChunker:
+    """获取默认参数的分块器（无状态，可在线程间共享）"""
+    global _default_chunker
+    if _default_chunker is None:
+        _default_chunker = TextChunker()
+    return _default_chunker
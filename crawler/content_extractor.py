@@ -0,0 +1,278 @@
+# Copyright (c) 2025 Lingjing Project
+# SPDX-License-Identifier: MIT
+
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import lxml.html
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+# 整体删除的标签：不可能包含正文
+REMOVE_TAGS = ("script", "style", "noscript", "iframe", "svg", "canvas", "form", "button", "select", "template")
+
+# 正文段落的候选标签
+PARAGRAPH_TAGS = ("p", "pre", "td", "blockquote", "li", "h2", "h3")
+
+# 候选容器
+CONTAINER_TAGS = ("div", "article", "section", "main", "td", "body")
+
+POSITIVE_HINTS = re.compile(
+    r"article|body|content|entry|main|page|post|text|blog|story|正文|内容", re.IGNORECASE
+)
+NEGATIVE_HINTS = re.compile(
+    r"comment|footer|foot|footnote|nav|sidebar|side|menu|masthead|meta|outbrain|promo|related|"
+    r"scroll|share|shoutbox|social|sponsor|widget|advert|(?<![a-z])ad-|banner|breadcrumb|popup|subscribe|"
+    r"cookie|copyright|推荐|广告|评论",
+    re.IGNORECASE
+)
+UNLIKELY_TAGS = ("nav", "footer", "aside", "header")
+
+# 逗号与句读是正文的强信号（中英文）
+PUNCTUATION = re.compile(r"[,，。；;！？!?、]")
+
+# 中日韩字符信息密度高，计算正文长度时按多个拉丁字符计
+CJK_CHARS = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]")
+CJK_WEIGHT = 3
+
+MIN_PARAGRAPH_CHARS = 25
+
+
+@dataclass
+class ExtractedPage:
+    """一次解析得到的正文与元数据"""
+    title: str = ""
+    content_html: str = ""
+    text_length: int = 0
+    byline: str = ""
+    date_published: Optional[str] = None
+    og_tags: Dict[str, str] = field(default_factory=dict)
+    meta_tags: Dict[str, str] = field(default_factory=dict)
+    json_ld: List[Any] = field(default_factory=list)
+    time_datetimes: List[str] = field(default_factory=list)
+    confidence: float = 0.0  # 正文识别的置信度 0-1
+
+
+def _class_weight(element) -> float:
+    """按class/id判断是否像正文容器"""
+    hints = f"{element.get('class', '')} {element.get('id', '')}"
+    if not hints.strip():
+        return 0.0
+    weight = 0.0
+    if NEGATIVE_HINTS.search(hints):
+        weight -= 25.0
+    if POSITIVE_HINTS.search(hints):
+        weight += 25.0
+    return weight
+
+
+def _text(element) -> str:
+    return " ".join(element.text_content().split())
+
+
+def _link_density(element, text_length: int) -> float:
+    if text_length == 0:
+        return 0.0
+    link_length = sum(len(_text(link)) for link in element.iter("a"))
+    return min(1.0, link_length / text_length)
+
+
+def _harvest_metadata(tree, page: ExtractedPage):
+    """从同一棵树中收集标题、meta、Open Graph、JSON-LD和<time>"""
+    title = tree.find(".//title")
+    if title is not None and title.text:
+        page.title = title.text.strip()
+
+    for meta in tree.iter("meta"):
+        content = meta.get("content")
+        if content is None:
+            continue
+        prop = meta.get("property") or ""
+        name = meta.get("name") or ""
+        if prop.lower().startswith("og:"):
+            page.og_tags[prop[3:]] = content
+        elif prop:
+            page.meta_tags[prop] = content
+        if name:
+            page.meta_tags[name] = content
+
+    for script in tree.iter("script"):
+        if (script.get("type") or "").lower() != "application/ld+json" or not script.text:
+            continue
+        try:
+            page.json_ld.append(json.loads(script.text.strip()))
+        except ValueError:
+            continue
+
+    for time_element in tree.iter("time"):
+        if time_element.get("datetime"):
+            page.time_datetimes.append(time_element.get("datetime"))
+
+    page.byline = _find_byline(tree, page)
+    page.date_published = _find_date(page)
+
+
+def _json_ld_objects(json_ld: List[Any]):
+    for item in json_ld:
+        stack = [item]
+        while stack:
+            current = stack.pop()
+            if isinstance(current, list):
+                stack.extend(current)
+            elif isinstance(current, dict):
+                yield current
+                if "@graph" in current:
+                    stack.append(current["@graph"])
+
+
+def _find_byline(tree, page: ExtractedPage) -> str:
+    for obj in _json_ld_objects(page.json_ld):
+        author = obj.get("author")
+        if isinstance(author, list) and author:
+            author = author[0]
+        if isinstance(author, dict):
+            author = author.get("name")
+        if isinstance(author, str) and author.strip():
+            return author.strip()
+    for key in ("author", "article:author", "byl", "dc.creator"):
+        if page.meta_tags.get(key):
+            return page.meta_tags[key].strip()
+    for element in tree.xpath(
+        '//*[@rel="author" or @itemprop="author" or contains(@class, "author") or contains(@class, "byline")]'
+    ):
+        text = _text(element)
+        if 1 < len(text) < 50:
+            return text
+    return ""
+
+
+def _find_date(page: ExtractedPage) -> Optional[str]:
+    for obj in _json_ld_objects(page.json_ld):
+        if isinstance(obj.get("datePublished"), str):
+            return obj["datePublished"]
+    for key in ("article:published_time", "date", "pubdate", "publishdate", "dc.date"):
+        if page.meta_tags.get(key):
+            return page.meta_tags[key]
+    if page.time_datetimes:
+        return page.time_datetimes[0]
+    return None
+
+
+def _clean(tree):
+    for element in list(tree.iter(*REMOVE_TAGS)):
+        element.drop_tree()
+    # 注释和处理指令
+    for element in tree.xpath("//comment() | //processing-instruction()"):
+        parent = element.getparent()
+        if parent is not None:
+            parent.remove(element)
+    for element in tree.xpath('//*[@hidden or contains(@style, "display:none") or contains(@style, "display: none")]'):
+        element.drop_tree()
+
+
+def _score_candidates(tree) -> Dict[Any, float]:
+    """文本密度打分：段落的分数累加到父节点和祖父节点"""
+    scores: Dict[Any, float] = {}
+    for paragraph in tree.iter(*PARAGRAPH_TAGS):
+        text = _text(paragraph)
+        if len(text) < MIN_PARAGRAPH_CHARS:
+            continue
+        # 逗号/句读越多、段落越长越像正文；中文字符密度高，按字符数计分
+        score = 1.0 + len(PUNCTUATION.findall(text)) + min(len(text) / 100.0, 3.0)
+        parent = paragraph.getparent()
+        grandparent = parent.getparent() if parent is not None else None
+        for ancestor, share in ((parent, 1.0), (grandparent, 0.5)):
+            if ancestor is None or ancestor.tag not in CONTAINER_TAGS:
+                continue
+            if ancestor not in scores:
+                scores[ancestor] = _class_weight(ancestor)
+                if ancestor.tag in ("article", "main"):
+                    scores[ancestor] += 10.0
+            scores[ancestor] += score * share
+    return scores
+
+
+def _prune(container):
+    """去掉正文容器内部明显的非正文块"""
+    for element in list(container.iter(*UNLIKELY_TAGS, "div", "section", "ul", "table")):
+        if element is container or element.getparent() is None:
+            continue
+        if element.tag in UNLIKELY_TAGS or _class_weight(element) < 0:
+            element.drop_tree()
+            continue
+        text_length = len(_text(element))
+        if element.tag in ("ul", "div", "section", "table") and text_length and _link_density(element, text_length) > 0.5:
+            element.drop_tree()
+
+
+def extract_page(html: str, url: str = "") -> ExtractedPage:
+    """单次lxml解析完成正文定位与元数据收集
+
+    Args:
+        html: 页面HTML
+        url: 页面URL（用于把相对链接补全为绝对链接）
+
+    Returns:
+        ExtractedPage，confidence表示正文识别的可靠程度
+    """
+    page = ExtractedPage()
+    if not html or not html.strip():
+        return page
+    try:
+        tree = lxml.html.document_fromstring(html)
+    except (etree.ParserError, ValueError) as e:
+        logger.debug(f"Failed to parse HTML for {url}: {e}")
+        return page
+
+    _harvest_metadata(tree, page)
+    _clean(tree)
+
+    scores = _score_candidates(tree)
+    if not scores:
+        return page
+
+    # 链接密度高的容器（导航、目录）降权
+    best, best_score = None, 0.0
+    for candidate, score in scores.items():
+        text_length = len(_text(candidate))
+        adjusted = score * (1.0 - _link_density(candidate, text_length))
+        if adjusted > best_score:
+            best, best_score = candidate, adjusted
+    if best is None:
+        return page
+
+    body = tree.find("body")
+    total_length = len(_text(body)) if body is not None else 0
+
+    # 同一父节点下得分接近的兄弟容器（被拆开的正文）一并保留
+    parent = best.getparent()
+    content = best
+    if parent is not None:
+        siblings = [
+            sibling for sibling in parent
+            if sibling is best or scores.get(sibling, 0.0) >= max(10.0, best_score * 0.2)
+        ]
+        if len(siblings) > 1:
+            content = lxml.html.Element("div")
+            for sibling in siblings:
+                content.append(sibling)
+
+    _prune(content)
+    if url:
+        content.make_links_absolute(url, resolve_base_href=False)
+
+    page.content_html = lxml.html.tostring(content, encoding="unicode")
+    content_text = _text(content)
+    page.text_length = len(content_text)
+
+    # 置信度：正文足够长、占页面文本的比例合理、链接少
+    share = page.text_length / total_length if total_length else 1.0
+    link_density = _link_density(content, page.text_length)
+    weighted_length = page.text_length + (CJK_WEIGHT - 1) * len(CJK_CHARS.findall(content_text))
+    length_factor = min(weighted_length / 1000.0, 1.0)
+    page.confidence = round(length_factor * (1.0 - link_density) * min(1.0, 0.5 + share), 3)
+    return page
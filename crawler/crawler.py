@@ -5,7 +5,7 @@ import abc
 import asyncio
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Set, Callable, AsyncIterator
 from urllib.parse import urljoin, urlparse
 
 import aiohttp
@@ -13,28 +13,70 @@ from bs4 import BeautifulSoup
 
 from rag.retriever import Document, MysteryEvent
 from config.mystery_config import DataSourceConfig, DataSourceType
+from crawler.chunker import TextChunker, get_default_chunker
+from crawler.http_cache import HTTPResponseCache, get_shared_http_cache
+from crawler.frontier import CrawlFrontier, FrontierEntry, canonicalize_url
+from crawler.parser_pool import ParserPool, get_shared_parser_pool, make_soup, css
+from crawler.transport import CrawlTransport, get_shared_transport
 
 
 class Crawler(abc.ABC):
     """基础爬虫抽象类"""
     
-    def __init__(self, config: DataSourceConfig):
+    def __init__(self, config: DataSourceConfig, transport: Optional[CrawlTransport] = None,
+                 max_concurrency: int = 10, frontier: Optional[CrawlFrontier] = None,
+                 follow_external_links: bool = False, http_cache: Optional[HTTPResponseCache] = None,
+                 parser_pool: Optional[ParserPool] = None, chunker: Optional[TextChunker] = None):
         self.config = config
         self.logger = logging.getLogger(self.__class__.__name__)
+        # 默认使用进程内共享的传输层，不同类型的爬虫复用同一连接池
+        self.transport = transport or get_shared_transport()
+        self.max_concurrency = max_concurrency
+        # 抓取边界：解析页面时发现的链接会加入其中
+        self.frontier = frontier
+        self.follow_external_links = follow_external_links
+        self._page_depths: Dict[str, int] = {}
+        if frontier is not None:
+            frontier.register_source(config)
+        # HTTP响应缓存：重抓时发送条件请求，304时复用缓存的响应体和解析结果
+        self._http_cache = http_cache
+        self._not_modified: Set[str] = set()
+        # 解析在进程池中执行，工作进程中的爬虫副本只收集链接，由主进程写入抓取边界
+        self.parser_pool = parser_pool or get_shared_parser_pool()
+        self._collect_links = False
+        self._collected_links: List[str] = []
+        # 正文分块器：按句子和标题切分，块元数据带源文本偏移量
+        self.chunker = chunker or get_default_chunker()
         self.session: Optional[aiohttp.ClientSession] = None
         
+    def __getstate__(self):
+        """序列化到解析工作进程时去掉连接、抓取边界、缓存等进程内资源"""
+        state = self.__dict__.copy()
+        for key in ('transport', 'frontier', '_http_cache', 'session', 'parser_pool'):
+            state[key] = None
+        state['_not_modified'] = set()
+        state['_page_depths'] = {}
+        state['_collect_links'] = self.frontier is not None
+        state['_collected_links'] = []
+        return state
+        
+    @property
+    def http_cache(self) -> Optional[HTTPResponseCache]:
+        """HTTP响应缓存，默认在首次使用时打开共享的磁盘缓存"""
+        return self._http_cache if self._http_cache is not None else get_shared_http_cache()
+        
     async def __aenter__(self):
         """异步上下文管理器入口"""
-        self.session = aiohttp.ClientSession(
-            headers=self.config.headers,
-            timeout=aiohttp.ClientTimeout(total=30)
-        )
+        await self.transport.open()
+        self.transport.register_source(self.config)
+        self.session = self.transport.session
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """异步上下文管理器出口"""
         if self.session:
-            await self.session.close()
+            self.session = None
+            await self.transport.close()
             
     @abc.abstractmethod
     async def crawl_url(self, url: str) -> Optional[Document]:
@@ -46,9 +88,15 @@ class Crawler(abc.ABC):
         """搜索相关内容"""
         pass
         
-    async def batch_crawl(self, urls: List[str]) -> List[Document]:
-        """批量爬取URL"""
-        tasks = [self.crawl_url(url) for url in urls]
+    async def batch_crawl(self, urls: List[str], max_concurrency: Optional[int] = None) -> List[Document]:
+        """批量爬取URL（并发数有上限，单主机的并发和速率由传输层控制）"""
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+        
+        async def crawl_bounded(url: str) -> Optional[Document]:
+            async with semaphore:
+                return await self.crawl_url(url)
+        
+        tasks = [crawl_bounded(url) for url in urls]
         results = await asyncio.gather(*tasks, return_exceptions=True)
         
         documents = []
@@ -60,14 +108,150 @@ class Crawler(abc.ABC):
                 
         return documents
         
+    async def stream_crawl(self, urls: List[str], max_concurrency: Optional[int] = None) -> AsyncIterator[Document]:
+        """流式批量爬取，文档解析完成即产出，不等待整批结束"""
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+        
+        async def crawl_bounded(url: str) -> Optional[Document]:
+            async with semaphore:
+                return await self.crawl_url(url)
+                
+        tasks = [asyncio.ensure_future(crawl_bounded(url)) for url in urls]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    document = await next_done
+                except Exception as e:
+                    self.logger.error(f"Crawling failed: {e}")
+                    continue
+                if document:
+                    yield document
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+    async def crawl_frontier(self, max_pages: int = 100, batch_size: Optional[int] = None,
+                             max_wait: float = 30.0) -> List[Document]:
+        """从抓取边界中按优先级持续抓取，直到达到页数上限或边界为空
+        
+        每批处理后都会提交状态，中断后用同一数据库重新运行即可继续。
+        
+        Args:
+            max_pages: 本次最多抓取的页数
+            batch_size: 每批并发抓取的URL数
+            max_wait: 没有可立即抓取的URL时最多等待的秒数，超过则结束本次运行
+                （例如只剩处于重试退避中的URL）
+        """
+        if self.frontier is None:
+            raise RuntimeError("No crawl frontier configured for this crawler.")
+            
+        batch_size = batch_size or self.max_concurrency
+        source_type = self.config.source_type.value
+        documents: List[Document] = []
+        crawled = 0
+        
+        while crawled < max_pages:
+            entries = self.frontier.next_batch(min(batch_size, max_pages - crawled), source_types=[source_type])
+            if not entries:
+                wait = self.frontier.next_ready_in()
+                if wait is None or wait > max_wait:
+                    break
+                # 只剩受礼貌延迟限制的主机，等待最早可抓取的时刻
+                await asyncio.sleep(wait)
+                continue
+                
+            results = await asyncio.gather(
+                *(self._crawl_frontier_entry(entry) for entry in entries),
+                return_exceptions=True
+            )
+            for entry, result in zip(entries, results):
+                if isinstance(result, Document):
+                    documents.append(result)
+                    self.frontier.mark_done(entry.url)
+                elif isinstance(result, Exception):
+                    self.logger.error(f"Crawling failed: {result}")
+                    self.frontier.mark_failed(entry.url, error=str(result))
+                else:
+                    self.frontier.mark_failed(entry.url, error="no document extracted")
+            crawled += len(entries)
+            
+        self.frontier.checkpoint()
+        if self.http_cache:
+            stats = self.http_cache.get_stats()
+            self.logger.info(
+                f"HTTP cache: hit ratio {stats['hit_ratio']:.1%}, {stats['bytes_saved']} bytes saved"
+            )
+        return documents
+        
+    async def _crawl_frontier_entry(self, entry: FrontierEntry) -> Optional[Document]:
+        self._page_depths[entry.key] = entry.depth
+        try:
+            return await self.crawl_url(entry.url)
+        finally:
+            self._page_depths.pop(entry.key, None)
+        
+    async def _parse_off_loop(self, method: Callable[[str, str], Any], html: str, url: str) -> Any:
+        """在解析进程池中执行解析方法，并把发现的链接写入抓取边界"""
+        result, links = await self.parser_pool.parse(method, html, url)
+        if links:
+            self._add_links(links, url)
+        return result
+        
+    def _enqueue_links(self, soup: BeautifulSoup, page_url: str) -> int:
+        """将页面中发现的链接加入抓取边界，返回新加入的数量"""
+        if self._collect_links:
+            # 在解析工作进程中：只收集，由主进程写入抓取边界
+            self._collected_links.extend(self._discover_links(soup, page_url))
+            return 0
+        if self.frontier is None:
+            return 0
+        return self._add_links(self._discover_links(soup, page_url), page_url)
+        
+    def _discover_links(self, soup: BeautifulSoup, page_url: str) -> List[str]:
+        """提取页面中应跟进的链接"""
+        page_host = urlparse(page_url).netloc.lower()
+        links = []
+        for anchor in soup.find_all('a', href=True):
+            href = anchor['href'].strip()
+            if not href or href.startswith(('#', 'javascript:', 'mailto:', 'tel:')):
+                continue
+            link = urljoin(page_url, href)
+            if not self.follow_external_links and urlparse(link).netloc.lower() != page_host:
+                continue
+            if self._should_crawl_url(link):
+                links.append(link)
+        return links
+        
+    def _add_links(self, links: List[str], page_url: str) -> int:
+        if self.frontier is None:
+            return 0
+        depth = self._page_depths.get(canonicalize_url(page_url), 0) + 1
+        return self.frontier.add_many(
+            links, self.config.source_type.value, depth=depth, discovered_from=page_url
+        )
+        
     async def _fetch_html(self, url: str) -> Optional[str]:
         """获取网页HTML内容"""
         try:
             if not self.session:
                 raise RuntimeError("Session not initialized. Use async context manager.")
                 
-            async with self.session.get(url) as response:
+            headers = dict(self.config.headers)
+            if self.http_cache:
+                headers.update(self.http_cache.conditional_headers(url))
+                
+            async with self.transport.get(url, headers=headers) as response:
+                if response.status == 304 and self.http_cache:
+                    entry = self.http_cache.revalidated(url, response.headers)
+                    if entry:
+                        self._not_modified.add(url)
+                        return entry.text
+                        
                 if response.status == 200:
+                    self._not_modified.discard(url)
+                    body = await response.read()
+                    if self.http_cache:
+                        self.http_cache.store(url, body, response.headers)
                     return await response.text()
                 else:
                     self.logger.warning(f"HTTP {response.status} for {url}")
@@ -77,9 +261,21 @@ class Crawler(abc.ABC):
             self.logger.error(f"Failed to fetch {url}: {e}")
             return None
             
+    def _cached_document(self, url: str) -> Optional[Document]:
+        """页面未修改（304）时返回上次的解析结果，避免重复解析"""
+        if not self.http_cache or url not in self._not_modified:
+            return None
+        self._not_modified.discard(url)
+        return self.http_cache.get_parsed(url, self.__class__.__name__)
+        
+    def _cache_document(self, url: str, document: Document):
+        """为当前缓存的响应体保存解析结果"""
+        if self.http_cache:
+            self.http_cache.store_parsed(url, self.__class__.__name__, document)
+            
     def _parse_html(self, html: str, url: str) -> Dict[str, Any]:
         """解析HTML内容"""
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = make_soup(html)
         
         # 提取基本信息
         title = self._extract_title(soup)
@@ -119,7 +315,7 @@ class Crawler(abc.ABC):
         ]
         
         for selector in content_selectors:
-            content_elem = soup.select_one(selector)
+            content_elem = css(selector).select_one(soup)
             if content_elem:
                 return content_elem.get_text(separator='\n', strip=True)
                 
@@ -152,7 +348,7 @@ class Crawler(abc.ABC):
             'time[datetime]', '.publish-date', '.date', '.timestamp'
         ]
         for selector in date_selectors:
-            date_elem = soup.select_one(selector)
+            date_elem = css(selector).select_one(soup)
             if date_elem:
                 date_text = date_elem.get('datetime') or date_elem.get_text()
                 metadata['publication_date'] = date_text
@@ -161,7 +357,7 @@ class Crawler(abc.ABC):
         # 提取作者信息
         author_selectors = ['.author', '.byline', '.writer']
         for selector in author_selectors:
-            author_elem = soup.select_one(selector)
+            author_elem = css(selector).select_one(soup)
             if author_elem:
                 metadata['author'] = author_elem.get_text().strip()
                 break
@@ -174,7 +370,7 @@ class Crawler(abc.ABC):
             id=doc_id,
             url=parsed_data['metadata']['url'],
             title=parsed_data['title'],
-            chunks=[],  # 将在后续处理中分块
+            chunks=self.chunker.chunk(parsed_data['content'], similarity=0.8, metadata={'type': 'content'}),
             credibility_score=self.config.reliability_score,
             source_type=self.config.source_type.value,
             metadata=parsed_data['metadata']
@@ -0,0 +1,553 @@
+# Copyright (c) 2025 Lingjing Project
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import gzip
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import dateutil.parser
+from lxml import etree
+
+from config.mystery_config import DataSourceConfig
+from config.tools import CRAWL_FRONTIER_DB
+from crawler.frontier import canonicalize_url
+from crawler.parser_pool import css, make_soup
+from crawler.transport import CrawlTransport, get_shared_transport
+
+logger = logging.getLogger(__name__)
+
+FEED_TYPES = ("application/rss+xml", "application/atom+xml", "application/xml", "text/xml")
+
+# 页面未声明订阅源时依次探测的常见路径
+FALLBACK_FEED_PATHS = ("/rss.xml", "/feed", "/rss", "/sitemap_news.xml", "/news-sitemap.xml")
+
+
+@dataclass
+class FeedEntry:
+    """订阅源中的一篇文章"""
+    url: str
+    guid: str
+    feed_url: str
+    title: Optional[str] = None
+    published: Optional[datetime] = None
+
+
+@dataclass
+class ParsedFeed:
+    """一次解析的结果：文章条目与子站点地图（sitemapindex）"""
+    kind: str  # rss / atom / sitemap / sitemapindex / unknown
+    entries: List[FeedEntry] = field(default_factory=list)
+    children: List[Tuple[str, Optional[str]]] = field(default_factory=list)  # (子站点地图URL, lastmod)
+    ttl_minutes: Optional[int] = None
+
+
+def _local(element) -> str:
+    return etree.QName(element).localname.lower() if isinstance(element.tag, str) else ""
+
+
+def _child(element, name: str):
+    for child in element:
+        if _local(child) == name:
+            return child
+    return None
+
+
+def _child_text(element, name: str) -> Optional[str]:
+    child = _child(element, name)
+    if child is None or child.text is None:
+        return None
+    return child.text.strip() or None
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    """解析RFC 822（RSS）或ISO 8601（Atom/站点地图）时间，统一为UTC"""
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            parsed = dateutil.parser.parse(value)
+        except (ValueError, OverflowError):
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def parse_feed(body: bytes, feed_url: str) -> ParsedFeed:
+    """解析RSS 2.0 / Atom / 站点地图（含Google News扩展）/ 站点地图索引
+
+    按元素本地名匹配，不依赖具体的命名空间前缀。
+    """
+    if body[:2] == b"\x1f\x8b":
+        body = gzip.decompress(body)
+    parser = etree.XMLParser(recover=True, resolve_entities=False, no_network=True, huge_tree=True)
+    try:
+        root = etree.fromstring(body, parser)
+    except etree.XMLSyntaxError:
+        root = None
+    if root is None:
+        return ParsedFeed(kind="unknown")
+
+    kind = _local(root)
+    if kind == "rss" or kind == "rdf":
+        return _parse_rss(root, feed_url)
+    if kind == "feed":
+        return _parse_atom(root, feed_url)
+    if kind == "urlset":
+        return _parse_sitemap(root, feed_url)
+    if kind == "sitemapindex":
+        children = []
+        for sitemap in root:
+            loc = _child_text(sitemap, "loc")
+            if loc:
+                children.append((urljoin(feed_url, loc), _child_text(sitemap, "lastmod")))
+        return ParsedFeed(kind="sitemapindex", children=children)
+    return ParsedFeed(kind="unknown")
+
+
+def _parse_rss(root, feed_url: str) -> ParsedFeed:
+    channel = _child(root, "channel")
+    ttl = _child_text(channel, "ttl") if channel is not None else None
+    # RSS 1.0（RDF）的item与channel同级
+    items = [el for el in root.iter() if _local(el) == "item"]
+    entries = []
+    for item in items:
+        link = _child_text(item, "link")
+        guid = _child_text(item, "guid")
+        if not link and guid and guid.startswith(("http://", "https://")):
+            link = guid
+        if not link:
+            continue
+        url = urljoin(feed_url, link)
+        entries.append(FeedEntry(
+            url=url,
+            guid=guid or canonicalize_url(url),
+            feed_url=feed_url,
+            title=_child_text(item, "title"),
+            published=_parse_datetime(_child_text(item, "pubdate") or _child_text(item, "date"))
+        ))
+    return ParsedFeed(kind="rss", entries=entries, ttl_minutes=int(ttl) if ttl and ttl.isdigit() else None)
+
+
+def _parse_atom(root, feed_url: str) -> ParsedFeed:
+    entries = []
+    for entry in root:
+        if _local(entry) != "entry":
+            continue
+        link = None
+        for child in entry:
+            if _local(child) == "link" and child.get("rel", "alternate") == "alternate" and child.get("href"):
+                link = child.get("href")
+                break
+        if not link:
+            continue
+        url = urljoin(feed_url, link)
+        entries.append(FeedEntry(
+            url=url,
+            guid=_child_text(entry, "id") or canonicalize_url(url),
+            feed_url=feed_url,
+            title=_child_text(entry, "title"),
+            published=_parse_datetime(_child_text(entry, "published") or _child_text(entry, "updated"))
+        ))
+    return ParsedFeed(kind="atom", entries=entries)
+
+
+def _parse_sitemap(root, feed_url: str) -> ParsedFeed:
+    entries = []
+    for node in root:
+        loc = _child_text(node, "loc")
+        if not loc:
+            continue
+        url = urljoin(feed_url, loc)
+        # Google News站点地图：<news:news><news:publication_date/><news:title/></news:news>
+        news = _child(node, "news")
+        title = _child_text(news, "title") if news is not None else None
+        published = _child_text(news, "publication_date") if news is not None else None
+        entries.append(FeedEntry(
+            url=url,
+            guid=canonicalize_url(url),
+            feed_url=feed_url,
+            title=title,
+            published=_parse_datetime(published or _child_text(node, "lastmod"))
+        ))
+    return ParsedFeed(kind="sitemap", entries=entries)
+
+
+def discover_feed_links(html: str, page_url: str) -> List[str]:
+    """从页面的<link rel="alternate">中发现订阅源"""
+    soup = make_soup(html)
+    feeds = []
+    for link in css('link[rel~="alternate"][href]').select(soup):
+        if (link.get("type") or "").split(";")[0].strip().lower() in FEED_TYPES:
+            feeds.append(urljoin(page_url, link["href"]))
+    return list(dict.fromkeys(feeds))
+
+
+def sitemaps_from_robots(text: str, base_url: str) -> List[str]:
+    """从robots.txt的Sitemap指令中发现站点地图"""
+    sitemaps = []
+    for line in text.splitlines():
+        key, _, value = line.partition(":")
+        if key.strip().lower() == "sitemap" and value.strip():
+            sitemaps.append(urljoin(base_url, value.strip()))
+    return sitemaps
+
+
+@dataclass
+class FeedState:
+    """订阅源的轮询状态"""
+    feed_url: str
+    source_name: str
+    source_type: str
+    kind: str = "unknown"
+    parent_url: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    source_lastmod: Optional[str] = None  # 站点地图索引中声明的lastmod
+    interval: float = 900.0
+    next_poll_at: float = 0.0
+    last_polled_at: Optional[float] = None
+    last_new_items: int = 0
+
+
+class FeedStore:
+    """订阅源状态与已见GUID
+
+    与抓取边界共用同一个SQLite数据库（抓取存储）。feeds表保存每个订阅源的
+    校验器和轮询间隔，feed_items表记录已见过的GUID和规范化URL。
+    """
+
+    def __init__(self, db_path: str = CRAWL_FRONTIER_DB):
+        """初始化订阅源存储
+
+        Args:
+            db_path: SQLite数据库路径
+        """
+        self.db_path = db_path
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._init_schema()
+
+    def _init_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS feeds (
+                    feed_url TEXT PRIMARY KEY,
+                    source_name TEXT NOT NULL,
+                    source_type TEXT NOT NULL,
+                    kind TEXT NOT NULL DEFAULT 'unknown',
+                    parent_url TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    source_lastmod TEXT,
+                    interval REAL NOT NULL,
+                    next_poll_at REAL NOT NULL DEFAULT 0,
+                    last_polled_at REAL,
+                    last_new_items INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_feeds_source ON feeds (source_name, next_poll_at)")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS feed_items (
+                    guid TEXT PRIMARY KEY,
+                    url TEXT NOT NULL UNIQUE,
+                    feed_url TEXT NOT NULL,
+                    title TEXT,
+                    published TEXT,
+                    first_seen REAL NOT NULL
+                )
+            """)
+
+    def add_feed(self, state: FeedState) -> bool:
+        """登记订阅源，已存在时保留原有状态，返回是否为新订阅源"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO feeds (feed_url, source_name, source_type, kind, parent_url, "
+                "source_lastmod, interval, next_poll_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (state.feed_url, state.source_name, state.source_type, state.kind, state.parent_url,
+                 state.source_lastmod, state.interval, state.next_poll_at)
+            )
+        return cursor.rowcount == 1
+
+    def get_feed(self, feed_url: str) -> Optional[FeedState]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM feeds WHERE feed_url = ?", (feed_url,)).fetchone()
+        return FeedState(**dict(row)) if row else None
+
+    def feeds_for(self, source_name: str, due_only: bool = False) -> List[FeedState]:
+        """数据源的订阅源列表，due_only时只返回已到轮询时间的"""
+        query = "SELECT * FROM feeds WHERE source_name = ?"
+        params: list = [source_name]
+        if due_only:
+            query += " AND next_poll_at <= ?"
+            params.append(time.time())
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY next_poll_at", params).fetchall()
+        return [FeedState(**dict(row)) for row in rows]
+
+    def update_feed(self, state: FeedState):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE feeds SET kind = ?, etag = ?, last_modified = ?, source_lastmod = ?, interval = ?, "
+                "next_poll_at = ?, last_polled_at = ?, last_new_items = ? WHERE feed_url = ?",
+                (state.kind, state.etag, state.last_modified, state.source_lastmod, state.interval,
+                 state.next_poll_at, state.last_polled_at, state.last_new_items, state.feed_url)
+            )
+
+    def filter_new(self, entries: List[FeedEntry]) -> List[FeedEntry]:
+        """记录条目并返回此前未见过的（GUID和规范化URL均未出现过）"""
+        now = time.time()
+        new_entries = []
+        with self._lock, self._conn:
+            for entry in entries:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO feed_items (guid, url, feed_url, title, published, first_seen) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (entry.guid, canonicalize_url(entry.url), entry.feed_url, entry.title,
+                     entry.published.isoformat() if entry.published else None, now)
+                )
+                if cursor.rowcount == 1:
+                    new_entries.append(entry)
+        return new_entries
+
+    def prune(self, max_age_days: int = 90) -> int:
+        """删除很久以前见过的条目（它们早已滚出订阅源），返回删除数量"""
+        cutoff = time.time() - max_age_days * 86400
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM feed_items WHERE first_seen < ?", (cutoff,)).rowcount
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            feeds = self._conn.execute("SELECT COUNT(*) FROM feeds").fetchone()[0]
+            items = self._conn.execute("SELECT COUNT(*) FROM feed_items").fetchone()[0]
+        return {"feeds": feeds, "items_seen": items}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class FeedPoller:
+    """RSS/Atom/站点地图发现与增量摄取
+
+    每个数据源先发现一次订阅源（页面<link rel="alternate">、robots.txt中的
+    Sitemap、常见路径），之后按各自的间隔用条件请求轮询：304或没有新条目时
+    逐步拉长间隔，有新条目时恢复基础间隔。与已见GUID比对后只返回新文章。
+    """
+
+    def __init__(
+        self,
+        store: Optional[FeedStore] = None,
+        transport: Optional[CrawlTransport] = None,
+        base_interval: float = 900.0,
+        max_interval: float = 6 * 3600.0,
+        backoff_factor: float = 1.5,
+        max_entry_age_days: Optional[int] = 7
+    ):
+        """初始化轮询器
+
+        Args:
+            store: 订阅源状态存储，默认使用共享存储
+            transport: HTTP传输层，默认使用共享传输层
+            base_interval: 基础轮询间隔（秒）
+            max_interval: 最长轮询间隔（秒）
+            backoff_factor: 无更新时间隔的增长系数
+            max_entry_age_days: 忽略发布时间早于此天数的条目（首次摄取大型站点地图时尤其有用）
+        """
+        self._store = store
+        self.transport = transport or get_shared_transport()
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.max_entry_age_days = max_entry_age_days
+        self._opened = False
+
+    @property
+    def store(self) -> FeedStore:
+        """订阅源状态存储，默认在首次使用时打开共享存储"""
+        return self._store if self._store is not None else get_shared_feed_store()
+
+    async def __aenter__(self):
+        await self.transport.open()
+        self._opened = True
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._opened:
+            self._opened = False
+            await self.transport.close()
+
+    async def discover(self, config: DataSourceConfig) -> List[str]:
+        """为数据源发现订阅源并登记，返回新登记的订阅源URL"""
+        self.transport.register_source(config)
+        candidates = list(config.feed_urls)
+
+        if not candidates:
+            html = await self._get_text(config.base_url, config.headers)
+            if html:
+                candidates.extend(discover_feed_links(html, config.base_url))
+            robots = await self._get_text(urljoin(config.base_url, "/robots.txt"), config.headers)
+            if robots:
+                # 只跟进看起来是新闻站点地图的条目，完整站点地图对增量摄取没有意义
+                candidates.extend(
+                    sitemap for sitemap in sitemaps_from_robots(robots, config.base_url)
+                    if "news" in sitemap.lower()
+                )
+
+        if not candidates:
+            for path in FALLBACK_FEED_PATHS:
+                url = urljoin(config.base_url, path)
+                body = await self._get_bytes(url, config.headers)
+                if body and parse_feed(body, url).kind != "unknown":
+                    candidates.append(url)
+                    break
+
+        registered = []
+        for feed_url in dict.fromkeys(candidates):
+            state = FeedState(
+                feed_url=feed_url,
+                source_name=config.name,
+                source_type=config.source_type.value,
+                interval=self.base_interval
+            )
+            if self.store.add_feed(state):
+                registered.append(feed_url)
+        if registered:
+            logger.info(f"Discovered {len(registered)} feeds for {config.name}")
+        elif not candidates:
+            logger.warning(f"No feeds or news sitemaps found for {config.name}")
+        return registered
+
+    async def poll_source(self, config: DataSourceConfig, force: bool = False) -> List[FeedEntry]:
+        """轮询数据源所有到期的订阅源，返回新文章"""
+        if not self.store.feeds_for(config.name):
+            await self.discover(config)
+        self.transport.register_source(config)
+
+        new_entries: List[FeedEntry] = []
+        for state in self.store.feeds_for(config.name, due_only=not force):
+            # 子站点地图由所属索引按lastmod驱动轮询
+            if state.parent_url is None:
+                new_entries.extend(await self.poll(state, config.headers))
+        return new_entries
+
+    async def poll(self, state: FeedState, headers: Optional[Dict[str, str]] = None) -> List[FeedEntry]:
+        """用条件请求轮询一个订阅源，返回新文章"""
+        request_headers = dict(headers or {})
+        if state.etag:
+            request_headers["If-None-Match"] = state.etag
+        if state.last_modified:
+            request_headers["If-Modified-Since"] = state.last_modified
+
+        now = time.time()
+        state.last_polled_at = now
+        try:
+            async with self.transport.get(state.feed_url, headers=request_headers) as response:
+                if response.status == 304:
+                    self._reschedule(state, new_items=0)
+                    return []
+                if response.status != 200:
+                    logger.warning(f"HTTP {response.status} polling feed {state.feed_url}")
+                    self._reschedule(state, new_items=0)
+                    return []
+                body = await response.read()
+                state.etag = response.headers.get("ETag")
+                state.last_modified = response.headers.get("Last-Modified")
+        except Exception as e:
+            logger.error(f"Failed to poll feed {state.feed_url}: {e}")
+            self._reschedule(state, new_items=0)
+            return []
+
+        # 大型站点地图的解析放到线程中，避免阻塞事件循环
+        parsed = await asyncio.get_running_loop().run_in_executor(None, parse_feed, body, state.feed_url)
+        state.kind = parsed.kind
+
+        if parsed.kind == "sitemapindex":
+            new_entries = await self._poll_children(state, parsed, headers)
+        else:
+            new_entries = self.store.filter_new(self._recent(parsed.entries))
+            if parsed.ttl_minutes:
+                state.interval = max(state.interval, parsed.ttl_minutes * 60.0)
+
+        self._reschedule(state, new_items=len(new_entries))
+        return new_entries
+
+    async def _poll_children(self, index: FeedState, parsed: ParsedFeed,
+                             headers: Optional[Dict[str, str]]) -> List[FeedEntry]:
+        """站点地图索引：只轮询新出现或lastmod有变化的子站点地图"""
+        new_entries: List[FeedEntry] = []
+        for child_url, lastmod in parsed.children:
+            child = self.store.get_feed(child_url)
+            if child is None:
+                child = FeedState(
+                    feed_url=child_url,
+                    source_name=index.source_name,
+                    source_type=index.source_type,
+                    parent_url=index.feed_url,
+                    interval=self.base_interval
+                )
+                self.store.add_feed(child)
+            elif lastmod and lastmod == child.source_lastmod:
+                continue
+            elif not lastmod and child.next_poll_at > time.time():
+                continue
+            child.source_lastmod = lastmod
+            new_entries.extend(await self.poll(child, headers))
+        return new_entries
+
+    def _recent(self, entries: List[FeedEntry]) -> List[FeedEntry]:
+        if not self.max_entry_age_days:
+            return entries
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.max_entry_age_days)
+        return [entry for entry in entries if entry.published is None or entry.published >= cutoff]
+
+    def _reschedule(self, state: FeedState, new_items: int):
+        # 有新条目时恢复基础间隔，否则逐步拉长
+        if new_items:
+            state.interval = self.base_interval
+        else:
+            state.interval = min(self.max_interval, state.interval * self.backoff_factor)
+        state.last_new_items = new_items
+        state.next_poll_at = (state.last_polled_at or time.time()) + state.interval
+        self.store.update_feed(state)
+
+    async def _get_bytes(self, url: str, headers: Optional[Dict[str, str]] = None) -> Optional[bytes]:
+        try:
+            async with self.transport.get(url, headers=headers) as response:
+                if response.status == 200:
+                    return await response.read()
+        except Exception as e:
+            logger.debug(f"Feed discovery request failed for {url}: {e}")
+        return None
+
+    async def _get_text(self, url: str, headers: Optional[Dict[str, str]] = None) -> Optional[str]:
+        body = await self._get_bytes(url, headers)
+        return body.decode("utf-8", errors="replace") if body is not None else None
+
+
+_shared_store: Optional[FeedStore] = None
+_shared_store_lock = threading.Lock()
+
+
+def get_shared_feed_store() -> FeedStore:
+    """获取进程内共享的订阅源存储"""
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = FeedStore()
+    return _shared_store
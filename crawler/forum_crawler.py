@@ -3,38 +3,112 @@
 
 import hashlib
 import re
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Dict, List, Optional, Any
-from urllib.parse import quote, urljoin
+from urllib.parse import quote, urljoin, urlparse, urlunparse, parse_qsl, urlencode
 
 from crawler.crawler import Crawler
+from crawler.frontier import canonicalize_url
+from crawler.parser_pool import css, make_soup
+from crawler.thread_store import ThreadStore, ThreadState, get_shared_thread_store
 from rag.retriever import Document, Chunk
 from config.mystery_config import DataSourceConfig
 
+# 分页参数：?page=3、?p=3、?start=40、/page-3、/page/3
+PAGE_QUERY_PARAMS = ("page", "p", "start")
+PAGE_PATH_PATTERN = re.compile(r'/page[-/](\d+)/?$')
+
 
 class ForumCrawler(Crawler):
     """论坛社区爬虫"""
     
-    def __init__(self, config: DataSourceConfig):
-        super().__init__(config)
+    def __init__(self, config: DataSourceConfig, thread_store: Optional[ThreadStore] = None,
+                 max_thread_pages: int = 20, **kwargs):
+        super().__init__(config, **kwargs)
         self.forum_indicators = [
             "post", "thread", "reply", "forum", "discussion",
             "member", "user", "joined", "posts:"
         ]
+        # 主题抓取进度：重抓时从上次的最后一页继续，只处理新帖子
+        self._thread_store = thread_store
+        # 单次抓取最多跟进的分页数，超出部分留给下次增量抓取
+        self.max_thread_pages = max_thread_pages
+        
+    def __getstate__(self):
+        state = super().__getstate__()
+        state['_thread_store'] = None
+        return state
+        
+    @property
+    def thread_store(self) -> ThreadStore:
+        """主题状态存储，默认在首次使用时打开共享存储"""
+        return self._thread_store if self._thread_store is not None else get_shared_thread_store()
         
     async def crawl_url(self, url: str) -> Optional[Document]:
-        """爬取论坛页面"""
-        html = await self._fetch_html(url)
-        if not html:
-            return None
+        """爬取论坛主题
+        
+        首次抓取时沿分页链接抓取整个主题；再次抓取时从上次的最后一页开始，
+        只解析高水位线之后的帖子，并作为新块追加到已保存的文档中。
+        """
+        thread_key = self._thread_key(url)
+        state = self.thread_store.get(thread_key)
+        document = self.thread_store.load_document(thread_key) if state else None
+        if document is None:
+            state = ThreadState(thread_key=thread_key, url=url)
+        stored = document is not None
+            
+        page_url = state.last_page_url or url
+        page_number = state.last_page
+        new_posts = 0
+        added_posts: List[Dict[str, Any]] = []
+        added_chunks: List[Chunk] = []
+        
+        for _ in range(self.max_thread_pages):
+            html = await self._fetch_html(page_url)
+            if not html:
+                break
+            unchanged = page_url in self._not_modified
+            self._not_modified.discard(page_url)
+            if unchanged and document is not None:
+                # 最后一页未修改：既没有新帖子也没有新的分页
+                break
+                
+            parsed_data = await self._parse_off_loop(self._parse_forum_html, html, page_url)
+            if not parsed_data:
+                break
+                
+            posts = parsed_data['metadata']['posts']
+            if page_url == state.last_page_url:
+                posts = self._posts_after(posts, state)
+                
+            if document is None:
+                parsed_data['metadata']['posts'] = posts
+                document = self._create_forum_document(parsed_data, hashlib.md5(url.encode()).hexdigest())
+            else:
+                added_chunks.extend(self._append_posts(document, posts))
+                added_posts.extend(posts)
+                
+            state.last_page = self._page_number(page_url) or page_number
+            state.last_page_url = page_url
+            self._advance_high_water_mark(state, posts)
+            new_posts += len(posts)
             
-        parsed_data = self._parse_forum_html(html, url)
-        if not parsed_data:
+            next_page = parsed_data.get('next_page')
+            if not next_page:
+                break
+            page_url = next_page
+            page_number = state.last_page + 1
+            
+        if document is None:
             return None
+        if not stored:
+            self.thread_store.save(state, document)
+        elif new_posts:
+            # 已保存的主题只追加新帖子，不重写整个文档
+            self.thread_store.append_posts(state, added_posts, added_chunks)
+        if new_posts or not stored:
+            self.logger.info(f"Thread {thread_key}: {new_posts} new posts, {state.posts_count} total")
             
-        doc_id = hashlib.md5(url.encode()).hexdigest()
-        document = self._create_forum_document(parsed_data, doc_id)
-        
         return document
         
     async def search(self, query: str, limit: int = 10) -> List[Document]:
@@ -47,17 +121,15 @@ class ForumCrawler(Crawler):
         # 生成搜索URL
         search_urls = self._generate_forum_search_urls(forum_query, limit)
         
-        for url in search_urls:
-            doc = await self.crawl_url(url)
-            if doc:
-                documents.append(doc)
+        # 并发抓取，单主机的并发和速率由共享传输层控制
+        documents.extend(await self.batch_crawl(search_urls))
                 
         return documents[:limit]
         
     def _parse_forum_html(self, html: str, url: str) -> Optional[Dict[str, Any]]:
         """解析论坛HTML"""
-        from bs4 import BeautifulSoup
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = make_soup(html)
+        self._enqueue_links(soup, url)
         
         # 检查是否为论坛页面
         if not self._is_forum_page(soup):
@@ -97,9 +169,81 @@ class ForumCrawler(Crawler):
         return {
             'title': title,
             'content': content,
-            'metadata': metadata
+            'metadata': metadata,
+            'next_page': self._extract_next_page(soup, url)
         }
         
+    def _extract_next_page(self, soup, url: str) -> Optional[str]:
+        """提取主题的下一页链接"""
+        next_selectors = [
+            'link[rel="next"]',
+            'a[rel="next"]',
+            '.pagination .next a',
+            '.pagination a.next',
+            '.pagenav a.next',
+            'a.next-page'
+        ]
+        
+        for selector in next_selectors:
+            next_elem = css(selector).select_one(soup)
+            if next_elem and next_elem.get('href'):
+                next_url = urljoin(url, next_elem['href'])
+                if canonicalize_url(next_url) != canonicalize_url(url):
+                    return next_url
+                    
+        return None
+        
+    @staticmethod
+    def _page_number(url: str) -> Optional[int]:
+        """从URL中解析页码，无法识别时返回None"""
+        parsed = urlparse(url)
+        for key, value in parse_qsl(parsed.query):
+            if key in PAGE_QUERY_PARAMS and value.isdigit():
+                return int(value)
+        path_match = PAGE_PATH_PATTERN.search(parsed.path)
+        return int(path_match.group(1)) if path_match else None
+        
+    @staticmethod
+    def _thread_key(url: str) -> str:
+        """主题标识：优先使用URL中的主题ID，否则使用去掉分页参数的规范化URL"""
+        parsed = urlparse(url)
+        host = re.sub(r'^www\.', '', parsed.netloc.lower())
+        thread_id_match = re.search(r'(?:thread|topic|t)[=/](\d+)', url)
+        if thread_id_match:
+            return f"{host}:{thread_id_match.group(1)}"
+        query = urlencode([(k, v) for k, v in parse_qsl(parsed.query) if k not in PAGE_QUERY_PARAMS])
+        path = PAGE_PATH_PATTERN.sub('', parsed.path)
+        return canonicalize_url(urlunparse(parsed._replace(path=path, query=query)))
+        
+    def _posts_after(self, posts: List[Dict[str, Any]], state: ThreadState) -> List[Dict[str, Any]]:
+        """筛选出高水位线之后的新帖子"""
+        post_ids = [post.get('id') for post in posts]
+        if state.last_post_id and state.last_post_id in post_ids:
+            return posts[post_ids.index(state.last_post_id) + 1:]
+        if state.last_post_time:
+            last_time = datetime.fromisoformat(state.last_post_time)
+            return [
+                post for post in posts
+                if post.get('timestamp') and self._utc_naive(post['timestamp']) > last_time
+            ]
+        return posts
+        
+    def _advance_high_water_mark(self, state: ThreadState, posts: List[Dict[str, Any]]):
+        if not posts:
+            return
+        last_post = posts[-1]
+        state.last_post_id = last_post.get('id')
+        if last_post.get('timestamp'):
+            state.last_post_time = self._utc_naive(last_post['timestamp']).isoformat()
+        state.posts_count += len(posts)
+        
+    @staticmethod
+    def _utc_naive(value: datetime) -> datetime:
+        # 统一为不带时区的UTC时间，避免带/不带时区的时间无法比较
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+        
     def _is_forum_page(self, soup) -> bool:
         """检查是否为论坛页面"""
         text = soup.get_text().lower()
@@ -118,7 +262,7 @@ class ForumCrawler(Crawler):
             '.reply', '.discussion', '.topic'
         ]
         
-        structure_count = sum(1 for selector in forum_selectors if soup.select(selector))
+        structure_count = sum(1 for selector in forum_selectors if css(selector).select(soup))
         
         return keyword_count >= 2 or structure_count >= 1
         
@@ -135,7 +279,7 @@ class ForumCrawler(Crawler):
         ]
         
         for selector in title_selectors:
-            title_elem = soup.select_one(selector)
+            title_elem = css(selector).select_one(soup)
             if title_elem:
                 title = title_elem.get_text().strip()
                 if len(title) > 5:  # 确保标题有意义
@@ -158,7 +302,7 @@ class ForumCrawler(Crawler):
         ]
         
         for selector in post_selectors:
-            post_elems = soup.select(selector)
+            post_elems = css(selector).select(soup)
             if post_elems:
                 for i, post_elem in enumerate(post_elems):
                     post_data = self._parse_single_post(post_elem, i)
@@ -181,10 +325,10 @@ class ForumCrawler(Crawler):
         
         content = ""
         for selector in content_selectors:
-            content_elem = post_elem.select_one(selector)
+            content_elem = css(selector).select_one(post_elem)
             if content_elem:
                 # 移除引用和签名
-                for quote in content_elem.select('.quote, .signature, .sig'):
+                for quote in css('.quote, .signature, .sig').select(content_elem):
                     quote.decompose()
                 content = content_elem.get_text(separator='\n', strip=True)
                 break
@@ -223,7 +367,7 @@ class ForumCrawler(Crawler):
         ]
         
         for selector in username_selectors:
-            username_elem = post_elem.select_one(selector)
+            username_elem = css(selector).select_one(post_elem)
             if username_elem:
                 user_info['username'] = username_elem.get_text().strip()
                 break
@@ -237,7 +381,7 @@ class ForumCrawler(Crawler):
         ]
         
         for selector in rank_selectors:
-            rank_elem = post_elem.select_one(selector)
+            rank_elem = css(selector).select_one(post_elem)
             if rank_elem:
                 user_info['rank'] = rank_elem.get_text().strip()
                 break
@@ -250,7 +394,7 @@ class ForumCrawler(Crawler):
         ]
         
         for selector in joined_selectors:
-            joined_elem = post_elem.select_one(selector)
+            joined_elem = css(selector).select_one(post_elem)
             if joined_elem:
                 user_info['joined'] = joined_elem.get_text().strip()
                 break
@@ -263,7 +407,7 @@ class ForumCrawler(Crawler):
         ]
         
         for selector in posts_count_selectors:
-            posts_elem = post_elem.select_one(selector)
+            posts_elem = css(selector).select_one(post_elem)
             if posts_elem:
                 posts_text = posts_elem.get_text()
                 posts_match = re.search(r'(\d+)', posts_text)
@@ -284,7 +428,7 @@ class ForumCrawler(Crawler):
         ]
         
         for selector in time_selectors:
-            time_elem = post_elem.select_one(selector)
+            time_elem = css(selector).select_one(post_elem)
             if time_elem:
                 time_text = time_elem.get('datetime') or time_elem.get_text()
                 parsed_time = self._parse_date(time_text)
@@ -316,7 +460,7 @@ class ForumCrawler(Crawler):
         ]
         
         for selector in forum_name_selectors:
-            name_elem = soup.select_one(selector)
+            name_elem = css(selector).select_one(soup)
             if name_elem:
                 forum_info['name'] = name_elem.get_text().strip()
                 break
@@ -401,23 +545,9 @@ class ForumCrawler(Crawler):
             
     def _create_forum_document(self, parsed_data: Dict[str, Any], doc_id: str) -> Document:
         """创建论坛文档对象"""
-        # 创建文档块
-        chunks = []
-        
         # 为每个帖子创建一个块
         posts = parsed_data['metadata'].get('posts', [])
-        for post in posts:
-            if post.get('content'):
-                chunks.append(Chunk(
-                    content=post['content'],
-                    similarity=0.6,
-                    metadata={
-                        'type': 'forum_post',
-                        'post_id': post.get('id'),
-                        'user': post.get('user', {}),
-                        'timestamp': post.get('timestamp').isoformat() if post.get('timestamp') else None
-                    }
-                ))
+        chunks = [chunk for post in posts if post.get('content') for chunk in self._create_post_chunks(post)]
                 
         return Document(
             id=doc_id,
@@ -429,6 +559,30 @@ class ForumCrawler(Crawler):
             metadata=parsed_data['metadata']
         )
         
+    def _create_post_chunks(self, post: Dict[str, Any]) -> List[Chunk]:
+        """每个帖子单独分块（帖子之间不合并），长帖按句子切分，偏移量相对于帖子正文"""
+        return self.chunker.chunk(
+            post['content'],
+            similarity=0.6,
+            metadata={
+                'type': 'forum_post',
+                'post_id': post.get('id'),
+                'user': post.get('user', {}),
+                'timestamp': post.get('timestamp').isoformat() if post.get('timestamp') else None
+            }
+        )
+        
+    def _append_posts(self, document: Document, posts: List[Dict[str, Any]]) -> List[Chunk]:
+        """把新帖子作为新块追加到已有文档，不重建已有内容，返回新增的块"""
+        if not posts:
+            return []
+        chunks = [chunk for post in posts if post.get('content') for chunk in self._create_post_chunks(post)]
+        document.chunks.extend(chunks)
+        document.metadata.setdefault('posts', []).extend(posts)
+        document.metadata['posts_count'] = len(document.metadata['posts'])
+        document.metadata['crawled_at'] = datetime.now().isoformat()
+        return chunks
+        
     def _build_forum_query(self, query: str) -> str:
         """构建论坛搜索查询"""
         # 添加论坛相关的关键词
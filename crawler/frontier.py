@@ -0,0 +1,417 @@
+# Copyright (c) 2025 Lingjing Project
+# SPDX-License-Identifier: MIT
+
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Iterable
+from urllib.parse import urldefrag, urlsplit, urlunsplit, parse_qsl, urlencode
+
+from config.mystery_config import DataSourceConfig, DataSourceType
+from config.tools import CRAWL_FRONTIER_DB
+
+logger = logging.getLogger(__name__)
+
+# 规范化时去除的跟踪参数
+TRACKING_PARAMS = {"fbclid", "gclid", "yclid", "mc_cid", "mc_eid", "ref", "spm"}
+
+# 各数据源类型的基础优先级（越大越先抓取）
+DEFAULT_SOURCE_PRIORITIES: Dict[str, int] = {
+    DataSourceType.ACADEMIC.value: 50,
+    DataSourceType.GOVERNMENT.value: 50,
+    DataSourceType.RESEARCH_INSTITUTE.value: 40,
+    DataSourceType.NEWS.value: 30,
+    DataSourceType.DOCUMENTARY.value: 20,
+    DataSourceType.FORUM.value: 10,
+}
+
+
+def canonicalize_url(url: str) -> str:
+    """URL规范化，用于去重
+
+    小写协议和主机、去掉默认端口和片段、清理跟踪参数并排序查询参数、
+    解析路径中的 . 和 .. 段。
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "http"
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+
+    # 解析路径中的 . 和 .. 段
+    segments: List[str] = []
+    for segment in parts.path.split("/"):
+        if segment == "..":
+            if segments:
+                segments.pop()
+        elif segment and segment != ".":
+            segments.append(segment)
+    path = "/" + "/".join(segments)
+    if parts.path.endswith("/") and segments:
+        path += "/"
+
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+class BloomFilter:
+    """布隆过滤器，作为已见URL热集合的快速预检
+
+    判定为"不存在"时一定不存在；判定为"存在"时需回查数据库。
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001):
+        """初始化布隆过滤器
+
+        Args:
+            capacity: 预期元素数量
+            error_rate: 期望误判率
+        """
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterable[int]:
+        # 双重哈希：h1 + i * h2
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+@dataclass
+class FrontierEntry:
+    """待抓取的URL
+
+    url是发现时的原始URL（实际抓取使用），key是规范化后的URL（只用于去重和状态更新）。
+    """
+    url: str
+    host: str
+    source_type: str
+    priority: int
+    depth: int = 0
+    attempts: int = 0
+    discovered_from: Optional[str] = None
+    key: str = ""
+
+    def __post_init__(self):
+        if not self.key:
+            self.key = canonicalize_url(self.url)
+
+
+class CrawlFrontier:
+    """持久化抓取边界与调度器
+
+    基于SQLite保存所有已发现URL的状态（pending/in_progress/done/failed），
+    按数据源类型优先级出队，并对每个主机施加礼貌延迟。进程崩溃后重新打开
+    同一数据库即可从断点继续：遗留的in_progress记录会被重置为pending。
+    """
+
+    def __init__(
+        self,
+        db_path: str = CRAWL_FRONTIER_DB,
+        politeness_delay: float = 1.0,
+        source_priorities: Optional[Dict[str, int]] = None,
+        max_depth: int = 3,
+        max_attempts: int = 3,
+        bloom_capacity: int = 1_000_000
+    ):
+        """初始化抓取边界
+
+        Args:
+            db_path: SQLite数据库路径
+            politeness_delay: 同一主机两次请求之间的默认最小间隔（秒）
+            source_priorities: 数据源类型到基础优先级的映射
+            max_depth: 链接发现的最大深度
+            max_attempts: 单个URL的最大尝试次数
+            bloom_capacity: 布隆过滤器的预期容量
+        """
+        self.db_path = db_path
+        self.politeness_delay = politeness_delay
+        self.source_priorities = {**DEFAULT_SOURCE_PRIORITIES, **(source_priorities or {})}
+        self.max_depth = max_depth
+        self.max_attempts = max_attempts
+
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._seen = BloomFilter(capacity=bloom_capacity)
+
+        self._init_schema()
+        self._resume()
+
+    def _init_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS urls (
+                    url TEXT PRIMARY KEY,
+                    fetch_url TEXT,
+                    host TEXT NOT NULL,
+                    source_type TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    depth INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    discovered_from TEXT,
+                    added_at REAL NOT NULL,
+                    next_fetch_at REAL NOT NULL DEFAULT 0,
+                    fetched_at REAL,
+                    http_status INTEGER,
+                    error TEXT
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_urls_queue ON urls (status, priority DESC, added_at)"
+            )
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS hosts (
+                    host TEXT PRIMARY KEY,
+                    delay REAL NOT NULL,
+                    next_allowed_at REAL NOT NULL DEFAULT 0
+                )
+            """)
+
+    def _resume(self):
+        """断点恢复：重置上次未完成的URL，并把已见URL装入布隆过滤器"""
+        with self._lock, self._conn:
+            reset = self._conn.execute(
+                "UPDATE urls SET status = 'pending' WHERE status = 'in_progress'"
+            ).rowcount
+            for (url,) in self._conn.execute("SELECT url FROM urls"):
+                self._seen.add(url)
+        if reset:
+            logger.info(f"Resumed crawl frontier: {reset} interrupted URLs re-queued")
+
+    def register_source(self, config: DataSourceConfig):
+        """按数据源的每分钟请求限制设置主机礼貌延迟"""
+        host = urlsplit(config.base_url).netloc.lower()
+        if host and config.rate_limit > 0:
+            self.set_host_delay(host, 60.0 / config.rate_limit)
+
+    def set_host_delay(self, host: str, delay: float):
+        """设置主机的最小请求间隔（秒）"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO hosts (host, delay) VALUES (?, ?) "
+                "ON CONFLICT(host) DO UPDATE SET delay = excluded.delay",
+                (self._host_key(host), delay)
+            )
+
+    def add(
+        self,
+        url: str,
+        source_type: str,
+        priority: int = 0,
+        depth: int = 0,
+        discovered_from: Optional[str] = None
+    ) -> bool:
+        """加入一个URL
+
+        Args:
+            url: 原始URL
+            source_type: 数据源类型（决定基础优先级）
+            priority: 相对于基础优先级的额外加权
+            depth: 链接发现深度
+            discovered_from: 发现该链接的页面URL
+
+        Returns:
+            是否为新URL
+        """
+        return self.add_many([url], source_type, priority, depth, discovered_from) == 1
+
+    def add_many(
+        self,
+        urls: Iterable[str],
+        source_type: str,
+        priority: int = 0,
+        depth: int = 0,
+        discovered_from: Optional[str] = None
+    ) -> int:
+        """批量加入URL，返回新加入的数量"""
+        if depth > self.max_depth:
+            return 0
+
+        effective_priority = self.source_priorities.get(source_type, 0) + priority - depth
+        now = time.time()
+        rows = []
+        for url in urls:
+            canonical = canonicalize_url(url)
+            if not canonical.startswith(("http://", "https://")):
+                continue
+            # 规范化URL只作去重键，抓取时使用原始URL（部分站点的www主机或查询参数不可省略）
+            rows.append((
+                canonical, urldefrag(url.strip())[0], self._host_key(urlsplit(canonical).netloc), source_type,
+                effective_priority, depth, discovered_from, now
+            ))
+
+        if not rows:
+            return 0
+
+        added = 0
+        with self._lock, self._conn:
+            for row in rows:
+                canonical = row[0]
+                # 布隆过滤器判定不存在的URL必然是新的，判定存在时再回查数据库
+                if canonical in self._seen and self._exists(canonical):
+                    continue
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO urls "
+                    "(url, fetch_url, host, source_type, priority, depth, discovered_from, added_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    row
+                )
+                self._seen.add(canonical)
+                added += cursor.rowcount
+        return added
+
+    def next_batch(self, limit: int = 10, source_types: Optional[List[str]] = None) -> List[FrontierEntry]:
+        """按优先级取出一批可立即抓取的URL
+
+        每个主机在一批中最多出现一次，且必须已过礼貌延迟；
+        取出的URL标记为in_progress，并推迟该主机的下次可抓取时间。
+        """
+        now = time.time()
+        query = (
+            "SELECT u.url, u.fetch_url, u.host, u.source_type, u.priority, u.depth, u.attempts, u.discovered_from "
+            "FROM urls u LEFT JOIN hosts h ON u.host = h.host "
+            "WHERE u.status = 'pending' AND u.next_fetch_at <= ? "
+            "AND COALESCE(h.next_allowed_at, 0) <= ?"
+        )
+        params: List = [now, now]
+        if source_types:
+            query += f" AND u.source_type IN ({','.join('?' * len(source_types))})"
+            params.extend(source_types)
+        query += " ORDER BY u.priority DESC, u.added_at LIMIT ?"
+        # 多取一些候选，以便跳过同一主机的重复URL
+        params.append(limit * 8)
+
+        entries: List[FrontierEntry] = []
+        with self._lock, self._conn:
+            hosts_taken = set()
+            for row in self._conn.execute(query, params).fetchall():
+                if row["host"] in hosts_taken:
+                    continue
+                hosts_taken.add(row["host"])
+                entries.append(FrontierEntry(
+                    url=row["fetch_url"],
+                    host=row["host"],
+                    source_type=row["source_type"],
+                    priority=row["priority"],
+                    depth=row["depth"],
+                    attempts=row["attempts"],
+                    discovered_from=row["discovered_from"],
+                    key=row["url"]
+                ))
+                if len(entries) >= limit:
+                    break
+
+            for entry in entries:
+                self._conn.execute(
+                    "UPDATE urls SET status = 'in_progress', attempts = attempts + 1 WHERE url = ?",
+                    (entry.key,)
+                )
+                self._conn.execute(
+                    "INSERT INTO hosts (host, delay, next_allowed_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(host) DO UPDATE SET next_allowed_at = ? + hosts.delay",
+                    (entry.host, self.politeness_delay, now + self.politeness_delay, now)
+                )
+        return entries
+
+    def next_ready_in(self) -> Optional[float]:
+        """距离下一个URL可抓取还需等待的秒数，没有待抓取URL时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(MAX(u.next_fetch_at, COALESCE(h.next_allowed_at, 0))) "
+                "FROM urls u LEFT JOIN hosts h ON u.host = h.host WHERE u.status = 'pending'"
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def mark_done(self, url: str, http_status: int = 200):
+        """标记URL抓取成功"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE urls SET status = 'done', fetched_at = ?, http_status = ?, error = NULL "
+                "WHERE url = ?",
+                (time.time(), http_status, canonicalize_url(url))
+            )
+
+    def mark_failed(self, url: str, error: str = "", http_status: Optional[int] = None, retry: bool = True):
+        """标记URL抓取失败，未超过最大尝试次数时按指数退避重新排队"""
+        canonical = canonicalize_url(url)
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT attempts FROM urls WHERE url = ?", (canonical,)).fetchone()
+            if not row:
+                return
+            if retry and row["attempts"] < self.max_attempts:
+                self._conn.execute(
+                    "UPDATE urls SET status = 'pending', next_fetch_at = ?, http_status = ?, error = ? "
+                    "WHERE url = ?",
+                    (time.time() + 30 * 2 ** row["attempts"], http_status, error, canonical)
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE urls SET status = 'failed', fetched_at = ?, http_status = ?, error = ? "
+                    "WHERE url = ?",
+                    (time.time(), http_status, error, canonical)
+                )
+
+    def checkpoint(self):
+        """把WAL日志合并进主数据库文件"""
+        with self._lock:
+            self._conn.commit()
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def get_stats(self) -> Dict[str, int]:
+        """各状态的URL数量"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM urls GROUP BY status").fetchall()
+        stats = {"pending": 0, "in_progress": 0, "done": 0, "failed": 0}
+        stats.update({status: count for status, count in rows})
+        return stats
+
+    def has_pending(self) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM urls WHERE status IN ('pending', 'in_progress') LIMIT 1"
+            ).fetchone()
+        return row is not None
+
+    def close(self):
+        self.checkpoint()
+        self._conn.close()
+
+    def _exists(self, canonical: str) -> bool:
+        return self._conn.execute("SELECT 1 FROM urls WHERE url = ?", (canonical,)).fetchone() is not None
+
+    @staticmethod
+    def _host_key(host: str) -> str:
+        host = host.lower()
+        return host[4:] if host.startswith("www.") else host
@@ -0,0 +1,249 @@
+# Copyright (c) 2025 Lingjing Project
+# SPDX-License-Identifier: MIT
+
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Optional, Any, Mapping
+
+from config.tools import HTTP_CACHE_DB, HTTP_CACHE_ENABLED
+from crawler.frontier import canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    """缓存的HTTP响应"""
+    url: str
+    body: bytes
+    content_type: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+    validated_at: float
+
+    @property
+    def text(self) -> str:
+        """按Content-Type中的字符集解码响应体"""
+        charset = "utf-8"
+        if "charset=" in self.content_type:
+            charset = self.content_type.split("charset=")[-1].split(";")[0].strip() or charset
+        try:
+            return self.body.decode(charset, errors="replace")
+        except LookupError:
+            return self.body.decode("utf-8", errors="replace")
+
+
+class HTTPResponseCache:
+    """磁盘HTTP响应缓存
+
+    以zlib压缩保存响应体及其校验器（ETag/Last-Modified），重抓时发送
+    If-None-Match/If-Modified-Since，收到304即复用缓存的响应体。
+    对同一响应体的解析结果也可一并缓存，304时跳过重新解析。
+    """
+
+    def __init__(self, db_path: str = HTTP_CACHE_DB, compress_level: int = 6):
+        """初始化响应缓存
+
+        Args:
+            db_path: SQLite数据库路径
+            compress_level: zlib压缩级别
+        """
+        self.db_path = db_path
+        self.compress_level = compress_level
+
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "hits": 0, "misses": 0, "bytes_saved": 0, "bytes_stored": 0}
+        self._init_schema()
+
+    def _init_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_type TEXT,
+                    body BLOB NOT NULL,
+                    body_size INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    validated_at REAL NOT NULL,
+                    parsed BLOB,
+                    parsed_by TEXT
+                )
+            """)
+
+    def get(self, url: str, variant: str = "") -> Optional[CacheEntry]:
+        """读取缓存的响应
+
+        Args:
+            url: 请求URL
+            variant: 同一URL的不同表示（如Jina的返回格式）
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, body, content_type, etag, last_modified, fetched_at, validated_at "
+                "FROM responses WHERE key = ?",
+                (self._key(url, variant),)
+            ).fetchone()
+        if not row:
+            return None
+        return CacheEntry(
+            url=row[0],
+            body=zlib.decompress(row[1]),
+            content_type=row[2] or "",
+            etag=row[3],
+            last_modified=row[4],
+            fetched_at=row[5],
+            validated_at=row[6]
+        )
+
+    def conditional_headers(self, url: str, variant: str = "") -> Dict[str, str]:
+        """生成重抓时的条件请求头，没有缓存时返回空字典"""
+        with self._lock:
+            self._stats["lookups"] += 1
+            row = self._conn.execute(
+                "SELECT etag, last_modified FROM responses WHERE key = ?",
+                (self._key(url, variant),)
+            ).fetchone()
+        headers: Dict[str, str] = {}
+        if row:
+            if row[0]:
+                headers["If-None-Match"] = row[0]
+            if row[1]:
+                headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def store(self, url: str, body: bytes, headers: Mapping[str, str], variant: str = "") -> bool:
+        """保存200响应（计为一次未命中）
+
+        只有带校验器（ETag或Last-Modified）的响应才会被缓存，否则无法做条件请求。
+
+        Returns:
+            是否已缓存
+        """
+        with self._lock:
+            self._stats["misses"] += 1
+        etag, last_modified = self._validators(headers)
+        if not etag and not last_modified:
+            return False
+
+        compressed = zlib.compress(body, self.compress_level)
+        now = time.time()
+        with self._lock, self._conn:
+            self._stats["bytes_stored"] += len(compressed)
+            # 响应体变化后原有解析结果作废
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, url, etag, last_modified, content_type, body, body_size, fetched_at, validated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self._key(url, variant), url, etag, last_modified,
+                 self._header(headers, "content-type"), compressed, len(body), now, now)
+            )
+        return True
+
+    def revalidated(self, url: str, headers: Optional[Mapping[str, str]] = None,
+                    variant: str = "") -> Optional[CacheEntry]:
+        """处理304响应：刷新校验器与验证时间，返回缓存的响应"""
+        key = self._key(url, variant)
+        etag, last_modified = self._validators(headers or {})
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE responses SET validated_at = ?, "
+                "etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE key = ?",
+                (time.time(), etag, last_modified, key)
+            )
+            row = self._conn.execute("SELECT body_size FROM responses WHERE key = ?", (key,)).fetchone()
+            if row:
+                self._stats["hits"] += 1
+                self._stats["bytes_saved"] += row[0]
+        return self.get(url, variant) if row else None
+
+    def get_parsed(self, url: str, parser: str, variant: str = "") -> Optional[Any]:
+        """读取与当前缓存响应体对应的解析结果"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT parsed FROM responses WHERE key = ? AND parsed_by = ?",
+                (self._key(url, variant), parser)
+            ).fetchone()
+        if not row or row[0] is None:
+            return None
+        try:
+            return pickle.loads(zlib.decompress(row[0]))
+        except Exception as e:
+            logger.warning(f"Discarding unreadable parsed cache for {url}: {e}")
+            return None
+
+    def store_parsed(self, url: str, parser: str, value: Any, variant: str = ""):
+        """为当前缓存的响应体保存解析结果"""
+        blob = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), self.compress_level)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE responses SET parsed = ?, parsed_by = ? WHERE key = ?",
+                (blob, parser, self._key(url, variant))
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """命中率与节省的字节数"""
+        with self._lock:
+            stats = dict(self._stats)
+            row = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(body_size), 0) FROM responses").fetchone()
+        fetches = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / fetches if fetches else 0.0
+        stats["entries"] = row[0]
+        stats["cached_body_bytes"] = row[1]
+        return stats
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @classmethod
+    def _validators(cls, headers: Mapping[str, str]):
+        return cls._header(headers, "etag") or None, cls._header(headers, "last-modified") or None
+
+    @staticmethod
+    def _header(headers: Mapping[str, str], name: str) -> str:
+        # 兼容大小写不敏感的头部容器（aiohttp/requests）和普通字典
+        value = headers.get(name)
+        if value is None:
+            for key, item in headers.items():
+                if key.lower() == name:
+                    return item
+            return ""
+        return value
+
+    @staticmethod
+    def _key(url: str, variant: str) -> str:
+        canonical = canonicalize_url(url)
+        return f"{canonical}|{variant}" if variant else canonical
+
+
+_shared_cache: Optional[HTTPResponseCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_http_cache() -> Optional[HTTPResponseCache]:
+    """获取进程内共享的HTTP响应缓存（首次使用时创建），禁用时返回None"""
+    global _shared_cache
+    if not HTTP_CACHE_ENABLED:
+        return None
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = HTTPResponseCache()
+    return _shared_cache
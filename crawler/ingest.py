@@ -0,0 +1,450 @@
+# Copyright (c) 2025 Lingjing Project
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import hashlib
+import inspect
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Union
+
+from config.tools import CRAWL_DATA_DIR
+from crawler.article import Article
+from crawler.chunker import TextChunker, get_default_chunker
+from crawler.frontier import canonicalize_url
+from crawler.http_cache import HTTPResponseCache, get_shared_http_cache
+from crawler.readability_extractor import ReadabilityExtractor
+from crawler.transport import CrawlTransport, get_shared_transport
+from rag.retriever import Chunk, Document
+
+logger = logging.getLogger(__name__)
+
+# 队列中的结束标记
+_STOP = object()
+
+Sink = Callable[[List[Document]], Union[None, Awaitable[None]]]
+
+
+@dataclass
+class IngestItem:
+    """在流水线各阶段间传递的单个页面"""
+    url: str
+    source_type: str = "unknown"
+    url_key: Optional[str] = None
+    html: Optional[str] = None
+    # 原始响应，文档写入全部存储后才存入HTTP缓存，失败时下次仍会完整重抓
+    body: Optional[bytes] = None
+    headers: Optional[Dict[str, str]] = None
+    article: Optional[Article] = None
+    text: str = ""
+    content_hash: Optional[str] = None
+    credibility: Optional[Dict[str, Any]] = None
+    chunks: List[Chunk] = field(default_factory=list)
+    document: Optional[Document] = None
+    submitted_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class StageMetrics:
+    """单个阶段的吞吐与延迟统计"""
+    processed: int = 0
+    dropped: int = 0  # 正常丢弃（未修改、重复、可信度过低等）
+    failed: int = 0
+    busy_seconds: float = 0.0
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+
+    def snapshot(self, elapsed: float, queue_size: int) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2)
+
+        return {
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "queue_size": queue_size,
+            "throughput_per_sec": round(self.processed / elapsed, 3) if elapsed > 0 else 0.0,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "latency_p50_ms": percentile(0.5),
+            "latency_p95_ms": percentile(0.95),
+        }
+
+
+class _Stage:
+    """流水线阶段：固定数量的工作协程从输入队列取数据，处理后放入下一阶段的队列
+
+    处理函数返回None表示丢弃该条目。
+    """
+
+    def __init__(self, name: str, handler: Callable[[IngestItem], Awaitable[Optional[IngestItem]]],
+                 workers: int, queue_size: int):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.metrics = StageMetrics()
+        self.next: Optional["_Stage"] = None
+        self.on_drain: Optional[Callable[[], Awaitable[None]]] = None
+        self._tasks: List[asyncio.Task] = []
+        self._active = 0
+
+    def start(self):
+        self._active = self.workers
+        self._tasks = [asyncio.create_task(self._work(), name=f"ingest-{self.name}-{i}")
+                       for i in range(self.workers)]
+
+    async def _work(self):
+        while True:
+            item = await self.queue.get()
+            if item is _STOP:
+                break
+            start = time.monotonic()
+            try:
+                result = await self.handler(item)
+            except Exception as e:
+                self.metrics.failed += 1
+                logger.warning(f"Ingest stage {self.name} failed for {item.url}: {e}")
+                continue
+            finally:
+                elapsed = time.monotonic() - start
+                self.metrics.busy_seconds += elapsed
+                self.metrics.latencies.append(elapsed)
+            if result is None:
+                self.metrics.dropped += 1
+                continue
+            self.metrics.processed += 1
+            if self.next is not None:
+                await self.next.queue.put(result)
+
+        # 最后一个退出的工作协程负责收尾并通知下一阶段
+        self._active -= 1
+        if self._active == 0:
+            if self.on_drain is not None:
+                await self.on_drain()
+            if self.next is not None:
+                for _ in range(self.next.workers):
+                    await self.next.queue.put(_STOP)
+
+    async def stop(self):
+        for _ in range(self.workers):
+            await self.queue.put(_STOP)
+
+    async def join(self):
+        await asyncio.gather(*self._tasks)
+
+
+class JsonlSink:
+    """把文档追加写入JSON Lines文件（默认的存储阶段输出）"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(CRAWL_DATA_DIR, "ingested.jsonl")
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+    def __call__(self, documents: List[Document]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for document in documents:
+                f.write(json.dumps(document.to_dict(), ensure_ascii=False, default=str) + "\n")
+
+
+class IngestPipeline:
+    """流式摄取流水线：抓取 → 提取 → 去重 → 可信度评分 → 分块 → 存储/索引
+
+    重复的URL在抓取前丢弃，去重阶段只按内容指纹去重；HTTP缓存的校验器在文档
+    成功写入所有存储后才保存，写入失败的页面下次不会被304跳过。
+    各阶段之间是有界队列，下游变慢时上游自然被阻塞（背压），内存占用有上限。
+    每个阶段的并发数可单独配置，并各自统计吞吐和延迟。CPU密集的提取、评分和分块
+    在线程池中执行，不阻塞事件循环。
+    """
+
+    STAGES = ("fetch", "extract", "dedup", "score", "chunk", "index")
+
+    def __init__(
+        self,
+        workers: Optional[Dict[str, int]] = None,
+        queue_size: int = 100,
+        transport: Optional[CrawlTransport] = None,
+        http_cache: Optional[HTTPResponseCache] = None,
+        extractor: Optional[ReadabilityExtractor] = None,
+        scorer: Optional[Callable[[str, str, str], Dict[str, Any]]] = None,
+        chunker: Optional[TextChunker] = None,
+        sinks: Optional[List[Sink]] = None,
+        min_credibility: float = 0.0,
+        min_text_length: int = 200,
+        index_batch_size: int = 50,
+        index_flush_interval: float = 5.0,
+        dedup_capacity: int = 500_000
+    ):
+        """初始化摄取流水线
+
+        Args:
+            workers: 各阶段的工作协程数，如 {"fetch": 16, "extract": 4}
+            queue_size: 阶段间队列的容量
+            transport: HTTP传输层，默认使用共享传输层（按主机限速）
+            http_cache: HTTP响应缓存，未修改（304）的页面直接丢弃
+            extractor: 正文提取器
+            scorer: 可信度评分函数 (text, url, publish_date) -> dict，默认使用CredibilityAnalyzer
+            chunker: 正文分块器，默认按句子/标题分块并记录偏移量
+            sinks: 存储/索引输出，接收一批Document，可为同步或异步函数
+            min_credibility: 低于此可信度的文档被丢弃
+            min_text_length: 正文少于此长度的页面被丢弃
+            index_batch_size: 存储阶段的批大小
+            index_flush_interval: 存储阶段最长攒批时间（秒）
+            dedup_capacity: 去重时记住的最近内容指纹数
+        """
+        self.workers = {"fetch": 8, "extract": 2, "dedup": 1, "score": 2, "chunk": 1, "index": 1}
+        self.workers.update(workers or {})
+        self.queue_size = queue_size
+        self.transport = transport or get_shared_transport()
+        self._http_cache = http_cache
+        self.extractor = extractor or ReadabilityExtractor()
+        self.scorer = scorer or self._default_scorer()
+        self.chunker = chunker or get_default_chunker()
+        self.sinks = sinks if sinks is not None else [JsonlSink()]
+        self.min_credibility = min_credibility
+        self.min_text_length = min_text_length
+        self.index_batch_size = index_batch_size
+        self.index_flush_interval = index_flush_interval
+        self.dedup_capacity = dedup_capacity
+
+        self._seen_urls: "OrderedDict[str, None]" = OrderedDict()
+        self._seen_hashes: "OrderedDict[str, None]" = OrderedDict()
+        self._batch: List[IngestItem] = []
+        self._batch_lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stages: Dict[str, _Stage] = {}
+        self._running = False
+        self._started_at: Optional[float] = None
+        self._completed = 0
+        self._end_to_end: Deque[float] = deque(maxlen=1000)
+
+    @property
+    def http_cache(self) -> Optional[HTTPResponseCache]:
+        """HTTP响应缓存，默认在首次使用时打开共享的磁盘缓存"""
+        return self._http_cache if self._http_cache is not None else get_shared_http_cache()
+
+    @staticmethod
+    def _default_scorer() -> Callable[[str, str, str], Dict[str, Any]]:
+        # 延迟导入：tools包依赖crawler包
+        from tools.credibility import CredibilityAnalyzer
+        analyzer = CredibilityAnalyzer()
+
+        def score(text: str, url: str, publish_date: str) -> Dict[str, Any]:
+            result = analyzer.analyze_credibility(text, url, publish_date)
+            return {
+                "credibility_score": result.overall_score,
+                "source_score": result.source_score,
+                "content_score": result.content_score,
+                "temporal_score": result.temporal_score,
+            }
+        return score
+
+    async def start(self):
+        """启动所有阶段的工作协程"""
+        if self._running:
+            return
+        await self.transport.open()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers["extract"] + self.workers["score"],
+            thread_name_prefix="ingest-cpu"
+        )
+        handlers = {
+            "fetch": self._fetch,
+            "extract": self._extract,
+            "dedup": self._dedup,
+            "score": self._score,
+            "chunk": self._chunk,
+            "index": self._index,
+        }
+        self._stages = {}
+        previous: Optional[_Stage] = None
+        for name in self.STAGES:
+            stage = _Stage(name, handlers[name], self.workers.get(name, 1), self.queue_size)
+            if previous is not None:
+                previous.next = stage
+            self._stages[name] = stage
+            previous = stage
+        self._stages["index"].on_drain = self._flush
+        for stage in self._stages.values():
+            stage.start()
+        self._flusher = asyncio.create_task(self._flush_periodically())
+        self._started_at = time.monotonic()
+        self._running = True
+
+    async def submit(self, url: str, source_type: str = "unknown"):
+        """提交一个URL，队列已满时等待"""
+        await self._stages["fetch"].queue.put(IngestItem(url=url, source_type=source_type))
+
+    async def stop(self):
+        """停止接收新URL，等待已提交的条目全部处理完毕"""
+        if not self._running:
+            return
+        self._running = False
+        await self._stages["fetch"].stop()
+        for stage in self._stages.values():
+            await stage.join()
+        if self._flusher is not None:
+            self._flusher.cancel()
+        self._executor.shutdown(wait=True)
+        await self.transport.close()
+        logger.info(f"Ingest pipeline stopped: {json.dumps(self.get_metrics(), ensure_ascii=False)}")
+
+    async def run(self, urls: Union[AsyncIterable[str], Iterable[str]], source_type: str = "unknown"):
+        """处理一个URL流直到其结束（可以是无限的异步迭代器）"""
+        await self.start()
+        try:
+            if hasattr(urls, "__aiter__"):
+                async for url in urls:
+                    await self.submit(url, source_type)
+            else:
+                for url in urls:
+                    await self.submit(url, source_type)
+        finally:
+            await self.stop()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """各阶段及端到端的吞吐与延迟"""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        latencies = sorted(self._end_to_end)
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "completed": self._completed,
+            "end_to_end_p50_ms": round(latencies[len(latencies) // 2] * 1000, 2) if latencies else 0.0,
+            "stages": {
+                name: stage.metrics.snapshot(elapsed, stage.queue.qsize())
+                for name, stage in self._stages.items()
+            },
+        }
+
+    async def _fetch(self, item: IngestItem) -> Optional[IngestItem]:
+        # 抓取前按规范化URL去重；抓取失败时释放，允许再次提交
+        item.url_key = canonicalize_url(item.url)
+        if not self._remember(self._seen_urls, item.url_key):
+            return None
+        try:
+            headers = self.http_cache.conditional_headers(item.url) if self.http_cache else {}
+            async with self.transport.get(item.url, headers=headers) as response:
+                if response.status == 304:
+                    # 页面未修改，上次已经摄取过
+                    if self.http_cache:
+                        self.http_cache.revalidated(item.url, response.headers)
+                    return None
+                if response.status != 200:
+                    raise RuntimeError(f"HTTP {response.status}")
+                item.body = await response.read()
+                item.headers = dict(response.headers)
+                item.html = item.body.decode(response.get_encoding() or "utf-8", errors="replace")
+        except BaseException:
+            self._seen_urls.pop(item.url_key, None)
+            raise
+        return item
+
+    async def _extract(self, item: IngestItem) -> Optional[IngestItem]:
+        loop = asyncio.get_running_loop()
+        item.article = await loop.run_in_executor(
+            self._executor, self.extractor.extract_article, item.html, item.url
+        )
+        item.html = None
+        item.text = item.article.markdown_body.strip()
+        if len(item.text) < self.min_text_length:
+            return None
+        return item
+
+    async def _dedup(self, item: IngestItem) -> Optional[IngestItem]:
+        normalized = re.sub(r'\s+', ' ', item.text).strip().lower()
+        item.content_hash = hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+        if not self._remember(self._seen_hashes, item.content_hash):
+            return None
+        return item
+
+    def _remember(self, seen: "OrderedDict[str, None]", key: str) -> bool:
+        """记录一个键，已经见过时返回False；超过容量时淘汰最早的键"""
+        if key in seen:
+            return False
+        seen[key] = None
+        if len(seen) > self.dedup_capacity:
+            seen.popitem(last=False)
+        return True
+
+    async def _score(self, item: IngestItem) -> Optional[IngestItem]:
+        publish_date = item.article.publication_date.strftime("%Y-%m-%d") if item.article.publication_date else ""
+        loop = asyncio.get_running_loop()
+        item.credibility = await loop.run_in_executor(
+            self._executor, self.scorer, item.text, item.url, publish_date
+        )
+        if item.credibility.get("credibility_score", 0.0) < self.min_credibility:
+            return None
+        return item
+
+    async def _chunk(self, item: IngestItem) -> Optional[IngestItem]:
+        article = item.article
+        score = item.credibility.get("credibility_score", article.credibility_score)
+        loop = asyncio.get_running_loop()
+        item.chunks = await loop.run_in_executor(
+            self._executor, lambda: self.chunker.chunk(item.text, similarity=score, metadata={"content_hash": item.content_hash})
+        )
+        item.document = Document(
+            id=hashlib.md5(item.url.encode()).hexdigest(),
+            url=item.url,
+            title=article.title,
+            chunks=item.chunks,
+            credibility_score=score,
+            source_type=item.source_type if item.source_type != "unknown" else article.source_type,
+            publication_date=article.publication_date,
+            author=article.author,
+            metadata={
+                "content_hash": item.content_hash,
+                "credibility": item.credibility,
+                **article.extract_mystery_info(),
+            }
+        )
+        item.article = None
+        return item
+
+    async def _index(self, item: IngestItem) -> Optional[IngestItem]:
+        self._end_to_end.append(time.monotonic() - item.submitted_at)
+        async with self._batch_lock:
+            self._batch.append(item)
+            full = len(self._batch) >= self.index_batch_size
+        if full:
+            await self._flush()
+        self._completed += 1
+        return item
+
+    async def _flush(self):
+        async with self._batch_lock:
+            batch, self._batch = self._batch, []
+        if not batch:
+            return
+        documents = [item.document for item in batch]
+        stored = True
+        for sink in self.sinks:
+            try:
+                result = sink(documents)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                stored = False
+                logger.error(f"Ingest sink {getattr(sink, '__name__', type(sink).__name__)} failed: {e}")
+        for item in batch:
+            if not stored:
+                # 未写入的页面不记为已见，再次提交时重新抓取
+                self._seen_urls.pop(item.url_key, None)
+                self._seen_hashes.pop(item.content_hash, None)
+            elif self.http_cache:
+                self.http_cache.store(item.url, item.body, item.headers)
+            item.body = item.headers = None
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.index_flush_interval)
+            await self._flush()
@@ -1,24 +1,131 @@
 # Copyright (c) 2025 Lingjing Project
 # SPDX-License-Identifier: MIT
 
+import asyncio
 import logging
 import os
-import time
-from typing import Optional, Dict, Any
+import threading
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Tuple, List, AsyncIterator, Awaitable, TypeVar
+import aiohttp
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from crawler.http_cache import HTTPResponseCache, get_shared_http_cache
+from crawler.transport import AdaptiveRateLimiter, retry_after_seconds
+
 logger = logging.getLogger(__name__)
 
+JINA_READER_URL = "https://r.jina.ai/"
+
+# Jina Reader的速率档位（每分钟请求数）：无API key为20，有API key为200
+JINA_RATE_LIMIT_FREE = 20
+JINA_RATE_LIMIT_KEYED = 200
+
+T = TypeVar("T")
+
+
+@dataclass
+class JinaResult:
+    """单个URL的抓取结果"""
+    url: str
+    content: str
+    return_format: str
+    error: Optional[str] = None
+    
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _build_jina_request(
+    api_key: Optional[str],
+    url: str,
+    return_format: str,
+    include_links: bool,
+    include_images: bool,
+    target_selector: Optional[str],
+    wait_for_selector: Optional[str],
+    headers: Optional[Dict[str, str]]
+) -> Tuple[Dict[str, str], Dict[str, Any]]:
+    """构建Jina Reader请求的请求头和请求体"""
+    request_headers = {
+        "Content-Type": "application/json",
+        "X-Return-Format": return_format,
+    }
+    
+    if api_key:
+        request_headers["Authorization"] = f"Bearer {api_key}"
+    
+    # 添加自定义请求头
+    if headers:
+        request_headers.update(headers)
+    
+    # 构建请求数据
+    data: Dict[str, Any] = {"url": url}
+    
+    if include_links:
+        data["include_links"] = True
+    if not include_images:
+        data["include_images"] = False
+    if target_selector:
+        data["target_selector"] = target_selector
+    if wait_for_selector:
+        data["wait_for_selector"] = wait_for_selector
+    
+    return request_headers, data
+
+
+def _cache_variant(return_format: str, include_links: bool, include_images: bool,
+                   target_selector: Optional[str], wait_for_selector: Optional[str]) -> str:
+    return f"jina|{return_format}|{include_links}|{include_images}|{target_selector}|{wait_for_selector}"
+
+
+def _default_rate_limiter(api_key: Optional[str], initial_rate: Optional[float] = None) -> AdaptiveRateLimiter:
+    """按API key档位创建速率控制器（速率单位：每秒请求数）"""
+    tier_rate = (JINA_RATE_LIMIT_KEYED if api_key else JINA_RATE_LIMIT_FREE) / 60.0
+    return AdaptiveRateLimiter(
+        initial_rate=initial_rate or tier_rate,
+        max_rate=tier_rate * 2,
+        increase=tier_rate / 10
+    )
+
+
+def _run_sync(coro: Awaitable[T]) -> T:
+    """在同步代码中运行协程；调用方已处于事件循环中时改在独立线程中运行"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    
+    result: Dict[str, Any] = {}
+    
+    def runner():
+        try:
+            result["value"] = asyncio.run(coro)
+        except BaseException as e:
+            result["error"] = e
+    
+    thread = threading.Thread(target=runner)
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
 
 class JinaClient:
     """Jina客户端，用于网页内容抓取"""
     
-    def __init__(self, api_key: Optional[str] = None, timeout: int = 30, max_retries: int = 3):
+    def __init__(self, api_key: Optional[str] = None, timeout: int = 30, max_retries: int = 3,
+                 http_cache: Optional[HTTPResponseCache] = None):
         self.api_key = api_key or os.getenv("JINA_API_KEY")
         self.timeout = timeout
         self.max_retries = max_retries
+        # Jina输出按源站校验器缓存：源站返回304时直接复用上次的结果
+        self._http_cache = http_cache
+        self._rate_limiter: Optional[AdaptiveRateLimiter] = None
         
         # 配置会话
         self.session = requests.Session()
@@ -39,6 +146,11 @@ class JinaClient:
                 "See https://jina.ai/reader for more information."
             )
     
+    @property
+    def http_cache(self) -> Optional[HTTPResponseCache]:
+        """HTTP响应缓存，默认在首次使用时打开共享的磁盘缓存"""
+        return self._http_cache if self._http_cache is not None else get_shared_http_cache()
+    
     def crawl(
         self, 
         url: str, 
@@ -47,71 +159,109 @@ class JinaClient:
         include_images: bool = True,
         target_selector: Optional[str] = None,
         wait_for_selector: Optional[str] = None,
-        headers: Optional[Dict[str, str]] = None
+        headers: Optional[Dict[str, str]] = None,
+        use_cache: bool = True
     ) -> str:
-        """爬取网页内容"""
-        request_headers = {
-            "Content-Type": "application/json",
-            "X-Return-Format": return_format,
-        }
-        
-        if self.api_key:
-            request_headers["Authorization"] = f"Bearer {self.api_key}"
-        
-        # 添加自定义请求头
-        if headers:
-            request_headers.update(headers)
+        """爬取网页内容
         
-        # 构建请求数据
-        data = {"url": url}
+        启用缓存时先向源站发送条件HEAD请求：源站返回304则直接返回缓存的
+        Jina结果，不再调用Jina；否则调用Jina并以源站校验器保存结果。
+        """
+        cache = self.http_cache if use_cache else None
+        variant = _cache_variant(return_format, include_links, include_images, target_selector, wait_for_selector)
+        origin_headers: Dict[str, str] = {}
+        if cache:
+            cached, origin_headers = self._revalidate_origin(url, variant)
+            if cached is not None:
+                return cached
         
-        if include_links:
-            data["include_links"] = True
-        if not include_images:
-            data["include_images"] = False
-        if target_selector:
-            data["target_selector"] = target_selector
-        if wait_for_selector:
-            data["wait_for_selector"] = wait_for_selector
+        request_headers, data = _build_jina_request(
+            self.api_key, url, return_format, include_links, include_images,
+            target_selector, wait_for_selector, headers
+        )
         
         try:
             response = self.session.post(
-                "https://r.jina.ai/", 
+                JINA_READER_URL, 
                 headers=request_headers, 
                 json=data,
                 timeout=self.timeout
             )
             response.raise_for_status()
+            if cache:
+                cache.store(url, response.content, {
+                    **origin_headers, "Content-Type": response.headers.get("Content-Type", "")
+                }, variant=variant)
             return response.text
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to crawl {url}: {e}")
             raise
     
+    def _revalidate_origin(self, url: str, variant: str) -> Tuple[Optional[str], Dict[str, str]]:
+        """向源站发送条件HEAD请求
+        
+        Returns:
+            (缓存的内容或None, 源站校验器头)
+        """
+        conditional = self.http_cache.conditional_headers(url, variant=variant)
+        try:
+            response = self.session.head(url, headers=conditional, timeout=self.timeout, allow_redirects=True)
+        except requests.exceptions.RequestException as e:
+            logger.debug(f"Origin revalidation failed for {url}: {e}")
+            return None, {}
+        
+        if response.status_code == 304 and conditional:
+            entry = self.http_cache.revalidated(url, response.headers, variant=variant)
+            if entry:
+                return entry.text, {}
+        
+        validators = {
+            name: response.headers[name]
+            for name in ("ETag", "Last-Modified")
+            if response.ok and name in response.headers
+        }
+        return None, validators
+    
+    def async_client(self, max_concurrency: int = 8) -> "AsyncJinaClient":
+        """创建共享本客户端配置与速率控制状态的异步客户端"""
+        return AsyncJinaClient(
+            api_key=self.api_key,
+            timeout=self.timeout,
+            max_retries=self.max_retries,
+            max_concurrency=max_concurrency,
+            rate_limiter=self.rate_limiter,
+            http_cache=self.http_cache
+        )
+    
     def crawl_multiple(
         self, 
         urls: list[str], 
         return_format: str = "html",
         delay: float = 1.0,
+        max_concurrency: int = 8,
         **kwargs
     ) -> Dict[str, str]:
-        """批量爬取多个URL"""
-        results = {}
+        """批量爬取多个URL（并发执行，速率自适应）
         
-        for i, url in enumerate(urls):
-            try:
-                logger.info(f"Crawling {i+1}/{len(urls)}: {url}")
-                content = self.crawl(url, return_format=return_format, **kwargs)
-                results[url] = content
-                
-                # 添加延迟避免频率限制
-                if i < len(urls) - 1 and delay > 0:
-                    time.sleep(delay)
-                    
-            except Exception as e:
-                logger.error(f"Failed to crawl {url}: {e}")
-                results[url] = ""
+        Args:
+            urls: URL列表
+            return_format: 返回格式
+            delay: 首次调用时的初始请求间隔（秒），之后由速率控制自动调整
+            max_concurrency: 最大并发请求数
+        """
+        if self._rate_limiter is None and delay > 0:
+            self._rate_limiter = _default_rate_limiter(self.api_key, initial_rate=1.0 / delay)
+        
+        async def crawl_all() -> Dict[str, str]:
+            results = {}
+            async with self.async_client(max_concurrency) as client:
+                async for result in client.crawl_many(urls, return_format=return_format, **kwargs):
+                    results[result.url] = result.content
+                    logger.info(f"Crawled {len(results)}/{len(urls)}: {result.url}")
+            # 保持输入顺序
+            return {url: results.get(url, "") for url in urls}
         
-        return results
+        return _run_sync(crawl_all())
     
     def crawl_with_fallback(
         self, 
@@ -120,25 +270,18 @@ class JinaClient:
         fallback_formats: list[str] = None
     ) -> tuple[str, str]:
         """带回退机制的爬取"""
-        fallback_formats = fallback_formats or ["text", "markdown"]
+        async def crawl() -> Tuple[str, str]:
+            async with self.async_client(max_concurrency=1) as client:
+                return await client.crawl_with_fallback(url, return_format, fallback_formats)
         
-        # 首先尝试主要格式
-        try:
-            content = self.crawl(url, return_format=return_format)
-            return content, return_format
-        except Exception as e:
-            logger.warning(f"Failed to crawl {url} with format {return_format}: {e}")
-        
-        # 尝试回退格式
-        for format_type in fallback_formats:
-            try:
-                logger.info(f"Trying fallback format {format_type} for {url}")
-                content = self.crawl(url, return_format=format_type)
-                return content, format_type
-            except Exception as e:
-                logger.warning(f"Failed to crawl {url} with format {format_type}: {e}")
-        
-        raise Exception(f"Failed to crawl {url} with all attempted formats")
+        return _run_sync(crawl())
+    
+    @property
+    def rate_limiter(self) -> AdaptiveRateLimiter:
+        """跨批次共享的速率控制器"""
+        if self._rate_limiter is None:
+            self._rate_limiter = _default_rate_limiter(self.api_key)
+        return self._rate_limiter
     
     def test_connection(self) -> bool:
         """测试连接"""
@@ -163,7 +306,7 @@ class JinaClient:
         try:
             # 发送一个简单请求来获取响应头中的速率限制信息
             response = self.session.post(
-                "https://r.jina.ai/", 
+                JINA_READER_URL, 
                 headers=headers, 
                 json={"url": "https://example.com"},
                 timeout=10
@@ -182,4 +325,190 @@ class JinaClient:
     def close(self):
         """关闭会话"""
         if self.session:
-            self.session.close()
\ No newline at end of file
+            self.session.close()
+
+
+class AsyncJinaClient:
+    """异步Jina客户端
+    
+    基于连接池的aiohttp会话，信号量限制并发数，AIMD速率控制在收到429时
+    降速、持续成功时提速；批量结果按完成顺序流式返回。
+    """
+    
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        timeout: int = 30,
+        max_retries: int = 3,
+        max_concurrency: int = 8,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        http_cache: Optional[HTTPResponseCache] = None
+    ):
+        """初始化异步客户端
+        
+        Args:
+            api_key: Jina API key
+            timeout: 单次请求超时时间（秒）
+            max_retries: 429/5xx/网络错误的最大重试次数
+            max_concurrency: 最大并发请求数
+            rate_limiter: 速率控制器（可与其他客户端共享）
+            http_cache: HTTP响应缓存
+        """
+        self.api_key = api_key or os.getenv("JINA_API_KEY")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = rate_limiter or _default_rate_limiter(self.api_key)
+        self._http_cache = http_cache
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+    
+    @property
+    def http_cache(self) -> Optional[HTTPResponseCache]:
+        """HTTP响应缓存，默认在首次使用时打开共享的磁盘缓存"""
+        return self._http_cache if self._http_cache is not None else get_shared_http_cache()
+    
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.max_concurrency,
+            ttl_dns_cache=300,
+            keepalive_timeout=30
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self.session:
+            await self.session.close()
+            self.session = None
+    
+    async def crawl(
+        self,
+        url: str,
+        return_format: str = "html",
+        include_links: bool = False,
+        include_images: bool = True,
+        target_selector: Optional[str] = None,
+        wait_for_selector: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
+        use_cache: bool = True
+    ) -> str:
+        """爬取网页内容"""
+        if not self.session:
+            raise RuntimeError("Session not initialized. Use async context manager.")
+        
+        cache = self.http_cache if use_cache else None
+        variant = _cache_variant(return_format, include_links, include_images, target_selector, wait_for_selector)
+        origin_headers: Dict[str, str] = {}
+        
+        async with self._semaphore:
+            if cache:
+                cached, origin_headers = await self._revalidate_origin(url, variant)
+                if cached is not None:
+                    return cached
+            
+            request_headers, data = _build_jina_request(
+                self.api_key, url, return_format, include_links, include_images,
+                target_selector, wait_for_selector, headers
+            )
+            
+            for attempt in range(self.max_retries + 1):
+                await self.rate_limiter.acquire()
+                try:
+                    async with self.session.post(JINA_READER_URL, headers=request_headers, json=data) as response:
+                        if response.status == 429 and attempt < self.max_retries:
+                            retry_after = retry_after_seconds(response.headers, attempt)
+                            self.rate_limiter.on_throttle(retry_after)
+                            logger.warning(
+                                f"Jina rate limited, slowing to {self.rate_limiter.rate * 60:.0f} req/min"
+                            )
+                            continue
+                        if response.status >= 500 and attempt < self.max_retries:
+                            await asyncio.sleep(2 ** attempt)
+                            continue
+                        
+                        response.raise_for_status()
+                        body = await response.read()
+                        self.rate_limiter.on_success()
+                        if cache:
+                            cache.store(url, body, {
+                                **origin_headers, "Content-Type": response.headers.get("Content-Type", "")
+                            }, variant=variant)
+                        return await response.text()
+                except aiohttp.ClientResponseError as e:
+                    # 429/5xx在上面已重试到上限；其他4xx（参数错误、鉴权失败等）重试也不会成功
+                    logger.error(f"Failed to crawl {url}: {e}")
+                    raise
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if attempt >= self.max_retries:
+                        logger.error(f"Failed to crawl {url}: {e}")
+                        raise
+                    await asyncio.sleep(2 ** attempt)
+        
+        raise RuntimeError(f"Failed to crawl {url}: retries exhausted")
+    
+    async def crawl_many(self, urls: List[str], return_format: str = "html", **kwargs) -> AsyncIterator[JinaResult]:
+        """并发爬取多个URL，按完成顺序流式返回结果"""
+        async def crawl_one(url: str) -> JinaResult:
+            try:
+                content = await self.crawl(url, return_format=return_format, **kwargs)
+                return JinaResult(url=url, content=content, return_format=return_format)
+            except Exception as e:
+                logger.error(f"Failed to crawl {url}: {e}")
+                return JinaResult(url=url, content="", return_format=return_format, error=str(e))
+        
+        tasks = [asyncio.ensure_future(crawl_one(url)) for url in urls]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def crawl_with_fallback(
+        self,
+        url: str,
+        return_format: str = "html",
+        fallback_formats: Optional[List[str]] = None
+    ) -> Tuple[str, str]:
+        """带回退机制的爬取，依次尝试主要格式和回退格式"""
+        fallback_formats = fallback_formats or ["text", "markdown"]
+        
+        for format_type in [return_format] + [f for f in fallback_formats if f != return_format]:
+            try:
+                if format_type != return_format:
+                    logger.info(f"Trying fallback format {format_type} for {url}")
+                content = await self.crawl(url, return_format=format_type)
+                return content, format_type
+            except Exception as e:
+                logger.warning(f"Failed to crawl {url} with format {format_type}: {e}")
+        
+        raise Exception(f"Failed to crawl {url} with all attempted formats")
+    
+    async def _revalidate_origin(self, url: str, variant: str) -> Tuple[Optional[str], Dict[str, str]]:
+        """向源站发送条件HEAD请求
+        
+        Returns:
+            (缓存的内容或None, 源站校验器头)
+        """
+        conditional = self.http_cache.conditional_headers(url, variant=variant)
+        try:
+            async with self.session.head(url, headers=conditional, allow_redirects=True) as response:
+                if response.status == 304 and conditional:
+                    entry = self.http_cache.revalidated(url, response.headers, variant=variant)
+                    if entry:
+                        return entry.text, {}
+                
+                validators = {
+                    name: response.headers[name]
+                    for name in ("ETag", "Last-Modified")
+                    if response.status < 400 and name in response.headers
+                }
+                return None, validators
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.debug(f"Origin revalidation failed for {url}: {e}")
+            return None, {}
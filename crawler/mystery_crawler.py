@@ -8,15 +8,16 @@ from typing import Dict, List, Optional, Any
 from urllib.parse import quote, urljoin
 
 from crawler.crawler import Crawler
-from rag.retriever import Document, Chunk, MysteryEvent
+from crawler.parser_pool import css, make_soup
+from rag.retriever import Document, MysteryEvent
 from config.mystery_config import DataSourceConfig, MysteryEventType
 
 
 class MysteryCrawler(Crawler):
     """神秘事件专用爬虫"""
     
-    def __init__(self, config: DataSourceConfig):
-        super().__init__(config)
+    def __init__(self, config: DataSourceConfig, **kwargs):
+        super().__init__(config, **kwargs)
         self.mystery_keywords = {
             MysteryEventType.UFO: [
                 "UFO", "unidentified flying object", "flying saucer", "alien",
@@ -50,12 +51,17 @@ class MysteryCrawler(Crawler):
         if not html:
             return None
             
-        parsed_data = self._parse_mystery_html(html, url)
+        cached = self._cached_document(url)
+        if cached:
+            return cached
+            
+        parsed_data = await self._parse_off_loop(self._parse_mystery_html, html, url)
         if not parsed_data:
             return None
             
         doc_id = hashlib.md5(url.encode()).hexdigest()
         document = self._create_mystery_document(parsed_data, doc_id)
+        self._cache_document(url, document)
         
         return document
         
@@ -72,17 +78,15 @@ class MysteryCrawler(Crawler):
         # 生成搜索URL
         search_urls = self._generate_mystery_search_urls(mystery_query, limit)
         
-        for url in search_urls:
-            doc = await self.crawl_url(url)
-            if doc:
-                documents.append(doc)
+        # 并发抓取，单主机的并发和速率由共享传输层控制
+        documents.extend(await self.batch_crawl(search_urls))
                 
         return documents[:limit]
         
     def _parse_mystery_html(self, html: str, url: str) -> Optional[Dict[str, Any]]:
         """解析神秘事件HTML"""
-        from bs4 import BeautifulSoup
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = make_soup(html)
+        self._enqueue_links(soup, url)
         
         # 提取标题
         title = self._extract_title(soup)
@@ -160,7 +164,7 @@ class MysteryCrawler(Crawler):
         ]
         
         for selector in content_selectors:
-            content_elem = soup.select_one(selector)
+            content_elem = css(selector).select_one(soup)
             if content_elem:
                 # 移除不需要的元素
                 for unwanted in content_elem(['script', 'style', 'nav', 'aside']):
@@ -202,7 +206,7 @@ class MysteryCrawler(Crawler):
         ]
         
         for selector in location_selectors:
-            location_elem = soup.select_one(selector)
+            location_elem = css(selector).select_one(soup)
             if location_elem:
                 location_text = location_elem.get_text().strip()
                 if location_text:
@@ -235,7 +239,7 @@ class MysteryCrawler(Crawler):
         ]
         
         for selector in date_selectors:
-            date_elem = soup.select_one(selector)
+            date_elem = css(selector).select_one(soup)
             if date_elem:
                 date_text = date_elem.get('datetime') or date_elem.get_text()
                 parsed_date = self._parse_date(date_text)
@@ -281,7 +285,7 @@ class MysteryCrawler(Crawler):
         ]
         
         for selector in witness_selectors:
-            witness_elems = soup.select(selector)
+            witness_elems = css(selector).select(soup)
             for elem in witness_elems:
                 witness_text = elem.get_text().strip()
                 if witness_text and witness_text not in witnesses:
@@ -319,7 +323,7 @@ class MysteryCrawler(Crawler):
         ]
         
         for selector in evidence_selectors:
-            evidence_elems = soup.select(selector)
+            evidence_elems = css(selector).select(soup)
             for elem in evidence_elems:
                 evidence_text = elem.get_text().strip()
                 if evidence_text and evidence_text not in evidence:
@@ -373,15 +377,8 @@ class MysteryCrawler(Crawler):
         
         content = parsed_data['content']
         if content:
-            # 按段落分块
-            paragraphs = [p.strip() for p in content.split('\n\n') if p.strip()]
-            for i, paragraph in enumerate(paragraphs):
-                if len(paragraph) > 50:  # 只保留有意义的段落
-                    chunks.append(Chunk(
-                        content=paragraph,
-                        similarity=0.8,
-                        metadata={'type': 'content', 'paragraph_index': i}
-                    ))
+            # 按句子和标题分块，块之间有重叠
+            chunks.extend(self.chunker.chunk(content, similarity=0.8, metadata={'type': 'content'}))
                     
         return Document(
             id=doc_id,
@@ -8,6 +8,8 @@ from typing import Dict, List, Optional, Any
 from urllib.parse import quote, urljoin
 
 from crawler.crawler import Crawler
+from crawler.feeds import FeedEntry, FeedPoller, FeedStore, get_shared_feed_store
+from crawler.parser_pool import css, make_soup
 from rag.retriever import Document, Chunk
 from config.mystery_config import DataSourceConfig
 
@@ -15,12 +17,42 @@ from config.mystery_config import DataSourceConfig
 class NewsCrawler(Crawler):
     """新闻媒体爬虫"""
     
-    def __init__(self, config: DataSourceConfig):
-        super().__init__(config)
+    def __init__(self, config: DataSourceConfig, feed_store: Optional[FeedStore] = None, **kwargs):
+        super().__init__(config, **kwargs)
         self.news_indicators = [
             "breaking news", "reported", "according to", "sources say",
             "investigation reveals", "witnesses report", "officials confirm"
         ]
+        # 订阅源状态与已见GUID，用于增量发现新文章
+        self._feed_store = feed_store
+        
+    def __getstate__(self):
+        state = super().__getstate__()
+        state['_feed_store'] = None
+        return state
+        
+    @property
+    def feed_store(self) -> FeedStore:
+        """订阅源状态存储，默认在首次使用时打开共享存储"""
+        return self._feed_store if self._feed_store is not None else get_shared_feed_store()
+        
+    async def poll_feeds(self, force: bool = False, enqueue: bool = True) -> List[FeedEntry]:
+        """轮询数据源的RSS/Atom/新闻站点地图，返回新出现的文章
+        
+        配置了抓取边界且enqueue为True时，新文章URL会直接加入抓取边界。
+        """
+        poller = FeedPoller(self.feed_store, self.transport)
+        entries = await poller.poll_source(self.config, force=force)
+        if entries and enqueue and self.frontier is not None:
+            added = self.frontier.add_many([entry.url for entry in entries], self.config.source_type.value)
+            self.logger.info(f"Queued {added} new articles from {self.config.name} feeds")
+        return entries
+        
+    async def crawl_feeds(self, limit: Optional[int] = None) -> List[Document]:
+        """只抓取订阅源中新出现的文章，代替逐页抓取搜索结果"""
+        entries = await self.poll_feeds(enqueue=False)
+        urls = [entry.url for entry in entries][:limit]
+        return await self.batch_crawl(urls) if urls else []
         
     async def crawl_url(self, url: str) -> Optional[Document]:
         """爬取新闻页面"""
@@ -28,12 +60,17 @@ class NewsCrawler(Crawler):
         if not html:
             return None
             
-        parsed_data = self._parse_news_html(html, url)
+        cached = self._cached_document(url)
+        if cached:
+            return cached
+            
+        parsed_data = await self._parse_off_loop(self._parse_news_html, html, url)
         if not parsed_data:
             return None
             
         doc_id = hashlib.md5(url.encode()).hexdigest()
         document = self._create_news_document(parsed_data, doc_id)
+        self._cache_document(url, document)
         
         return document
         
@@ -47,17 +84,15 @@ class NewsCrawler(Crawler):
         # 生成搜索URL
         search_urls = self._generate_news_search_urls(news_query, limit)
         
-        for url in search_urls:
-            doc = await self.crawl_url(url)
-            if doc:
-                documents.append(doc)
+        # 并发抓取，单主机的并发和速率由共享传输层控制
+        documents.extend(await self.batch_crawl(search_urls))
                 
         return documents[:limit]
         
     def _parse_news_html(self, html: str, url: str) -> Optional[Dict[str, Any]]:
         """解析新闻HTML"""
-        from bs4 import BeautifulSoup
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = make_soup(html)
+        self._enqueue_links(soup, url)
         
         # 提取新闻标题
         title = self._extract_news_title(soup)
@@ -118,7 +153,7 @@ class NewsCrawler(Crawler):
         ]
         
         for selector in title_selectors:
-            title_elem = soup.select_one(selector)
+            title_elem = css(selector).select_one(soup)
             if title_elem:
                 title = title_elem.get_text().strip()
                 if len(title) > 10:  # 确保标题有意义
@@ -146,10 +181,10 @@ class NewsCrawler(Crawler):
         ]
         
         for selector in content_selectors:
-            content_elem = soup.select_one(selector)
+            content_elem = css(selector).select_one(soup)
             if content_elem:
                 # 移除广告和相关文章
-                for ad in content_elem.select('.ad, .advertisement, .related, .sidebar'):
+                for ad in css('.ad, .advertisement, .related, .sidebar').select(content_elem):
                     ad.decompose()
                 return content_elem.get_text(separator='\n', strip=True)
                 
@@ -173,7 +208,7 @@ class NewsCrawler(Crawler):
         ]
         
         for selector in date_selectors:
-            date_elem = soup.select_one(selector)
+            date_elem = css(selector).select_one(soup)
             if date_elem:
                 date_text = date_elem.get('datetime') or date_elem.get_text()
                 parsed_date = self._parse_date(date_text)
@@ -202,7 +237,7 @@ class NewsCrawler(Crawler):
         ]
         
         for selector in author_selectors:
-            author_elem = soup.select_one(selector)
+            author_elem = css(selector).select_one(soup)
             if author_elem:
                 author_text = author_elem.get_text().strip()
                 # 清理作者信息
@@ -228,7 +263,7 @@ class NewsCrawler(Crawler):
         ]
         
         for selector in site_name_selectors:
-            site_elem = soup.select_one(selector)
+            site_elem = css(selector).select_one(soup)
             if site_elem:
                 site_name = site_elem.get_text().strip()
                 if site_name:
@@ -260,7 +295,7 @@ class NewsCrawler(Crawler):
         ]
         
         for selector in summary_selectors:
-            summary_elem = soup.select_one(selector)
+            summary_elem = css(selector).select_one(soup)
             if summary_elem:
                 return summary_elem.get_text().strip()
                 
@@ -284,7 +319,7 @@ class NewsCrawler(Crawler):
         ]
         
         for selector in tag_selectors:
-            tag_elems = soup.select(f"{selector} a, {selector} span")
+            tag_elems = css(f"{selector} a, {selector} span").select(soup)
             for elem in tag_elems:
                 tag_text = elem.get_text().strip()
                 if tag_text and tag_text not in tags:
@@ -348,15 +383,8 @@ class NewsCrawler(Crawler):
         
         content = parsed_data['content']
         if content:
-            # 按段落分块
-            paragraphs = [p.strip() for p in content.split('\n\n') if p.strip()]
-            for i, paragraph in enumerate(paragraphs):
-                if len(paragraph) > 50:  # 只保留有意义的段落
-                    chunks.append(Chunk(
-                        content=paragraph,
-                        similarity=0.7,
-                        metadata={'type': 'content', 'paragraph_index': i}
-                    ))
+            # 按句子和标题分块，块之间有重叠
+            chunks.extend(self.chunker.chunk(content, similarity=0.7, metadata={'type': 'content'}))
                     
         # 如果有摘要，作为单独的块
         summary = parsed_data['metadata'].get('summary')
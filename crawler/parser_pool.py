@@ -0,0 +1,116 @@
+# Copyright (c) 2025 Lingjing Project
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import logging
+import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, List, Optional, Tuple
+
+import soupsieve
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+# 解析器工作进程数，0表示在事件循环中直接解析
+CRAWL_PARSER_WORKERS = int(os.getenv("CRAWL_PARSER_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+def make_soup(html: str) -> BeautifulSoup:
+    """使用lxml构建文档树（比纯Python的html.parser快数倍）"""
+    return BeautifulSoup(html, 'lxml')
+
+
+@lru_cache(maxsize=1024)
+def css(selector: str) -> soupsieve.SoupSieve:
+    """预编译CSS选择器，同一选择器在进程内只编译一次"""
+    return soupsieve.compile(selector)
+
+
+def _parse_page(method: Callable[[str, str], Any], html: str, url: str) -> Tuple[Any, List[str]]:
+    """在工作进程中执行爬虫的解析方法
+
+    method是绑定到爬虫副本的解析方法，副本在序列化时已去掉连接、
+    抓取边界等进程内资源；解析过程中发现的链接被收集后一并返回。
+    """
+    crawler = method.__self__
+    result = method(html, url)
+    return result, crawler._collected_links
+
+
+class ParserPool:
+    """HTML解析进程池
+
+    把CPU密集的解析移出事件循环。同时在途的解析任务数有上限，
+    达到上限后提交方会等待，抓取协程因此不会无限超前于解析。
+    """
+
+    def __init__(self, max_workers: int = CRAWL_PARSER_WORKERS, max_pending: Optional[int] = None):
+        """初始化解析进程池
+
+        Args:
+            max_workers: 工作进程数，0表示在调用方线程内直接解析
+            max_pending: 同时在途的解析任务上限，默认为工作进程数的2倍
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending or max(1, max_workers * 2)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        # asyncio.Semaphore绑定事件循环，每个循环使用独立的信号量
+        self._slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = asyncio.Semaphore(self.max_pending)
+            self._slots[loop] = slots
+        return slots
+
+    async def parse(self, method: Callable[[str, str], Any], html: str, url: str) -> Tuple[Any, List[str]]:
+        """在进程池中解析页面
+
+        Args:
+            method: 爬虫的解析方法（绑定方法），签名为 (html, url)
+            html: 页面HTML
+            url: 页面URL
+
+        Returns:
+            (解析结果, 解析过程中发现的链接)
+        """
+        if self.max_workers <= 0:
+            return _parse_page(method, html, url)
+
+        async with self._get_slots():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), _parse_page, method, html, url)
+
+    def close(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+_shared_pool: Optional[ParserPool] = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_shared_parser_pool() -> ParserPool:
+    """获取进程内共享的解析进程池"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ParserPool()
+    return _shared_pool
@@ -1,17 +1,34 @@
 # Copyright (c) 2025 Lingjing Project
 # SPDX-License-Identifier: MIT
 
+import logging
 import re
 from datetime import datetime
 from typing import Optional, Dict, Any
-from readabilipy import simple_json_from_html_string
+
 from crawler.article import Article
+from crawler.content_extractor import ExtractedPage, extract_page
+
+try:
+    from readabilipy import simple_json_from_html_string
+except ImportError:
+    simple_json_from_html_string = None
+
+logger = logging.getLogger(__name__)
 
 
 class ReadabilityExtractor:
     """可读性提取器，扩展支持神秘事件内容分析"""
     
-    def __init__(self):
+    def __init__(self, min_confidence: float = 0.4, use_fallback: bool = True):
+        """初始化提取器
+
+        Args:
+            min_confidence: 文本密度提取的最低置信度，低于该值时回退到readabilipy
+            use_fallback: 是否启用readabilipy回退（需要安装readabilipy）
+        """
+        self.min_confidence = min_confidence
+        self.use_fallback = use_fallback
         self.source_credibility_map = {
             # 学术来源
             "cnki.net": {"type": "academic", "score": 0.9},
@@ -49,25 +66,37 @@ class ReadabilityExtractor:
         }
     
     def extract_article(self, html: str, url: str = "") -> Article:
-        """提取文章内容"""
+        """提取文章内容
+
+        先用一次lxml解析完成正文定位（文本密度打分）和元数据收集；
+        置信度过低时回退到readabilipy。
+        """
         try:
-            # 使用readabilipy提取主要内容
-            article_data = simple_json_from_html_string(html, use_readability=True)
-            
-            title = article_data.get("title", "")
-            content = article_data.get("content", "")
-            
+            page = extract_page(html, url)
+            title = page.title
+            content = page.content_html
+            method = "density"
+
+            if page.confidence < self.min_confidence:
+                fallback = self._extract_with_readabilipy(html)
+                if fallback and fallback.get("content"):
+                    title = title or fallback.get("title") or ""
+                    content = fallback["content"]
+                    method = "readabilipy"
+                    page.byline = page.byline or fallback.get("byline") or ""
+                    page.date_published = page.date_published or fallback.get("date_published")
+
             # 提取元数据
-            metadata = self._extract_metadata(html, article_data)
+            metadata = self._extract_metadata(page, method)
             
             # 分析来源可信度
             source_info = self._analyze_source(url)
             
             # 提取作者信息
-            author = self._extract_author(html, article_data)
+            author = self._extract_author(html, page)
             
             # 提取发布日期
-            publication_date = self._extract_publication_date(html, article_data)
+            publication_date = self._extract_publication_date(html, page)
             
             # 创建Article对象
             article = Article(
@@ -84,6 +113,7 @@ class ReadabilityExtractor:
             return article
             
         except Exception as e:
+            logger.debug(f"Article extraction failed for {url}: {e}")
             # 如果提取失败，创建基本的Article对象
             return Article(
                 title="提取失败",
@@ -92,27 +122,29 @@ class ReadabilityExtractor:
                 source_type="unknown",
                 credibility_score=0.1
             )
+
+    def _extract_with_readabilipy(self, html: str) -> Optional[Dict[str, Any]]:
+        """readabilipy回退提取（启动Node子进程，较慢）"""
+        if not self.use_fallback or simple_json_from_html_string is None:
+            return None
+        try:
+            return simple_json_from_html_string(html, use_readability=True)
+        except Exception as e:
+            logger.debug(f"readabilipy fallback failed: {e}")
+            return None
     
-    def _extract_metadata(self, html: str, article_data: dict) -> Dict[str, Any]:
-        """提取元数据"""
-        metadata = {}
-        
-        # 提取基本元数据
-        metadata.update(article_data)
-        
-        # 提取Open Graph标签
-        og_tags = self._extract_og_tags(html)
-        metadata["og_tags"] = og_tags
-        
-        # 提取JSON-LD结构化数据
-        json_ld = self._extract_json_ld(html)
-        metadata["json_ld"] = json_ld
-        
-        # 提取meta标签
-        meta_tags = self._extract_meta_tags(html)
-        metadata["meta_tags"] = meta_tags
-        
-        return metadata
+    def _extract_metadata(self, page: ExtractedPage, method: str) -> Dict[str, Any]:
+        """提取元数据（与正文来自同一次解析）"""
+        return {
+            "title": page.title,
+            "byline": page.byline,
+            "date_published": page.date_published,
+            "og_tags": page.og_tags,
+            "json_ld": page.json_ld,
+            "meta_tags": page.meta_tags,
+            "extraction_method": method,
+            "extraction_confidence": page.confidence
+        }
     
     def _analyze_source(self, url: str) -> Dict[str, Any]:
         """分析来源可信度"""
@@ -140,18 +172,14 @@ class ReadabilityExtractor:
         else:
             return {"type": "unknown", "score": 0.3}
     
-    def _extract_author(self, html: str, article_data: dict) -> str:
+    def _extract_author(self, html: str, page: ExtractedPage) -> str:
         """提取作者信息"""
-        # 从article_data中获取
-        author = article_data.get("byline", "")
-        if author:
-            return author
+        # JSON-LD、meta author、rel=author/byline节点
+        if page.byline:
+            return page.byline
         
-        # 从HTML中提取
+        # 从正文文本中提取
         author_patterns = [
-            r'<meta\s+name=["\']author["\']\s+content=["\']([^"\'>]+)["\']',
-            r'<span\s+class=["\'][^"\'>]*author[^"\'>]*["\'][^>]*>([^<]+)</span>',
-            r'<div\s+class=["\'][^"\'>]*author[^"\'>]*["\'][^>]*>([^<]+)</div>',
             r'作者[：:](\s*[^\n<>]{2,20})',
             r'By\s+([A-Za-z\s]{2,30})'
         ]
@@ -165,21 +193,20 @@ class ReadabilityExtractor:
         
         return ""
     
-    def _extract_publication_date(self, html: str, article_data: dict) -> Optional[datetime]:
+    def _extract_publication_date(self, html: str, page: ExtractedPage) -> Optional[datetime]:
         """提取发布日期"""
-        # 从article_data中获取
-        date_published = article_data.get("date_published")
-        if date_published:
+        # JSON-LD datePublished、article:published_time、<time datetime>
+        candidates = [page.date_published] + page.time_datetimes
+        for date_published in candidates:
+            if not date_published:
+                continue
             try:
-                return datetime.fromisoformat(date_published.replace('Z', '+00:00'))
-            except:
-                pass
+                return datetime.fromisoformat(date_published.strip().replace('Z', '+00:00'))
+            except ValueError:
+                continue
         
-        # 从HTML中提取
+        # 从正文文本中提取
         date_patterns = [
-            r'<meta\s+property=["\']article:published_time["\']\s+content=["\']([^"\'>]+)["\']',
-            r'<time\s+datetime=["\']([^"\'>]+)["\']',
-            r'<meta\s+name=["\']date["\']\s+content=["\']([^"\'>]+)["\']',
             r'发布时间[：:]\s*(\d{4}[-/]\d{1,2}[-/]\d{1,2})',
             r'(\d{4}年\d{1,2}月\d{1,2}日)',
             r'(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})'
@@ -189,60 +216,17 @@ class ReadabilityExtractor:
             match = re.search(pattern, html)
             if match:
                 date_str = match.group(1)
-                try:
-                    # 尝试多种日期格式
-                    for fmt in ['%Y-%m-%d', '%Y/%m/%d', '%Y-%m-%dT%H:%M:%S', '%Y年%m月%d日']:
-                        try:
-                            return datetime.strptime(date_str, fmt)
-                        except:
-                            continue
-                except:
-                    continue
+                for fmt in ['%Y-%m-%d', '%Y/%m/%d', '%Y-%m-%dT%H:%M:%S', '%Y年%m月%d日']:
+                    try:
+                        return datetime.strptime(date_str, fmt)
+                    except ValueError:
+                        continue
         
         return None
     
-    def _extract_og_tags(self, html: str) -> Dict[str, str]:
-        """提取Open Graph标签"""
-        og_tags = {}
-        og_pattern = r'<meta\s+property=["\']og:([^"\'>]+)["\']\s+content=["\']([^"\'>]*)["\']'
-        
-        matches = re.findall(og_pattern, html, re.IGNORECASE)
-        for prop, content in matches:
-            og_tags[prop] = content
-        
-        return og_tags
-    
-    def _extract_json_ld(self, html: str) -> list:
-        """提取JSON-LD结构化数据"""
-        import json
-        
-        json_ld_data = []
-        json_ld_pattern = r'<script\s+type=["\']application/ld\+json["\'][^>]*>([^<]+)</script>'
-        
-        matches = re.findall(json_ld_pattern, html, re.IGNORECASE | re.DOTALL)
-        for match in matches:
-            try:
-                data = json.loads(match.strip())
-                json_ld_data.append(data)
-            except:
-                continue
-        
-        return json_ld_data
-    
-    def _extract_meta_tags(self, html: str) -> Dict[str, str]:
-        """提取meta标签"""
-        meta_tags = {}
-        meta_pattern = r'<meta\s+name=["\']([^"\'>]+)["\']\s+content=["\']([^"\'>]*)["\']'
-        
-        matches = re.findall(meta_pattern, html, re.IGNORECASE)
-        for name, content in matches:
-            meta_tags[name] = content
-        
-        return meta_tags
-    
     def analyze_content_quality(self, article: Article) -> Dict[str, Any]:
         """分析内容质量"""
-        content = article._get_plain_text()
+        content = article.plain_text
         
         quality_metrics = {
             "word_count": len(content.split()),
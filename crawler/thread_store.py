@@ -0,0 +1,185 @@
+# Copyright (c) 2025 Lingjing Project
+# SPDX-License-Identifier: MIT
+
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from config.tools import CRAWL_FRONTIER_DB
+from rag.retriever import Chunk, Document
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ThreadState:
+    """论坛主题的抓取进度（高水位线）"""
+    thread_key: str
+    url: str
+    last_page: int = 1
+    last_page_url: Optional[str] = None
+    last_post_id: Optional[str] = None
+    last_post_time: Optional[str] = None  # ISO格式
+    posts_count: int = 0
+    updated_at: float = 0.0
+
+
+class ThreadStore:
+    """论坛主题增量抓取状态
+
+    与抓取边界共用同一个SQLite数据库（抓取存储），为每个主题保存最后
+    抓取到的页码和帖子，以及已合并的Document。重抓时只需从最后一页开始
+    抓取新页面，新帖子作为新的块追加到已有文档中。
+
+    文档只在首次抓取时完整保存一次，之后每次增量抓取只追加新帖子及其块，
+    读取时按顺序合并，写入量与新帖子数成正比而不是与主题长度成正比。
+    """
+
+    def __init__(self, db_path: str = CRAWL_FRONTIER_DB, compress_level: int = 6):
+        """初始化主题状态存储
+
+        Args:
+            db_path: SQLite数据库路径
+            compress_level: 文档zlib压缩级别
+        """
+        self.db_path = db_path
+        self.compress_level = compress_level
+
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._init_schema()
+
+    def _init_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS forum_threads (
+                    thread_key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    last_page INTEGER NOT NULL DEFAULT 1,
+                    last_page_url TEXT,
+                    last_post_id TEXT,
+                    last_post_time TEXT,
+                    posts_count INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL,
+                    document BLOB
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS forum_thread_posts (
+                    thread_key TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    posts BLOB NOT NULL,
+                    PRIMARY KEY (thread_key, seq)
+                )
+            """)
+
+    def get(self, thread_key: str) -> Optional[ThreadState]:
+        """读取主题的抓取进度"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT thread_key, url, last_page, last_page_url, last_post_id, last_post_time, "
+                "posts_count, updated_at FROM forum_threads WHERE thread_key = ?",
+                (thread_key,)
+            ).fetchone()
+        return ThreadState(**dict(row)) if row else None
+
+    def load_document(self, thread_key: str) -> Optional[Document]:
+        """读取主题已合并的文档（首次保存的文档加上之后追加的帖子）"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT document FROM forum_threads WHERE thread_key = ?", (thread_key,)
+            ).fetchone()
+            appended = self._conn.execute(
+                "SELECT posts FROM forum_thread_posts WHERE thread_key = ? ORDER BY seq", (thread_key,)
+            ).fetchall()
+        if not row or row[0] is None:
+            return None
+        try:
+            document = self._loads(row[0])
+            for (blob,) in appended:
+                self._apply_posts(document, self._loads(blob))
+            return document
+        except Exception as e:
+            logger.warning(f"Discarding unreadable thread document {thread_key}: {e}")
+            return None
+
+    def save(self, state: ThreadState, document: Document):
+        """完整保存主题进度与文档，并清除之前追加的帖子"""
+        state.updated_at = time.time()
+        blob = self._dumps(document)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO forum_threads "
+                "(thread_key, url, last_page, last_page_url, last_post_id, last_post_time, "
+                "posts_count, updated_at, document) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (state.thread_key, state.url, state.last_page, state.last_page_url, state.last_post_id,
+                 state.last_post_time, state.posts_count, state.updated_at, blob)
+            )
+            self._conn.execute("DELETE FROM forum_thread_posts WHERE thread_key = ?", (state.thread_key,))
+
+    def append_posts(self, state: ThreadState, posts: List[Dict[str, Any]], chunks: List[Chunk]):
+        """保存主题进度，并只追加本次新抓取的帖子及其块（主题须已完整保存过）"""
+        state.updated_at = time.time()
+        blob = self._dumps({"posts": posts, "chunks": chunks, "crawled_at": datetime.now().isoformat()})
+        with self._lock, self._conn:
+            updated = self._conn.execute(
+                "UPDATE forum_threads SET last_page = ?, last_page_url = ?, last_post_id = ?, "
+                "last_post_time = ?, posts_count = ?, updated_at = ? WHERE thread_key = ?",
+                (state.last_page, state.last_page_url, state.last_post_id, state.last_post_time,
+                 state.posts_count, state.updated_at, state.thread_key)
+            ).rowcount
+            if not updated:
+                raise KeyError(f"Thread {state.thread_key} has not been saved")
+            self._conn.execute(
+                "INSERT INTO forum_thread_posts (thread_key, seq, posts) VALUES (?, "
+                "(SELECT COALESCE(MAX(seq), 0) + 1 FROM forum_thread_posts WHERE thread_key = ?), ?)",
+                (state.thread_key, state.thread_key, blob)
+            )
+
+    def delete(self, thread_key: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM forum_threads WHERE thread_key = ?", (thread_key,))
+            self._conn.execute("DELETE FROM forum_thread_posts WHERE thread_key = ?", (thread_key,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _dumps(self, value: Any) -> bytes:
+        return zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), self.compress_level)
+
+    @staticmethod
+    def _loads(blob: bytes) -> Any:
+        return pickle.loads(zlib.decompress(blob))
+
+    @staticmethod
+    def _apply_posts(document: Document, appended: Dict[str, Any]):
+        """把一次追加的帖子合并进文档（与论坛爬虫追加新帖子的方式一致）"""
+        document.chunks.extend(appended["chunks"])
+        document.metadata.setdefault('posts', []).extend(appended["posts"])
+        document.metadata['posts_count'] = len(document.metadata['posts'])
+        document.metadata['crawled_at'] = appended["crawled_at"]
+
+
+_shared_store: Optional[ThreadStore] = None
+_shared_store_lock = threading.Lock()
+
+
+def get_shared_thread_store() -> ThreadStore:
+    """获取进程内共享的主题状态存储"""
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = ThreadStore()
+    return _shared_store
@@ -0,0 +1,322 @@
+# Copyright (c) 2025 Lingjing Project
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Dict, Optional, AsyncIterator
+from urllib.parse import urlparse
+
+import aiohttp
+
+from config.mystery_config import DataSourceConfig
+
+logger = logging.getLogger(__name__)
+
+
+def retry_after_seconds(headers, attempt: int) -> float:
+    """解析Retry-After头，缺失或为日期格式时按指数退避"""
+    value = headers.get("Retry-After", "")
+    try:
+        return max(float(value), 1.0)
+    except ValueError:
+        return float(2 ** (attempt + 1))
+
+
+class TokenBucket:
+    """令牌桶限速器
+
+    以 rate_per_minute / 60 的速率补充令牌，桶容量决定允许的突发请求数。
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        """初始化令牌桶
+
+        Args:
+            rate_per_minute: 每分钟允许的请求数
+            capacity: 桶容量（最大突发请求数），默认为1
+        """
+        self.rate = max(rate_per_minute, 0.001) / 60.0
+        self.capacity = max(capacity or 1.0, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        """获取一个令牌，令牌不足时等待"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """暂停发放令牌（用于响应429的Retry-After）"""
+        now = time.monotonic()
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.tokens = 0
+        self.updated_at = now
+
+
+class AdaptiveRateLimiter:
+    """自适应速率控制（AIMD）
+
+    每次成功后速率加性增加，收到429时乘性减少并按Retry-After暂停。
+    通过预约时间槽实现匀速发放，不依赖asyncio锁，可在多个事件循环间复用。
+    """
+
+    def __init__(
+        self,
+        initial_rate: float,
+        min_rate: float = 0.05,
+        max_rate: float = 10.0,
+        increase: float = 0.1,
+        decrease_factor: float = 0.5
+    ):
+        """初始化速率控制器
+
+        Args:
+            initial_rate: 初始速率（每秒请求数）
+            min_rate: 最低速率
+            max_rate: 最高速率
+            increase: 每次成功后增加的速率
+            decrease_factor: 收到429时速率的缩减系数
+        """
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate = min(max(initial_rate, min_rate), max_rate)
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.throttled = 0
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    async def acquire(self):
+        """预约下一个发送时间槽并等待"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot, self._paused_until)
+            self._next_slot = slot + 1.0 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self.throttled += 1
+            now = time.monotonic()
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+            # 已预约但尚未发出的时间槽按新速率重新排队
+            self._next_slot = max(now, self._paused_until) + 1.0 / self.rate
+
+
+@dataclass
+class HostStats:
+    """单个主机的请求统计"""
+    requests: int = 0
+    throttled: int = 0  # 收到429的次数
+    errors: int = 0
+    wait_seconds: float = 0.0  # 在限速器和并发上限上的累计等待时间
+
+
+class CrawlTransport:
+    """爬虫共享HTTP传输层
+
+    所有爬虫共用一个连接池（DNS缓存、keep-alive复用），
+    并按主机施加并发上限和令牌桶限速。限速参数来自各数据源的
+    DataSourceConfig.rate_limit（每分钟请求数）。
+    """
+
+    def __init__(
+        self,
+        total_connections: int = 100,
+        connections_per_host: int = 4,
+        default_rate_limit: int = 60,
+        burst: int = 2,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 30.0,
+        request_timeout: float = 30.0,
+        max_retries: int = 2
+    ):
+        """初始化传输层
+
+        Args:
+            total_connections: 连接池总连接数上限
+            connections_per_host: 每个主机的并发请求上限
+            default_rate_limit: 未注册主机的默认每分钟请求数
+            burst: 令牌桶容量（允许的突发请求数）
+            dns_cache_ttl: DNS缓存时间（秒）
+            keepalive_timeout: 空闲连接保持时间（秒）
+            request_timeout: 单次请求超时时间（秒）
+            max_retries: 收到429后的最大重试次数
+        """
+        self.total_connections = total_connections
+        self.connections_per_host = connections_per_host
+        self.default_rate_limit = default_rate_limit
+        self.burst = burst
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.request_timeout = request_timeout
+        self.max_retries = max_retries
+
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._users = 0
+        self._rate_limits: Dict[str, int] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.stats: Dict[str, HostStats] = {}
+
+    async def open(self) -> "CrawlTransport":
+        """登记一个使用者，必要时创建共享会话"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.total_connections,
+                limit_per_host=self.connections_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout)
+            )
+            # 限速器和信号量绑定到当前事件循环，随会话一起重建
+            self._buckets.clear()
+            self._semaphores.clear()
+        self._users += 1
+        return self
+
+    async def close(self):
+        """注销一个使用者，最后一个使用者退出时关闭会话"""
+        self._users = max(0, self._users - 1)
+        if self._users == 0 and self.session and not self.session.closed:
+            await self.session.close()
+            self.session = None
+
+    def register_source(self, config: DataSourceConfig):
+        """按数据源配置登记主机的限速参数"""
+        host = self._host(config.base_url)
+        if not host:
+            return
+        # 多个配置指向同一主机时取最严格的限制
+        rate_limit = config.rate_limit
+        if host in self._rate_limits:
+            rate_limit = min(rate_limit, self._rate_limits[host])
+        if self._rate_limits.get(host) != rate_limit:
+            self._rate_limits[host] = rate_limit
+            self._buckets.pop(host, None)
+
+    @asynccontextmanager
+    async def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        **kwargs
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        """发送受限速的请求
+
+        用法:
+            async with transport.request("GET", url) as response:
+                text = await response.text()
+        """
+        if self.session is None or self.session.closed:
+            raise RuntimeError("Transport not opened. Use the crawler as an async context manager.")
+
+        host = self._host(url)
+        stats = self.stats.setdefault(host, HostStats())
+        semaphore = self._get_semaphore(host)
+        bucket = self._get_bucket(host)
+
+        for attempt in range(self.max_retries + 1):
+            start = time.monotonic()
+            async with semaphore:
+                await bucket.acquire()
+                stats.wait_seconds += time.monotonic() - start
+                stats.requests += 1
+                try:
+                    response = await self.session.request(method, url, headers=headers, **kwargs)
+                except Exception:
+                    stats.errors += 1
+                    raise
+
+                if response.status == 429 and attempt < self.max_retries:
+                    stats.throttled += 1
+                    retry_after = retry_after_seconds(response.headers, attempt)
+                    response.release()
+                    logger.warning(f"HTTP 429 from {host}, backing off {retry_after:.1f}s")
+                    bucket.pause(retry_after)
+                    continue
+
+            try:
+                yield response
+            finally:
+                response.release()
+            return
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, **kwargs):
+        """发送受限速的GET请求"""
+        return self.request("GET", url, headers=headers, **kwargs)
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """获取各主机的请求统计"""
+        return {
+            host: {
+                "requests": stats.requests,
+                "throttled": stats.throttled,
+                "errors": stats.errors,
+                "wait_seconds": round(stats.wait_seconds, 3),
+                "rate_limit": self._rate_limits.get(host, self.default_rate_limit)
+            }
+            for host, stats in self.stats.items()
+        }
+
+    def _get_bucket(self, host: str) -> TokenBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            rate_limit = self._rate_limits.get(host, self.default_rate_limit)
+            bucket = TokenBucket(rate_limit, capacity=self.burst)
+            self._buckets[host] = bucket
+        return bucket
+
+    def _get_semaphore(self, host: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.connections_per_host)
+            self._semaphores[host] = semaphore
+        return semaphore
+
+    @staticmethod
+    def _host(url: str) -> str:
+        return urlparse(url).netloc.lower()
+
+
+_shared_transport: Optional[CrawlTransport] = None
+
+
+def get_shared_transport() -> CrawlTransport:
+    """获取进程内共享的爬虫传输层"""
+    global _shared_transport
+    if _shared_transport is None:
+        _shared_transport = CrawlTransport()
+    return _shared_transport
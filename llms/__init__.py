@@ -1,7 +1,7 @@
 # Copyright (c) 2024 Lingjing
 # SPDX-License-Identifier: MIT
 
-from .llm import get_llm_by_type, create_llm_from_config
+from .llm import get_llm_by_type, create_llm_from_config, get_embedding_model
 from .types import LLMType
 
-__all__ = ["get_llm_by_type", "create_llm_from_config", "LLMType"]
\ No newline at end of file
+__all__ = ["get_llm_by_type", "create_llm_from_config", "get_embedding_model", "LLMType"]
\ No newline at end of file
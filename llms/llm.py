@@ -28,6 +28,16 @@ try:
 except ImportError:
     Ollama = None
 
+try:
+    from langchain_openai import OpenAIEmbeddings
+except ImportError:
+    OpenAIEmbeddings = None
+
+try:
+    from langchain_community.embeddings import OllamaEmbeddings
+except ImportError:
+    OllamaEmbeddings = None
+
 from .types import LLMType, DEFAULT_LLM_CONFIGS
 from config.configuration import load_yaml_config
 
@@ -415,6 +425,56 @@ def get_llm_by_type(
     return llm
 
 
+def get_embedding_model(provider: Optional[str] = None) -> Any:
+    """
+    Get an embedding model for LLMType.EMBEDDING.
+
+    The model name comes from the provider's ``models.embedding`` entry in the
+    LLM config. OpenAI-compatible endpoints (openai, qwen) use OpenAIEmbeddings,
+    ollama uses OllamaEmbeddings.
+
+    Args:
+        provider: LLM provider (if None, will try to detect from config)
+
+    Returns:
+        Embeddings instance with embed_documents/embed_query
+    """
+    if provider is None:
+        provider = _detect_default_provider()
+    provider = provider.lower()
+
+    cache_key = f"{provider}_{LLMType.EMBEDDING.value}"
+    if cache_key in _llm_cache:
+        return _llm_cache[cache_key]
+
+    provider_config = load_llm_config().get(provider, {})
+    env_config = _get_env_llm_conf(LLMType.EMBEDDING.value, provider)
+    model = env_config.get("model") or provider_config.get("models", {}).get(LLMType.EMBEDDING.value)
+    if not model:
+        raise ValueError(f"No embedding model configured for provider {provider}")
+
+    if provider == "ollama":
+        if OllamaEmbeddings is None:
+            raise ImportError("langchain_community is required for Ollama embeddings. Install with: pip install langchain-community")
+        embeddings = OllamaEmbeddings(
+            model=model,
+            base_url=env_config.get("base_url") or provider_config.get("base_url", "http://localhost:11434")
+        )
+    elif provider in ("openai", "qwen"):
+        if OpenAIEmbeddings is None:
+            raise ImportError("langchain_openai is required for OpenAI embeddings. Install with: pip install langchain-openai")
+        embeddings = OpenAIEmbeddings(
+            model=model,
+            api_key=env_config.get("api_key") or provider_config.get("api_key"),
+            base_url=env_config.get("base_url") or provider_config.get("base_url")
+        )
+    else:
+        raise ValueError(f"Embeddings are not supported for provider: {provider}")
+
+    _llm_cache[cache_key] = embeddings
+    return embeddings
+
+
 def _detect_default_provider() -> str:
     """Detect the default LLM provider from environment or config."""
     # Check environment variable
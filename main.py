@@ -18,6 +18,7 @@
 
 import asyncio
 import argparse
+import json
 import logging
 import sys
 from pathlib import Path
@@ -217,6 +218,63 @@ async def run_batch_mode(queries: list, output_dir: Optional[str] = None):
     return results
 
 
+async def _read_url_lines(url_file: str):
+    """逐行读取URL（'-'表示标准输入），适合从上游进程持续接收URL流。"""
+    loop = asyncio.get_running_loop()
+    stream = sys.stdin if url_file == "-" else open(url_file, "r", encoding="utf-8")
+    try:
+        while True:
+            line = await loop.run_in_executor(None, stream.readline)
+            if not line:
+                break
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+async def _poll_feed_urls(poll_interval: float):
+    """持续轮询所有新闻数据源的订阅源，产出新文章URL。"""
+    from crawler.feeds import FeedPoller
+    from config.mystery_config import DataSourceType, MysteryEventConfig
+    
+    sources = MysteryEventConfig().get_sources_by_type(DataSourceType.NEWS)
+    async with FeedPoller() as poller:
+        while True:
+            for source in sources:
+                for entry in await poller.poll_source(source):
+                    yield entry.url
+            await asyncio.sleep(poll_interval)
+
+
+async def run_ingest_mode(url_file: Optional[str] = None, follow_feeds: bool = False,
+                          fetch_workers: int = 8, metrics_interval: float = 30.0,
+                          feed_poll_interval: float = 60.0):
+    """运行流式摄取模式：持续处理URL流（文件/标准输入或新闻订阅源）。"""
+    from crawler.ingest import IngestPipeline
+    
+    if not url_file and not follow_feeds:
+        print("❌ 摄取模式需要 --urls 或 --feeds")
+        return
+    
+    pipeline = IngestPipeline(workers={"fetch": fetch_workers})
+    urls = _read_url_lines(url_file) if url_file else _poll_feed_urls(feed_poll_interval)
+    
+    async def report_metrics():
+        while True:
+            await asyncio.sleep(metrics_interval)
+            logger.info(f"摄取进度: {json.dumps(pipeline.get_metrics(), ensure_ascii=False)}")
+    
+    reporter = asyncio.create_task(report_metrics())
+    try:
+        await pipeline.run(urls)
+    finally:
+        reporter.cancel()
+    print(f"\n📊 摄取完成: {json.dumps(pipeline.get_metrics(), ensure_ascii=False, indent=2)}")
+
+
 def main():
     """主函数。"""
     parser = argparse.ArgumentParser(
@@ -410,9 +468,13 @@ if __name__ == "__main__":
     import argparse
     
     parser = argparse.ArgumentParser(description="Mystery Event Research System")
-    parser.add_argument("--mode", choices=["server", "research"], default="server",
-                       help="Run mode: server (FastAPI) or research (CLI)")
+    parser.add_argument("--mode", choices=["server", "research", "ingest"], default="server",
+                       help="Run mode: server (FastAPI), research (CLI) or ingest (streaming pipeline)")
     parser.add_argument("--query", type=str, help="Research query for CLI mode")
+    parser.add_argument("--urls", type=str, help="URL list for ingest mode, one per line ('-' for stdin)")
+    parser.add_argument("--feeds", action="store_true", help="Ingest new articles from news source feeds continuously")
+    parser.add_argument("--fetch-workers", type=int, default=8, help="Concurrent fetchers in ingest mode")
+    parser.add_argument("--metrics-interval", type=float, default=30.0, help="Seconds between ingest metrics logs")
     parser.add_argument("--host", type=str, default="127.0.0.1", help="Server host")
     parser.add_argument("--port", type=int, default=8000, help="Server port")
     parser.add_argument("--reload", action="store_true", help="Enable auto-reload")
@@ -454,5 +516,13 @@ if __name__ == "__main__":
         print("="*50)
         print(f"Final result: {result}")
     
+    elif args.mode == "ingest":
+        asyncio.run(run_ingest_mode(
+            url_file=args.urls,
+            follow_feeds=args.feeds,
+            fetch_workers=args.fetch_workers,
+            metrics_interval=args.metrics_interval
+        ))
+    
     else:
         main()
\ No newline at end of file
@@ -4,6 +4,11 @@
 from .retriever import Resource, Document, Chunk, Retriever, MysteryEvent
 from .ragflow import RAGFlowRetriever
 from .neo4j_retriever import Neo4jRetriever
+from .vector_retriever import VectorRetriever
+from .elasticsearch_retriever import ElasticsearchRetriever
+from .bm25_index import BM25Index
+from .hybrid_retriever import HybridRetriever
+from .event_network_cache import EventChangeLog, EventNetworkCache, get_shared_network_cache
 from .builder import build_retriever
 
 __all__ = [
@@ -14,5 +19,12 @@ __all__ = [
     "MysteryEvent",
     "RAGFlowRetriever",
     "Neo4jRetriever",
+    "VectorRetriever",
+    "ElasticsearchRetriever",
+    "BM25Index",
+    "HybridRetriever",
+    "EventChangeLog",
+    "EventNetworkCache",
+    "get_shared_network_cache",
     "build_retriever"
 ]
\ No newline at end of file
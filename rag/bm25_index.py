@@ -0,0 +1,498 @@
+# Copyright (c) 2025 Lingjing Project
+# SPDX-License-Identifier: MIT
+
+import heapq
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import sqlite3
+import threading
+from array import array
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import jieba
+except ImportError:
+    jieba = None
+
+try:
+    import Stemmer
+except ImportError:
+    Stemmer = None
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?|[぀-ヿ㐀-䶿一-鿿가-힯]+")
+
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "has", "have", "in", "is", "it",
+    "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "will", "with", "which", "who",
+    "的", "了", "和", "是", "在"
+})
+
+_STEP2_SUFFIXES = (
+    ("ational", "ate"), ("tional", "tion"), ("ization", "ize"), ("fulness", "ful"), ("ousness", "ous"),
+    ("iveness", "ive"), ("biliti", "ble"), ("alism", "al"), ("ation", "ate"), ("ator", "ate"),
+    ("iviti", "ive"), ("aliti", "al"), ("ement", ""), ("ment", ""), ("ness", ""), ("ful", ""),
+)
+_VOWEL = re.compile(r"[aeiouy]")
+
+_snowball = Stemmer.Stemmer("english") if Stemmer is not None else None
+
+
+def stem(word: str) -> str:
+    """英文词干提取：安装PyStemmer时使用Snowball，否则使用简化的Porter规则"""
+    if _snowball is not None:
+        return _snowball.stemWord(word)
+    if len(word) <= 3 or not word.isalpha():
+        return word
+    # Porter step 1a
+    if word.endswith("sses"):
+        word = word[:-2]
+    elif word.endswith("ies"):
+        word = word[:-2]
+    elif word.endswith(("ches", "shes", "xes", "zes")):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith("ss") and not word.endswith("us"):
+        word = word[:-1]
+    # Porter step 1b
+    if word.endswith("eed"):
+        if len(word) > 4:
+            word = word[:-1]
+    else:
+        for suffix in ("ing", "ed"):
+            if word.endswith(suffix) and _VOWEL.search(word[:-len(suffix)]):
+                word = word[:-len(suffix)]
+                if word.endswith(("at", "bl", "iz")):
+                    word += "e"
+                elif len(word) > 2 and word[-1] == word[-2] and word[-1] not in "lsz":
+                    word = word[:-1]
+                break
+    # Porter step 1c
+    if word.endswith("y") and len(word) > 2 and _VOWEL.search(word[:-1]):
+        word = word[:-1] + "i"
+    for suffix, replacement in _STEP2_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)] + replacement
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """中英文分词：英文小写、去停用词并提取词干；中文用jieba分词，未安装时用字二元组"""
+    tokens: List[str] = []
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        if token.isascii():
+            token = token.split("'")[0]
+            if token not in STOPWORDS:
+                tokens.append(stem(token))
+        elif jieba is not None:
+            tokens.extend(word for word in jieba.lcut_for_search(token) if word not in STOPWORDS)
+        elif len(token) == 1:
+            tokens.append(token)
+        else:
+            tokens.extend(token[i:i + 2] for i in range(len(token) - 1))
+    return tokens
+
+
+def encode_postings(postings: Sequence[Tuple[int, int]]) -> bytes:
+    """倒排表压缩：文档号差值 + 词频，均为varint"""
+    out = bytearray()
+    previous = 0
+    for doc, tf in postings:
+        for value in (doc - previous, tf):
+            while value >= 0x80:
+                out.append((value & 0x7F) | 0x80)
+                value >>= 7
+            out.append(value)
+        previous = doc
+    return bytes(out)
+
+
+def decode_postings(data, offset: int = 0, length: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+    """解码varint倒排表，data可以是bytes或mmap"""
+    end = len(data) if length is None else offset + length
+    position = offset
+    doc = 0
+    while position < end:
+        values = []
+        for _ in range(2):
+            value, shift = 0, 0
+            while True:
+                byte = data[position]
+                position += 1
+                value |= (byte & 0x7F) << shift
+                if byte < 0x80:
+                    break
+                shift += 7
+            values.append(value)
+        doc += values[0]
+        yield doc, values[1]
+
+
+class _Segment:
+    """不可变的倒排段：词典常驻内存，倒排数据内存映射"""
+
+    def __init__(self, name: str, terms: Dict[str, List[int]], data, file=None):
+        self.name = name
+        self.terms = terms  # term -> [offset, length, df]
+        self.data = data
+        self._file = file
+
+    @classmethod
+    def open(cls, directory: str, name: str) -> "_Segment":
+        with open(os.path.join(directory, f"{name}.dict"), "r", encoding="utf-8") as f:
+            terms = json.load(f)
+        postings_path = os.path.join(directory, f"{name}.post")
+        file = open(postings_path, "rb")
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(postings_path) else b""
+        return cls(name, terms, data, file)
+
+    @classmethod
+    def build(cls, name: str, postings: Dict[str, List[Tuple[int, int]]]) -> Tuple["_Segment", bytes]:
+        terms: Dict[str, List[int]] = {}
+        blob = bytearray()
+        for term in sorted(postings):
+            encoded = encode_postings(sorted(postings[term]))
+            terms[term] = [len(blob), len(encoded), len(postings[term])]
+            blob.extend(encoded)
+        return cls(name, terms, bytes(blob)), bytes(blob)
+
+    def postings(self, term: str) -> Iterator[Tuple[int, int]]:
+        entry = self.terms.get(term)
+        if entry is None:
+            return iter(())
+        return decode_postings(self.data, entry[0], entry[1])
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        if self._file is not None:
+            self._file.close()
+
+
+class BM25Index:
+    """进程内BM25倒排索引
+
+    新文档先写入内存缓冲，commit()时冻结为不可变段：倒排表按文档号差值和词频
+    做varint压缩，写入磁盘后通过mmap读取，词典以JSON保存并常驻内存。文档号、
+    长度、删除标记和附加字段存于同目录的SQLite。更新=删除旧文档号+追加新文档号，
+    段数超过max_segments时自动合并并清除已删除文档。path为None时完全在内存中运行。
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        k1: float = 1.2,
+        b: float = 0.75,
+        title_boost: int = 2,
+        flush_docs: int = 5000,
+        max_segments: int = 8
+    ):
+        """初始化BM25索引
+
+        Args:
+            path: 索引目录，None表示只在内存中
+            k1: BM25词频饱和参数
+            b: BM25长度归一化参数
+            title_boost: 标题词的词频倍数
+            flush_docs: 缓冲文档数达到该值时自动commit
+            max_segments: 段数上限，超过时合并
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.title_boost = title_boost
+        self.flush_docs = flush_docs
+        self.max_segments = max_segments
+        self._lock = threading.RLock()
+
+        if path:
+            os.makedirs(path, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(path, "docs.db") if path else ":memory:", check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._init_schema()
+
+        self._segments: List[_Segment] = []
+        self._buffer: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self._buffered_docs = 0
+        self._lengths = array("I")
+        self._alive = bytearray()
+        self._doc_nums: Dict[str, int] = {}
+        self._total_length = 0
+        self._alive_count = 0
+        # 段名使用单调递增的代号，合并后的段不会与被替换的段同名
+        self._generation = 0
+        self._load()
+
+    def _init_schema(self):
+        with self._lock, self._conn:
+            if self.path:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS docs (
+                    doc_num INTEGER PRIMARY KEY,
+                    doc_id TEXT NOT NULL,
+                    length INTEGER NOT NULL,
+                    deleted INTEGER NOT NULL DEFAULT 0,
+                    fields TEXT
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_docs_id ON docs(doc_id) WHERE deleted = 0")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS index_info (name TEXT PRIMARY KEY, value TEXT)")
+
+    def _get_info(self, name: str, default: Any = None) -> Any:
+        row = self._conn.execute("SELECT value FROM index_info WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_info(self, name: str, value: Any):
+        self._conn.execute("INSERT OR REPLACE INTO index_info (name, value) VALUES (?, ?)", (name, json.dumps(value)))
+
+    def _load(self):
+        committed = self._get_info("committed_doc_num", -1)
+        self._generation = self._get_info("segment_generation", 0)
+        with self._conn:
+            # 未commit的文档没有倒排数据，重新打开时丢弃
+            self._conn.execute("DELETE FROM docs WHERE doc_num > ?", (committed,))
+        for name in self._get_info("segments", []):
+            self._segments.append(_Segment.open(self.path, name))
+        for row in self._conn.execute("SELECT doc_num, doc_id, length, deleted FROM docs ORDER BY doc_num"):
+            self._append_doc_slot(row["doc_num"], row["length"], not row["deleted"])
+            if not row["deleted"]:
+                self._doc_nums[row["doc_id"]] = row["doc_num"]
+
+    def _append_doc_slot(self, doc_num: int, length: int, alive: bool):
+        while len(self._lengths) < doc_num:
+            self._lengths.append(0)
+            self._alive.append(0)
+        self._lengths.append(length)
+        self._alive.append(1 if alive else 0)
+        if alive:
+            self._total_length += length
+            self._alive_count += 1
+
+    def __len__(self) -> int:
+        return self._alive_count
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_nums
+
+    def doc_ids(self) -> List[str]:
+        """当前未删除文档的外部ID"""
+        with self._lock:
+            return list(self._doc_nums)
+
+    def add(self, doc_id: str, text: str, title: str = "", fields: Optional[Dict[str, Any]] = None):
+        """添加或替换文档
+
+        Args:
+            doc_id: 文档外部ID，已存在时替换
+            text: 正文
+            title: 标题（词频乘以title_boost）
+            fields: 随检索结果返回的附加字段（需可JSON序列化）
+        """
+        counts = Counter(tokenize(text))
+        for token in tokenize(title):
+            counts[token] += self.title_boost
+        length = sum(counts.values())
+
+        with self._lock:
+            self._delete_locked(doc_id)
+            doc_num = len(self._lengths)
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO docs (doc_num, doc_id, length, fields) VALUES (?, ?, ?, ?)",
+                    (doc_num, doc_id, length, json.dumps(fields or {}, ensure_ascii=False, default=str))
+                )
+            self._append_doc_slot(doc_num, length, True)
+            self._doc_nums[doc_id] = doc_num
+            for term, tf in counts.items():
+                self._buffer[term].append((doc_num, tf))
+            self._buffered_docs += 1
+            if self._buffered_docs >= self.flush_docs:
+                self.commit()
+
+    def delete(self, doc_id: str) -> bool:
+        with self._lock:
+            return self._delete_locked(doc_id)
+
+    def _delete_locked(self, doc_id: str) -> bool:
+        doc_num = self._doc_nums.pop(doc_id, None)
+        if doc_num is None:
+            return False
+        with self._conn:
+            self._conn.execute("UPDATE docs SET deleted = 1 WHERE doc_num = ?", (doc_num,))
+        self._alive[doc_num] = 0
+        self._total_length -= self._lengths[doc_num]
+        self._alive_count -= 1
+        return True
+
+    def _next_segment_name(self, suffix: str = "") -> str:
+        self._generation += 1
+        return f"seg_{self._generation:010d}{suffix}"
+
+    def _save_segments(self):
+        self._set_info("segments", [segment.name for segment in self._segments])
+        self._set_info("segment_generation", self._generation)
+
+    def commit(self):
+        """把内存缓冲冻结为新段（有路径时写入磁盘）"""
+        with self._lock:
+            if self._buffer:
+                name = self._next_segment_name()
+                segment, blob = _Segment.build(name, self._buffer)
+                if self.path:
+                    self._write_segment(name, segment.terms, blob)
+                    segment = _Segment.open(self.path, name)
+                self._segments.append(segment)
+                self._buffer = defaultdict(list)
+                self._buffered_docs = 0
+            with self._conn:
+                self._save_segments()
+                self._set_info("committed_doc_num", len(self._lengths) - 1)
+            if len(self._segments) > self.max_segments:
+                self.optimize()
+
+    def _write_segment(self, name: str, terms: Dict[str, List[int]], blob: bytes):
+        # 先写临时文件再改名，段文件要么完整要么不存在
+        for suffix, payload, mode in ((".post", blob, "wb"), (".dict", json.dumps(terms, ensure_ascii=False), "w")):
+            tmp_path = os.path.join(self.path, f"{name}{suffix}.tmp")
+            with open(tmp_path, mode, **({} if mode == "wb" else {"encoding": "utf-8"})) as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, os.path.join(self.path, f"{name}{suffix}"))
+
+    def optimize(self):
+        """合并所有段并清除已删除文档的倒排"""
+        with self._lock:
+            if self._buffer:
+                self.commit()
+            if not self._segments:
+                return
+            merged: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+            for segment in self._segments:
+                for term in segment.terms:
+                    for doc, tf in segment.postings(term):
+                        if self._alive[doc]:
+                            merged[term].append((doc, tf))
+            old_segments = self._segments
+            name = self._next_segment_name("_m")
+            segment, blob = _Segment.build(name, merged)
+            if self.path:
+                self._write_segment(name, segment.terms, blob)
+                segment = _Segment.open(self.path, name)
+            self._segments = [segment]
+            with self._conn:
+                self._save_segments()
+            for old in old_segments:
+                old.close()
+                if self.path and old.name != name:
+                    for suffix in (".post", ".dict"):
+                        try:
+                            os.remove(os.path.join(self.path, f"{old.name}{suffix}"))
+                        except FileNotFoundError:
+                            pass
+
+    def _postings(self, term: str) -> Iterator[Tuple[int, int]]:
+        for segment in self._segments:
+            yield from segment.postings(term)
+        yield from self._buffer.get(term, ())
+
+    def _document_frequency(self, term: str) -> int:
+        df = sum(segment.terms[term][2] for segment in self._segments if term in segment.terms)
+        return df + len(self._buffer.get(term, ()))
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        predicate: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> List[Tuple[float, str, Dict[str, Any]]]:
+        """BM25检索
+
+        Args:
+            query: 查询文本
+            limit: 返回数量
+            predicate: 按附加字段过滤的函数，对得分最高的候选依次判断
+
+        Returns:
+            [(得分, doc_id, 附加字段)]，按得分降序
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with self._lock:
+            if not self._alive_count:
+                return []
+            n = self._alive_count
+            avgdl = self._total_length / n or 1.0
+            k1, b = self.k1, self.b
+            scores: Dict[int, float] = defaultdict(float)
+            for term in terms:
+                df = self._document_frequency(term)
+                if not df:
+                    continue
+                idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+                for doc, tf in self._postings(term):
+                    if self._alive[doc]:
+                        norm = k1 * (1.0 - b + b * self._lengths[doc] / avgdl)
+                        scores[doc] += idf * tf * (k1 + 1.0) / (tf + norm)
+
+            ranked = heapq.nlargest(len(scores) if predicate else limit, scores.items(), key=lambda item: item[1])
+            results: List[Tuple[float, str, Dict[str, Any]]] = []
+            batch_size = max(limit * 2, 50)
+            for start in range(0, len(ranked), batch_size):
+                batch = ranked[start:start + batch_size]
+                rows = self._fetch_docs([doc for doc, _ in batch])
+                for doc, score in batch:
+                    row = rows.get(doc)
+                    if row is None:
+                        continue
+                    fields = json.loads(row["fields"] or "{}")
+                    if predicate is not None and not predicate(fields):
+                        continue
+                    results.append((score, row["doc_id"], fields))
+                    if len(results) >= limit:
+                        return results
+            return results
+
+    def _fetch_docs(self, doc_nums: List[int]) -> Dict[int, sqlite3.Row]:
+        if not doc_nums:
+            return {}
+        placeholders = ",".join("?" * len(doc_nums))
+        return {
+            row["doc_num"]: row for row in self._conn.execute(
+                f"SELECT doc_num, doc_id, fields FROM docs WHERE doc_num IN ({placeholders})", doc_nums
+            )
+        }
+
+    def get_fields(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        doc_num = self._doc_nums.get(doc_id)
+        if doc_num is None:
+            return None
+        row = self._conn.execute("SELECT fields FROM docs WHERE doc_num = ?", (doc_num,)).fetchone()
+        return json.loads(row[0] or "{}") if row else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "documents": self._alive_count,
+            "deleted": len(self._lengths) - self._alive_count,
+            "segments": len(self._segments),
+            "buffered_documents": self._buffered_docs,
+            "terms": len({term for segment in self._segments for term in segment.terms} | set(self._buffer)),
+            "avg_length": round(self._total_length / self._alive_count, 2) if self._alive_count else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            if self.path and self._buffer:
+                self.commit()
+            for segment in self._segments:
+                segment.close()
+            self._segments = []
+            self._conn.close()
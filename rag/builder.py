@@ -1,9 +1,21 @@
 # Copyright (c) 2025 Lingjing Project
 # SPDX-License-Identifier: MIT
 
-from config.tools import SELECTED_RAG_PROVIDER, RAGProvider
+import threading
+
+from config.tools import (
+    BM25_INDEX_DIR,
+    EVENT_NETWORK_WARM_UP_INTERVAL,
+    SELECTED_RAG_PROVIDER,
+    RAGProvider,
+)
+from .bm25_index import BM25Index
+from .event_network_cache import get_shared_network_cache
 from .ragflow import RAGFlowRetriever
+from .elasticsearch_retriever import ElasticsearchRetriever
 from .neo4j_retriever import Neo4jRetriever
+from .hybrid_retriever import HybridRetriever
+from .vector_retriever import VectorRetriever
 from .retriever import Retriever
 
 
@@ -12,22 +24,43 @@ def build_retriever() -> Retriever | None:
     if SELECTED_RAG_PROVIDER == RAGProvider.RAGFLOW.value:
         return RAGFlowRetriever()
     elif SELECTED_RAG_PROVIDER == RAGProvider.NEO4J.value:
-        return Neo4jRetriever()
+        return build_graph_retriever()
+    elif SELECTED_RAG_PROVIDER == RAGProvider.VECTOR.value:
+        return VectorRetriever()
     elif SELECTED_RAG_PROVIDER == RAGProvider.ELASTICSEARCH.value:
-        # TODO: 实现Elasticsearch检索器
-        raise NotImplementedError("Elasticsearch retriever not implemented yet")
+        return ElasticsearchRetriever()
     elif SELECTED_RAG_PROVIDER:
         raise ValueError(f"Unsupported RAG provider: {SELECTED_RAG_PROVIDER}")
     return None
 
 
+# 预热任务每个进程只运行一个，由第一个构建的图检索器驱动
+_warm_up_thread: threading.Thread | None = None
+_warm_up_lock = threading.Lock()
+
+
 def build_graph_retriever() -> Neo4jRetriever:
-    """构建图数据库检索器"""
-    return Neo4jRetriever()
+    """构建图数据库检索器，配置了BM25_INDEX_DIR时附带全文索引，并按配置共享事件网络邻域缓存"""
+    retriever = Neo4jRetriever(
+        text_index=BM25Index(BM25_INDEX_DIR) if BM25_INDEX_DIR else None,
+        network_cache=get_shared_network_cache()
+    )
+    _ensure_network_warm_up(retriever)
+    return retriever
+
+
+def _ensure_network_warm_up(retriever: Neo4jRetriever):
+    """预热任务未运行（尚未启动，或驱动它的检索器已关闭）时用该检索器启动"""
+    global _warm_up_thread
+    if retriever.network_cache is None or EVENT_NETWORK_WARM_UP_INTERVAL <= 0:
+        return
+    with _warm_up_lock:
+        if _warm_up_thread is None or not _warm_up_thread.is_alive():
+            _warm_up_thread = retriever.start_network_warm_up(EVENT_NETWORK_WARM_UP_INTERVAL)
 
 
-def build_hybrid_retriever() -> list[Retriever]:
-    """构建混合检索器，同时使用多种检索方式"""
+def build_hybrid_retriever() -> HybridRetriever:
+    """构建混合检索器，并发查询多种检索方式并融合结果"""
     retrievers = []
     
     # 添加主要检索器
@@ -36,12 +69,11 @@ def build_hybrid_retriever() -> list[Retriever]:
         retrievers.append(main_retriever)
     
     # 总是添加Neo4j检索器用于关联分析
-    try:
-        graph_retriever = build_graph_retriever()
-        if graph_retriever not in retrievers:
-            retrievers.append(graph_retriever)
-    except Exception:
-        # Neo4j不可用时忽略
-        pass
+    if not isinstance(main_retriever, Neo4jRetriever):
+        try:
+            retrievers.append(build_graph_retriever())
+        except Exception:
+            # Neo4j不可用时忽略
+            pass
     
-    return retrievers
\ No newline at end of file
+    return HybridRetriever(retrievers)
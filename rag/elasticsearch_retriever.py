@@ -0,0 +1,529 @@
+# Copyright (c) 2025 Lingjing Project
+# SPDX-License-Identifier: MIT
+
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config.tools import (
+    ELASTICSEARCH_INDEX,
+    ELASTICSEARCH_PASSWORD,
+    ELASTICSEARCH_PIT_KEEP_ALIVE,
+    ELASTICSEARCH_QUERY_CACHE_TTL,
+    ELASTICSEARCH_URL,
+    ELASTICSEARCH_USER,
+)
+from utils.cache import TTLCache
+from .retriever import Chunk, Document, Resource, Retriever, MysteryEvent
+
+logger = logging.getLogger(__name__)
+
+# 中日韩文本用内置的cjk_bigram切分，不依赖分词插件
+INDEX_SETTINGS = {
+    "analysis": {
+        "analyzer": {
+            "cjk_text": {
+                "type": "custom",
+                "tokenizer": "standard",
+                "filter": ["cjk_width", "lowercase", "cjk_bigram"]
+            }
+        }
+    }
+}
+
+# 字段与爬虫/存储工具写入的事件文档一致：timestamp为日期，location为{"lat", "lon"}
+INDEX_MAPPINGS = {
+    "properties": {
+        "id": {"type": "keyword"},
+        "event_id": {"type": "keyword"},
+        "event_type": {"type": "keyword"},
+        "title": {
+            "type": "text", "analyzer": "cjk_text",
+            "fields": {"keyword": {"type": "keyword", "ignore_above": 256}}
+        },
+        "description": {"type": "text", "analyzer": "cjk_text"},
+        "address": {
+            "type": "text", "analyzer": "cjk_text",
+            "fields": {"keyword": {"type": "keyword", "ignore_above": 256}}
+        },
+        "country": {"type": "keyword"},
+        "region": {"type": "keyword"},
+        "location": {"type": "geo_point"},
+        "timestamp": {"type": "date"},
+        "credibility_score": {"type": "float"},
+        "source_url": {"type": "keyword"},
+        "witnesses": {"type": "object", "enabled": False},
+        "evidence": {"type": "object", "enabled": False},
+        "metadata": {"type": "object", "enabled": False}
+    }
+}
+
+RESOURCE_PREFIX = "es://"
+
+
+class ElasticsearchRetriever(Retriever):
+    """Elasticsearch检索器
+
+    事件索引使用专门的映射（geo_point位置、date时间、keyword类型、CJK分词），
+    深分页走point-in-time + search_after，时间线/热力图分面由服务端聚合计算。
+    相同的并发查询合并为一次请求（单飞），可选短时缓存。
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        index: Optional[str] = None,
+        cache: Optional[TTLCache] = None,
+        page_size: int = 50,
+        timeout: float = 30.0,
+        pool_size: int = 10,
+        create_index: bool = True
+    ):
+        """初始化Elasticsearch检索器
+
+        Args:
+            url: Elasticsearch地址（默认读取ELASTICSEARCH_URL）
+            index: 事件索引名（默认读取ELASTICSEARCH_INDEX）
+            cache: 查询合并/缓存，默认按ELASTICSEARCH_QUERY_CACHE_TTL创建（0为只合并不缓存）
+            page_size: 单页结果数
+            timeout: 请求超时（秒）
+            pool_size: 连接池大小
+            create_index: 索引不存在时按映射创建
+        """
+        self.url = (url or ELASTICSEARCH_URL).rstrip("/")
+        self.index = index or ELASTICSEARCH_INDEX
+        self.page_size = page_size
+        self.timeout = timeout
+        self.cache = cache if cache is not None else TTLCache(maxsize=256, ttl=ELASTICSEARCH_QUERY_CACHE_TTL)
+
+        # 检索请求是只读的，POST也可安全重试
+        self.session = requests.Session()
+        if ELASTICSEARCH_USER:
+            self.session.auth = (ELASTICSEARCH_USER, ELASTICSEARCH_PASSWORD)
+        self.session.headers.update({"Content-Type": "application/json"})
+        retry_strategy = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[429, 502, 503, 504],
+            allowed_methods=["GET", "POST", "PUT", "DELETE", "HEAD"],
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry_strategy)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        if create_index:
+            self.ensure_index()
+
+    def close(self):
+        self.session.close()
+
+    def _request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None, **params) -> Dict[str, Any]:
+        response = self.session.request(
+            method, f"{self.url}/{path.lstrip('/')}", json=body, params=params or None, timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json() if response.content else {}
+
+    def ensure_index(self) -> bool:
+        """索引不存在时按INDEX_SETTINGS/INDEX_MAPPINGS创建，返回是否新建"""
+        response = self.session.head(f"{self.url}/{quote(self.index)}", timeout=self.timeout)
+        if response.status_code == 200:
+            return False
+        response = self.session.put(
+            f"{self.url}/{quote(self.index)}",
+            json={"settings": INDEX_SETTINGS, "mappings": INDEX_MAPPINGS},
+            timeout=self.timeout
+        )
+        # 并发创建时其他进程可能已建好
+        if response.status_code == 400 and "resource_already_exists" in response.text:
+            return False
+        response.raise_for_status()
+        logger.info(f"Created Elasticsearch index {self.index}")
+        return True
+
+    def search(self, body: Dict[str, Any], path: Optional[str] = None) -> Dict[str, Any]:
+        """执行_search；请求体相同的并发调用共享一次请求"""
+        path = path or f"{quote(self.index)}/_search"
+        key = ("search", path, json.dumps(body, sort_keys=True, ensure_ascii=False, default=str))
+        return self.cache.get_or_load(key, lambda: self._request("POST", path, body))
+
+    @staticmethod
+    def build_event_query(
+        query: str | None = None,
+        event_type: str | None = None,
+        location: str | None = None,
+        date_range: tuple[datetime, datetime] | None = None,
+        min_credibility: float = 0.0,
+        near: tuple[float, float] | None = None,
+        radius_km: float = 50.0
+    ) -> Dict[str, Any]:
+        """构建事件查询：全文条件计分，其余条件放在filter中（不计分、可缓存）"""
+        must: List[Dict[str, Any]] = []
+        filters: List[Dict[str, Any]] = []
+        if query and query.strip():
+            must.append({
+                "multi_match": {"query": query, "fields": ["title^2", "description"], "type": "best_fields"}
+            })
+        if event_type:
+            filters.append({"term": {"event_type": event_type}})
+        if location:
+            filters.append({"match": {"address": {"query": location, "operator": "and"}}})
+        if date_range:
+            start_date, end_date = date_range
+            filters.append({"range": {"timestamp": {"gte": start_date.isoformat(), "lte": end_date.isoformat()}}})
+        if min_credibility > 0:
+            filters.append({"range": {"credibility_score": {"gte": min_credibility}}})
+        if near:
+            filters.append({
+                "geo_distance": {"distance": f"{radius_km}km", "location": {"lat": near[0], "lon": near[1]}}
+            })
+        if not must and not filters:
+            return {"match_all": {}}
+        return {"bool": {"must": must or [{"match_all": {}}], "filter": filters}}
+
+    def list_resources(self, query: str | None = None) -> list[Resource]:
+        """按事件类型聚合，每种类型作为一个资源"""
+        body = {
+            "size": 0,
+            "query": self.build_event_query(query),
+            "aggs": {
+                "event_types": {
+                    "terms": {"field": "event_type", "size": 100},
+                    "aggs": {"credibility": {"avg": {"field": "credibility_score"}}}
+                }
+            }
+        }
+        try:
+            response = self.search(body)
+        except Exception as e:
+            logger.error(f"Failed to list Elasticsearch resources: {e}")
+            return []
+
+        resources = []
+        for bucket in response.get("aggregations", {}).get("event_types", {}).get("buckets", []):
+            event_type = bucket["key"]
+            resources.append(Resource(
+                uri=f"{RESOURCE_PREFIX}{self.index}/{event_type}",
+                title=event_type,
+                description=f"{bucket['doc_count']} events",
+                resource_type="mystery_event",
+                credibility_score=bucket.get("credibility", {}).get("value") or 0.5,
+                metadata={"index": self.index, "event_type": event_type, "doc_count": bucket["doc_count"]}
+            ))
+        return resources
+
+    def query_relevant_documents(
+        self, query: str, resources: list[Resource] = None
+    ) -> list[Document]:
+        """检索事件文档，resources限定事件类型"""
+        event_types = [
+            resource.metadata.get("event_type") or resource.uri.rsplit("/", 1)[-1]
+            for resource in resources or []
+            if resource.uri.startswith(RESOURCE_PREFIX)
+        ]
+        event_query = self.build_event_query(query)
+        if event_types:
+            event_query = {"bool": {"must": [event_query], "filter": [{"terms": {"event_type": event_types}}]}}
+        body = {
+            "size": self.page_size,
+            "query": event_query,
+            "highlight": {"fields": {"description": {"fragment_size": 300, "number_of_fragments": 3}}}
+        }
+        try:
+            response = self.search(body)
+        except Exception as e:
+            logger.error(f"Failed to query Elasticsearch documents: {e}")
+            return []
+
+        hits = response.get("hits", {})
+        max_score = hits.get("max_score") or 1.0
+        documents = []
+        for hit in hits.get("hits", []):
+            event = self._hit_to_event(hit)
+            similarity = (hit.get("_score") or 0.0) / max_score
+            fragments = hit.get("highlight", {}).get("description") or [event.description]
+            documents.append(Document(
+                id=event.event_id,
+                url=event.source_url,
+                title=event.title,
+                chunks=[Chunk(content=fragment, similarity=similarity) for fragment in fragments if fragment],
+                mystery_event=event,
+                credibility_score=event.credibility_score,
+                source_type="mystery_event",
+                publication_date=event.date,
+                metadata={"index": hit.get("_index"), "score": hit.get("_score")}
+            ))
+        return documents
+
+    def query_mystery_events(
+        self,
+        query: str,
+        event_type: str | None = None,
+        location: str | None = None,
+        date_range: tuple[datetime, datetime] | None = None,
+        min_credibility: float = 0.0,
+        near: tuple[float, float] | None = None,
+        radius_km: float = 50.0
+    ) -> list[MysteryEvent]:
+        """查询神秘事件（第一页），需要全部结果时用iter_mystery_events"""
+        body = {
+            "size": self.page_size,
+            "query": self.build_event_query(query, event_type, location, date_range, min_credibility, near, radius_km),
+            "sort": ["_score", {"credibility_score": "desc"}, {"timestamp": {"order": "desc", "missing": "_last"}}]
+        }
+        try:
+            response = self.search(body)
+        except Exception as e:
+            logger.error(f"Failed to query Elasticsearch events: {e}")
+            return []
+        return [self._hit_to_event(hit) for hit in response.get("hits", {}).get("hits", [])]
+
+    def iter_mystery_events(
+        self,
+        query: str | None = None,
+        event_type: str | None = None,
+        location: str | None = None,
+        date_range: tuple[datetime, datetime] | None = None,
+        min_credibility: float = 0.0,
+        page_size: int = 500,
+        keep_alive: str = ELASTICSEARCH_PIT_KEEP_ALIVE
+    ) -> Iterator[MysteryEvent]:
+        """遍历所有匹配事件
+
+        在同一个point-in-time快照上用search_after逐页读取，翻页代价不随深度增长，
+        期间的写入也不会造成重复或遗漏。
+        """
+        event_query = self.build_event_query(query, event_type, location, date_range, min_credibility)
+        for hit in self.iter_hits(event_query, page_size, keep_alive):
+            yield self._hit_to_event(hit)
+
+    def iter_hits(
+        self,
+        query: Dict[str, Any],
+        page_size: int = 500,
+        keep_alive: str = ELASTICSEARCH_PIT_KEEP_ALIVE,
+        sort: Optional[List[Any]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """PIT + search_after遍历原始命中；_shard_doc作为最后的排序键保证翻页稳定"""
+        pit_id = self._request("POST", f"{quote(self.index)}/_pit", keep_alive=keep_alive)["id"]
+        search_after = None
+        try:
+            while True:
+                body = {
+                    "size": page_size,
+                    "query": query,
+                    "pit": {"id": pit_id, "keep_alive": keep_alive},
+                    "sort": list(sort or ["_score"]) + [{"_shard_doc": "asc"}],
+                    "track_total_hits": False
+                }
+                if search_after is not None:
+                    body["search_after"] = search_after
+                # 翻页请求不经过合并缓存：每页只读一次
+                response = self._request("POST", "_search", body)
+                pit_id = response.get("pit_id", pit_id)
+                hits = response.get("hits", {}).get("hits", [])
+                yield from hits
+                if len(hits) < page_size:
+                    break
+                search_after = hits[-1]["sort"]
+        finally:
+            try:
+                self._request("DELETE", "_pit", {"id": pit_id})
+            except Exception as e:
+                logger.warning(f"Failed to close point-in-time: {e}")
+
+    def event_facets(
+        self,
+        query: str | None = None,
+        event_type: str | None = None,
+        location: str | None = None,
+        date_range: tuple[datetime, datetime] | None = None,
+        min_credibility: float = 0.0,
+        interval: str = "month",
+        geohash_precision: int = 4
+    ) -> Dict[str, Any]:
+        """服务端聚合：时间线（date_histogram）、热力图（geohash_grid+质心）和事件类型分布
+
+        Args:
+            interval: 时间线的日历间隔（day/week/month/quarter/year）
+            geohash_precision: 热力图网格精度，越大网格越小
+
+        Returns:
+            {"total", "timeline": [...], "heatmap": [...], "event_types": [...]}
+        """
+        body = {
+            "size": 0,
+            "track_total_hits": True,
+            "query": self.build_event_query(query, event_type, location, date_range, min_credibility),
+            "aggs": {
+                "timeline": {
+                    "date_histogram": {"field": "timestamp", "calendar_interval": interval, "min_doc_count": 1},
+                    "aggs": {"credibility": {"avg": {"field": "credibility_score"}}}
+                },
+                "heatmap": {
+                    "geohash_grid": {"field": "location", "precision": geohash_precision, "size": 1000},
+                    "aggs": {"centroid": {"geo_centroid": {"field": "location"}}}
+                },
+                "event_types": {"terms": {"field": "event_type", "size": 50}}
+            }
+        }
+        response = self.search(body)
+        aggregations = response.get("aggregations", {})
+        total = response.get("hits", {}).get("total", 0)
+        return {
+            "total": total.get("value", 0) if isinstance(total, dict) else total,
+            "timeline": [
+                {
+                    "date": bucket.get("key_as_string", bucket["key"]),
+                    "count": bucket["doc_count"],
+                    "avg_credibility": bucket.get("credibility", {}).get("value")
+                }
+                for bucket in aggregations.get("timeline", {}).get("buckets", [])
+            ],
+            "heatmap": [
+                {
+                    "geohash": bucket["key"],
+                    "count": bucket["doc_count"],
+                    "lat": bucket.get("centroid", {}).get("location", {}).get("lat"),
+                    "lon": bucket.get("centroid", {}).get("location", {}).get("lon")
+                }
+                for bucket in aggregations.get("heatmap", {}).get("buckets", [])
+            ],
+            "event_types": [
+                {"event_type": bucket["key"], "count": bucket["doc_count"]}
+                for bucket in aggregations.get("event_types", {}).get("buckets", [])
+            ]
+        }
+
+    def store_mystery_event(self, event: MysteryEvent) -> bool:
+        """存储神秘事件（以event_id为文档ID，重复写入覆盖）"""
+        try:
+            self._request("PUT", f"{quote(self.index)}/_doc/{quote(event.event_id, safe='')}", self._event_source(event))
+            # 写入后旧的缓存结果不再可信
+            self.cache.invalidate()
+            return True
+        except Exception as e:
+            logger.error(f"Error storing mystery event: {e}")
+            return False
+
+    def find_related_events(
+        self,
+        event: MysteryEvent,
+        similarity_threshold: float = 0.7,
+        radius_km: float = 50.0,
+        day_window: int = 30
+    ) -> list[MysteryEvent]:
+        """查找相关事件
+
+        同类型0.4、同地点或radius_km内0.3、前后day_window天内0.3，每项用constant_score
+        计分，_score即相似度，min_score在服务端过滤。
+        """
+        should: List[Dict[str, Any]] = [
+            {"constant_score": {"filter": {"term": {"event_type": event.event_type}}, "boost": 0.4}}
+        ]
+        nearby: List[Dict[str, Any]] = []
+        if event.location:
+            nearby.append({"term": {"address.keyword": event.location}})
+        coordinates = (event.metadata or {}).get("coordinates")
+        if isinstance(coordinates, dict) and coordinates.get("lat") is not None and coordinates.get("lon") is not None:
+            nearby.append({
+                "geo_distance": {
+                    "distance": f"{radius_km}km",
+                    "location": {"lat": coordinates["lat"], "lon": coordinates["lon"]}
+                }
+            })
+        if nearby:
+            should.append({"constant_score": {"filter": {"bool": {"should": nearby}}, "boost": 0.3}})
+        if event.date:
+            window = timedelta(days=day_window)
+            should.append({"constant_score": {
+                "filter": {"range": {"timestamp": {
+                    "gte": (event.date - window).isoformat(), "lte": (event.date + window).isoformat()
+                }}},
+                "boost": 0.3
+            }})
+
+        body = {
+            "size": 20,
+            "min_score": similarity_threshold,
+            "query": {
+                "bool": {
+                    "should": should,
+                    "minimum_should_match": 1,
+                    "must_not": [{"ids": {"values": [event.event_id]}}]
+                }
+            }
+        }
+        try:
+            response = self.search(body)
+        except Exception as e:
+            logger.error(f"Failed to find related events: {e}")
+            return []
+        related = []
+        for hit in response.get("hits", {}).get("hits", []):
+            related_event = self._hit_to_event(hit)
+            related_event.metadata["similarity_score"] = hit.get("_score")
+            related.append(related_event)
+        return related
+
+    @staticmethod
+    def _event_source(event: MysteryEvent) -> Dict[str, Any]:
+        metadata = dict(event.metadata or {})
+        coordinates = metadata.pop("coordinates", None)
+        source = {
+            "id": event.event_id,
+            "event_id": event.event_id,
+            "event_type": event.event_type,
+            "title": event.title,
+            "description": event.description,
+            "address": event.location,
+            "timestamp": event.date.isoformat() if event.date else None,
+            "credibility_score": event.credibility_score,
+            "source_url": event.source_url,
+            "witnesses": event.witnesses,
+            "evidence": event.evidence,
+            "metadata": metadata
+        }
+        if isinstance(coordinates, dict) and coordinates.get("lat") is not None and coordinates.get("lon") is not None:
+            source["location"] = {"lat": coordinates["lat"], "lon": coordinates["lon"]}
+        return source
+
+    def _hit_to_event(self, hit: Dict[str, Any]) -> MysteryEvent:
+        """命中转换为事件，兼容存储工具写入的文档（id、location坐标、address）"""
+        source = hit.get("_source", {})
+        metadata = dict(source.get("metadata") or {})
+        location = source.get("location")
+        if isinstance(location, dict):
+            metadata["coordinates"] = {"lat": location.get("lat"), "lon": location.get("lon")}
+            address = source.get("address")
+        else:
+            address = source.get("address") or location
+        metadata["score"] = hit.get("_score")
+        return MysteryEvent(
+            event_id=source.get("event_id") or source.get("id") or hit.get("_id"),
+            event_type=source.get("event_type", "unknown"),
+            title=source.get("title", ""),
+            description=source.get("description", ""),
+            location=address,
+            date=self._parse_date(source.get("timestamp") or source.get("date")),
+            credibility_score=source.get("credibility_score", 0.5),
+            source_url=source.get("source_url"),
+            witnesses=source.get("witnesses") or [],
+            evidence=source.get("evidence") or [],
+            metadata=metadata
+        )
+
+    @staticmethod
+    def _parse_date(value: Any) -> datetime | None:
+        if not value or not isinstance(value, str):
+            return None
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
@@ -0,0 +1,127 @@
+# Copyright (c) 2025 Lingjing Project
+# SPDX-License-Identifier: MIT
+
+import abc
+import hashlib
+import logging
+import re
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from config.tools import EMBEDDING_BATCH_SIZE, EMBEDDING_PROVIDER
+
+logger = logging.getLogger(__name__)
+
+# 拉丁词、数字与中日韩字符
+WORD_PATTERN = re.compile(r"[A-Za-z0-9]+|[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]+")
+
+
+class Embedder(abc.ABC):
+    """文本嵌入接口，输出L2归一化的float32向量（内积即余弦相似度）"""
+
+    dimension: int = 0
+
+    @abc.abstractmethod
+    def embed_documents(self, texts: Sequence[str]) -> np.ndarray:
+        """批量嵌入，返回形状为 (len(texts), dimension) 的数组"""
+        pass
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self.embed_documents([text])[0]
+
+    @property
+    def name(self) -> str:
+        """嵌入模型标识，写入索引以防不同模型的向量混用"""
+        return f"{self.__class__.__name__}:{self.dimension}"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+class HashingEmbedder(Embedder):
+    """本地哈希嵌入（无需模型和网络）
+
+    英文按词、中文按相邻二字组做特征哈希到固定维度，带符号以减小冲突偏差。
+    语义能力有限，适合离线环境和测试；生产环境建议配置嵌入模型。
+    """
+
+    def __init__(self, dimension: int = 512):
+        self.dimension = dimension
+
+    def _features(self, text: str) -> List[str]:
+        features = []
+        for token in WORD_PATTERN.findall(text.lower()):
+            if token.isascii():
+                features.append(token)
+            elif len(token) == 1:
+                features.append(token)
+            else:
+                features.extend(token[i:i + 2] for i in range(len(token) - 1))
+        return features
+
+    def embed_documents(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text or ""):
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                vectors[row, value % self.dimension] += 1.0 if (value >> 63) else -1.0
+        # 次线性词频，避免高频词主导
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        return _normalize(vectors)
+
+
+class LLMEmbedder(Embedder):
+    """使用LLM提供商的嵌入模型（LLMType.EMBEDDING）"""
+
+    def __init__(self, provider: Optional[str] = None, batch_size: int = EMBEDDING_BATCH_SIZE, model=None):
+        """初始化嵌入器
+
+        Args:
+            provider: LLM提供商，默认自动检测
+            batch_size: 每次请求嵌入的文本数
+            model: 直接传入的Embeddings对象（embed_documents/embed_query）
+        """
+        if model is None:
+            from llms.llm import get_embedding_model
+            model = get_embedding_model(provider)
+        self.model = model
+        self.provider = provider
+        self.batch_size = batch_size
+        self.dimension = 0
+
+    @property
+    def name(self) -> str:
+        model_name = getattr(self.model, "model", self.model.__class__.__name__)
+        return f"{self.provider or 'llm'}:{model_name}"
+
+    def embed_documents(self, texts: Sequence[str]) -> np.ndarray:
+        batches = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = [text or " " for text in texts[start:start + self.batch_size]]
+            batches.append(np.asarray(self.model.embed_documents(batch), dtype=np.float32))
+        if not batches:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        vectors = np.vstack(batches)
+        self.dimension = vectors.shape[1]
+        return _normalize(vectors)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        vector = np.asarray([self.model.embed_query(text)], dtype=np.float32)
+        self.dimension = vector.shape[1]
+        return _normalize(vector)[0]
+
+
+def build_embedder(provider: str = EMBEDDING_PROVIDER) -> Embedder:
+    """按配置构建嵌入器，嵌入模型不可用时回退到本地哈希嵌入"""
+    if not provider or provider == "hashing":
+        return HashingEmbedder()
+    try:
+        return LLMEmbedder(provider)
+    except (ImportError, ValueError) as e:
+        logger.warning(f"Embedding provider {provider} unavailable, falling back to hashing embedder: {e}")
+        return HashingEmbedder()
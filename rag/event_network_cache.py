@@ -0,0 +1,379 @@
+# Copyright (c) 2025 Lingjing Project
+# SPDX-License-Identifier: MIT
+
+import logging
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from config.tools import EVENT_NETWORK_CACHE_SIZE, EVENT_NETWORK_CACHE_TTL, EVENT_NETWORK_HUB_MIN_DEGREE
+
+logger = logging.getLogger(__name__)
+
+
+class EventChangeLog:
+    """事件变更日志
+
+    写入方（存储事件、创建关系）追加受影响的事件ID，每条记录带单调递增的序号；
+    缓存按序号增量消费，只失效包含这些事件的邻域。只保留最近max_entries条，
+    过旧的序号视为“全部已变更”。
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self._entries: deque = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+        self._seq = 0
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    def append(self, event_ids: Iterable[str], kind: str = "update") -> int:
+        """记录一次变更，返回其序号"""
+        ids = frozenset(event_id for event_id in event_ids if event_id)
+        with self._lock:
+            self._seq += 1
+            self._entries.append((self._seq, ids, kind, time.time()))
+            return self._seq
+
+    def since(self, seq: int) -> Optional[List[Tuple[int, frozenset, str, float]]]:
+        """返回序号大于seq的变更；所需记录已被淘汰时返回None"""
+        with self._lock:
+            if seq >= self._seq:
+                return []
+            if not self._entries or self._entries[0][0] > seq + 1:
+                return None
+            return [entry for entry in self._entries if entry[0] > seq]
+
+    def changed_since(self, seq: int, event_ids: Set[str]) -> bool:
+        """seq之后是否有涉及event_ids的变更"""
+        changes = self.since(seq)
+        if changes is None:
+            return True
+        return any(not ids.isdisjoint(event_ids) for _, ids, _, _ in changes)
+
+
+class EventNeighbourhood:
+    """以CSR（压缩稀疏行）格式存储的k跳事件子图
+
+    节点按序编号，第i个节点的出边为targets[offsets[i]:offsets[i + 1]]，
+    边类型存为类型表下标，边属性只为非空的边保存。
+    """
+
+    __slots__ = (
+        "root", "depth", "seq", "built_at", "node_ids", "nodes",
+        "offsets", "targets", "types", "type_names", "edge_properties"
+    )
+
+    def __init__(
+        self,
+        root: str,
+        depth: int,
+        nodes: Dict[str, Dict[str, Any]],
+        edges: Iterable[Tuple[str, str, str, Dict[str, Any]]],
+        seq: int = 0
+    ):
+        """从节点属性和边列表构建CSR
+
+        Args:
+            root: 中心事件ID
+            depth: 跳数
+            nodes: 事件ID -> 节点属性
+            edges: (源事件ID, 目标事件ID, 关系类型, 关系属性)，重复边只保留一条
+            seq: 构建开始时变更日志的序号
+        """
+        self.root = root
+        self.depth = depth
+        self.seq = seq
+        self.built_at = time.monotonic()
+        self.node_ids: List[str] = list(nodes)
+        self.nodes: List[Dict[str, Any]] = [nodes[event_id] for event_id in self.node_ids]
+        index = {event_id: position for position, event_id in enumerate(self.node_ids)}
+
+        type_index: Dict[str, int] = {}
+        adjacency: List[List[Tuple[int, int, Optional[Dict[str, Any]]]]] = [[] for _ in self.node_ids]
+        seen = set()
+        for source, target, relationship_type, properties in edges:
+            if source not in index or target not in index:
+                continue
+            key = (source, target, relationship_type)
+            if key in seen:
+                continue
+            seen.add(key)
+            type_id = type_index.setdefault(relationship_type, len(type_index))
+            adjacency[index[source]].append((index[target], type_id, properties or None))
+
+        self.type_names: Tuple[str, ...] = tuple(type_index)
+        self.offsets = array("I", [0])
+        self.targets = array("I")
+        self.types = array("H")
+        self.edge_properties: Dict[int, Dict[str, Any]] = {}
+        for out_edges in adjacency:
+            for target, type_id, properties in out_edges:
+                if properties:
+                    self.edge_properties[len(self.targets)] = properties
+                self.targets.append(target)
+                self.types.append(type_id)
+            self.offsets.append(len(self.targets))
+
+    @property
+    def node_set(self) -> Set[str]:
+        return set(self.node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets)
+
+    def edges(self) -> Iterator[Tuple[str, str, str, Dict[str, Any]]]:
+        for source in range(len(self.node_ids)):
+            for position in range(self.offsets[source], self.offsets[source + 1]):
+                yield (
+                    self.node_ids[source],
+                    self.node_ids[self.targets[position]],
+                    self.type_names[self.types[position]],
+                    self.edge_properties.get(position, {})
+                )
+
+    def degree(self, event_id: str) -> int:
+        """子图内与event_id相连的边数（出边+入边）"""
+        try:
+            node = self.node_ids.index(event_id)
+        except ValueError:
+            return 0
+        out_degree = self.offsets[node + 1] - self.offsets[node]
+        return out_degree + self.targets.count(node)
+
+    def to_network(self, convert: Callable[[Dict[str, Any]], Any]) -> Dict[str, Any]:
+        """还原为get_event_network的返回格式，convert把节点属性转换为事件对象"""
+        return {
+            "nodes": [convert(properties) for properties in self.nodes],
+            "edges": [
+                {"source": source, "target": target, "type": relationship_type, "properties": dict(properties)}
+                for source, target, relationship_type, properties in self.edges()
+            ]
+        }
+
+
+class EventNetworkCache:
+    """事件关系网络的邻域缓存
+
+    缓存枢纽事件（度数不低于min_degree）的k跳子图。写入方通过change_log记录变更，
+    读取前先消费变更日志，失效所有包含已变更事件的子图；预热任务定期重建高度数
+    事件的子图，热点请求不再执行变长遍历。
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 600.0,
+        min_degree: int = 5,
+        change_log: Optional[EventChangeLog] = None
+    ):
+        """初始化邻域缓存
+
+        Args:
+            maxsize: 最多缓存的子图数，超出时淘汰最久未使用的
+            ttl: 子图有效期（秒），兜底其他进程写入造成的过期
+            min_degree: 按需加载时只缓存度数不低于该值的中心事件
+            change_log: 变更日志，默认新建
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.min_degree = min_degree
+        self.change_log = change_log or EventChangeLog()
+        self._entries: "OrderedDict[Tuple[str, int], EventNeighbourhood]" = OrderedDict()
+        # 事件ID -> 包含它的缓存键，用于按变更精确失效
+        self._members: Dict[str, Set[Tuple[str, int]]] = {}
+        self._applied_seq = self.change_log.seq
+        self._lock = threading.RLock()
+        self._warm_up_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.last_read_ms = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def record_change(self, event_ids: Iterable[str], kind: str = "update") -> int:
+        """写入方调用：追加变更日志"""
+        return self.change_log.append(event_ids, kind)
+
+    def sync(self):
+        """消费变更日志，失效受影响的子图"""
+        with self._lock:
+            changes = self.change_log.since(self._applied_seq)
+            if changes is None:
+                logger.warning("Event change log overflowed, clearing event network cache")
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._members.clear()
+            else:
+                for _, event_ids, _, _ in changes:
+                    for event_id in event_ids:
+                        for key in list(self._members.get(event_id, ())):
+                            self._remove(key)
+                            self.invalidations += 1
+            self._applied_seq = self.change_log.seq
+
+    def _remove(self, key: Tuple[str, int]):
+        neighbourhood = self._entries.pop(key, None)
+        if neighbourhood is None:
+            return
+        for event_id in neighbourhood.node_ids:
+            keys = self._members.get(event_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._members[event_id]
+
+    def get(self, event_id: str, depth: int) -> Optional[EventNeighbourhood]:
+        started = time.perf_counter()
+        self.sync()
+        key = (event_id, depth)
+        with self._lock:
+            neighbourhood = self._entries.get(key)
+            if neighbourhood is not None and self.ttl > 0 and time.monotonic() - neighbourhood.built_at > self.ttl:
+                self._remove(key)
+                neighbourhood = None
+            if neighbourhood is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        self.last_read_ms = (time.perf_counter() - started) * 1000
+        return neighbourhood
+
+    def put(self, neighbourhood: EventNeighbourhood, force: bool = False) -> bool:
+        """缓存子图；非force时只缓存枢纽事件。构建期间子图内有变更则丢弃，返回是否已缓存"""
+        if not force and neighbourhood.degree(neighbourhood.root) < self.min_degree:
+            return False
+        members = neighbourhood.node_set | {neighbourhood.root}
+        if self.change_log.changed_since(neighbourhood.seq, members):
+            return False
+        key = (neighbourhood.root, neighbourhood.depth)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = neighbourhood
+            for event_id in members:
+                self._members.setdefault(event_id, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+        return True
+
+    def get_or_load(
+        self,
+        event_id: str,
+        depth: int,
+        loader: Callable[[str, int], Tuple[Dict[str, Dict[str, Any]], Sequence[Tuple[str, str, str, Dict[str, Any]]]]]
+    ) -> EventNeighbourhood:
+        """命中则返回缓存子图，否则用loader(event_id, depth) -> (节点, 边)加载"""
+        neighbourhood = self.get(event_id, depth)
+        if neighbourhood is None:
+            seq = self.change_log.seq
+            nodes, edges = loader(event_id, depth)
+            neighbourhood = EventNeighbourhood(event_id, depth, nodes, edges, seq)
+            self.put(neighbourhood)
+        return neighbourhood
+
+    def warm_up(
+        self,
+        hub_loader: Callable[[int], Iterable[str]],
+        loader: Callable[[str, int], Tuple[Dict[str, Dict[str, Any]], Sequence[Tuple[str, str, str, Dict[str, Any]]]]],
+        depth: int = 2,
+        limit: int = 100
+    ) -> int:
+        """预计算度数最高的limit个事件的子图，返回新缓存的子图数
+
+        Args:
+            hub_loader: hub_loader(limit)按度数降序返回事件ID
+            loader: loader(event_id, depth) -> (节点, 边)
+            depth: 跳数
+            limit: 预热的事件数
+        """
+        self.sync()
+        warmed = 0
+        for event_id in hub_loader(limit):
+            with self._lock:
+                cached = (event_id, depth) in self._entries
+            if cached:
+                continue
+            try:
+                seq = self.change_log.seq
+                nodes, edges = loader(event_id, depth)
+                if self.put(EventNeighbourhood(event_id, depth, nodes, edges, seq), force=True):
+                    warmed += 1
+            except Exception as e:
+                logger.warning(f"Failed to warm up event network for {event_id}: {e}")
+        return warmed
+
+    def start_warm_up_job(self, warm_up: Callable[[], Any], interval: float = 300.0) -> threading.Thread:
+        """在后台线程中立即执行一次warm_up，之后每interval秒执行一次"""
+        if self._warm_up_thread is not None and self._warm_up_thread.is_alive():
+            return self._warm_up_thread
+        self._stop.clear()
+
+        def run():
+            while not self._stop.is_set():
+                try:
+                    warm_up()
+                except Exception as e:
+                    logger.error(f"Event network warm-up failed: {e}")
+                self._stop.wait(interval)
+
+        self._warm_up_thread = threading.Thread(target=run, name="event-network-warm-up", daemon=True)
+        self._warm_up_thread.start()
+        return self._warm_up_thread
+
+    def stop_warm_up_job(self):
+        self._stop.set()
+        if self._warm_up_thread is not None:
+            self._warm_up_thread.join(timeout=5)
+            self._warm_up_thread = None
+
+    def invalidate(self, event_id: Optional[str] = None):
+        """失效包含event_id的子图，event_id为None时清空缓存"""
+        with self._lock:
+            if event_id is None:
+                self._entries.clear()
+                self._members.clear()
+            else:
+                for key in list(self._members.get(event_id, ())):
+                    self._remove(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "change_log_seq": self.change_log.seq,
+            "applied_seq": self._applied_seq,
+            "edges": sum(neighbourhood.edge_count for neighbourhood in self._entries.values()),
+            "last_read_ms": round(self.last_read_ms, 3)
+        }
+
+
+_shared_cache: Optional[EventNetworkCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_network_cache() -> Optional[EventNetworkCache]:
+    """获取进程内共享的事件网络邻域缓存（首次使用时创建），EVENT_NETWORK_CACHE_SIZE<=0时返回None"""
+    global _shared_cache
+    if EVENT_NETWORK_CACHE_SIZE <= 0:
+        return None
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = EventNetworkCache(
+                maxsize=EVENT_NETWORK_CACHE_SIZE,
+                ttl=EVENT_NETWORK_CACHE_TTL,
+                min_degree=EVENT_NETWORK_HUB_MIN_DEGREE
+            )
+    return _shared_cache
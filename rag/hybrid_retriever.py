@@ -0,0 +1,277 @@
+# Copyright (c) 2025 Lingjing Project
+# SPDX-License-Identifier: MIT
+
+import hashlib
+import logging
+import re
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from config.tools import HYBRID_RETRIEVER_TIMEOUT, HYBRID_RRF_K
+from .retriever import Document, MysteryEvent, Resource, Retriever
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_url(url: Optional[str]) -> Optional[str]:
+    """规范化URL用于去重：小写协议和主机，去掉片段和末尾斜杠"""
+    if not url:
+        return None
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ""))
+
+
+def content_hash(*texts: Optional[str]) -> str:
+    """忽略大小写和空白差异的内容哈希"""
+    normalized = _WHITESPACE.sub(" ", " ".join(text or "" for text in texts)).strip().lower()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def document_key(document: Document) -> str:
+    url = normalize_url(document.url)
+    if url:
+        return f"url:{url}"
+    return "hash:" + content_hash(document.title, *(chunk.content for chunk in document.chunks))
+
+
+def event_key(event: MysteryEvent) -> str:
+    url = normalize_url(event.source_url)
+    if url:
+        return f"url:{url}"
+    return "hash:" + content_hash(event.title, event.description)
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: Sequence[Tuple[str, Sequence[Any]]],
+    key: Callable[[Any], str],
+    k: int = HYBRID_RRF_K,
+    weights: Optional[Dict[str, float]] = None
+) -> List[Tuple[float, Any, List[str]]]:
+    """倒数排名融合：score = Σ weight / (k + rank)
+
+    Args:
+        ranked_lists: [(后端名, 按相关度排序的结果)]
+        key: 去重键函数，键相同的结果合并为一条
+        k: RRF平滑常数
+        weights: 后端权重，默认均为1
+
+    Returns:
+        [(融合得分, 首次出现的结果, 命中的后端列表)]，按得分降序
+    """
+    fused: Dict[str, List[Any]] = {}
+    for name, items in ranked_lists:
+        weight = (weights or {}).get(name, 1.0)
+        seen = set()
+        for rank, item in enumerate(items, start=1):
+            item_key = key(item)
+            # 同一后端内的重复只按最高排名计一次
+            if item_key in seen:
+                continue
+            seen.add(item_key)
+            entry = fused.get(item_key)
+            if entry is None:
+                fused[item_key] = [weight / (k + rank), item, [name], [item]]
+            else:
+                entry[0] += weight / (k + rank)
+                entry[2].append(name)
+                entry[3].append(item)
+    ordered = sorted(fused.values(), key=lambda entry: entry[0], reverse=True)
+    return [(score, _merge(items), sources) for score, _, sources, items in ordered]
+
+
+def _merge(items: List[Any]) -> Any:
+    """合并不同后端返回的同一文档的块（按内容去重）"""
+    first = items[0]
+    if not isinstance(first, Document) or len(items) == 1:
+        return first
+    seen = {content_hash(chunk.content) for chunk in first.chunks}
+    for other in items[1:]:
+        for chunk in other.chunks:
+            digest = content_hash(chunk.content)
+            if digest not in seen:
+                seen.add(digest)
+                first.chunks.append(chunk)
+    return first
+
+
+class HybridRetriever(Retriever):
+    """混合检索器
+
+    并发查询所有检索后端，每个后端有独立超时，超时或出错的后端被跳过并返回其余
+    后端的部分结果，因此延迟取决于最慢的（未超时）后端而不是各后端之和。结果用
+    倒数排名融合（RRF）合并，并按规范化URL或内容哈希去重。
+    """
+
+    def __init__(
+        self,
+        retrievers: Iterable[Retriever],
+        timeout: float = HYBRID_RETRIEVER_TIMEOUT,
+        timeouts: Optional[Dict[str, float]] = None,
+        weights: Optional[Dict[str, float]] = None,
+        rrf_k: int = HYBRID_RRF_K,
+        max_workers: Optional[int] = None
+    ):
+        """初始化混合检索器
+
+        Args:
+            retrievers: 检索后端
+            timeout: 默认的单后端超时（秒）
+            timeouts: 按后端名覆盖的超时
+            weights: 按后端名设置的RRF权重
+            rrf_k: RRF平滑常数
+            max_workers: 线程池大小，默认为后端数的两倍
+        """
+        self.retrievers: Dict[str, Retriever] = {}
+        for retriever in retrievers:
+            name = retriever.__class__.__name__
+            suffix = 2
+            while name in self.retrievers:
+                name = f"{retriever.__class__.__name__}#{suffix}"
+                suffix += 1
+            self.retrievers[name] = retriever
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        self.weights = weights or {}
+        self.rrf_k = rrf_k
+        self.last_report: Dict[str, Dict[str, Any]] = {}
+        # 超时的调用仍在后台运行，线程池留出余量以免拖慢下一次查询
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or max(2, len(self.retrievers) * 2), thread_name_prefix="hybrid-retriever"
+        )
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for retriever in self.retrievers.values():
+            close = getattr(retriever, "close", None)
+            if callable(close):
+                try:
+                    close()
+                except Exception as e:
+                    logger.warning(f"Failed to close retriever: {e}")
+
+    def _fan_out(
+        self,
+        operation: str,
+        call: Callable[[str, Retriever], Any],
+        names: Optional[Iterable[str]] = None
+    ) -> List[Tuple[str, Any]]:
+        """在所有（或指定）后端上并发执行call(后端名, 后端)，返回按后端顺序的成功结果"""
+        started = time.monotonic()
+
+        def timed(name: str, retriever: Retriever) -> Tuple[Any, float]:
+            result = call(name, retriever)
+            return result, time.monotonic() - started
+
+        futures: Dict[str, Future] = {
+            name: self._executor.submit(timed, name, self.retrievers[name])
+            for name in (names if names is not None else self.retrievers)
+        }
+        results: List[Tuple[str, Any]] = []
+        report: Dict[str, Dict[str, Any]] = {}
+        for name, future in futures.items():
+            # 各后端从同一时刻开始计时，依次等待不会累加超时
+            remaining = started + self.timeouts.get(name, self.timeout) - time.monotonic()
+            try:
+                result, elapsed = future.result(timeout=max(0.0, remaining))
+                results.append((name, result))
+                report[name] = {"status": "ok", "elapsed": round(elapsed, 3)}
+            except FutureTimeoutError:
+                future.cancel()
+                logger.warning(f"{operation} on {name} timed out, returning partial results")
+                report[name] = {"status": "timeout", "elapsed": round(time.monotonic() - started, 3)}
+            except Exception as e:
+                logger.error(f"{operation} on {name} failed: {e}")
+                report[name] = {"status": "error", "error": str(e), "elapsed": round(time.monotonic() - started, 3)}
+        self.last_report = report
+        return results
+
+    def list_resources(self, query: str | None = None) -> list[Resource]:
+        """汇总所有后端的资源，资源元数据中记录所属后端"""
+        resources: Dict[str, Resource] = {}
+        for name, items in self._fan_out("list_resources", lambda _, retriever: retriever.list_resources(query)):
+            for resource in items:
+                if resource.uri not in resources:
+                    resource.metadata["retriever"] = name
+                    resources[resource.uri] = resource
+        return list(resources.values())
+
+    def query_relevant_documents(
+        self, query: str, resources: list[Resource] = None
+    ) -> list[Document]:
+        """并发检索所有后端并融合排序
+
+        带有retriever元数据的资源只发给对应后端；未标记的资源发给所有后端。
+        """
+        routed: Dict[str, list[Resource]] = {}
+        untagged: list[Resource] = []
+        for resource in resources or []:
+            name = resource.metadata.get("retriever")
+            if name in self.retrievers:
+                routed.setdefault(name, []).append(resource)
+            else:
+                untagged.append(resource)
+
+        if resources and not untagged:
+            names = list(routed)
+        else:
+            names = list(self.retrievers)
+        per_backend = {name: routed.get(name, []) + untagged or None for name in names}
+
+        ranked = self._fan_out(
+            "query_relevant_documents",
+            lambda name, retriever: retriever.query_relevant_documents(query, per_backend[name]),
+            names
+        )
+        documents = []
+        for score, document, sources in reciprocal_rank_fusion(ranked, document_key, self.rrf_k, self.weights):
+            document.metadata["rrf_score"] = score
+            document.metadata["retrievers"] = sources
+            documents.append(document)
+        return documents
+
+    def query_mystery_events(
+        self,
+        query: str,
+        event_type: str | None = None,
+        location: str | None = None,
+        date_range: tuple[datetime, datetime] | None = None,
+        min_credibility: float = 0.0
+    ) -> list[MysteryEvent]:
+        """并发查询所有后端的神秘事件并融合排序"""
+        ranked = self._fan_out(
+            "query_mystery_events",
+            lambda _, retriever: retriever.query_mystery_events(query, event_type, location, date_range, min_credibility)
+        )
+        return self._fuse_events(ranked)
+
+    def store_mystery_event(self, event: MysteryEvent) -> bool:
+        """并发写入所有后端，任一后端成功即返回True"""
+        results = self._fan_out("store_mystery_event", lambda _, retriever: retriever.store_mystery_event(event))
+        return any(stored for _, stored in results)
+
+    def find_related_events(
+        self,
+        event: MysteryEvent,
+        similarity_threshold: float = 0.7
+    ) -> list[MysteryEvent]:
+        """并发查找相关事件并融合排序"""
+        ranked = self._fan_out(
+            "find_related_events",
+            lambda _, retriever: retriever.find_related_events(event, similarity_threshold)
+        )
+        source_key = event_key(event)
+        return [related for related in self._fuse_events(ranked) if event_key(related) != source_key]
+
+    def _fuse_events(self, ranked: List[Tuple[str, List[MysteryEvent]]]) -> list[MysteryEvent]:
+        events = []
+        for score, event, sources in reciprocal_rank_fusion(ranked, event_key, self.rrf_k, self.weights):
+            event.metadata["rrf_score"] = score
+            event.metadata["retrievers"] = sources
+            events.append(event)
+        return events
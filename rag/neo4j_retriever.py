@@ -1,17 +1,208 @@
 # Copyright (c) 2025 Lingjing Project
 # SPDX-License-Identifier: MIT
 
+import asyncio
+import logging
 import os
+import re
+import threading
+import time
 from datetime import datetime
-from typing import Optional, Dict, Any, List
-from neo4j import GraphDatabase
+from typing import Optional, Dict, Any, Iterable, Iterator, List, Sequence, Tuple
+from neo4j import AsyncGraphDatabase, GraphDatabase
+from neo4j.exceptions import ServiceUnavailable, SessionExpired, TransientError
+from .bm25_index import BM25Index
+from .event_network_cache import EventNeighbourhood, EventNetworkCache
 from .retriever import Chunk, Document, Resource, Retriever, MysteryEvent
 
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERRORS = (TransientError, ServiceUnavailable, SessionExpired)
+
+RELATIONSHIP_TYPE_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# 单次往返写入事件节点及其位置关系
+UPSERT_EVENTS_QUERY = """
+    UNWIND $rows AS row
+    MERGE (e:MysteryEvent {event_id: row.event_id})
+    SET e.event_type = row.event_type,
+        e.title = row.title,
+        e.description = row.description,
+        e.location = row.location,
+        e.date = row.date,
+        e.day = CASE WHEN row.day IS NULL THEN null ELSE date(row.day) END,
+        e.point = CASE
+            WHEN row.latitude IS NULL OR row.longitude IS NULL THEN null
+            ELSE point({latitude: row.latitude, longitude: row.longitude})
+        END,
+        e.credibility_score = row.credibility_score,
+        e.source_url = row.source_url,
+        e.witnesses = row.witnesses,
+        e.evidence = row.evidence,
+        e.updated_at = datetime()
+    WITH e, row
+    WHERE row.location IS NOT NULL
+    MERGE (l:Location {name: row.location})
+    MERGE (e)-[:OCCURRED_AT]->(l)
+"""
+
+# 关系类型不能参数化，按类型分组后填入
+MERGE_RELATIONSHIPS_QUERY = """
+    UNWIND $rows AS row
+    MATCH (e1:MysteryEvent {{event_id: row.source}})
+    MATCH (e2:MysteryEvent {{event_id: row.target}})
+    MERGE (e1)-[r:{relationship_type}]->(e2)
+    SET r += row.properties
+"""
+
+
+# 事件标题/描述和地点名的全文索引名
+EVENT_FULLTEXT_INDEX = "event_text_index"
+LOCATION_FULLTEXT_INDEX = "location_text_index"
+
+SCHEMA_STATEMENTS = (
+    "CREATE INDEX event_id_index IF NOT EXISTS FOR (e:MysteryEvent) ON (e.event_id)",
+    "CREATE INDEX event_type_index IF NOT EXISTS FOR (e:MysteryEvent) ON (e.event_type)",
+    "CREATE INDEX location_index IF NOT EXISTS FOR (l:Location) ON (l.name)",
+    "CREATE INDEX document_id_index IF NOT EXISTS FOR (d:Document) ON (d.id)",
+    # e.day为date类型，日期范围和“前后30天”查询走范围索引
+    "CREATE RANGE INDEX event_day_index IF NOT EXISTS FOR (e:MysteryEvent) ON (e.day)",
+    # e.point为WGS-84点，point.distance过滤走点索引
+    "CREATE TEXT INDEX event_location_index IF NOT EXISTS FOR (e:MysteryEvent) ON (e.location)",
+    "CREATE POINT INDEX event_point_index IF NOT EXISTS FOR (e:MysteryEvent) ON (e.point)",
+    f"CREATE FULLTEXT INDEX {EVENT_FULLTEXT_INDEX} IF NOT EXISTS FOR (e:MysteryEvent) ON EACH [e.title, e.description]",
+    f"CREATE FULLTEXT INDEX {LOCATION_FULLTEXT_INDEX} IF NOT EXISTS FOR (l:Location) ON EACH [l.name]",
+)
+
+# 相关事件的候选集分别由类型索引、同地点关系、点索引和日期索引召回，再统一打分
+RELATED_EVENTS_QUERY = """
+    MATCH (e1:MysteryEvent {event_id: $event_id})
+    CALL {
+        WITH e1
+        MATCH (e2:MysteryEvent)
+        WHERE e2.event_type = e1.event_type AND e2 <> e1
+        RETURN e2 LIMIT $candidate_limit
+        UNION
+        WITH e1
+        MATCH (e1)-[:OCCURRED_AT]->(:Location)<-[:OCCURRED_AT]-(e2:MysteryEvent)
+        WHERE e2 <> e1
+        RETURN e2 LIMIT $candidate_limit
+        UNION
+        WITH e1
+        MATCH (e2:MysteryEvent)
+        WHERE point.distance(e2.point, e1.point) <= $radius_meters AND e2 <> e1
+        RETURN e2 LIMIT $candidate_limit
+        UNION
+        WITH e1
+        MATCH (e2:MysteryEvent)
+        WHERE e2.day >= e1.day - duration({days: $day_window})
+          AND e2.day <= e1.day + duration({days: $day_window})
+          AND e2 <> e1
+        RETURN e2 LIMIT $candidate_limit
+    }
+    WITH e1, e2,
+         e1.event_type = e2.event_type AS same_type,
+         (e1.location IS NOT NULL AND e1.location = e2.location)
+            OR coalesce(point.distance(e1.point, e2.point) <= $radius_meters, false) AS nearby,
+         coalesce(abs(duration.inDays(e1.day, e2.day).days) <= $day_window, false) AS close_in_time
+    RETURN e2,
+           CASE WHEN same_type THEN 0.4 ELSE 0.0 END +
+           CASE WHEN nearby THEN 0.3 ELSE 0.0 END +
+           CASE WHEN close_in_time THEN 0.3 ELSE 0.0 END AS similarity_score
+    ORDER BY similarity_score DESC
+    LIMIT 20
+"""
+
+# 按关联事件数排序的枢纽事件，用于预热邻域缓存
+HUB_EVENTS_QUERY = """
+    MATCH (e:MysteryEvent)
+    WITH e, COUNT { (e)--(:MysteryEvent) } AS degree
+    WHERE degree >= $min_degree
+    RETURN e.event_id AS event_id
+    ORDER BY degree DESC
+    LIMIT $limit
+"""
+
+# 旧数据只有字符串日期，补写date类型的e.day
+BACKFILL_DAY_QUERY = """
+    MATCH (e:MysteryEvent)
+    WHERE e.day IS NULL AND e.date =~ '[0-9]{4}-[0-9]{2}-[0-9]{2}.*'
+    CALL {
+        WITH e
+        SET e.day = date(left(e.date, 10))
+    } IN TRANSACTIONS OF $batch_size ROWS
+"""
+
+_FULLTEXT_SPECIAL = re.compile(r'([+\-&|!(){}\[\]^"~*?:\\/])')
+
+
+def _fulltext_query(text: str) -> str:
+    """转义Lucene查询语法字符，用户输入按普通词项匹配"""
+    return _FULLTEXT_SPECIAL.sub(r"\\\1", text.strip())
+
+
+def _event_coordinates(event: MysteryEvent) -> Tuple[Optional[float], Optional[float]]:
+    """从事件元数据中读取坐标：coordinates={"lat", "lon"}或顶层lat/lon"""
+    metadata = event.metadata or {}
+    coordinates = metadata.get("coordinates")
+    if not isinstance(coordinates, dict):
+        coordinates = metadata
+    latitude = coordinates.get("lat", coordinates.get("latitude"))
+    longitude = coordinates.get("lon", coordinates.get("longitude"))
+    if latitude is None or longitude is None:
+        return None, None
+    try:
+        return float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        return None, None
+
+
+def _batches(rows: Sequence[Dict[str, Any]], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    for start in range(0, len(rows), batch_size):
+        yield list(rows[start:start + batch_size])
+
+
+# BM25索引用的文档文本：正文加全部块内容
+TEXT_INDEX_ROWS = """
+    OPTIONAL MATCH (d)-[:HAS_CHUNK]->(c:Chunk)
+    WITH d, collect(c.content) as contents
+    RETURN d.id as id, d.title as title, d.content as content, contents
+"""
+
 
 class Neo4jRetriever(Retriever):
     """Neo4j图数据库检索器，专门用于神秘事件研究"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        text_index: Optional[BM25Index] = None,
+        batch_size: Optional[int] = None,
+        max_pool_size: Optional[int] = None,
+        max_retries: int = 3,
+        write_concurrency: int = 4,
+        network_cache: Optional[EventNetworkCache] = None,
+        text_index_sync_interval: float = 60.0
+    ):
+        """初始化Neo4j检索器
+
+        Args:
+            text_index: 文档全文BM25索引；设置后用它召回文档ID，替代逐节点的CONTAINS扫描
+            batch_size: 批量写入时每个事务的行数（默认读取NEO4J_BATCH_SIZE）
+            max_pool_size: 连接池大小（默认读取NEO4J_MAX_POOL_SIZE）
+            max_retries: 每批遇到瞬时错误时的重试次数
+            write_concurrency: 异步批量写入时同时进行的事务数
+            network_cache: get_event_network的邻域缓存；写入事件和关系时记录变更日志
+            text_index_sync_interval: 查询文档时增量同步BM25索引的最小间隔（秒）
+        """
+        self.text_index = text_index
+        self.text_index_sync_interval = text_index_sync_interval
+        self._text_index_synced_at = 0.0
+        self._text_index_sync_lock = threading.Lock()
+        self.network_cache = network_cache
+        self.batch_size = batch_size or int(os.getenv("NEO4J_BATCH_SIZE", "1000"))
+        self.max_pool_size = max_pool_size or int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+        self.max_retries = max_retries
+        self.write_concurrency = write_concurrency
         self.uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
         self.username = os.getenv("NEO4J_USERNAME", "neo4j")
         self.password = os.getenv("NEO4J_PASSWORD")
@@ -21,40 +212,219 @@ class Neo4jRetriever(Retriever):
             
         self.driver = GraphDatabase.driver(
             self.uri, 
-            auth=(self.username, self.password)
+            auth=(self.username, self.password),
+            **self._driver_options()
         )
+        # 异步驱动绑定事件循环，首次使用时创建
+        self._async_driver = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
         
         # 初始化数据库结构
         self._initialize_database()
+        # 新建的BM25索引为空时从已有Document节点回填
+        if self.text_index is not None and len(self.text_index) == 0:
+            try:
+                self.rebuild_text_index()
+            except Exception as e:
+                logger.warning(f"Failed to backfill BM25 text index: {e}")
+        self._text_index_synced_at = time.monotonic()
     
     def close(self):
         """关闭数据库连接"""
+        if self.network_cache is not None:
+            self.network_cache.stop_warm_up_job()
         if self.driver:
             self.driver.close()
+
+    async def aclose(self):
+        """关闭异步驱动"""
+        if self._async_driver is not None:
+            await self._async_driver.close()
+            self._async_driver = None
+            self._async_loop = None
+
+    def _driver_options(self) -> Dict[str, Any]:
+        return {
+            "max_connection_pool_size": self.max_pool_size,
+            "connection_acquisition_timeout": 60.0,
+            "max_connection_lifetime": 3600,
+            "max_transaction_retry_time": 15.0,
+            "keep_alive": True
+        }
+
+    def _get_async_driver(self):
+        loop = asyncio.get_running_loop()
+        if self._async_driver is None or self._async_loop is not loop:
+            self._async_driver = AsyncGraphDatabase.driver(
+                self.uri,
+                auth=(self.username, self.password),
+                **self._driver_options()
+            )
+            self._async_loop = loop
+        return self._async_driver
+
+    @staticmethod
+    def _event_row(event: MysteryEvent) -> Dict[str, Any]:
+        latitude, longitude = _event_coordinates(event)
+        return {
+            "event_id": event.event_id,
+            "event_type": event.event_type,
+            "title": event.title,
+            "description": event.description,
+            "location": event.location,
+            "date": event.date.isoformat() if event.date else None,
+            "day": event.date.date().isoformat() if event.date else None,
+            "latitude": latitude,
+            "longitude": longitude,
+            "credibility_score": event.credibility_score,
+            "source_url": event.source_url,
+            "witnesses": event.witnesses,
+            "evidence": event.evidence
+        }
+
+    @staticmethod
+    def _relationship_groups(
+        relationships: Iterable[Tuple[str, str, str, Optional[Dict[str, Any]]]]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """按关系类型分组，类型名必须是合法标识符（会拼入Cypher）"""
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for relationship in relationships:
+            source, target, relationship_type = relationship[:3]
+            properties = relationship[3] if len(relationship) > 3 else None
+            if not RELATIONSHIP_TYPE_PATTERN.match(relationship_type):
+                raise ValueError(f"Invalid relationship type: {relationship_type}")
+            groups.setdefault(relationship_type, []).append(
+                {"source": source, "target": target, "properties": properties or {}}
+            )
+        return groups
+
+    def _write_batches(self, query: str, rows: Sequence[Dict[str, Any]], batch_size: Optional[int]) -> int:
+        """同步批量写入：每批一个托管写事务，瞬时错误按批重试"""
+        written = 0
+        with self.driver.session() as session:
+            for batch in _batches(rows, batch_size or self.batch_size):
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        session.execute_write(lambda tx: tx.run(query, rows=batch).consume())
+                        written += len(batch)
+                        break
+                    except RETRYABLE_ERRORS as e:
+                        if attempt >= self.max_retries:
+                            logger.error(f"Neo4j batch of {len(batch)} rows failed after {attempt + 1} attempts: {e}")
+                            break
+                        time.sleep(0.5 * 2 ** attempt)
+        return written
+
+    async def _awrite_batches(self, query: str, rows: Sequence[Dict[str, Any]], batch_size: Optional[int]) -> int:
+        """异步批量写入：最多write_concurrency个批次并行提交"""
+        driver = self._get_async_driver()
+        semaphore = asyncio.Semaphore(self.write_concurrency)
+
+        async def write(batch: List[Dict[str, Any]]) -> int:
+            async def work(tx):
+                result = await tx.run(query, rows=batch)
+                await result.consume()
+
+            async with semaphore:
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        async with driver.session() as session:
+                            await session.execute_write(work)
+                        return len(batch)
+                    except RETRYABLE_ERRORS as e:
+                        if attempt >= self.max_retries:
+                            logger.error(f"Neo4j batch of {len(batch)} rows failed after {attempt + 1} attempts: {e}")
+                            return 0
+                        await asyncio.sleep(0.5 * 2 ** attempt)
+            return 0
+
+        counts = await asyncio.gather(*(write(batch) for batch in _batches(rows, batch_size or self.batch_size)))
+        return sum(counts)
+
+    def _record_change(self, event_ids: Iterable[str], kind: str):
+        if self.network_cache is not None:
+            self.network_cache.record_change(event_ids, kind)
+
+    def store_mystery_events_bulk(self, events: Iterable[MysteryEvent], batch_size: Optional[int] = None) -> int:
+        """批量存储神秘事件（UNWIND），返回成功写入的事件数"""
+        rows = [self._event_row(event) for event in events]
+        try:
+            return self._write_batches(UPSERT_EVENTS_QUERY, rows, batch_size)
+        finally:
+            # 部分批次失败时也可能已写入，一律记为变更
+            self._record_change((row["event_id"] for row in rows), "event")
+
+    async def astore_mystery_events_bulk(
+        self, events: Iterable[MysteryEvent], batch_size: Optional[int] = None
+    ) -> int:
+        """store_mystery_events_bulk的异步版本，使用异步驱动并行提交批次"""
+        rows = [self._event_row(event) for event in events]
+        try:
+            return await self._awrite_batches(UPSERT_EVENTS_QUERY, rows, batch_size)
+        finally:
+            self._record_change((row["event_id"] for row in rows), "event")
+
+    def create_relationships_bulk(
+        self,
+        relationships: Iterable[Tuple[str, str, str, Optional[Dict[str, Any]]]],
+        batch_size: Optional[int] = None
+    ) -> int:
+        """批量创建事件关系
+
+        Args:
+            relationships: (起点事件ID, 终点事件ID, 关系类型[, 属性])，同一对事件同一类型只保留一条关系，属性覆盖更新
+            batch_size: 每个事务的行数
+
+        Returns:
+            成功处理的关系数
+        """
+        written = 0
+        for relationship_type, rows in self._relationship_groups(relationships).items():
+            query = MERGE_RELATIONSHIPS_QUERY.format(relationship_type=relationship_type)
+            try:
+                written += self._write_batches(query, rows, batch_size)
+            finally:
+                self._record_change(self._relationship_endpoints(rows), "relationship")
+        return written
+
+    async def acreate_relationships_bulk(
+        self,
+        relationships: Iterable[Tuple[str, str, str, Optional[Dict[str, Any]]]],
+        batch_size: Optional[int] = None
+    ) -> int:
+        """create_relationships_bulk的异步版本"""
+        groups = self._relationship_groups(relationships)
+        try:
+            counts = await asyncio.gather(*(
+                self._awrite_batches(MERGE_RELATIONSHIPS_QUERY.format(relationship_type=relationship_type), rows, batch_size)
+                for relationship_type, rows in groups.items()
+            ))
+        finally:
+            self._record_change(
+                (event_id for rows in groups.values() for event_id in self._relationship_endpoints(rows)), "relationship"
+            )
+        return sum(counts)
+
+    @staticmethod
+    def _relationship_endpoints(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+        for row in rows:
+            yield row["source"]
+            yield row["target"]
     
     def _initialize_database(self):
-        """初始化数据库结构"""
+        """初始化数据库结构，并为旧事件补写日期索引属性"""
         with self.driver.session() as session:
-            # 创建索引
-            session.run("""
-                CREATE INDEX event_id_index IF NOT EXISTS 
-                FOR (e:MysteryEvent) ON (e.event_id)
-            """)
-            
-            session.run("""
-                CREATE INDEX event_type_index IF NOT EXISTS 
-                FOR (e:MysteryEvent) ON (e.event_type)
-            """)
-            
-            session.run("""
-                CREATE INDEX location_index IF NOT EXISTS 
-                FOR (l:Location) ON (l.name)
-            """)
-            
-            session.run("""
-                CREATE INDEX document_id_index IF NOT EXISTS 
-                FOR (d:Document) ON (d.id)
-            """)
+            for statement in SCHEMA_STATEMENTS:
+                session.run(statement)
+        try:
+            self.backfill_index_properties()
+        except Exception as e:
+            logger.warning(f"Failed to backfill event index properties: {e}")
+    
+    def backfill_index_properties(self, batch_size: Optional[int] = None):
+        """为旧事件补写e.day，使其能被日期索引查到（坐标需重新写入事件才能补上）"""
+        with self.driver.session() as session:
+            session.run(BACKFILL_DAY_QUERY, batch_size=batch_size or self.batch_size).consume()
     
     def list_resources(self, query: str | None = None) -> list[Resource]:
         """列出Neo4j中的资源"""
@@ -91,7 +461,12 @@ class Neo4jRetriever(Retriever):
     def query_relevant_documents(
         self, query: str, resources: list[Resource] = None
     ) -> list[Document]:
-        """查询相关文档"""
+        """查询相关文档；BM25索引为空（尚未回填）时退回CONTAINS查询"""
+        if self.text_index is not None:
+            self._maybe_sync_text_index()
+            if len(self.text_index) > 0:
+                return self._query_documents_by_text_index(query, resources)
+
         with self.driver.session() as session:
             # 构建查询条件
             if resources:
@@ -114,36 +489,139 @@ class Neo4jRetriever(Retriever):
                     ORDER BY d.credibility_score DESC
                     LIMIT 20
                 """, query=query)
+            return self._records_to_documents(result)
+
+    def _query_documents_by_text_index(self, query: str, resources: list[Resource] = None) -> list[Document]:
+        """先用BM25索引召回文档ID，再按ID批量取节点，结果保持BM25得分顺序"""
+        allowed = {r.uri for r in resources} if resources else None
+        hits = self.text_index.search(
+            query, limit=20,
+            predicate=(lambda fields: fields.get("id") in allowed) if allowed is not None else None
+        )
+        if not hits:
+            return []
+        scores = {doc_id: score for score, doc_id, _ in hits}
+        with self.driver.session() as session:
+            result = session.run("""
+                MATCH (d:Document)
+                WHERE d.id IN $ids
+                OPTIONAL MATCH (d)-[:HAS_CHUNK]->(c:Chunk)
+                RETURN d, collect(c) as chunks
+            """, ids=list(scores))
+            documents = self._records_to_documents(result)
+        for document in documents:
+            document.metadata["bm25_score"] = scores.get(document.id, 0.0)
+        documents.sort(key=lambda document: document.metadata["bm25_score"], reverse=True)
+        return documents
+
+    def rebuild_text_index(self, batch_size: int = 1000) -> int:
+        """从Neo4j中的Document节点（分批）重建BM25索引，返回索引的文档数"""
+        if self.text_index is None:
+            raise ValueError("text_index is not configured")
+        indexed = 0
+        last_id = ""
+        with self.driver.session() as session:
+            while True:
+                records = list(session.run(
+                    "MATCH (d:Document) WHERE d.id > $last_id WITH d ORDER BY d.id LIMIT $batch_size"
+                    + TEXT_INDEX_ROWS + " ORDER BY id",
+                    last_id=last_id, batch_size=batch_size
+                ))
+                if not records:
+                    break
+                self._add_to_text_index(records)
+                indexed += len(records)
+                last_id = records[-1]["id"]
+        self.text_index.commit()
+        return indexed
+
+    def sync_text_index(self, batch_size: int = 1000) -> int:
+        """增量同步BM25索引，返回新增的文档数
+
+        Document节点数与索引文档数一致时直接返回（两次同步之间新增和删除数相同时
+        要等到数量再次变化才会同步）；否则按id分页只取ID比对，补入索引中没有的节点，
+        删除Neo4j中已不存在的文档。
+        """
+        if self.text_index is None:
+            raise ValueError("text_index is not configured")
+        added = 0
+        seen = set()
+        last_id = ""
+        with self.driver.session() as session:
+            total = list(session.run("MATCH (d:Document) RETURN count(d) AS total"))[0]["total"]
+            if total == len(self.text_index):
+                return 0
+            while True:
+                ids = [record["id"] for record in session.run(
+                    "MATCH (d:Document) WHERE d.id > $last_id RETURN d.id AS id ORDER BY d.id LIMIT $batch_size",
+                    last_id=last_id, batch_size=batch_size
+                )]
+                if not ids:
+                    break
+                seen.update(ids)
+                missing = [doc_id for doc_id in ids if doc_id not in self.text_index]
+                if missing:
+                    records = list(session.run("MATCH (d:Document) WHERE d.id IN $ids" + TEXT_INDEX_ROWS, ids=missing))
+                    self._add_to_text_index(records)
+                    added += len(records)
+                last_id = ids[-1]
+        for doc_id in self.text_index.doc_ids():
+            if doc_id not in seen:
+                self.text_index.delete(doc_id)
+        self.text_index.commit()
+        return added
+
+    def _maybe_sync_text_index(self):
+        """距上次同步超过text_index_sync_interval时同步；其他线程正在同步时跳过"""
+        if time.monotonic() - self._text_index_synced_at < self.text_index_sync_interval:
+            return
+        if not self._text_index_sync_lock.acquire(blocking=False):
+            return
+        try:
+            added = self.sync_text_index()
+            if added:
+                logger.info(f"Added {added} new documents to BM25 text index")
+        except Exception as e:
+            logger.warning(f"Failed to sync BM25 text index: {e}")
+        finally:
+            self._text_index_synced_at = time.monotonic()
+            self._text_index_sync_lock.release()
+
+    def _add_to_text_index(self, records):
+        for record in records:
+            text = "\n".join(part for part in [record["content"], *record["contents"]] if part)
+            self.text_index.add(record["id"], text, title=record["title"] or "", fields={"id": record["id"]})
+
+    def _records_to_documents(self, result) -> list[Document]:
+        documents = []
+        for record in result:
+            doc_node = record["d"]
+            chunk_nodes = record["chunks"]
             
-            documents = []
-            for record in result:
-                doc_node = record["d"]
-                chunk_nodes = record["chunks"]
-                
-                chunks = []
-                for chunk_node in chunk_nodes:
-                    if chunk_node:
-                        chunk = Chunk(
-                            content=chunk_node["content"],
-                            similarity=chunk_node.get("similarity", 0.0),
-                            metadata=dict(chunk_node)
-                        )
-                        chunks.append(chunk)
-                
-                document = Document(
-                    id=doc_node["id"],
-                    url=doc_node.get("url"),
-                    title=doc_node.get("title"),
-                    chunks=chunks,
-                    credibility_score=doc_node.get("credibility_score", 0.5),
-                    source_type=doc_node.get("source_type", "unknown"),
-                    publication_date=self._parse_date(doc_node.get("publication_date")),
-                    author=doc_node.get("author"),
-                    metadata=dict(doc_node)
-                )
-                documents.append(document)
+            chunks = []
+            for chunk_node in chunk_nodes:
+                if chunk_node:
+                    chunk = Chunk(
+                        content=chunk_node["content"],
+                        similarity=chunk_node.get("similarity", 0.0),
+                        metadata=dict(chunk_node)
+                    )
+                    chunks.append(chunk)
             
-            return documents
+            document = Document(
+                id=doc_node["id"],
+                url=doc_node.get("url"),
+                title=doc_node.get("title"),
+                chunks=chunks,
+                credibility_score=doc_node.get("credibility_score", 0.5),
+                source_type=doc_node.get("source_type", "unknown"),
+                publication_date=self._parse_date(doc_node.get("publication_date")),
+                author=doc_node.get("author"),
+                metadata=dict(doc_node)
+            )
+            documents.append(document)
+        
+        return documents
     
     def query_mystery_events(
         self, 
@@ -151,43 +629,77 @@ class Neo4jRetriever(Retriever):
         event_type: str | None = None,
         location: str | None = None,
         date_range: tuple[datetime, datetime] | None = None,
-        min_credibility: float = 0.0
+        min_credibility: float = 0.0,
+        near: tuple[float, float] | None = None,
+        radius_km: float = 50.0
     ) -> list[MysteryEvent]:
-        """查询神秘事件"""
+        """查询神秘事件
+
+        文本条件走全文索引，地点匹配全文索引召回的Location节点或e.location子串，
+        日期走e.day范围索引，near=(纬度, 经度)时按point.distance在radius_km内过滤。
+        """
         with self.driver.session() as session:
             # 构建Cypher查询
-            cypher_parts = ["MATCH (e:MysteryEvent)"]
+            cypher_parts = []
             conditions = ["e.credibility_score >= $min_credibility"]
             params = {"min_credibility": min_credibility}
+            query = _fulltext_query(query or "")
+            location_text = (location or "").strip()
+            
+            # 地点先在全文索引中召回Location节点；e.location字符串（未建关系的旧数据）也参与匹配
+            if location_text:
+                cypher_parts.append(
+                    f"CALL db.index.fulltext.queryNodes('{LOCATION_FULLTEXT_INDEX}', $location) YIELD node AS l"
+                )
+                cypher_parts.append("WITH collect(l) AS locations")
+                params["location"] = _fulltext_query(location_text)
+                params["location_text"] = location_text
             
             # 添加文本搜索条件
             if query:
-                conditions.append("(e.title CONTAINS $query OR e.description CONTAINS $query)")
+                if location_text:
+                    conditions.append(
+                        "(e.location CONTAINS $location_text"
+                        " OR EXISTS { MATCH (e)-[:OCCURRED_AT]->(loc) WHERE loc IN locations })"
+                    )
+                cypher_parts.append(
+                    f"CALL db.index.fulltext.queryNodes('{EVENT_FULLTEXT_INDEX}', $query) YIELD node AS e, score"
+                )
                 params["query"] = query
+            elif location_text:
+                cypher_parts.append(
+                    "CALL { WITH locations MATCH (e:MysteryEvent)-[:OCCURRED_AT]->(loc) WHERE loc IN locations RETURN e"
+                    " UNION WITH locations MATCH (e:MysteryEvent) WHERE e.location CONTAINS $location_text RETURN e }"
+                )
+                # CALL子查询后不能直接跟WHERE，先用WITH投影
+                cypher_parts.append("WITH DISTINCT e")
+            else:
+                cypher_parts.append("MATCH (e:MysteryEvent)")
             
             # 添加事件类型条件
             if event_type:
                 conditions.append("e.event_type = $event_type")
                 params["event_type"] = event_type
             
-            # 添加位置条件
-            if location:
-                cypher_parts.append("OPTIONAL MATCH (e)-[:OCCURRED_AT]->(l:Location)")
-                conditions.append("(e.location CONTAINS $location OR l.name CONTAINS $location)")
-                params["location"] = location
-            
             # 添加日期范围条件
             if date_range:
                 start_date, end_date = date_range
-                conditions.append("e.date >= $start_date AND e.date <= $end_date")
-                params["start_date"] = start_date.isoformat()
-                params["end_date"] = end_date.isoformat()
+                conditions.append("e.day >= date($start_date) AND e.day <= date($end_date)")
+                params["start_date"] = start_date.date().isoformat()
+                params["end_date"] = end_date.date().isoformat()
             
-            # 组装完整查询
-            if conditions:
-                cypher_parts.append("WHERE " + " AND ".join(conditions))
+            # 添加距离条件
+            if near:
+                conditions.append(
+                    "point.distance(e.point, point({latitude: $latitude, longitude: $longitude})) <= $radius_meters"
+                )
+                params["latitude"], params["longitude"] = float(near[0]), float(near[1])
+                params["radius_meters"] = radius_km * 1000
             
-            cypher_parts.append("RETURN e ORDER BY e.credibility_score DESC, e.date DESC LIMIT 50")
+            # 组装完整查询
+            cypher_parts.append("WHERE " + " AND ".join(conditions))
+            order = "score DESC, " if query else ""
+            cypher_parts.append(f"RETURN e ORDER BY {order}e.credibility_score DESC, e.date DESC LIMIT 50")
             
             cypher_query = " ".join(cypher_parts)
             result = session.run(cypher_query, **params)
@@ -203,42 +715,11 @@ class Neo4jRetriever(Retriever):
     def store_mystery_event(self, event: MysteryEvent) -> bool:
         """存储神秘事件"""
         try:
+            # 事件节点和位置关系在同一次往返中写入
             with self.driver.session() as session:
-                # 创建或更新事件节点
-                session.run("""
-                    MERGE (e:MysteryEvent {event_id: $event_id})
-                    SET e.event_type = $event_type,
-                        e.title = $title,
-                        e.description = $description,
-                        e.location = $location,
-                        e.date = $date,
-                        e.credibility_score = $credibility_score,
-                        e.source_url = $source_url,
-                        e.witnesses = $witnesses,
-                        e.evidence = $evidence,
-                        e.updated_at = datetime()
-                """, 
-                    event_id=event.event_id,
-                    event_type=event.event_type,
-                    title=event.title,
-                    description=event.description,
-                    location=event.location,
-                    date=event.date.isoformat() if event.date else None,
-                    credibility_score=event.credibility_score,
-                    source_url=event.source_url,
-                    witnesses=event.witnesses,
-                    evidence=event.evidence
-                )
-                
-                # 如果有位置信息，创建位置节点和关系
-                if event.location:
-                    session.run("""
-                        MATCH (e:MysteryEvent {event_id: $event_id})
-                        MERGE (l:Location {name: $location})
-                        MERGE (e)-[:OCCURRED_AT]->(l)
-                    """, event_id=event.event_id, location=event.location)
-                
-                return True
+                session.execute_write(lambda tx: tx.run(UPSERT_EVENTS_QUERY, rows=[self._event_row(event)]).consume())
+            self._record_change([event.event_id], "event")
+            return True
         except Exception as e:
             print(f"Error storing mystery event: {e}")
             return False
@@ -246,36 +727,24 @@ class Neo4jRetriever(Retriever):
     def find_related_events(
         self, 
         event: MysteryEvent, 
-        similarity_threshold: float = 0.7
+        similarity_threshold: float = 0.7,
+        radius_km: float = 50.0,
+        day_window: int = 30,
+        candidate_limit: int = 200
     ) -> list[MysteryEvent]:
-        """查找相关事件"""
+        """查找相关事件
+
+        同类型、同地点或radius_km内、前后day_window天内各计分，候选集都由索引召回，
+        不再与全部事件逐一比较。
+        """
         with self.driver.session() as session:
-            # 查找相同类型的事件
-            result = session.run("""
-                MATCH (e1:MysteryEvent {event_id: $event_id})
-                MATCH (e2:MysteryEvent)
-                WHERE e1 <> e2
-                AND (
-                    e1.event_type = e2.event_type
-                    OR e1.location = e2.location
-                    OR abs(duration.between(date(e1.date), date(e2.date)).days) <= 30
-                )
-                RETURN e2, 
-                       CASE 
-                           WHEN e1.event_type = e2.event_type THEN 0.4
-                           ELSE 0.0
-                       END +
-                       CASE 
-                           WHEN e1.location = e2.location THEN 0.3
-                           ELSE 0.0
-                       END +
-                       CASE 
-                           WHEN abs(duration.between(date(e1.date), date(e2.date)).days) <= 30 THEN 0.3
-                           ELSE 0.0
-                       END as similarity_score
-                ORDER BY similarity_score DESC
-                LIMIT 20
-            """, event_id=event.event_id)
+            result = session.run(
+                RELATED_EVENTS_QUERY,
+                event_id=event.event_id,
+                radius_meters=radius_km * 1000,
+                day_window=day_window,
+                candidate_limit=candidate_limit
+            )
             
             related_events = []
             for record in result:
@@ -309,15 +778,31 @@ class Neo4jRetriever(Retriever):
             }
             
             session.run(query, **params)
+        self._record_change([event1_id, event2_id], "relationship")
     
     def get_event_network(self, event_id: str, max_depth: int = 2) -> Dict[str, Any]:
-        """获取事件关系网络"""
+        """获取事件关系网络，配置了邻域缓存时枢纽事件直接读缓存"""
+        if self.network_cache is not None:
+            neighbourhood = self.network_cache.get_or_load(event_id, max_depth, self._load_event_network)
+        else:
+            nodes, edges = self._load_event_network(event_id, max_depth)
+            neighbourhood = EventNeighbourhood(event_id, max_depth, nodes, edges)
+        return neighbourhood.to_network(self._node_to_mystery_event)
+    
+    def _load_event_network(
+        self, event_id: str, max_depth: int
+    ) -> Tuple[Dict[str, Dict[str, Any]], List[Tuple[str, str, str, Dict[str, Any]]]]:
+        """变长遍历k跳内的事件，返回（事件ID -> 节点属性, 边列表）"""
+        # 变长路径的跳数不能参数化
+        max_depth = int(max_depth)
+        if max_depth < 1:
+            raise ValueError(f"max_depth must be >= 1, got {max_depth}")
         with self.driver.session() as session:
-            result = session.run("""
-                MATCH path = (e:MysteryEvent {event_id: $event_id})-[*1..$max_depth]-(related:MysteryEvent)
+            result = session.run(f"""
+                MATCH path = (e:MysteryEvent {{event_id: $event_id}})-[*1..{max_depth}]-(related:MysteryEvent)
                 RETURN path
                 LIMIT 100
-            """, event_id=event_id, max_depth=max_depth)
+            """, event_id=event_id)
             
             nodes = {}
             edges = []
@@ -326,23 +811,48 @@ class Neo4jRetriever(Retriever):
                 path = record["path"]
                 for node in path.nodes:
                     if "MysteryEvent" in node.labels:
-                        nodes[node["event_id"]] = self._node_to_mystery_event(node)
+                        nodes[node["event_id"]] = dict(node)
                 
                 for relationship in path.relationships:
-                    edges.append({
-                        "source": relationship.start_node["event_id"],
-                        "target": relationship.end_node["event_id"],
-                        "type": relationship.type,
-                        "properties": dict(relationship)
-                    })
+                    edges.append((
+                        relationship.start_node.get("event_id"),
+                        relationship.end_node.get("event_id"),
+                        relationship.type,
+                        dict(relationship)
+                    ))
             
-            return {
-                "nodes": list(nodes.values()),
-                "edges": edges
-            }
+            return nodes, edges
+    
+    def hub_event_ids(self, limit: int = 100, min_degree: Optional[int] = None) -> List[str]:
+        """按关联事件数降序返回枢纽事件ID"""
+        if min_degree is None:
+            min_degree = self.network_cache.min_degree if self.network_cache is not None else 1
+        with self.driver.session() as session:
+            result = session.run(HUB_EVENTS_QUERY, min_degree=min_degree, limit=limit)
+            return [record["event_id"] for record in result]
+    
+    def warm_up_network_cache(self, max_depth: int = 2, limit: int = 100) -> int:
+        """预计算枢纽事件的邻域子图，返回新缓存的子图数"""
+        if self.network_cache is None:
+            return 0
+        return self.network_cache.warm_up(self.hub_event_ids, self._load_event_network, max_depth, limit)
+    
+    def start_network_warm_up(self, interval: float = 300.0, max_depth: int = 2, limit: int = 100):
+        """后台定期预热邻域缓存"""
+        if self.network_cache is None:
+            return None
+        return self.network_cache.start_warm_up_job(
+            lambda: self.warm_up_network_cache(max_depth, limit), interval
+        )
     
     def _node_to_mystery_event(self, node) -> MysteryEvent:
         """将Neo4j节点转换为MysteryEvent对象"""
+        metadata = dict(node)
+        # 索引用的point/date属性还原为普通值
+        metadata.pop("day", None)
+        point = metadata.pop("point", None)
+        if point is not None:
+            metadata["coordinates"] = {"lat": point.latitude, "lon": point.longitude}
         return MysteryEvent(
             event_id=node["event_id"],
             event_type=node.get("event_type", "unknown"),
@@ -354,7 +864,7 @@ class Neo4jRetriever(Retriever):
             source_url=node.get("source_url"),
             witnesses=node.get("witnesses", []),
             evidence=node.get("evidence", []),
-            metadata=dict(node)
+            metadata=metadata
         )
     
     def _parse_date(self, date_str: str) -> datetime | None:
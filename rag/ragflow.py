@@ -1,13 +1,26 @@
 # Copyright (c) 2025 Lingjing Project
 # SPDX-License-Identifier: MIT
 
+import asyncio
+import logging
 import os
+import re
+import threading
+import aiohttp
 import requests
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator, Iterator, List, Tuple
 from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.cache import TTLCache
 from .retriever import Chunk, Document, Resource, Retriever, MysteryEvent
 
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
 
 def parse_uri(uri: str) -> tuple[str, str | None]:
     """解析URI获取数据集ID和文档ID"""
@@ -23,13 +36,18 @@ def parse_uri(uri: str) -> tuple[str, str | None]:
 
 
 class RAGFlowRetriever(Retriever):
-    """RAGFlow检索器，扩展支持神秘事件研究"""
+    """RAGFlow检索器，扩展支持神秘事件研究
 
-    def __init__(self):
+    同步请求复用带连接池和重试的requests会话，异步请求复用aiohttp会话；检索结果
+    按页流式获取，并以规范化的（问题, 数据集, 文档）为键做TTL+LRU缓存，并发的
+    相同查询只请求RAGFlow一次。
+    """
+
+    def __init__(self, cache: Optional[TTLCache] = None):
         api_url = os.getenv("RAGFLOW_API_URL")
         if not api_url:
             raise ValueError("RAGFLOW_API_URL is not set")
-        self.api_url = api_url
+        self.api_url = api_url.rstrip("/")
 
         api_key = os.getenv("RAGFLOW_API_KEY")
         if not api_key:
@@ -38,16 +56,71 @@ class RAGFlowRetriever(Retriever):
 
         page_size = os.getenv("RAGFLOW_PAGE_SIZE")
         self.page_size = int(page_size) if page_size else 10
+        self.max_pages = int(os.getenv("RAGFLOW_MAX_PAGES", "1"))
+        self.timeout = float(os.getenv("RAGFLOW_TIMEOUT", "30"))
+        self.pool_size = int(os.getenv("RAGFLOW_POOL_SIZE", "10"))
 
-    def query_relevant_documents(
-        self, query: str, resources: list[Resource] = None
-    ) -> list[Document]:
-        """查询相关文档"""
-        headers = {
+        self.cache = cache if cache is not None else TTLCache(
+            maxsize=int(os.getenv("RAGFLOW_CACHE_SIZE", "256")),
+            ttl=float(os.getenv("RAGFLOW_CACHE_TTL", "300"))
+        )
+
+        self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         }
 
+        # 配置会话（检索是只读请求，POST也可安全重试）
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        retry_strategy = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET", "POST"],
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=retry_strategy
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._async_session: Optional[aiohttp.ClientSession] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._async_lock = threading.Lock()
+
+    def close(self):
+        self.session.close()
+
+    async def aclose(self):
+        if self._async_session is not None:
+            await self._async_session.close()
+            self._async_session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    def _get_async_session(self) -> aiohttp.ClientSession:
+        with self._async_lock:
+            loop = asyncio.get_running_loop()
+            session = self._async_session
+            # aiohttp会话绑定事件循环，循环变化时重建
+            if session is None or session.closed or self._async_loop is not loop:
+                connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300, keepalive_timeout=30)
+                session = aiohttp.ClientSession(
+                    connector=connector,
+                    headers=self.headers,
+                    timeout=aiohttp.ClientTimeout(total=self.timeout)
+                )
+                self._async_session = session
+                self._async_loop = loop
+            return session
+
+    @staticmethod
+    def _resource_ids(resources: list[Resource] | None) -> Tuple[list[str], list[str]]:
         dataset_ids: list[str] = []
         document_ids: list[str] = []
 
@@ -57,71 +130,140 @@ class RAGFlowRetriever(Retriever):
                 dataset_ids.append(dataset_id)
                 if document_id:
                     document_ids.append(document_id)
+        return dataset_ids, document_ids
+
+    def _cache_key(self, query: str, dataset_ids: list[str], document_ids: list[str], max_pages: int) -> tuple:
+        """规范化缓存键：问题去除多余空白，ID去重排序"""
+        question = _WHITESPACE.sub(" ", query).strip()
+        return (
+            "retrieval", question, tuple(sorted(set(dataset_ids))), tuple(sorted(set(document_ids))),
+            self.page_size, max_pages
+        )
 
-        payload = {
+    def _retrieval_payload(self, query: str, dataset_ids: list[str], document_ids: list[str], page: int) -> dict:
+        return {
             "question": query,
             "dataset_ids": dataset_ids,
             "document_ids": document_ids,
+            "page": page,
             "page_size": self.page_size,
         }
 
-        response = requests.post(
-            f"{self.api_url}/api/v1/retrieval", headers=headers, json=payload
-        )
+    def _is_last_page(self, data: Dict[str, Any], page: int) -> bool:
+        total = data.get("total")
+        if total is not None and page * self.page_size >= total:
+            return True
+        return len(data.get("chunks", [])) < self.page_size
 
-        if response.status_code != 200:
-            raise Exception(f"Failed to query documents: {response.text}")
+    def iter_retrieval_pages(
+        self, query: str, resources: list[Resource] = None, max_pages: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """按page_size逐页流式获取检索结果（不经过缓存）"""
+        dataset_ids, document_ids = self._resource_ids(resources)
+        for page in range(1, (max_pages or self.max_pages) + 1):
+            response = self.session.post(
+                f"{self.api_url}/api/v1/retrieval",
+                json=self._retrieval_payload(query, dataset_ids, document_ids, page),
+                timeout=self.timeout
+            )
 
-        result = response.json()
-        data = result.get("data", {})
-        doc_aggs = data.get("doc_aggs", [])
-        
+            if response.status_code != 200:
+                raise Exception(f"Failed to query documents: {response.text}")
+
+            data = response.json().get("data", {})
+            yield data
+            if self._is_last_page(data, page):
+                break
+
+    async def aiter_retrieval_pages(
+        self, query: str, resources: list[Resource] = None, max_pages: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """iter_retrieval_pages的异步版本"""
+        dataset_ids, document_ids = self._resource_ids(resources)
+        session = self._get_async_session()
+        for page in range(1, (max_pages or self.max_pages) + 1):
+            async with session.post(
+                f"{self.api_url}/api/v1/retrieval",
+                json=self._retrieval_payload(query, dataset_ids, document_ids, page)
+            ) as response:
+                if response.status != 200:
+                    raise Exception(f"Failed to query documents: {await response.text()}")
+                data = (await response.json(content_type=None)).get("data", {})
+            yield data
+            if self._is_last_page(data, page):
+                break
+
+    def query_relevant_documents(
+        self, query: str, resources: list[Resource] = None
+    ) -> list[Document]:
+        """查询相关文档"""
+        dataset_ids, document_ids = self._resource_ids(resources)
+        key = self._cache_key(query, dataset_ids, document_ids, self.max_pages)
+        # 缓存原始响应页，每次调用都构建新的Document，调用方修改结果不会污染缓存
+        pages = self.cache.get_or_load(key, lambda: list(self.iter_retrieval_pages(query, resources)))
+        return self._build_documents(pages)
+
+    async def aquery_relevant_documents(
+        self, query: str, resources: list[Resource] = None
+    ) -> list[Document]:
+        """异步查询相关文档，与同步版本共享缓存"""
+        dataset_ids, document_ids = self._resource_ids(resources)
+        key = self._cache_key(query, dataset_ids, document_ids, self.max_pages)
+
+        async def load() -> list[Dict[str, Any]]:
+            return [data async for data in self.aiter_retrieval_pages(query, resources)]
+
+        pages = await self.cache.aget_or_load(key, load)
+        return self._build_documents(pages)
+
+    def _build_documents(self, pages: List[Dict[str, Any]]) -> list[Document]:
         docs: dict[str, Document] = {}
-        for doc in doc_aggs:
-            doc_id = doc.get("doc_id")
-            document = Document(
-                id=doc_id,
-                title=doc.get("doc_name"),
-                chunks=[],
-                source_type="ragflow",
-                metadata=doc
-            )
-            # 分析可信度
-            document.credibility_score = self.analyze_credibility(document)
-            docs[doc_id] = document
-
-        for chunk in data.get("chunks", []):
-            doc = docs.get(chunk.get("document_id"))
-            if doc:
-                chunk_obj = Chunk(
-                    content=chunk.get("content"),
-                    similarity=chunk.get("similarity"),
-                    metadata=chunk
+        for data in pages:
+            for doc in data.get("doc_aggs", []):
+                doc_id = doc.get("doc_id")
+                if doc_id in docs:
+                    continue
+                document = Document(
+                    id=doc_id,
+                    title=doc.get("doc_name"),
+                    chunks=[],
+                    source_type="ragflow",
+                    metadata=dict(doc)
                 )
-                doc.chunks.append(chunk_obj)
+                # 分析可信度
+                document.credibility_score = self.analyze_credibility(document)
+                docs[doc_id] = document
+
+        for data in pages:
+            for chunk in data.get("chunks", []):
+                doc = docs.get(chunk.get("document_id"))
+                if doc:
+                    chunk_obj = Chunk(
+                        content=chunk.get("content"),
+                        similarity=chunk.get("similarity"),
+                        metadata=dict(chunk)
+                    )
+                    doc.chunks.append(chunk_obj)
 
         return list(docs.values())
 
     def list_resources(self, query: str | None = None) -> list[Resource]:
         """列出资源"""
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
-
         params = {}
         if query:
             params["name"] = query
 
-        response = requests.get(
-            f"{self.api_url}/api/v1/datasets", headers=headers, params=params
-        )
+        def load() -> list[Dict[str, Any]]:
+            response = self.session.get(
+                f"{self.api_url}/api/v1/datasets", params=params, timeout=self.timeout
+            )
+
+            if response.status_code != 200:
+                raise Exception(f"Failed to list resources: {response.text}")
 
-        if response.status_code != 200:
-            raise Exception(f"Failed to list resources: {response.text}")
+            return response.json().get("data", [])
 
-        result = response.json()
-        data = result.get("data", [])
+        data = self.cache.get_or_load(("datasets", query or ""), load)
         
         resources = []
         for dataset in data:
@@ -131,7 +273,7 @@ class RAGFlowRetriever(Retriever):
                 description=dataset.get("description", ""),
                 resource_type="dataset",
                 credibility_score=0.7,  # RAGFlow数据集默认可信度
-                metadata=dataset
+                metadata=dict(dataset)
             )
             resources.append(resource)
             
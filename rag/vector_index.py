@@ -0,0 +1,521 @@
+# Copyright (c) 2025 Lingjing Project
+# SPDX-License-Identifier: MIT
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 每次从内存映射中读取并计算的行数
+SCAN_BLOCK_ROWS = 65536
+
+
+def to_index_date(value: Any) -> Optional[str]:
+    """日期统一为UTC的ISO字符串，可直接按字符串比较"""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec="seconds")
+
+
+@dataclass
+class VectorFilter:
+    """向量检索的元数据过滤条件"""
+    kind: Optional[str] = None  # chunk / event
+    event_types: Optional[Sequence[str]] = None
+    min_credibility: float = 0.0
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    doc_ids: Optional[Sequence[str]] = None
+    urls: Optional[Sequence[str]] = None
+
+    def to_sql(self) -> Tuple[str, List[Any]]:
+        clauses = ["deleted = 0"]
+        params: List[Any] = []
+        if self.kind:
+            clauses.append("kind = ?")
+            params.append(self.kind)
+        for column, values in (("event_type", self.event_types), ("doc_id", self.doc_ids), ("url", self.urls)):
+            if values:
+                clauses.append(f"{column} IN ({','.join('?' * len(values))})")
+                params.extend(values)
+        if self.min_credibility > 0:
+            clauses.append("credibility >= ?")
+            params.append(self.min_credibility)
+        if self.date_from is not None:
+            clauses.append("published_at >= ?")
+            params.append(to_index_date(self.date_from))
+        if self.date_to is not None:
+            clauses.append("published_at <= ?")
+            params.append(to_index_date(self.date_to))
+        return " AND ".join(clauses), params
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.event_types or self.doc_ids or self.urls or self.min_credibility > 0
+                    or self.date_from or self.date_to)
+
+
+class VectorIndex:
+    """磁盘上的IVF向量索引
+
+    向量以float32顺序追加写入vectors.f32，检索时通过numpy内存映射只读取候选行；
+    元数据（文本、事件类型、可信度、日期）保存在同目录的SQLite中，过滤条件
+    直接转成SQL。向量数达到训练阈值后用球面k-means训练nlist个聚类中心，
+    之后每个向量归入最近的倒排列表，查询只扫描nprobe个列表。训练前以及
+    过滤后候选较少时精确扫描。
+
+    写入是增量的：同一key重复写入会把旧行标记删除（墓碑），不重写向量文件。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dimension: Optional[int] = None,
+        nlist: int = 256,
+        nprobe: int = 8,
+        train_threshold: Optional[int] = None,
+        exact_search_limit: int = 20000,
+        embedder_name: Optional[str] = None
+    ):
+        """初始化向量索引
+
+        Args:
+            path: 索引目录
+            dimension: 向量维度，新建索引时可在首次写入时确定
+            nlist: 倒排列表（聚类中心）数量
+            nprobe: 查询时扫描的倒排列表数量
+            train_threshold: 向量数达到该值时自动训练，默认 nlist * 40
+            exact_search_limit: 过滤后候选不超过该值时精确扫描
+            embedder_name: 嵌入模型标识，与已有索引不一致时拒绝打开
+        """
+        self.path = path
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_threshold = train_threshold or nlist * 40
+        self.exact_search_limit = exact_search_limit
+
+        os.makedirs(path, exist_ok=True)
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._centroids_path = os.path.join(path, "centroids.npy")
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(path, "meta.db"), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._init_schema()
+
+        self.dimension = int(self._get_info("dimension") or dimension or 0) or None
+        if dimension and self.dimension != dimension:
+            raise ValueError(f"Index at {path} has dimension {self.dimension}, got {dimension}")
+        stored_name = self._get_info("embedder")
+        if embedder_name and stored_name and stored_name != embedder_name:
+            raise ValueError(f"Index at {path} was built with {stored_name}, not {embedder_name}")
+        if embedder_name and not stored_name:
+            self._set_info("embedder", embedder_name)
+
+        self.centroids: Optional[np.ndarray] = None
+        if os.path.exists(self._centroids_path):
+            self.centroids = np.load(self._centroids_path)
+        self._rows = 0
+        self._vectors: Optional[np.memmap] = None
+        self._alive = np.zeros(0, dtype=bool)
+        # 每行的kind编码常驻内存，只按kind过滤时不查SQLite
+        self._kinds = np.zeros(0, dtype=np.int16)
+        self._kind_codes: Dict[str, int] = {}
+        self._lists: Dict[int, List[int]] = {}
+        self._load()
+
+    def _init_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    row INTEGER PRIMARY KEY,
+                    key TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    doc_id TEXT,
+                    url TEXT,
+                    title TEXT,
+                    content TEXT,
+                    event_type TEXT,
+                    credibility REAL NOT NULL DEFAULT 0.5,
+                    published_at TEXT,
+                    source_type TEXT,
+                    list_id INTEGER NOT NULL DEFAULT -1,
+                    deleted INTEGER NOT NULL DEFAULT 0,
+                    payload TEXT
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_key ON entries(key) WHERE deleted = 0")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_doc ON entries(doc_id) WHERE deleted = 0")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_entries_filter ON entries(kind, event_type, published_at) WHERE deleted = 0"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS index_info (name TEXT PRIMARY KEY, value TEXT)")
+
+    def _get_info(self, name: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM index_info WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _set_info(self, name: str, value: Any):
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO index_info (name, value) VALUES (?, ?)", (name, str(value)))
+
+    def _load(self):
+        """打开内存映射并从元数据重建倒排列表"""
+        row = self._conn.execute("SELECT MAX(row) FROM entries").fetchone()
+        committed = (row[0] + 1) if row[0] is not None else 0
+        if self.dimension and os.path.exists(self._vectors_path):
+            row_bytes = self.dimension * 4
+            file_rows = os.path.getsize(self._vectors_path) // row_bytes
+            if file_rows > committed:
+                # 上次写入向量后元数据未提交，丢弃多余的行
+                with open(self._vectors_path, "r+b") as f:
+                    f.truncate(committed * row_bytes)
+            elif file_rows < committed:
+                # 向量文件被截断，对应的元数据作废
+                with self._conn:
+                    self._conn.execute("DELETE FROM entries WHERE row >= ?", (file_rows,))
+            committed = min(committed, file_rows)
+        self._rows = committed
+        self._remap()
+
+        self._alive = np.zeros(self._rows, dtype=bool)
+        self._kinds = np.full(self._rows, -1, dtype=np.int16)
+        self._lists = {}
+        for entry in self._conn.execute(
+            "SELECT row, list_id, kind FROM entries WHERE deleted = 0 AND row < ?", (self._rows,)
+        ):
+            self._alive[entry[0]] = True
+            self._kinds[entry[0]] = self._kind_code(entry[2])
+            self._lists.setdefault(entry[1], []).append(entry[0])
+
+    def _kind_code(self, kind: str) -> int:
+        return self._kind_codes.setdefault(kind, len(self._kind_codes))
+
+    def _remap(self):
+        if self._rows and self.dimension:
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(self._rows, self.dimension))
+        else:
+            self._vectors = None
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def __len__(self) -> int:
+        return int(self._alive.sum())
+
+    def add(self, vectors: np.ndarray, records: Sequence[Dict[str, Any]]) -> List[int]:
+        """追加向量及其元数据，key相同的旧记录被替换
+
+        Args:
+            vectors: 形状 (n, dimension) 的归一化向量
+            records: 每行的元数据，需包含key和kind，可含doc_id、url、title、content、
+                event_type、credibility、published_at(datetime)、source_type、payload(dict)
+
+        Returns:
+            新写入的行号
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if len(vectors) != len(records):
+            raise ValueError("vectors and records must have the same length")
+        if not len(records):
+            return []
+
+        with self._lock:
+            if self.dimension is None:
+                self.dimension = vectors.shape[1]
+                self._set_info("dimension", self.dimension)
+            elif vectors.shape[1] != self.dimension:
+                raise ValueError(f"Expected vectors of dimension {self.dimension}, got {vectors.shape[1]}")
+
+            list_ids = self._assign(vectors) if self.trained else np.full(len(vectors), -1, dtype=np.int64)
+            rows = list(range(self._rows, self._rows + len(vectors)))
+            # 先校验并组装元数据，失败时不触碰向量文件
+            entries = [
+                (row, record["key"], record.get("kind", "chunk"), record.get("doc_id"), record.get("url"),
+                 record.get("title"), record.get("content"), record.get("event_type"),
+                 float(record.get("credibility", 0.5)), to_index_date(record.get("published_at")),
+                 record.get("source_type"), int(list_id),
+                 json.dumps(record.get("payload") or {}, ensure_ascii=False, default=str))
+                for row, record, list_id in zip(rows, records, list_ids)
+            ]
+
+            # 按已提交行数定位写入，元数据提交失败时截回，行号与向量始终对齐
+            offset = self._rows * self.dimension * 4
+            fd = os.open(self._vectors_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                with os.fdopen(fd, "r+b") as f:
+                    f.seek(offset)
+                    f.write(vectors.tobytes())
+                    f.truncate()
+                    f.flush()
+                    os.fsync(f.fileno())
+                with self._conn:
+                    replaced = self._tombstone("key", [entry[1] for entry in entries])
+                    self._conn.executemany(
+                        "INSERT INTO entries (row, key, kind, doc_id, url, title, content, event_type, credibility, "
+                        "published_at, source_type, list_id, payload) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        entries
+                    )
+            except BaseException:
+                with open(self._vectors_path, "r+b") as f:
+                    f.truncate(offset)
+                raise
+
+            self._rows += len(rows)
+            self._alive = np.concatenate([self._alive, np.ones(len(rows), dtype=bool)])
+            self._kinds = np.concatenate([
+                self._kinds, np.asarray([self._kind_code(entry[2]) for entry in entries], dtype=np.int16)
+            ])
+            self._drop_rows(replaced)
+            for row, list_id in zip(rows, list_ids):
+                self._lists.setdefault(int(list_id), []).append(row)
+            self._remap()
+
+            if not self.trained and len(self) >= self.train_threshold:
+                self.train()
+        return rows
+
+    def delete(self, doc_id: Optional[str] = None, keys: Optional[Sequence[str]] = None) -> int:
+        """按文档或key删除（打墓碑）"""
+        with self._lock, self._conn:
+            removed: List[int] = []
+            if doc_id is not None:
+                removed += self._tombstone("doc_id", [doc_id])
+            if keys:
+                removed += self._tombstone("key", list(keys))
+            self._drop_rows(removed)
+        return len(removed)
+
+    def _tombstone(self, column: str, values: List[str]) -> List[int]:
+        rows: List[int] = []
+        for start in range(0, len(values), 500):
+            batch = values[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows += [r[0] for r in self._conn.execute(
+                f"SELECT row FROM entries WHERE deleted = 0 AND {column} IN ({placeholders})", batch
+            )]
+            self._conn.execute(f"UPDATE entries SET deleted = 1 WHERE deleted = 0 AND {column} IN ({placeholders})", batch)
+        return rows
+
+    def _drop_rows(self, rows: List[int]):
+        if not rows:
+            return
+        self._alive[rows] = False
+        # 倒排列表惰性清理：检索时按_alive过滤，删除较多时整体重建
+        if (self._rows - len(self)) > max(1000, self._rows // 4):
+            self._lists = {}
+            for entry in self._conn.execute("SELECT row, list_id FROM entries WHERE deleted = 0"):
+                self._lists.setdefault(entry[1], []).append(entry[0])
+
+    def train(self, iterations: int = 12, sample_size: Optional[int] = None, seed: int = 0):
+        """用球面k-means训练聚类中心并重新分配所有向量"""
+        with self._lock:
+            alive_rows = np.flatnonzero(self._alive)
+            nlist = min(self.nlist, len(alive_rows))
+            if nlist == 0:
+                return
+            rng = np.random.default_rng(seed)
+            sample_size = sample_size or nlist * 64
+            sample_rows = np.sort(rng.choice(alive_rows, size=min(sample_size, len(alive_rows)), replace=False))
+            sample = np.asarray(self._vectors[sample_rows])
+
+            centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+            for _ in range(iterations):
+                assignment = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assignment, sample)
+                counts = np.bincount(assignment, minlength=nlist)
+                empty = counts == 0
+                # 空簇用随机样本重新初始化
+                sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                norms[norms == 0] = 1.0
+                centroids = (sums / norms).astype(np.float32)
+
+            self.centroids = centroids
+            np.save(self._centroids_path, centroids)
+
+            self._lists = {}
+            updates = []
+            for start in range(0, len(alive_rows), SCAN_BLOCK_ROWS):
+                block_rows = alive_rows[start:start + SCAN_BLOCK_ROWS]
+                block_lists = self._assign(np.asarray(self._vectors[block_rows]))
+                for row, list_id in zip(block_rows.tolist(), block_lists.tolist()):
+                    self._lists.setdefault(list_id, []).append(row)
+                    updates.append((list_id, row))
+            with self._conn:
+                self._conn.executemany("UPDATE entries SET list_id = ? WHERE row = ?", updates)
+            logger.info(f"Trained IVF index with {nlist} lists over {len(alive_rows)} vectors")
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ self.centroids.T, axis=1)
+
+    def search(
+        self,
+        query: np.ndarray,
+        top_k: int = 10,
+        filters: Optional[VectorFilter] = None,
+        nprobe: Optional[int] = None
+    ) -> List[Tuple[float, Dict[str, Any]]]:
+        """检索最相似的向量
+
+        Returns:
+            [(相似度, 元数据)]，按相似度降序
+        """
+        if self._vectors is None or top_k <= 0:
+            return []
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        filters = filters or VectorFilter()
+
+        with self._lock:
+            kind_code: Optional[int] = None
+            if filters.kind:
+                kind_code = self._kind_codes.get(filters.kind)
+                if kind_code is None:
+                    return []
+
+            # 其他条件先用SQL预过滤；训练后结果超过精确扫描上限说明条件不够选择性，
+            # 改为探测倒排列表后再按SQL过滤候选，避免取出全部行号
+            allowed: Optional[np.ndarray] = None
+            post_filter = False
+            if not filters.is_empty:
+                where, params = filters.to_sql()
+                limit = self.exact_search_limit + 1 if self.trained else -1
+                allowed = np.fromiter(
+                    (r[0] for r in self._conn.execute(f"SELECT row FROM entries WHERE {where} LIMIT ?", params + [limit])),
+                    dtype=np.int64
+                )
+                if len(allowed) == 0:
+                    return []
+                if self.trained and len(allowed) > self.exact_search_limit:
+                    allowed, post_filter = None, True
+
+            if allowed is not None:
+                candidates = np.sort(allowed)
+            elif self.trained:
+                candidates = self._probe(query, nprobe or self.nprobe)
+            else:
+                candidates = np.flatnonzero(self._alive)
+
+            if len(candidates):
+                keep = self._alive[candidates]
+                if kind_code is not None:
+                    keep &= self._kinds[candidates] == kind_code
+                candidates = candidates[keep]
+            if post_filter:
+                candidates = self._filter_rows(candidates, filters)
+            scored = self._score(query, candidates, top_k)
+            return self._fetch(scored)
+
+    def _filter_rows(self, candidates: np.ndarray, filters: VectorFilter) -> np.ndarray:
+        """按过滤条件筛选候选行（分批用row IN查询）"""
+        where, params = filters.to_sql()
+        kept: List[int] = []
+        for start in range(0, len(candidates), 500):
+            batch = candidates[start:start + 500].tolist()
+            placeholders = ",".join("?" * len(batch))
+            kept += [r[0] for r in self._conn.execute(
+                f"SELECT row FROM entries WHERE row IN ({placeholders}) AND {where}", batch + params
+            )]
+        return np.asarray(sorted(kept), dtype=np.int64)
+
+    def _probe(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        centroid_scores = self.centroids @ query
+        nprobe = min(nprobe, len(centroid_scores))
+        probed = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        # 训练前写入、尚未归入列表的向量（list_id = -1）也要扫描
+        lists = [self._lists.get(int(list_id), []) for list_id in probed] + [self._lists.get(-1, [])]
+        rows = [row for rows in lists for row in rows]
+        return np.unique(np.asarray(rows, dtype=np.int64))
+
+    def _score(self, query: np.ndarray, candidates: np.ndarray, top_k: int) -> List[Tuple[float, int]]:
+        best_scores = np.zeros(0, dtype=np.float32)
+        best_rows = np.zeros(0, dtype=np.int64)
+        for start in range(0, len(candidates), SCAN_BLOCK_ROWS):
+            block_rows = candidates[start:start + SCAN_BLOCK_ROWS]
+            # 连续区间直接切片，避免逐行拷贝
+            if block_rows[-1] - block_rows[0] + 1 == len(block_rows):
+                block = self._vectors[block_rows[0]:block_rows[-1] + 1]
+            else:
+                block = self._vectors[block_rows]
+            scores = np.asarray(block) @ query
+            best_scores = np.concatenate([best_scores, scores])
+            best_rows = np.concatenate([best_rows, block_rows])
+            if len(best_scores) > top_k:
+                keep = np.argpartition(-best_scores, top_k - 1)[:top_k]
+                best_scores, best_rows = best_scores[keep], best_rows[keep]
+        order = np.argsort(-best_scores)
+        return [(float(best_scores[i]), int(best_rows[i])) for i in order]
+
+    def _fetch(self, scored: List[Tuple[float, int]]) -> List[Tuple[float, Dict[str, Any]]]:
+        if not scored:
+            return []
+        rows = [row for _, row in scored]
+        placeholders = ",".join("?" * len(rows))
+        entries = {
+            r["row"]: r for r in self._conn.execute(
+                f"SELECT row, key, kind, doc_id, url, title, content, event_type, credibility, published_at, "
+                f"source_type, payload FROM entries WHERE row IN ({placeholders})", rows
+            )
+        }
+        results = []
+        for score, row in scored:
+            entry = entries.get(row)
+            if entry is None:
+                continue
+            record = dict(entry)
+            record["payload"] = json.loads(record["payload"] or "{}")
+            results.append((score, record))
+        return results
+
+    def get_vector(self, key: str) -> Optional[np.ndarray]:
+        """读取某个key当前的向量"""
+        row = self._conn.execute("SELECT row FROM entries WHERE key = ? AND deleted = 0", (key,)).fetchone()
+        if row is None or self._vectors is None:
+            return None
+        return np.asarray(self._vectors[row[0]])
+
+    def records(self, filters: Optional[VectorFilter] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """按过滤条件列出记录（不做向量检索）"""
+        where, params = (filters or VectorFilter()).to_sql()
+        rows = self._conn.execute(
+            f"SELECT key, kind, doc_id, url, title, content, event_type, credibility, published_at, source_type, "
+            f"payload FROM entries WHERE {where} ORDER BY row DESC LIMIT ?", params + [limit]
+        ).fetchall()
+        results = []
+        for entry in rows:
+            record = dict(entry)
+            record["payload"] = json.loads(record["payload"] or "{}")
+            results.append(record)
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "rows": self._rows,
+            "alive": len(self),
+            "dimension": self.dimension,
+            "trained": self.trained,
+            "nlist": len(self.centroids) if self.trained else 0,
+            "nprobe": self.nprobe
+        }
+
+    def close(self):
+        with self._lock:
+            self._vectors = None
+            self._conn.close()
@@ -0,0 +1,254 @@
+# Copyright (c) 2025 Lingjing Project
+# SPDX-License-Identifier: MIT
+
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config.tools import EMBEDDING_BATCH_SIZE, VECTOR_INDEX_DIR
+from .embeddings import Embedder, build_embedder
+from .retriever import Chunk, Document, MysteryEvent, Resource, Retriever
+from .vector_index import VectorFilter, VectorIndex
+
+logger = logging.getLogger(__name__)
+
+URI_PREFIX = "vector://"
+
+
+class VectorRetriever(Retriever):
+    """本地向量检索器
+
+    文档块批量嵌入后写入磁盘上的IVF索引（内存映射），支持按事件类型、
+    可信度和日期过滤，文档可增量添加和更新，不依赖外部服务。
+    """
+
+    def __init__(
+        self,
+        index_dir: str = VECTOR_INDEX_DIR,
+        embedder: Optional[Embedder] = None,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        nlist: int = 256,
+        nprobe: int = 8
+    ):
+        """初始化向量检索器
+
+        Args:
+            index_dir: 索引目录
+            embedder: 嵌入器，默认按EMBEDDING_PROVIDER配置构建
+            batch_size: 每批嵌入的文本块数
+            nlist: IVF倒排列表数量
+            nprobe: 查询时扫描的倒排列表数量
+        """
+        self.embedder = embedder or build_embedder()
+        self.batch_size = batch_size
+        self.index = VectorIndex(index_dir, nlist=nlist, nprobe=nprobe, embedder_name=self.embedder.name)
+
+    def close(self):
+        self.index.close()
+
+    def add_documents(self, documents: Iterable[Document]) -> int:
+        """增量添加文档（同一文档再次添加时替换旧的块），返回写入的块数"""
+        pending: List[Tuple[str, Dict[str, Any]]] = []
+        written = 0
+        for document in documents:
+            self.index.delete(doc_id=document.id)
+            for i, chunk in enumerate(document.chunks):
+                if chunk.content and chunk.content.strip():
+                    pending.append((chunk.content, self._chunk_record(document, chunk, i)))
+            if document.mystery_event:
+                self.store_mystery_event(document.mystery_event)
+            if len(pending) >= self.batch_size:
+                written += self._flush(pending)
+                pending = []
+        if pending:
+            written += self._flush(pending)
+        return written
+
+    def _flush(self, pending: List[Tuple[str, Dict[str, Any]]]) -> int:
+        vectors = self.embedder.embed_documents([text for text, _ in pending])
+        self.index.add(vectors, [record for _, record in pending])
+        return len(pending)
+
+    def _chunk_record(self, document: Document, chunk: Chunk, position: int) -> Dict[str, Any]:
+        event = document.mystery_event
+        chunk_index = chunk.metadata.get("chunk_index", position)
+        return {
+            "key": f"{document.id}:{position}",
+            "kind": "chunk",
+            "doc_id": document.id,
+            "url": document.url,
+            "title": document.title,
+            "content": chunk.content,
+            "event_type": event.event_type if event else document.metadata.get("event_type"),
+            "credibility": document.credibility_score,
+            "published_at": document.publication_date or (event.date if event else None),
+            "source_type": document.source_type,
+            "payload": {**chunk.metadata, "chunk_index": chunk_index, "author": document.author}
+        }
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 10,
+        event_type: Optional[str] = None,
+        min_credibility: float = 0.0,
+        date_range: Optional[Tuple[datetime, datetime]] = None,
+        kind: str = "chunk",
+        doc_ids: Optional[List[str]] = None
+    ) -> List[Tuple[float, Dict[str, Any]]]:
+        """向量检索，返回 [(相似度, 记录)]"""
+        filters = VectorFilter(
+            kind=kind,
+            event_types=[event_type] if event_type else None,
+            min_credibility=min_credibility,
+            date_from=date_range[0] if date_range else None,
+            date_to=date_range[1] if date_range else None,
+            doc_ids=doc_ids
+        )
+        return self.index.search(self.embedder.embed_query(query), top_k=top_k, filters=filters)
+
+    def list_resources(self, query: str | None = None) -> list[Resource]:
+        """列出索引中的文档"""
+        if query:
+            records = [record for _, record in self.search(query, top_k=200)]
+        else:
+            records = self.index.records(VectorFilter(kind="chunk"), limit=500)
+        resources: "OrderedDict[str, Resource]" = OrderedDict()
+        for record in records:
+            if record["doc_id"] in resources:
+                continue
+            resources[record["doc_id"]] = Resource(
+                uri=f"{URI_PREFIX}{record['doc_id']}",
+                title=record["title"] or record["url"] or record["doc_id"],
+                description=(record["content"] or "")[:200],
+                resource_type=record["source_type"] or "unknown",
+                credibility_score=record["credibility"],
+                metadata={"url": record["url"], "event_type": record["event_type"]}
+            )
+            if len(resources) >= 50:
+                break
+        return list(resources.values())
+
+    def query_relevant_documents(
+        self, query: str, resources: list[Resource] = None, top_k: int = 20
+    ) -> list[Document]:
+        """检索相关文档块，按文档分组"""
+        doc_ids = [
+            resource.uri[len(URI_PREFIX):] for resource in resources or [] if resource.uri.startswith(URI_PREFIX)
+        ] or None
+        documents: "OrderedDict[str, Document]" = OrderedDict()
+        for score, record in self.search(query, top_k=top_k, doc_ids=doc_ids):
+            document = documents.get(record["doc_id"])
+            if document is None:
+                document = Document(
+                    id=record["doc_id"],
+                    url=record["url"],
+                    title=record["title"],
+                    credibility_score=record["credibility"],
+                    source_type=record["source_type"] or "unknown",
+                    publication_date=self._parse_date(record["published_at"]),
+                    author=record["payload"].get("author"),
+                    metadata={"event_type": record["event_type"]}
+                )
+                documents[record["doc_id"]] = document
+            document.chunks.append(Chunk(content=record["content"], similarity=score, metadata=record["payload"]))
+        return list(documents.values())
+
+    def query_mystery_events(
+        self,
+        query: str,
+        event_type: str | None = None,
+        location: str | None = None,
+        date_range: tuple[datetime, datetime] | None = None,
+        min_credibility: float = 0.0
+    ) -> list[MysteryEvent]:
+        """按语义和元数据过滤查询神秘事件"""
+        if query:
+            records = [
+                record for _, record in self.search(
+                    query, top_k=100, event_type=event_type, min_credibility=min_credibility,
+                    date_range=date_range, kind="event"
+                )
+            ]
+        else:
+            records = self.index.records(VectorFilter(
+                kind="event",
+                event_types=[event_type] if event_type else None,
+                min_credibility=min_credibility,
+                date_from=date_range[0] if date_range else None,
+                date_to=date_range[1] if date_range else None
+            ), limit=100)
+
+        events = []
+        for record in records:
+            event = self._record_to_event(record)
+            if location and location.lower() not in (event.location or "").lower():
+                continue
+            events.append(event)
+        return events
+
+    def store_mystery_event(self, event: MysteryEvent) -> bool:
+        """嵌入并存储神秘事件"""
+        try:
+            text = "\n".join(part for part in (event.title, event.description, event.location) if part)
+            self.index.add(self.embedder.embed_documents([text]), [{
+                "key": f"event:{event.event_id}",
+                "kind": "event",
+                "doc_id": event.event_id,
+                "url": event.source_url,
+                "title": event.title,
+                "content": event.description,
+                "event_type": event.event_type,
+                "credibility": event.credibility_score,
+                "published_at": event.date,
+                "payload": event.to_dict()
+            }])
+            return True
+        except Exception as e:
+            logger.error(f"Failed to store mystery event {event.event_id}: {e}")
+            return False
+
+    def find_related_events(
+        self,
+        event: MysteryEvent,
+        similarity_threshold: float = 0.7
+    ) -> list[MysteryEvent]:
+        """查找向量相似度超过阈值的事件"""
+        vector = self.index.get_vector(f"event:{event.event_id}")
+        if vector is None:
+            text = "\n".join(part for part in (event.title, event.description, event.location) if part)
+            vector = self.embedder.embed_query(text)
+        related = []
+        for score, record in self.index.search(vector, top_k=50, filters=VectorFilter(kind="event")):
+            if record["doc_id"] == event.event_id or score < similarity_threshold:
+                continue
+            related_event = self._record_to_event(record)
+            related_event.metadata["similarity"] = score
+            related.append(related_event)
+        return related
+
+    def _record_to_event(self, record: Dict[str, Any]) -> MysteryEvent:
+        payload = record["payload"]
+        return MysteryEvent(
+            event_id=record["doc_id"],
+            event_type=record["event_type"] or payload.get("event_type", "unknown"),
+            title=record["title"] or "",
+            description=record["content"] or "",
+            location=payload.get("location"),
+            date=self._parse_date(record["published_at"]),
+            credibility_score=record["credibility"],
+            source_url=record["url"],
+            witnesses=payload.get("witnesses", []),
+            evidence=payload.get("evidence", []),
+            metadata=dict(payload.get("metadata") or {})
+        )
+
+    @staticmethod
+    def _parse_date(value: Optional[str]) -> Optional[datetime]:
+        if not value:
+            return None
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
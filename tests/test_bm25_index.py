@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BM25倒排索引测试：分词、段提交与合并、墓碑删除和重新打开
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from rag.bm25_index import BM25Index, decode_postings, encode_postings, tokenize
+
+
+def _segment_files(path):
+    return sorted(name for name in os.listdir(path) if name.startswith("seg_"))
+
+
+class TestTokenize:
+    """分词测试"""
+
+    def test_english_is_stemmed_and_stopwords_removed(self):
+        assert tokenize("The lights were hovering") == tokenize("light hover")
+
+    def test_chinese_text_produces_tokens(self):
+        tokens = tokenize("不明飞行物")
+        assert tokens
+        assert all(token for token in tokens)
+
+    def test_postings_round_trip(self):
+        postings = [(0, 3), (5, 1), (130, 2), (100000, 7)]
+        assert list(decode_postings(encode_postings(postings))) == postings
+
+
+class TestBM25Index:
+    """BM25索引测试"""
+
+    def test_ranking_prefers_matching_documents(self):
+        index = BM25Index()
+        index.add("ufo", "Bright lights hovering over the lake", title="UFO sighting")
+        index.add("ghost", "Strange noises in an old house", title="Haunted house")
+        index.add("mixed", "A house near the lake", title="Lake house")
+        index.commit()
+
+        results = index.search("lake lights")
+
+        assert [doc_id for _, doc_id, _ in results][:2] == ["ufo", "mixed"]
+        assert results[0][0] > results[1][0] > 0
+
+    def test_buffered_documents_are_searchable_before_commit(self):
+        index = BM25Index()
+        index.add("a", "glowing orb", fields={"id": "a"})
+
+        assert index.search("orb")[0][1:] == ("a", {"id": "a"})
+        assert index.get_stats()["buffered_documents"] == 1
+
+    def test_update_and_delete_leave_tombstones(self):
+        index = BM25Index()
+        index.add("a", "glowing orb over the lake")
+        index.add("b", "glowing triangle")
+        index.commit()
+
+        index.add("a", "silent triangle craft")
+        assert index.delete("b")
+        assert not index.delete("b")
+
+        assert [doc_id for _, doc_id, _ in index.search("orb")] == []
+        assert [doc_id for _, doc_id, _ in index.search("triangle")] == ["a"]
+        stats = index.get_stats()
+        assert stats["documents"] == 1
+        assert stats["deleted"] == 2
+        assert "b" not in index
+
+    def test_segments_merge_and_drop_deleted_postings(self, tmp_path):
+        path = str(tmp_path / "bm25")
+        index = BM25Index(path, flush_docs=2, max_segments=2)
+        for i in range(4):
+            index.add(f"doc_{i}", f"lake sighting number {i}")
+        assert index.get_stats()["segments"] == 2
+        index.delete("doc_1")
+
+        # 第三个段触发合并
+        index.add("doc_4", "lake sighting again")
+        index.add("doc_5", "unrelated text")
+
+        assert index.get_stats()["segments"] == 1
+        merged = index._segments[0]
+        assert merged.name.endswith("_m")
+        merged_docs = {doc for doc, _ in merged.postings(tokenize("lake")[0])}
+        assert merged_docs == {0, 2, 3, 4}
+        assert _segment_files(path) == [f"{merged.name}.dict", f"{merged.name}.post"]
+        assert sorted(doc_id for _, doc_id, _ in index.search("lake", limit=10)) == [
+            "doc_0", "doc_2", "doc_3", "doc_4"
+        ]
+
+    def test_repeated_optimize_keeps_segment_files(self, tmp_path):
+        path = str(tmp_path / "bm25")
+        index = BM25Index(path)
+        index.add("a", "glowing orb")
+        index.add("b", "glowing disc")
+        index.commit()
+        index.optimize()
+        index.delete("b")
+        # 没有新文档时再次合并，新段不能与旧段同名而被清理掉
+        index.optimize()
+
+        names = [segment.name for segment in index._segments]
+        assert _segment_files(path) == [f"{names[0]}.dict", f"{names[0]}.post"]
+        reopened = BM25Index(path)
+        assert [doc_id for _, doc_id, _ in reopened.search("glowing")] == ["a"]
+        reopened.add("c", "glowing triangle")
+        reopened.commit()
+        assert len({segment.name for segment in reopened._segments}) == 2
+
+    def test_reopen_keeps_committed_documents_only(self, tmp_path):
+        path = str(tmp_path / "bm25")
+        index = BM25Index(path)
+        index.add("a", "glowing orb", fields={"id": "a", "type": "ufo"})
+        index.add("b", "haunted house")
+        index.commit()
+        index.delete("b")
+        # 未commit的文档重新打开后丢弃（不关闭，模拟崩溃）
+        index.add("c", "glowing disc")
+
+        reopened = BM25Index(path)
+
+        assert len(reopened) == 1
+        assert "a" in reopened and "b" not in reopened and "c" not in reopened
+        assert reopened.get_fields("a") == {"id": "a", "type": "ufo"}
+        assert [doc_id for _, doc_id, _ in reopened.search("glowing")] == ["a"]
+
+    def test_predicate_filters_by_fields(self):
+        index = BM25Index()
+        for i in range(30):
+            index.add(f"doc_{i}", "lake sighting", fields={"id": f"doc_{i}", "even": i % 2 == 0})
+
+        results = index.search("lake", limit=5, predicate=lambda fields: not fields["even"])
+
+        assert len(results) == 5
+        assert all(not fields["even"] for _, _, fields in results)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TTL缓存测试：过期与淘汰、线程和asyncio下的单飞加载、加载方取消
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from utils.cache import TTLCache
+
+
+class TestTTLCache:
+    """缓存基本行为测试"""
+
+    def test_entries_expire(self):
+        cache = TTLCache(ttl=0.05)
+        cache.set("a", 1)
+
+        assert cache.get("a") == 1
+        time.sleep(0.1)
+        assert cache.get("a", "missing") == "missing"
+
+    def test_least_recently_used_is_evicted(self):
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+    def test_zero_ttl_does_not_store(self):
+        cache = TTLCache(ttl=0)
+
+        assert cache.get_or_load("a", lambda: 1) == 1
+        assert len(cache) == 0
+
+
+class TestSingleFlight:
+    """单飞加载测试"""
+
+    def test_concurrent_threads_load_once(self):
+        cache = TTLCache()
+        calls = []
+        release = threading.Event()
+
+        def loader():
+            calls.append(1)
+            release.wait(5)
+            return "value"
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(cache.get_or_load, "key", loader) for _ in range(8)]
+            time.sleep(0.1)
+            release.set()
+            results = [future.result(timeout=5) for future in futures]
+
+        assert results == ["value"] * 8
+        assert len(calls) == 1
+        assert cache.get_stats()["loads"] == 1
+
+    def test_thread_failure_is_shared_and_not_cached(self):
+        cache = TTLCache()
+        release = threading.Event()
+
+        def loader():
+            release.wait(5)
+            raise RuntimeError("backend down")
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(cache.get_or_load, "key", loader) for _ in range(4)]
+            time.sleep(0.1)
+            release.set()
+            for future in futures:
+                with pytest.raises(RuntimeError):
+                    future.result(timeout=5)
+
+        assert cache.get_or_load("key", lambda: "recovered") == "recovered"
+
+    def test_concurrent_tasks_load_once(self):
+        cache = TTLCache()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "value"
+
+        async def main():
+            return await asyncio.gather(*(cache.aget_or_load("key", loader) for _ in range(5)))
+
+        assert asyncio.run(main()) == ["value"] * 5
+        assert len(calls) == 1
+        assert cache.get("key") == "value"
+
+    def test_cancelled_waiter_does_not_cancel_load(self):
+        cache = TTLCache()
+
+        async def loader():
+            await asyncio.sleep(0.05)
+            return "value"
+
+        async def main():
+            owner = asyncio.create_task(cache.aget_or_load("key", loader))
+            await asyncio.sleep(0)
+            waiter = asyncio.create_task(cache.aget_or_load("key", loader))
+            await asyncio.sleep(0.01)
+            waiter.cancel()
+            return await owner, waiter
+
+        value, waiter = asyncio.run(main())
+        assert value == "value"
+        assert waiter.cancelled()
+
+    def test_cancelled_owner_hands_load_to_waiter(self):
+        cache = TTLCache()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return f"value{len(calls)}"
+
+        async def main():
+            owner = asyncio.create_task(cache.aget_or_load("key", loader))
+            await asyncio.sleep(0)
+            waiters = [asyncio.create_task(cache.aget_or_load("key", loader)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            owner.cancel()
+            results = await asyncio.gather(*waiters)
+            return owner, results
+
+        owner, results = asyncio.run(main())
+        assert owner.cancelled()
+        # 一个等待方接手加载，其余等待方共享它的结果
+        assert results == ["value2"] * 3
+        assert len(calls) == 2
+        assert cache.get("key") == "value2"
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+正文分块器测试：块偏移量能映射回源文本、标题边界、重叠和超长句切分
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from crawler.chunker import TextChunker, count_tokens
+
+
+SOURCE = (
+    "# 目击报告\n\n"
+    "2024年1月15日晚上，多名目击者在湖边看到发光物体。物体悬停约三分钟后向北飞去！\n"
+    "Dr. Smith said the object was silent. It left no trace on radar.\n\n"
+    "## 调查进展\n\n"
+    "气象部门确认当晚没有异常天气。机场雷达记录仍在调取中。研究人员计划走访更多目击者。\n\n"
+    "第三章 结论\n"
+    "目前尚无定论。"
+)
+
+
+class TestTextChunker:
+    """分块器测试"""
+
+    @pytest.mark.parametrize("max_tokens,overlap_tokens", [(384, 48), (24, 8), (12, 0)])
+    def test_offsets_map_back_to_source(self, max_tokens, overlap_tokens):
+        chunker = TextChunker(max_tokens=max_tokens, overlap_tokens=overlap_tokens, min_tokens=1)
+
+        chunks = list(chunker.iter_chunks(SOURCE))
+
+        assert chunks
+        for index, chunk in enumerate(chunks):
+            assert chunk.text == SOURCE[chunk.start:chunk.end]
+            assert chunk.index == index
+            assert chunk.tokens == count_tokens(SOURCE, chunk.start, chunk.end)
+            assert chunk.tokens <= max_tokens
+        # 块按源文本顺序排列
+        assert [chunk.start for chunk in chunks] == sorted(chunk.start for chunk in chunks)
+
+    def test_chunk_metadata_offsets_match_content(self):
+        chunks = TextChunker(max_tokens=24, overlap_tokens=8, min_tokens=1).chunk(
+            SOURCE, similarity=0.7, metadata={"source": "test"}
+        )
+
+        for chunk in chunks:
+            meta = chunk.metadata
+            assert SOURCE[meta["start_offset"]:meta["end_offset"]] == chunk.content
+            assert meta["source"] == "test"
+            assert chunk.similarity == 0.7
+
+    def test_offsets_are_relative_to_whole_text_for_slices(self):
+        start = SOURCE.index("气象部门")
+        end = SOURCE.index("第三章")
+
+        chunks = list(TextChunker(min_tokens=1).iter_chunks(SOURCE, start, end))
+
+        assert chunks[0].start == start
+        assert all(SOURCE[chunk.start:chunk.end] == chunk.text for chunk in chunks)
+        assert chunks[-1].end <= end
+
+    def test_headings_are_boundaries_and_sections(self):
+        chunks = list(TextChunker(min_tokens=1).iter_chunks(SOURCE))
+
+        assert [chunk.section for chunk in chunks] == ["目击报告", "调查进展", "第三章 结论"]
+        assert all("#" not in chunk.text for chunk in chunks)
+        assert chunks[0].text.startswith("2024年1月15日")
+
+    def test_abbreviation_does_not_end_sentence(self):
+        chunker = TextChunker(min_tokens=1)
+        text = "Dr. Smith said the object was silent. It left no trace."
+
+        sentences = [text[start:end] for _, start, end in chunker._iter_sentences(text, 0, len(text))]
+
+        assert sentences == ["Dr. Smith said the object was silent.", "It left no trace."]
+
+    def test_overlap_repeats_trailing_sentences(self):
+        text = "".join(f"第{i}句话说明情况。" for i in range(12))
+        chunks = list(TextChunker(max_tokens=30, overlap_tokens=10, min_tokens=1).iter_chunks(text))
+
+        assert len(chunks) > 1
+        for previous, current in zip(chunks, chunks[1:]):
+            # 下一块从上一块末尾的完整句子开始
+            assert previous.start < current.start < previous.end
+            assert text[current.start - 1] == "。"
+
+    def test_oversized_sentence_is_split_on_token_boundaries(self):
+        text = "光" * 50
+        chunks = list(TextChunker(max_tokens=16, overlap_tokens=0, min_tokens=1).iter_chunks(text))
+
+        assert [chunk.tokens for chunk in chunks] == [16, 16, 16, 2]
+        assert "".join(chunk.text for chunk in chunks) == text
+
+    def test_overlap_must_be_smaller_than_limit(self):
+        with pytest.raises(ValueError):
+            TextChunker(max_tokens=10, overlap_tokens=10)
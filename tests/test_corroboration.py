@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨文档佐证索引测试：事件聚簇、独立来源计数和非法位置处理
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tools.corroboration import CorroborationIndex
+
+
+BEIJING = {"lat": 39.9, "lon": 116.4}
+
+
+class TestCorroborationIndex:
+    """佐证索引测试"""
+
+    def test_clusters_independent_sources(self):
+        index = CorroborationIndex()
+        index.add_document("a", "夜空中出现发光圆盘", "https://www.news.com.cn/a", datetime(2024, 1, 15), BEIJING)
+        index.add_document("b", "目击到光球悬停", "https://blog.example.org/b", datetime(2024, 1, 16),
+                           {"lat": 40.0, "lon": 116.5})
+        index.add_document("c", "又一篇发光物体报道", "https://news.com.cn/c", datetime(2024, 1, 17), BEIJING)
+        result = index.add_document("d", "无关的地震新闻", "https://other.net/d", datetime(2023, 6, 1),
+                                    {"lat": -33.9, "lon": 151.2})
+
+        clusters = index.get_clusters()
+        assert len(clusters) == 1
+        assert sorted(clusters[0]["documents"]) == ["a", "b", "c"]
+        # www.news.com.cn 与 news.com.cn 是同一来源
+        assert clusters[0]["independent_sources"] == ["example.org", "news.com.cn"]
+
+        a = index.get_result("a")
+        assert a.cluster_size == 3
+        assert a.independent_sources == 2
+        assert a.corroborating_sources == ["example.org"]
+        assert a.agreement_score == pytest.approx(1 / 3)
+        assert result.cluster_size == 1
+        assert result.agreement_score == 0.0
+
+    def test_duplicate_document_is_not_added_twice(self):
+        index = CorroborationIndex()
+        first = index.add_document("a", "发光物体", "https://a.com/1", datetime(2024, 1, 15), BEIJING)
+        again = index.add_document("a", "发光物体", "https://a.com/1", datetime(2024, 1, 15), BEIJING)
+
+        assert len(index) == 1
+        assert again == first
+
+    def test_keywords_match_on_word_boundaries(self):
+        index = CorroborationIndex()
+
+        assert index._extract_phenomena("The accident occurred after a photo was shot", None) == set()
+        assert index._extract_phenomena("A red orb, hot to the touch", None) == {"red", "orb", "hot"}
+        # 被“发光”包含的“光”不单独计入
+        assert index._extract_phenomena("夜空中出现发光圆盘", None) == {"发光", "圆盘"}
+
+    def test_unrelated_stories_in_same_window_stay_apart(self):
+        index = CorroborationIndex()
+        index.add_document("accident", "A car accident occurred on the highway, a photo shows the wreck",
+                           "https://a.com/1", datetime(2024, 1, 15))
+        index.add_document("robbery", "Robbery suspect photographed fleeing; police say it happened shortly after",
+                           "https://b.com/1", datetime(2024, 1, 20))
+        result = index.add_document("flood", "Flood waters covered the shortest road in the hottest month",
+                                    "https://c.com/1", datetime(2024, 1, 25))
+
+        assert index.get_clusters() == []
+        assert result.independent_sources == 1
+
+    def test_time_alone_is_not_enough(self):
+        index = CorroborationIndex(min_matched_dimensions=1)
+        index.add_document("a", "无关报道", "https://a.com/1", datetime(2024, 1, 15))
+
+        result = index.add_document("b", "另一篇报道", "https://b.com/1", datetime(2024, 1, 15))
+
+        assert result.cluster_size == 1
+
+    @pytest.mark.parametrize("location", [
+        {"lat": None, "lon": 116.4},
+        {"lat": "39.9", "lon": "116.4"},
+        {"lat": float("nan"), "lon": 116.4},
+        {"lat": 39.9},
+        {"lat": True, "lon": False},
+        {"lat": 95.0, "lon": 116.4},
+        "北京",
+    ])
+    def test_invalid_location_is_ignored(self, location):
+        index = CorroborationIndex()
+        index.add_document("a", "发光物体", "https://a.com/1", datetime(2024, 1, 15), BEIJING)
+
+        result = index.add_document("b", "发光物体", "https://b.com/1", datetime(2024, 1, 15), location)
+
+        # 位置被忽略，仍可通过时间和现象两个维度聚簇
+        assert result.cluster_size == 2
+        assert "geographical" not in result.matched_dimensions
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+网页抓取工具测试：使用本地HTTP服务验证响应头未声明字符集时的解码
+"""
+
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from crawler.http_cache import HTTPResponseCache
+from crawler.readability_extractor import ReadabilityExtractor
+from tools.crawl import MysteryWebCrawler, _decode_html
+
+
+PARAGRAPH = "2024年1月15日晚上8点，多名目击者在湖边看到一个发光的圆盘形物体在湖面上空悬停，随后快速向北移动。"
+
+PAGES = {
+    # 响应头只有text/html，字符集由<meta charset>声明
+    "/gbk": ("text/html", "gbk",
+             f'<html><head><meta charset="gb2312"><title>湖面发光物体</title></head>'
+             f'<body><article><p>{PARAGRAPH}</p><p>{PARAGRAPH}</p></article></body></html>'),
+    # 既没有响应头字符集也没有meta声明
+    "/utf8": ("text/html", "utf-8",
+              f'<html><head><title>湖面发光物体</title></head>'
+              f'<body><article><p>{PARAGRAPH}</p><p>{PARAGRAPH}</p></article></body></html>'),
+}
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """按路径返回固定编码的页面"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        content_type, encoding, html = PAGES[self.path]
+        payload = html.encode(encoding)
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def page_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+class TestDecodeHtml:
+    """字符集判定测试"""
+
+    def test_header_charset_wins(self):
+        body = '<meta charset="gbk"><p>发光</p>'.encode("utf-8")
+        assert "发光" in _decode_html(body, {"content-type": "text/html; charset=utf-8"})
+
+    def test_gbk_extension_characters_decode(self):
+        # "堃"不在GB2312中，按GB18030解码
+        body = '<meta http-equiv="Content-Type" content="text/html; charset=gb2312"><p>堃</p>'.encode("gbk")
+        assert "堃" in _decode_html(body, {"content-type": "text/html"})
+
+    def test_unknown_charset_falls_back_to_detection(self):
+        body = f'<meta charset="x-unknown"><p>{PARAGRAPH}</p>'.encode("utf-8")
+        assert PARAGRAPH in _decode_html(body, {"content-type": "text/html"})
+
+
+class TestMysteryWebCrawler:
+    """抓取与正文抽取测试"""
+
+    @pytest.mark.parametrize("path", ["/gbk", "/utf8"])
+    def test_pages_without_header_charset_are_not_garbled(self, page_server, tmp_path, path):
+        crawler = MysteryWebCrawler(
+            http_cache=HTTPResponseCache(str(tmp_path / "http_cache.db")),
+            extractor=ReadabilityExtractor(use_fallback=False)
+        )
+
+        content = crawler.extract_content(page_server + path)
+
+        assert content["title"] == "湖面发光物体"
+        assert "发光的圆盘形物体" in content["text"]
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抓取存储测试：共享存储按需打开，论坛主题增量保存只追加新帖子
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import crawler.feeds as feeds
+import crawler.http_cache as http_cache
+import crawler.thread_store as thread_store
+from config.mystery_config import DataSourceConfig, DataSourceType
+from crawler.forum_crawler import ForumCrawler
+from crawler.http_cache import HTTPResponseCache
+from crawler.news_crawler import NewsCrawler
+from crawler.thread_store import ThreadState, ThreadStore
+from rag.retriever import Chunk, Document
+
+
+class TestSharedStoresAreLazy:
+    """共享存储懒加载测试"""
+
+    def test_constructing_crawlers_opens_no_store(self, monkeypatch):
+        monkeypatch.setattr(http_cache, "_shared_cache", None)
+        monkeypatch.setattr(thread_store, "_shared_store", None)
+        monkeypatch.setattr(feeds, "_shared_store", None)
+
+        forum = ForumCrawler(DataSourceConfig("forum", DataSourceType.FORUM, "https://forum.example.com"))
+        news = NewsCrawler(DataSourceConfig("news", DataSourceType.NEWS, "https://news.example.com"))
+
+        assert http_cache._shared_cache is None
+        assert thread_store._shared_store is None
+        assert feeds._shared_store is None
+        assert "_thread_store" in forum.__getstate__()
+        assert news._feed_store is None
+
+    def test_explicit_store_is_used(self, tmp_path):
+        cache = HTTPResponseCache(str(tmp_path / "http_cache.db"))
+        store = ThreadStore(str(tmp_path / "crawl.db"))
+
+        forum = ForumCrawler(
+            DataSourceConfig("forum", DataSourceType.FORUM, "https://forum.example.com"),
+            thread_store=store, http_cache=cache
+        )
+
+        assert forum.thread_store is store
+        assert forum.http_cache is cache
+        assert forum.__getstate__()["_thread_store"] is None
+
+
+def _document(posts):
+    return Document(
+        id="thread",
+        url="https://forum.example.com/t/1",
+        title="主题",
+        chunks=[Chunk(post["content"], 0.6, {"post_id": post["id"]}) for post in posts],
+        source_type="forum",
+        metadata={"posts": list(posts), "posts_count": len(posts)}
+    )
+
+
+class TestThreadStore:
+    """论坛主题状态存储测试"""
+
+    def test_append_posts_merges_on_load(self, tmp_path):
+        store = ThreadStore(str(tmp_path / "crawl.db"))
+        first = [{"id": "1", "content": "第一帖"}, {"id": "2", "content": "第二帖"}]
+        state = ThreadState(thread_key="t1", url="https://forum.example.com/t/1", posts_count=2)
+        store.save(state, _document(first))
+        base_blob = store._conn.execute("SELECT document FROM forum_threads").fetchone()[0]
+
+        for post_id in ("3", "4"):
+            post = {"id": post_id, "content": f"第{post_id}帖"}
+            state.last_post_id = post_id
+            state.posts_count += 1
+            store.append_posts(state, [post], [Chunk(post["content"], 0.6, {"post_id": post_id})])
+
+        # 已保存的文档不被重写
+        assert store._conn.execute("SELECT document FROM forum_threads").fetchone()[0] == base_blob
+        assert store.get("t1").last_post_id == "4"
+
+        document = store.load_document("t1")
+        assert [chunk.metadata["post_id"] for chunk in document.chunks] == ["1", "2", "3", "4"]
+        assert document.metadata["posts_count"] == 4
+
+    def test_full_save_discards_appended_posts(self, tmp_path):
+        store = ThreadStore(str(tmp_path / "crawl.db"))
+        state = ThreadState(thread_key="t1", url="https://forum.example.com/t/1")
+        store.save(state, _document([{"id": "1", "content": "第一帖"}]))
+        store.append_posts(state, [{"id": "2", "content": "第二帖"}], [Chunk("第二帖", 0.6, {"post_id": "2"})])
+
+        store.save(state, _document([{"id": "9", "content": "重新抓取"}]))
+
+        document = store.load_document("t1")
+        assert [chunk.metadata["post_id"] for chunk in document.chunks] == ["9"]
+
+    def test_append_requires_saved_thread(self, tmp_path):
+        store = ThreadStore(str(tmp_path / "crawl.db"))
+        state = ThreadState(thread_key="missing", url="https://forum.example.com/t/2")
+
+        with pytest.raises(KeyError):
+            store.append_posts(state, [], [])
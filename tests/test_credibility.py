@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可信度分析测试：评分流水线的阶段开关、阶段计时和特征导出
+"""
+
+import csv
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tools.corroboration import CorroborationResult
+from tools.credibility import CredibilityAnalyzer
+from tools.credibility_pipeline import CredibilityPipeline, CredibilityStage
+
+
+CONTENT = "2024年1月15日晚上8点，北京市朝阳区多名目击者看到雷达显示的发光物体。"
+
+
+class TestCredibilityAnalyzer:
+    """可信度分析器测试"""
+
+    def test_full_pipeline_scores_all_dimensions(self):
+        analyzer = CredibilityAnalyzer()
+        score = analyzer.analyze_credibility(CONTENT, "https://www.nasa.gov/news", "2024-01-16")
+
+        pipeline = score.factors["pipeline"]
+        assert pipeline["executed_stages"] == analyzer.pipeline.stage_names
+        assert pipeline["skipped_stages"] == []
+        assert score.source_score == 0.95
+        assert 0.0 <= score.overall_score <= 1.0
+        assert {"source_analysis", "content_analysis", "temporal_analysis"} <= set(score.factors)
+
+    def test_disabled_stages_are_skipped(self):
+        analyzer = CredibilityAnalyzer(enabled_stages=["source", "overall"])
+        score = analyzer.analyze_credibility(CONTENT, "https://www.nasa.gov/news", "2024-01-16")
+
+        pipeline = score.factors["pipeline"]
+        assert pipeline["executed_stages"] == ["source", "overall"]
+        assert "logic" in pipeline["skipped_stages"]
+        assert set(pipeline["timings_ms"]) == {"source", "overall"}
+        # 被跳过的阶段使用默认评分，总体评分只由来源评分加权得到
+        assert score.logic_score == 0.5
+        assert "content_analysis" not in score.factors
+        assert score.overall_score == pytest.approx(0.95)
+
+    def test_unknown_stage_is_rejected(self):
+        with pytest.raises(ValueError):
+            CredibilityAnalyzer(enabled_stages=["source", "astrology"])
+
+    def test_stage_timings_accumulate(self):
+        analyzer = CredibilityAnalyzer()
+        for _ in range(3):
+            analyzer.analyze_credibility(CONTENT, "https://example.com/a", "2024-01-16")
+
+        stats = analyzer.get_stage_stats()
+        assert stats["logic"]["calls"] == 3
+        assert stats["logic"]["total_ms"] >= 0.0
+        assert stats["logic"]["avg_ms"] == pytest.approx(stats["logic"]["total_ms"] / 3)
+
+    def test_corroboration_raises_overall_score(self):
+        analyzer = CredibilityAnalyzer()
+        corroboration = CorroborationResult(
+            doc_id="a", cluster_id="a", cluster_size=3, independent_sources=3,
+            corroborating_sources=["b.com", "c.com"], agreement_score=0.5
+        )
+
+        alone = analyzer.analyze_credibility(CONTENT, "https://example.com/a", "2024-01-16")
+        corroborated = analyzer.analyze_credibility(
+            CONTENT, "https://example.com/a", "2024-01-16", corroboration=corroboration
+        )
+
+        assert corroborated.overall_score > alone.overall_score
+        assert corroborated.factors["corroboration"]["independent_sources"] == 3
+
+    def test_feature_export_to_csv(self, tmp_path):
+        pytest.importorskip("pandas")
+        analyzer = CredibilityAnalyzer(record_features=True)
+        analyzer.analyze_credibility(CONTENT, "https://www.nasa.gov/news", "2024-01-16")
+        analyzer.analyze_credibility("短文本", "https://example.com/b", "")
+
+        path = analyzer.export_features(str(tmp_path / "features" / "credibility.csv"))
+
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        assert [row["source_url"] for row in rows] == ["https://www.nasa.gov/news", "https://example.com/b"]
+        assert float(rows[0]["source_score"]) == 0.95
+        assert "time_ms_logic" in rows[0]
+        # 详情类结构不进入特征表
+        assert "source_analysis" not in rows[0]
+
+    def test_export_requires_recording(self, tmp_path):
+        with pytest.raises(RuntimeError):
+            CredibilityAnalyzer().export_features(str(tmp_path / "features.csv"))
+
+
+class TestCredibilityPipeline:
+    """评分流水线测试"""
+
+    def test_rejects_stage_with_unknown_input(self):
+        with pytest.raises(ValueError):
+            CredibilityPipeline(
+                [CredibilityStage(name="a", func=lambda ctx: {}, inputs=["missing"], outputs=["x"])],
+                raw_inputs=["content"]
+            )
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Elasticsearch检索器测试：使用本地假HTTP服务模拟索引、PIT分页和聚合接口
+"""
+
+import json
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from rag.elasticsearch_retriever import INDEX_MAPPINGS, ElasticsearchRetriever
+from rag.retriever import MysteryEvent
+
+
+class FakeElasticsearch(BaseHTTPRequestHandler):
+    """模拟索引管理、_doc、_pit、_search（search_after与聚合）的最小Elasticsearch"""
+
+    indices = {}
+    documents = {}
+    requests = []
+    pits = set()
+    search_delay = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body=None):
+        payload = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def _matches(self, source, query):
+        """只实现测试用到的过滤：term event_type、match_all和multi_match子串"""
+        if "bool" in query:
+            clauses = query["bool"].get("must", []) + query["bool"].get("filter", [])
+            return all(self._matches(source, clause) for clause in clauses)
+        if "term" in query:
+            field, value = next(iter(query["term"].items()))
+            return source.get(field) == value
+        if "multi_match" in query:
+            text = query["multi_match"]["query"]
+            return text in source.get("title", "") or text in source.get("description", "")
+        return True
+
+    def do_HEAD(self):
+        index = self.path.strip("/")
+        self._reply(200 if index in self.indices else 404)
+
+    def do_PUT(self):
+        parts = self.path.strip("/").split("/")
+        body = self._body()
+        type(self).requests.append(("PUT", self.path))
+        if len(parts) == 1:
+            self.indices[parts[0]] = body
+            self._reply(200, {"acknowledged": True})
+        else:
+            self.documents[parts[2]] = body
+            self._reply(201, {"result": "created"})
+
+    def do_DELETE(self):
+        body = self._body()
+        type(self).requests.append(("DELETE", self.path))
+        self.pits.discard(body.get("id"))
+        self._reply(200, {"succeeded": True})
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        body = self._body()
+        type(self).requests.append(("POST", path))
+        if path.endswith("/_pit"):
+            pit_id = f"pit_{len(self.pits) + 1}"
+            self.pits.add(pit_id)
+            self._reply(200, {"id": pit_id})
+            return
+
+        time.sleep(self.search_delay)
+        ordered = [
+            (position, doc_id, source)
+            for position, (doc_id, source) in enumerate(self.documents.items())
+            if self._matches(source, body.get("query", {}))
+        ]
+        if "aggs" in body:
+            self._reply(200, {"hits": {"total": {"value": len(ordered)}, "hits": []}, "aggregations": {
+                "timeline": {"buckets": [
+                    {"key": 0, "key_as_string": "2024-01-01T00:00:00.000Z", "doc_count": len(ordered),
+                     "credibility": {"value": 0.6}}
+                ]},
+                "heatmap": {"buckets": [
+                    {"key": "wx4g", "doc_count": len(ordered), "centroid": {"location": {"lat": 39.9, "lon": 116.4}}}
+                ]},
+                "event_types": {"buckets": [{"key": "ufo", "doc_count": len(ordered), "credibility": {"value": 0.6}}]}
+            }})
+            return
+
+        if "search_after" in body:
+            after = body["search_after"][-1]
+            ordered = [item for item in ordered if item[0] > after]
+        page = ordered[:body.get("size", 10)]
+        hits = [
+            {"_index": "mystery_events", "_id": doc_id, "_score": 1.0, "_source": source, "sort": [1.0, position]}
+            for position, doc_id, source in page
+        ]
+        reply = {"hits": {"total": {"value": len(ordered)}, "max_score": 1.0, "hits": hits}}
+        if "pit" in body:
+            reply["pit_id"] = body["pit"]["id"]
+        self._reply(200, reply)
+
+
+@pytest.fixture
+def es_server():
+    FakeElasticsearch.indices = {}
+    FakeElasticsearch.documents = {}
+    FakeElasticsearch.requests = []
+    FakeElasticsearch.pits = set()
+    FakeElasticsearch.search_delay = 0.0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeElasticsearch)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def _event(index, event_type="ufo"):
+    return MysteryEvent(
+        event_id=f"event_{index}",
+        event_type=event_type,
+        title=f"目击事件{index}",
+        description="夜空中出现发光物体",
+        location="北京",
+        date=datetime(2024, 1, 15),
+        credibility_score=0.6,
+        metadata={"coordinates": {"lat": 39.9, "lon": 116.4}}
+    )
+
+
+class TestElasticsearchRetriever:
+    """Elasticsearch检索器测试"""
+
+    def test_creates_index_with_mapping(self, es_server):
+        ElasticsearchRetriever(url=es_server, index="mystery_events")
+
+        created = FakeElasticsearch.indices["mystery_events"]
+        assert created["mappings"] == INDEX_MAPPINGS
+        assert created["mappings"]["properties"]["location"]["type"] == "geo_point"
+        assert created["mappings"]["properties"]["timestamp"]["type"] == "date"
+
+        ElasticsearchRetriever(url=es_server, index="mystery_events")
+        assert [request for request in FakeElasticsearch.requests if request[0] == "PUT"] == [("PUT", "/mystery_events")]
+
+    def test_store_and_query_round_trip(self, es_server):
+        retriever = ElasticsearchRetriever(url=es_server, index="mystery_events")
+        assert retriever.store_mystery_event(_event(1))
+
+        stored = FakeElasticsearch.documents["event_1"]
+        assert stored["location"] == {"lat": 39.9, "lon": 116.4}
+        assert stored["address"] == "北京"
+        assert stored["timestamp"] == "2024-01-15T00:00:00"
+
+        events = retriever.query_mystery_events("目击", event_type="ufo")
+        assert [event.event_id for event in events] == ["event_1"]
+        assert events[0].location == "北京"
+        assert events[0].date == datetime(2024, 1, 15)
+        assert events[0].metadata["coordinates"] == {"lat": 39.9, "lon": 116.4}
+
+    def test_iter_events_pages_with_pit_and_search_after(self, es_server):
+        retriever = ElasticsearchRetriever(url=es_server, index="mystery_events")
+        for index in range(7):
+            retriever.store_mystery_event(_event(index, "ufo" if index % 2 == 0 else "ghost"))
+
+        events = list(retriever.iter_mystery_events(event_type="ufo", page_size=2))
+
+        assert [event.event_id for event in events] == ["event_0", "event_2", "event_4", "event_6"]
+        assert ("POST", "/mystery_events/_pit") in FakeElasticsearch.requests
+        assert sum(1 for request in FakeElasticsearch.requests if request == ("POST", "/_search")) == 3
+        assert FakeElasticsearch.pits == set()
+
+    def test_facets_are_parsed_from_aggregations(self, es_server):
+        retriever = ElasticsearchRetriever(url=es_server, index="mystery_events")
+        retriever.store_mystery_event(_event(1))
+
+        facets = retriever.event_facets()
+
+        assert facets["total"] == 1
+        assert facets["timeline"][0]["count"] == 1
+        assert facets["heatmap"][0] == {"geohash": "wx4g", "count": 1, "lat": 39.9, "lon": 116.4}
+        assert facets["event_types"] == [{"event_type": "ufo", "count": 1}]
+
+        resources = retriever.list_resources()
+        assert resources[0].uri == "es://mystery_events/ufo"
+
+    def test_concurrent_identical_queries_are_coalesced(self, es_server):
+        retriever = ElasticsearchRetriever(url=es_server, index="mystery_events")
+        retriever.store_mystery_event(_event(1))
+        FakeElasticsearch.search_delay = 0.2
+        results = []
+
+        def query():
+            results.append(retriever.query_mystery_events("目击"))
+
+        threads = [threading.Thread(target=query) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(results) == 8
+        assert all(events[0].event_id == "event_1" for events in results)
+        assert sum(1 for request in FakeElasticsearch.requests if request == ("POST", "/mystery_events/_search")) == 1
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+事件网络邻域缓存测试：CSR子图构建、按变更日志失效、预热任务每进程只启动一次
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import rag.builder as builder
+from rag.event_network_cache import EventChangeLog, EventNeighbourhood, EventNetworkCache
+
+
+NODES = {event_id: {"event_id": event_id} for event_id in ("a", "b", "c", "d")}
+EDGES = [
+    ("a", "b", "SIMILAR_TO", {"score": 0.9}),
+    ("a", "c", "NEAR", {}),
+    ("a", "b", "SIMILAR_TO", {"score": 0.1}),
+    ("c", "d", "SIMILAR_TO", {}),
+    ("d", "missing", "NEAR", {}),
+]
+
+
+def _neighbourhood(root="a", depth=2, nodes=None, seq=0):
+    return EventNeighbourhood(root, depth, nodes or NODES, EDGES, seq)
+
+
+class TestEventNeighbourhood:
+    """CSR子图测试"""
+
+    def test_csr_layout(self):
+        neighbourhood = _neighbourhood()
+
+        assert list(neighbourhood.offsets) == [0, 2, 2, 3, 3]
+        assert [neighbourhood.node_ids[target] for target in neighbourhood.targets] == ["b", "c", "d"]
+        assert neighbourhood.type_names == ("SIMILAR_TO", "NEAR")
+        # 重复边只保留第一条，端点不在子图中的边被丢弃
+        assert list(neighbourhood.edges()) == [
+            ("a", "b", "SIMILAR_TO", {"score": 0.9}),
+            ("a", "c", "NEAR", {}),
+            ("c", "d", "SIMILAR_TO", {}),
+        ]
+        assert neighbourhood.degree("a") == 2
+        assert neighbourhood.degree("c") == 2
+        assert neighbourhood.degree("missing") == 0
+
+    def test_to_network(self):
+        network = _neighbourhood().to_network(lambda properties: properties["event_id"])
+
+        assert network["nodes"] == ["a", "b", "c", "d"]
+        assert network["edges"][0] == {"source": "a", "target": "b", "type": "SIMILAR_TO", "properties": {"score": 0.9}}
+
+
+class TestEventNetworkCache:
+    """邻域缓存失效测试"""
+
+    def test_change_to_member_invalidates_subgraph(self):
+        cache = EventNetworkCache(min_degree=0)
+        assert cache.put(_neighbourhood("a"))
+        assert cache.put(EventNeighbourhood("x", 2, {"x": {}}, []))
+
+        cache.record_change(["d"])
+
+        assert cache.get("a", 2) is None
+        assert cache.get("x", 2) is not None
+        assert cache.get_stats()["invalidations"] == 1
+
+    def test_unrelated_change_keeps_subgraph(self):
+        cache = EventNetworkCache(min_degree=0)
+        cache.put(_neighbourhood("a"))
+
+        cache.record_change(["z"])
+
+        assert cache.get("a", 2) is not None
+
+    def test_subgraph_changed_while_building_is_discarded(self):
+        cache = EventNetworkCache(min_degree=0)
+        seq = cache.change_log.seq
+        cache.record_change(["b"])
+
+        assert not cache.put(_neighbourhood("a", seq=seq))
+        assert len(cache) == 0
+
+    def test_change_log_overflow_clears_cache(self):
+        cache = EventNetworkCache(min_degree=0, change_log=EventChangeLog(max_entries=2))
+        cache.put(_neighbourhood("a"))
+        cache.put(EventNeighbourhood("x", 2, {"x": {}}, []))
+
+        for event_id in ("p", "q", "r"):
+            cache.record_change([event_id])
+
+        assert cache.get("x", 2) is None
+        assert len(cache) == 0
+
+    def test_only_hubs_are_cached_on_demand(self):
+        cache = EventNetworkCache(min_degree=3)
+        loads = []
+
+        def loader(event_id, depth):
+            loads.append(event_id)
+            return NODES, EDGES
+
+        cache.get_or_load("a", 2, loader)
+        cache.get_or_load("a", 2, loader)
+
+        assert loads == ["a", "a"]
+        assert cache.put(_neighbourhood("a"), force=True)
+        assert cache.get_or_load("a", 2, loader).root == "a"
+        assert loads == ["a", "a"]
+
+    def test_ttl_and_lru_eviction(self):
+        cache = EventNetworkCache(maxsize=1, ttl=0.05, min_degree=0)
+        cache.put(_neighbourhood("a"))
+        cache.put(EventNeighbourhood("x", 2, {"x": {}}, []))
+
+        assert cache.get("a", 2) is None
+        # 被淘汰子图的成员索引同时清理
+        assert "b" not in cache._members
+        time.sleep(0.1)
+        assert cache.get("x", 2) is None
+
+
+class FakeGraphRetriever:
+    """记录预热任务启动次数的图检索器"""
+
+    started = []
+
+    def __init__(self, text_index=None, network_cache=None):
+        self.network_cache = network_cache
+        self.stop = threading.Event()
+
+    def start_network_warm_up(self, interval):
+        thread = threading.Thread(target=self.stop.wait, daemon=True)
+        thread.start()
+        self.started.append(thread)
+        return thread
+
+
+class TestWarmUpStartsOnce:
+    """预热任务启动测试"""
+
+    def test_warm_up_starts_once_per_process(self, monkeypatch):
+        monkeypatch.setattr(builder, "Neo4jRetriever", FakeGraphRetriever)
+        monkeypatch.setattr(builder, "BM25_INDEX_DIR", "")
+        monkeypatch.setattr(builder, "EVENT_NETWORK_WARM_UP_INTERVAL", 300.0)
+        monkeypatch.setattr(builder, "_warm_up_thread", None)
+        monkeypatch.setattr(FakeGraphRetriever, "started", [])
+        shared = EventNetworkCache()
+        monkeypatch.setattr(builder, "get_shared_network_cache", lambda: shared)
+
+        first = builder.build_graph_retriever()
+        second = builder.build_graph_retriever()
+
+        assert first.network_cache is second.network_cache is shared
+        assert len(FakeGraphRetriever.started) == 1
+
+        # 驱动预热的检索器关闭后，下一个检索器接手
+        first.stop.set()
+        FakeGraphRetriever.started[0].join(timeout=5)
+        third = builder.build_graph_retriever()
+        assert len(FakeGraphRetriever.started) == 2
+        third.stop.set()
+        second.stop.set()
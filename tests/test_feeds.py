@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+订阅源测试：RSS/Atom/站点地图解析、已见GUID去重，以及用本地HTTP服务验证条件请求轮询和退避
+"""
+
+import asyncio
+import gzip
+import sys
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from crawler.feeds import FeedEntry, FeedPoller, FeedState, FeedStore, parse_feed
+from crawler.transport import CrawlTransport
+
+
+RSS = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>News</title><ttl>60</ttl>
+<item><title>Lights over the lake</title><link>/news/1</link><guid isPermaLink="false">item-1</guid>
+<pubDate>Mon, 15 Jan 2024 20:00:00 +0800</pubDate></item>
+<item><title>Only a guid</title><guid>https://example.com/news/2</guid></item>
+<item><title>No link</title></item>
+</channel></rss>"""
+
+ATOM = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom"><title>Blog</title>
+<entry><title>First</title><id>urn:uuid:1</id>
+<link rel="self" href="https://example.com/self"/><link href="https://example.com/posts/1"/>
+<updated>2024-01-16T08:00:00Z</updated></entry>
+<entry><title>Edit only</title><id>urn:uuid:2</id><link rel="edit" href="https://example.com/edit"/></entry>
+</feed>"""
+
+NEWS_SITEMAP = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"
+        xmlns:news="http://www.google.com/schemas/sitemap-news/0.9">
+<url><loc>https://example.com/a</loc><news:news><news:title>Orb sighting</news:title>
+<news:publication_date>2024-01-15T12:00:00+08:00</news:publication_date></news:news></url>
+<url><loc>https://example.com/b</loc><lastmod>2024-01-10</lastmod></url>
+</urlset>"""
+
+SITEMAP_INDEX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+<sitemap><loc>/sitemap-news-1.xml</loc><lastmod>2024-01-15</lastmod></sitemap>
+<sitemap><loc>https://example.com/sitemap-news-2.xml</loc></sitemap>
+</sitemapindex>"""
+
+
+class TestParseFeed:
+    """订阅源解析测试"""
+
+    def test_rss(self):
+        parsed = parse_feed(RSS, "https://example.com/rss.xml")
+
+        assert parsed.kind == "rss"
+        assert parsed.ttl_minutes == 60
+        assert [(entry.url, entry.guid) for entry in parsed.entries] == [
+            ("https://example.com/news/1", "item-1"),
+            ("https://example.com/news/2", "https://example.com/news/2"),
+        ]
+        assert parsed.entries[0].title == "Lights over the lake"
+        assert parsed.entries[0].published == datetime(2024, 1, 15, 12, 0, tzinfo=timezone.utc)
+
+    def test_atom_uses_alternate_link(self):
+        parsed = parse_feed(ATOM, "https://example.com/atom.xml")
+
+        assert parsed.kind == "atom"
+        assert [(entry.url, entry.guid) for entry in parsed.entries] == [("https://example.com/posts/1", "urn:uuid:1")]
+        assert parsed.entries[0].published == datetime(2024, 1, 16, 8, 0, tzinfo=timezone.utc)
+
+    def test_news_sitemap(self):
+        parsed = parse_feed(NEWS_SITEMAP, "https://example.com/sitemap_news.xml")
+
+        assert parsed.kind == "sitemap"
+        first, second = parsed.entries
+        assert (first.url, first.title) == ("https://example.com/a", "Orb sighting")
+        assert first.published == datetime(2024, 1, 15, 4, 0, tzinfo=timezone.utc)
+        # 没有news扩展时用lastmod
+        assert second.published == datetime(2024, 1, 10, tzinfo=timezone.utc)
+
+    def test_sitemap_index(self):
+        parsed = parse_feed(SITEMAP_INDEX, "https://example.com/sitemap.xml")
+
+        assert parsed.kind == "sitemapindex"
+        assert parsed.entries == []
+        assert parsed.children == [
+            ("https://example.com/sitemap-news-1.xml", "2024-01-15"),
+            ("https://example.com/sitemap-news-2.xml", None),
+        ]
+
+    def test_gzip_body(self):
+        parsed = parse_feed(gzip.compress(NEWS_SITEMAP), "https://example.com/sitemap_news.xml.gz")
+
+        assert parsed.kind == "sitemap"
+        assert len(parsed.entries) == 2
+
+    @pytest.mark.parametrize("body", [b"", b"<html><body>not a feed</body></html>", b"\x00\x01"])
+    def test_unknown(self, body):
+        assert parse_feed(body, "https://example.com/feed").kind == "unknown"
+
+
+class TestFeedStore:
+    """已见条目去重测试"""
+
+    def test_filter_new_dedups_by_guid_and_url(self, tmp_path):
+        store = FeedStore(str(tmp_path / "frontier.db"))
+        feed = "https://example.com/rss.xml"
+        first = [
+            FeedEntry(url="https://example.com/news/1", guid="item-1", feed_url=feed),
+            FeedEntry(url="https://example.com/news/2", guid="item-2", feed_url=feed),
+        ]
+
+        assert store.filter_new(first) == first
+        again = [
+            # GUID相同
+            FeedEntry(url="https://example.com/news/1?moved", guid="item-1", feed_url=feed),
+            # 规范化后URL相同
+            FeedEntry(url="https://EXAMPLE.com/news/2#comments", guid="other-feed-2", feed_url=feed),
+            FeedEntry(url="https://example.com/news/3", guid="item-3", feed_url=feed),
+        ]
+        assert [entry.guid for entry in store.filter_new(again)] == ["item-3"]
+        assert store.get_stats() == {"feeds": 0, "items_seen": 3}
+
+        # 重新打开后仍记得已见条目
+        store.close()
+        reopened = FeedStore(str(tmp_path / "frontier.db"))
+        assert reopened.filter_new(first) == []
+        reopened.close()
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    """返回可变内容的RSS，支持ETag条件请求"""
+
+    version = 1
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        etag = f'"v{FeedHandler.version}"'
+        FeedHandler.requests.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        items = "".join(
+            f"<item><title>Item {i}</title><link>/news/{i}</link><guid>item-{i}</guid></item>"
+            for i in range(1, FeedHandler.version + 1)
+        )
+        payload = f'<?xml version="1.0"?><rss version="2.0"><channel>{items}</channel></rss>'.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def feed_server():
+    FeedHandler.version = 1
+    FeedHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+class TestFeedPoller:
+    """条件请求轮询与退避测试"""
+
+    def test_conditional_polling_backs_off_and_resets(self, feed_server, tmp_path):
+        store = FeedStore(str(tmp_path / "frontier.db"))
+        feed_url = f"{feed_server}/rss.xml"
+        store.add_feed(FeedState(feed_url=feed_url, source_name="test", source_type="news", interval=100.0))
+        poller = FeedPoller(store=store, transport=CrawlTransport(default_rate_limit=6000),
+                            base_interval=100.0, max_interval=200.0, backoff_factor=1.5)
+
+        async def poll_twice_then_update():
+            async with poller:
+                first = await poller.poll(store.get_feed(feed_url))
+                unchanged = await poller.poll(store.get_feed(feed_url))
+                backed_off = store.get_feed(feed_url)
+                capped = await poller.poll(store.get_feed(feed_url))
+                capped_state = store.get_feed(feed_url)
+                FeedHandler.version = 2
+                updated = await poller.poll(store.get_feed(feed_url))
+                return first, unchanged, backed_off, capped, capped_state, updated
+
+        first, unchanged, backed_off, capped, capped_state, updated = asyncio.run(poll_twice_then_update())
+
+        assert [entry.guid for entry in first] == ["item-1"]
+        # 第二次带上ETag，304后间隔按系数拉长
+        assert FeedHandler.requests[:2] == [None, '"v1"']
+        assert unchanged == [] and backed_off.interval == 150.0
+        assert backed_off.next_poll_at == pytest.approx(backed_off.last_polled_at + 150.0)
+        assert capped == [] and capped_state.interval == 200.0
+        # 有新条目时只返回未见过的，并恢复基础间隔
+        assert [entry.guid for entry in updated] == ["item-2"]
+        state = store.get_feed(feed_url)
+        assert (state.interval, state.last_new_items, state.etag) == (100.0, 1, '"v2"')
+        store.close()
+
+    def test_failed_poll_is_rescheduled(self, tmp_path):
+        store = FeedStore(str(tmp_path / "frontier.db"))
+        feed_url = "http://127.0.0.1:9/rss.xml"
+        store.add_feed(FeedState(feed_url=feed_url, source_name="test", source_type="news", interval=100.0))
+        poller = FeedPoller(store=store, transport=CrawlTransport(), base_interval=100.0, backoff_factor=2.0)
+
+        async def poll():
+            async with poller:
+                return await poller.poll(store.get_feed(feed_url))
+
+        assert asyncio.run(poll()) == []
+        assert store.get_feed(feed_url).interval == 200.0
+        store.close()
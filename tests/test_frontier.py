@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抓取边界测试：规范化URL去重和原始URL抓取
+"""
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from crawler.frontier import CrawlFrontier, canonicalize_url
+
+
+class TestCrawlFrontier:
+    """抓取边界测试"""
+
+    def test_canonical_url_is_dedup_key_only(self):
+        frontier = CrawlFrontier(":memory:", politeness_delay=0)
+
+        assert frontier.add("https://www.example.com/a/./b?id=3&utm_source=feed#top", "news")
+        assert not frontier.add("https://example.com/a/b?id=3", "news")
+
+        [entry] = frontier.next_batch()
+        # 抓取使用原始URL（只去掉片段），规范化URL作为去重和状态键
+        assert entry.url == "https://www.example.com/a/./b?id=3&utm_source=feed"
+        assert entry.key == "https://example.com/a/b?id=3"
+        assert entry.key == canonicalize_url(entry.url)
+
+        frontier.mark_done(entry.url)
+        assert frontier.get_stats()["done"] == 1
+
+    def test_failed_entry_is_requeued_with_original_url(self):
+        frontier = CrawlFrontier(":memory:", politeness_delay=0, max_attempts=1)
+        frontier.add("https://www.example.com/page?ref=home", "news")
+
+        [entry] = frontier.next_batch()
+        frontier.mark_failed(entry.url, error="timeout")
+
+        assert frontier.get_stats()["failed"] == 1
@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图存储后端测试：Elasticsearch使用本地假HTTP服务，Neo4j使用记录调用的假驱动
+"""
+
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+from neo4j.exceptions import ClientError, ServiceUnavailable
+from requests.adapters import HTTPAdapter
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import tools.graph_storage as graph_storage
+from rag.elasticsearch_retriever import INDEX_MAPPINGS
+from tools.graph_storage import (
+    ElasticsearchStorage,
+    GraphBuilder,
+    GraphNode,
+    GraphRelationship,
+    GraphStorageManager,
+    Neo4jStorage,
+    elasticsearch_sink,
+    get_storage_outbox,
+    neo4j_sink,
+    query_related_events,
+    store_event_graph,
+)
+from tools.outbox import StorageOutbox
+
+
+class FakeElasticsearch(BaseHTTPRequestHandler):
+    """模拟建索引、_bulk、_search和删除接口的最小Elasticsearch"""
+
+    indices = {}
+    documents = {}
+    bulk_requests = []
+    rejected_once = set()
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_HEAD(self):
+        self.send_response(200 if self.path.strip("/") in self.indices else 404)
+        self.end_headers()
+
+    def do_PUT(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.indices[self.path.strip("/")] = body
+        self._reply(200, {"acknowledged": True})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.path == "/_bulk":
+            lines = [json.loads(line) for line in body.splitlines() if line.strip()]
+            type(self).bulk_requests.append(len(lines) // 2)
+            items = []
+            for header, source in zip(lines[::2], lines[1::2]):
+                meta = header["index"]
+                doc_id = meta["_id"]
+                location = source.get("location")
+                if doc_id.startswith("bad") or (
+                    location is not None and not (isinstance(location, dict) and set(location) == {"lat", "lon"})
+                ):
+                    items.append({"index": {"_id": doc_id, "status": 400, "error": {
+                        "type": "mapper_parsing_exception", "reason": "failed to parse"
+                    }}})
+                elif doc_id.startswith("busy") and doc_id not in self.rejected_once:
+                    self.rejected_once.add(doc_id)
+                    items.append({"index": {"_id": doc_id, "status": 429, "error": {
+                        "type": "es_rejected_execution_exception", "reason": "queue full"
+                    }}})
+                else:
+                    self.documents[(meta["_index"], doc_id)] = source
+                    items.append({"index": {"_id": doc_id, "status": 201}})
+            self._reply(200, {"errors": any(item["index"]["status"] >= 300 for item in items), "items": items})
+        elif self.path.endswith("/_search"):
+            index = self.path.split("/")[1]
+            hits = [
+                {"_id": doc_id, "_score": 1.0, "_source": source}
+                for (doc_index, doc_id), source in self.documents.items() if doc_index == index
+            ]
+            self._reply(200, {"hits": {"total": {"value": len(hits)}, "max_score": 1.0, "hits": hits}})
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_DELETE(self):
+        _, index, _, doc_id = self.path.split("/")
+        if self.documents.pop((index, doc_id), None) is None:
+            self._reply(404, {"result": "not_found"})
+        else:
+            self._reply(200, {"result": "deleted"})
+
+
+@pytest.fixture
+def es_server():
+    FakeElasticsearch.indices = {}
+    FakeElasticsearch.documents = {}
+    FakeElasticsearch.bulk_requests = []
+    FakeElasticsearch.rejected_once = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeElasticsearch)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+class FakeTransaction:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def run(self, query, **params):
+        self.driver.queries.append((query, params))
+        for marker, error in self.driver.errors.items():
+            if marker in query:
+                raise error
+        rows = params.get("rows", [])
+        # 模拟端点不存在的关系：MATCH失败，不返回该行
+        return [{"id": row["id"]} for row in rows if row.get("source_id") != "missing"]
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def run(self, query, parameters=None, **params):
+        self.driver.queries.append((query, {**(parameters or {}), **params}))
+        return []
+
+    def execute_write(self, work):
+        return work(FakeTransaction(self.driver))
+
+
+class FakeDriver:
+    def __init__(self):
+        self.queries = []
+        # 查询片段 -> 执行该写事务时抛出的异常
+        self.errors = {}
+
+    def session(self):
+        return FakeSession(self)
+
+    def close(self):
+        pass
+
+
+class TestElasticsearchStorage:
+    """Elasticsearch _bulk写入测试"""
+
+    def test_bulk_index_chunks_and_reports_failures(self, es_server):
+        storage = ElasticsearchStorage(url=es_server, max_actions=3, workers=2)
+        documents = [{"id": f"doc_{i}", "title": f"事件{i}"} for i in range(7)]
+        documents.append({"id": "bad_1", "title": "坏文档"})
+
+        result = storage.bulk_index("mystery_events", documents)
+
+        assert result["indexed_documents"] == 7
+        assert result["status"] == "partial"
+        assert result["failures"] == [
+            {"id": "bad_1", "status": 400, "error": "mapper_parsing_exception: failed to parse"}
+        ]
+        assert max(FakeElasticsearch.bulk_requests) <= 3
+        assert sum(FakeElasticsearch.bulk_requests) == 8
+
+    def test_chunk_bytes_limit(self, es_server):
+        storage = ElasticsearchStorage(url=es_server, chunk_bytes=200, workers=1)
+        documents = [{"id": f"doc_{i}", "description": "x" * 80} for i in range(5)]
+
+        result = storage.bulk_index("mystery_events", documents)
+
+        assert result["indexed_documents"] == 5
+        assert len(FakeElasticsearch.bulk_requests) == 5
+
+    def test_rejected_items_are_retried(self, es_server, monkeypatch):
+        monkeypatch.setattr("tools.graph_storage.time.sleep", lambda seconds: None)
+        storage = ElasticsearchStorage(url=es_server, workers=1)
+
+        result = storage.bulk_index("mystery_events", [{"id": "busy_1"}, {"id": "doc_1"}])
+
+        assert result["status"] == "success"
+        assert result["indexed_documents"] == 2
+        assert FakeElasticsearch.bulk_requests == [2, 1]
+
+    def test_search_and_delete(self, es_server):
+        storage = ElasticsearchStorage(url=es_server)
+        storage.bulk_index("mystery_events", [{"id": "doc_1", "title": "UFO"}])
+
+        search = json.loads(storage._run("search", "mystery_events", query=json.dumps({"match_all": {}})))
+        assert search["total_hits"] == 1
+        assert search["hits"][0]["_source"]["title"] == "UFO"
+
+        deleted = json.loads(storage._run("delete", "mystery_events", data=json.dumps({"id": "doc_1"})))
+        assert deleted["status"] == "success"
+        missing = json.loads(storage._run("delete", "mystery_events", data=json.dumps({"id": "doc_1"})))
+        assert missing["status"] == "not_found"
+
+    def test_unreachable_server_reports_every_item(self):
+        storage = ElasticsearchStorage(url="http://127.0.0.1:9", workers=1)
+        storage.client.mount("http://", HTTPAdapter(max_retries=0))
+
+        result = storage.bulk_index("mystery_events", [{"id": "doc_1"}, {"id": "doc_2"}])
+
+        assert result["status"] == "failed"
+        assert [failure["id"] for failure in result["failures"]] == ["doc_1", "doc_2"]
+
+    def test_sink_maps_location_strings_to_address(self, es_server):
+        storage = ElasticsearchStorage(url=es_server)
+        events = [
+            {"id": "event_1", "title": "湖面发光", "location": "北京市 颐和园"},
+            {"id": "event_2", "title": "山顶光球", "location": {"lat": "39.9", "lon": 116.4, "address": "北京"}},
+            {"id": "event_3", "title": "古宅怪声", "location": {"name": "上海"}, "address": "上海市 老城区"},
+        ]
+
+        rejected = elasticsearch_sink(storage)(events)
+
+        assert rejected == []
+        # 首次写入前按显式映射建索引
+        assert FakeElasticsearch.indices["mystery_events"]["mappings"] == INDEX_MAPPINGS
+        first = FakeElasticsearch.documents[("mystery_events", "event_1")]
+        assert "location" not in first and first["address"] == "北京市 颐和园"
+        second = FakeElasticsearch.documents[("mystery_events", "event_2")]
+        assert second["location"] == {"lat": 39.9, "lon": 116.4}
+        assert second["address"] == "北京"
+        third = FakeElasticsearch.documents[("mystery_events", "event_3")]
+        assert "location" not in third and third["address"] == "上海市 老城区"
+        # 发件箱中的原始事件不被修改
+        assert events[0]["location"] == "北京市 颐和园"
+
+    def test_index_events_creates_index_once(self, es_server):
+        storage = ElasticsearchStorage(url=es_server)
+        FakeElasticsearch.indices["events_v2"] = {"mappings": {}}
+
+        result = storage.index_events("mystery_events", [{"id": "event_1", "location": "北京市 颐和园"}])
+        storage.index_events("mystery_events", [{"id": "event_2"}])
+        storage.index_events("events_v2", [{"id": "event_3"}])
+
+        assert result["indexed_documents"] == 1
+        assert FakeElasticsearch.indices["mystery_events"]["settings"]["analysis"]["analyzer"]["cjk_text"]
+        # 已存在的索引不重建
+        assert FakeElasticsearch.indices["events_v2"] == {"mappings": {}}
+        assert storage.event_indices == {"mystery_events", "events_v2"}
+        assert FakeElasticsearch.documents[("mystery_events", "event_1")]["address"] == "北京市 颐和园"
+
+
+class TestNeo4jStorage:
+    """Neo4j UNWIND批量写入测试"""
+
+    def test_store_graph_batches_by_label_and_type(self):
+        driver = FakeDriver()
+        storage = Neo4jStorage(driver=driver, batch_size=2)
+        nodes = [GraphNode(id=f"event_{i}", label="Event", properties={"title": f"事件{i}"}, node_type="event")
+                 for i in range(3)]
+        nodes.append(GraphNode(id="location_1", label="Location",
+                               properties={"coords": {"lat": 1.0, "lon": 2.0}}, node_type="location"))
+        relationships = [
+            GraphRelationship(id="rel_1", source_id="event_0", target_id="location_1",
+                              relationship_type="OCCURRED_AT", properties={}),
+            GraphRelationship(id="rel_2", source_id="missing", target_id="location_1",
+                              relationship_type="OCCURRED_AT", properties={}),
+        ]
+
+        result = storage.store_graph(nodes, relationships)
+
+        assert result["stored_nodes"] == 4
+        assert result["stored_relationships"] == 1
+        assert result["failures"] == [
+            {"kind": "relationship", "id": "rel_2", "error": "source or target node not found"}
+        ]
+        writes = [(query, params["rows"]) for query, params in driver.queries if "UNWIND" in query]
+        event_batches = [len(rows) for query, rows in writes if "MERGE (n:Event" in query]
+        assert event_batches == [2, 1]
+        rel_query = next(query for query, _ in writes if "OCCURRED_AT" in query)
+        assert "MATCH (a:Event" in rel_query and "MATCH (b:Location" in rel_query
+        location_rows = next(rows for query, rows in writes if "MERGE (n:Location" in query)
+        assert location_rows[0]["properties"]["coords"] == json.dumps({"lat": 1.0, "lon": 2.0})
+
+    def test_invalid_identifiers_are_reported_not_executed(self):
+        driver = FakeDriver()
+        storage = Neo4jStorage(driver=driver)
+        nodes = [GraphNode(id="n1", label="Event) DETACH DELETE (x", properties={}, node_type="event")]
+        relationships = [GraphRelationship(id="r1", source_id="a", target_id="b",
+                                           relationship_type="KNOWS]->()", properties={})]
+
+        result = storage.store_graph(nodes, relationships)
+
+        assert result["status"] == "failed"
+        assert [failure["id"] for failure in result["failures"]] == ["n1", "r1"]
+        assert not any("DETACH" in query or "KNOWS" in query for query, _ in driver.queries)
+
+    def test_related_events_query_is_parameterized(self, monkeypatch):
+        driver = FakeDriver()
+        monkeypatch.setattr("tools.graph_storage.Neo4jStorage", lambda: Neo4jStorage(driver=driver))
+
+        result = json.loads(query_related_events.invoke(
+            {"event_id": "e1' OR 1=1 //", "relationship_types": ["SIMILAR_TO", "NEAR"], "max_depth": 99}
+        ))
+
+        assert result["status"] == "success"
+        query, params = driver.queries[-1]
+        assert params == {"event_id": "e1' OR 1=1 //"}
+        assert "{id: $event_id}" in query
+        assert "[r:SIMILAR_TO|NEAR*1..5]" in query
+
+    def test_related_events_rejects_invalid_relationship_types(self, monkeypatch):
+        driver = FakeDriver()
+        monkeypatch.setattr("tools.graph_storage.Neo4jStorage", lambda: Neo4jStorage(driver=driver))
+
+        result = json.loads(query_related_events.invoke(
+            {"event_id": "e1", "relationship_types": ["NEAR]-() DETACH DELETE (x"]}
+        ))
+
+        assert "error" in result
+        assert driver.queries == []
+
+
+class TestGraphBuilder:
+    """实体去重的流式图构建测试"""
+
+    def test_witnesses_and_locations_are_interned(self):
+        events = [
+            {"id": f"event_{i}", "title": f"事件{i}", "location": {"lat": 39.9042, "lon": 116.4074 + i * 1e-5},
+             "witnesses": [{"name": "张三", "credibility": 0.9}, {"name": " 张三 "}, {"name": "Li  Si"}]}
+            for i in range(3)
+        ]
+        events.append({"id": "event_3", "witnesses": [{"name": "li si"}], "location": "Beijing"})
+
+        batches = list(GraphBuilder().iter_batches(events, batch_size=2))
+
+        assert len(batches) == 2
+        nodes = [node for batch in batches for node in batch["nodes"]]
+        assert len(nodes) == len({node["id"] for node in nodes})
+        labels = [node["label"] for node in nodes]
+        assert labels.count("Person") == 2
+        assert labels.count("Location") == 2
+        assert labels.count("Event") == 4
+        witnessed = [rel for batch in batches for rel in batch["relationships"] if rel["relationship_type"] == "WITNESSED"]
+        assert len(witnessed) == 10
+
+    def test_streamed_batches_match_by_label(self):
+        driver = FakeDriver()
+        storage = Neo4jStorage(driver=driver)
+        events = [{"id": f"event_{i}", "witnesses": [{"name": "王五"}]} for i in range(3)]
+
+        result = store_event_graph(storage, events, batch_size=1)
+
+        assert result["status"] == "success"
+        assert result["stored_nodes"] == 4
+        assert result["stored_relationships"] == 3
+        rel_queries = [query for query, _ in driver.queries if "WITNESSED" in query]
+        assert len(rel_queries) == 3
+        assert all("MATCH (a:Person" in query and "MATCH (b:Event" in query for query in rel_queries)
+
+
+class TestNeo4jSink:
+    """发件箱Neo4j写入函数的失败映射测试"""
+
+    EVENTS = [
+        {"id": "event_1", "location": "北京", "witnesses": ["张三"]},
+        {"id": "event_2", "witnesses": ["张三"]},
+        {"id": "event_3", "location": "上海"},
+    ]
+
+    def test_retryable_errors_are_raised(self):
+        driver = FakeDriver()
+        driver.errors["MERGE (n:Person"] = ServiceUnavailable("connection lost")
+
+        with pytest.raises(ServiceUnavailable):
+            neo4j_sink(Neo4jStorage(driver=driver))(self.EVENTS)
+
+    def test_entity_failures_map_to_owning_events(self):
+        driver = FakeDriver()
+        driver.errors["MERGE (n:Person"] = ClientError("constraint violation")
+
+        # 人物节点失败时，连到它的所有事件都要重试
+        assert neo4j_sink(Neo4jStorage(driver=driver))(self.EVENTS) == ["event_1", "event_2"]
+
+    def test_relationship_failures_map_to_owning_events(self):
+        driver = FakeDriver()
+        driver.errors["OCCURRED_AT"] = ClientError("constraint violation")
+
+        assert neo4j_sink(Neo4jStorage(driver=driver))(self.EVENTS) == ["event_1", "event_3"]
+
+
+class TestStorageOutbox:
+    """发件箱投递、重放和死信测试"""
+
+    def test_sinks_drain_independently_and_resume_after_restart(self, tmp_path):
+        db_path = str(tmp_path / "outbox.db")
+        delivered = {"neo4j": [], "elasticsearch": []}
+        es_down = {"value": True}
+
+        def neo4j(events):
+            delivered["neo4j"].extend(event["id"] for event in events)
+            return []
+
+        def elasticsearch(events):
+            if es_down["value"]:
+                raise ConnectionError("connection refused")
+            delivered["elasticsearch"].extend(event["id"] for event in events)
+            return []
+
+        outbox = StorageOutbox(db_path, {"neo4j": neo4j, "elasticsearch": elasticsearch}, batch_size=2)
+        outbox.append((f"event_{i}", {"id": f"event_{i}"}) for i in range(5))
+        while outbox.deliver("neo4j"):
+            pass
+        with pytest.raises(ConnectionError):
+            outbox.deliver("elasticsearch")
+
+        stats = outbox.get_stats()
+        assert stats["sinks"]["neo4j"]["lag_records"] == 0
+        assert stats["sinks"]["elasticsearch"]["lag_records"] == 5
+        outbox.close()
+
+        # 重启后Elasticsearch从持久化的确认位置继续
+        es_down["value"] = False
+        outbox = StorageOutbox(db_path, {"neo4j": neo4j, "elasticsearch": elasticsearch}, batch_size=2, poll_interval=0.05)
+        outbox.start()
+        assert outbox.wait_until_drained(timeout=5)
+        outbox.close()
+
+        assert delivered["neo4j"] == [f"event_{i}" for i in range(5)]
+        assert delivered["elasticsearch"] == [f"event_{i}" for i in range(5)]
+
+    def test_item_failures_retry_then_dead_letter(self, tmp_path):
+        attempts = []
+
+        def sink(events):
+            attempts.append([event["id"] for event in events])
+            return ["bad"]
+
+        outbox = StorageOutbox(str(tmp_path / "outbox.db"), {"es": sink}, max_attempts=2)
+        outbox.append([("good", {"id": "good"}), ("bad", {"id": "bad"}), ("good", {"id": "good", "v": 2})])
+
+        outbox.deliver("es")
+        outbox.deliver("es")
+
+        # 同一键在批内只投递最新记录；失败条目重试一次后转入死信
+        assert attempts == [["good", "bad"], ["bad", "good"]]
+        stats = outbox.get_stats()["sinks"]["es"]
+        assert stats["lag_records"] == 0
+        assert stats["dead_letters"] == 1
+        outbox.close()
+
+
+class TestSharedStorageOutbox:
+    """共享发件箱测试"""
+
+    def test_manager_opens_outbox_on_first_write_with_its_storages(self, es_server, tmp_path, monkeypatch):
+        db_path = tmp_path / "storage_outbox.db"
+        monkeypatch.setattr(graph_storage, "STORAGE_OUTBOX_ENABLED", True)
+        monkeypatch.setattr(graph_storage, "STORAGE_OUTBOX_DB", str(db_path))
+        monkeypatch.setattr(graph_storage, "_storage_outboxes", {})
+        manager = GraphStorageManager()
+        driver = FakeDriver()
+        manager.neo4j_storage = Neo4jStorage(driver=driver)
+        manager.elasticsearch_storage = ElasticsearchStorage(url=es_server)
+
+        # 构造管理器不创建发件箱文件，也不启动投递线程
+        assert not db_path.exists()
+        assert graph_storage._storage_outboxes == {}
+
+        result = manager.store_mystery_events(json.dumps([{"id": "event_1", "title": "湖面发光", "location": "北京"}]))
+        try:
+            assert result["status"] == "accepted"
+            assert db_path.exists()
+            assert manager.outbox.wait_until_drained(timeout=5)
+        finally:
+            manager.outbox.close()
+
+        assert FakeElasticsearch.documents[("mystery_events", "event_1")]["address"] == "北京"
+        assert any("MERGE (n:Event" in query for query, _ in driver.queries)
+
+    def test_one_outbox_per_db_path(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(graph_storage, "_storage_outboxes", {})
+        storage = Neo4jStorage(driver=FakeDriver())
+        es = ElasticsearchStorage(url="http://127.0.0.1:9")
+
+        first = get_storage_outbox(str(tmp_path / "a.db"), storage, es)
+        try:
+            assert get_storage_outbox(str(tmp_path / "." / "a.db")) is first
+            second = get_storage_outbox(str(tmp_path / "b.db"), storage, es)
+            assert second is not first
+            second.close()
+        finally:
+            first.close()
+
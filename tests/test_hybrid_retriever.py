@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+混合检索器测试：RRF融合去重、慢后端超时后返回部分结果
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from rag.hybrid_retriever import HybridRetriever, document_key, normalize_url, reciprocal_rank_fusion
+from rag.retriever import Chunk, Document, MysteryEvent, Retriever
+
+
+class StaticRetriever(Retriever):
+    """返回固定结果的检索后端，可选延迟或抛错"""
+
+    def __init__(self, documents=(), events=(), delay=0.0, error=None):
+        self.documents = list(documents)
+        self.events = list(events)
+        self.delay = delay
+        self.error = error
+        self.released = threading.Event()
+
+    def _respond(self, result):
+        if self.delay:
+            self.released.wait(self.delay)
+        if self.error is not None:
+            raise self.error
+        return result
+
+    def list_resources(self, query=None):
+        return []
+
+    def query_relevant_documents(self, query, resources=None):
+        return self._respond(self.documents)
+
+    def query_mystery_events(self, query, event_type=None, location=None, date_range=None, min_credibility=0.0):
+        return self._respond(self.events)
+
+    def store_mystery_event(self, event):
+        return self._respond(True)
+
+    def find_related_events(self, event, similarity_threshold=0.7):
+        return self._respond(self.events)
+
+
+class SlowRetriever(StaticRetriever):
+    pass
+
+
+class FailingRetriever(StaticRetriever):
+    pass
+
+
+def _document(doc_id, url=None, chunks=("片段",), title="标题"):
+    return Document(id=doc_id, url=url, title=title, chunks=[Chunk(text, 0.5) for text in chunks])
+
+
+class TestReciprocalRankFusion:
+    """RRF融合测试"""
+
+    def test_normalize_url(self):
+        assert normalize_url("HTTPS://Example.COM/a/b/#frag") == "https://example.com/a/b"
+        assert normalize_url("https://example.com") == "https://example.com/"
+        assert normalize_url("") is None
+
+    def test_duplicates_across_backends_are_merged(self):
+        first = [_document("a1", "https://example.com/a", ["湖面发光"]), _document("b1", "https://example.com/b")]
+        second = [_document("a2", "HTTPS://EXAMPLE.com/a/", ["湖面发光", "向北飞去"])]
+
+        fused = reciprocal_rank_fusion([("es", first), ("neo4j", second)], document_key, k=60)
+
+        assert [document.id for _, document, _ in fused] == ["a1", "b1"]
+        score, merged, sources = fused[0]
+        assert sources == ["es", "neo4j"]
+        assert score == pytest.approx(2 / 61)
+        # 相同内容的块只保留一份
+        assert [chunk.content for chunk in merged.chunks] == ["湖面发光", "向北飞去"]
+
+    def test_duplicates_within_backend_count_once(self):
+        ranked = [("es", [_document("a", "https://example.com/a"), _document("a_dup", "https://example.com/a")])]
+
+        fused = reciprocal_rank_fusion(ranked, document_key, k=60)
+
+        assert len(fused) == 1
+        assert fused[0][0] == pytest.approx(1 / 61)
+
+    def test_documents_without_url_dedup_by_content(self):
+        ranked = [
+            ("es", [_document("x", chunks=["Glowing  orb"])]),
+            ("neo4j", [_document("y", chunks=["glowing orb"]), _document("z", chunks=["其他内容"])]),
+        ]
+
+        fused = reciprocal_rank_fusion(ranked, document_key, k=60)
+
+        assert [document.id for _, document, _ in fused] == ["x", "z"]
+
+    def test_weights_change_order(self):
+        ranked = [("es", [_document("a", "https://example.com/a")]), ("neo4j", [_document("b", "https://example.com/b")])]
+
+        fused = reciprocal_rank_fusion(ranked, document_key, k=60, weights={"neo4j": 2.0})
+
+        assert [document.id for _, document, _ in fused] == ["b", "a"]
+
+
+class TestHybridRetriever:
+    """混合检索器测试"""
+
+    def test_results_are_fused_and_annotated(self):
+        shared = "https://example.com/shared"
+        hybrid = HybridRetriever([
+            StaticRetriever([_document("a", shared), _document("b", "https://example.com/b")]),
+            SlowRetriever([_document("c", shared)]),
+        ])
+        try:
+            documents = hybrid.query_relevant_documents("发光")
+        finally:
+            hybrid.close()
+
+        assert [document.id for document in documents] == ["a", "b"]
+        assert documents[0].metadata["retrievers"] == ["StaticRetriever", "SlowRetriever"]
+        assert documents[0].metadata["rrf_score"] > documents[1].metadata["rrf_score"]
+
+    def test_timeout_returns_partial_results(self):
+        slow = SlowRetriever([_document("slow", "https://example.com/slow")], delay=5.0)
+        hybrid = HybridRetriever(
+            [StaticRetriever([_document("fast", "https://example.com/fast")]), slow],
+            timeout=2.0, timeouts={"SlowRetriever": 0.1}
+        )
+        try:
+            started = time.monotonic()
+            documents = hybrid.query_relevant_documents("发光")
+            elapsed = time.monotonic() - started
+        finally:
+            slow.released.set()
+            hybrid.close()
+
+        assert [document.id for document in documents] == ["fast"]
+        assert elapsed < 2.0
+        assert hybrid.last_report["StaticRetriever"]["status"] == "ok"
+        assert hybrid.last_report["SlowRetriever"]["status"] == "timeout"
+
+    def test_failing_backend_is_skipped(self):
+        event = MysteryEvent("e1", "ufo", "湖面发光", "描述", source_url="https://example.com/e1")
+        hybrid = HybridRetriever([
+            StaticRetriever(events=[event]),
+            FailingRetriever(error=RuntimeError("connection refused")),
+        ])
+        try:
+            events = hybrid.query_mystery_events("发光")
+        finally:
+            hybrid.close()
+
+        assert [item.event_id for item in events] == ["e1"]
+        report = hybrid.last_report["FailingRetriever"]
+        assert (report["status"], report["error"]) == ("error", "connection refused")
+
+    def test_find_related_excludes_source_event(self):
+        source = MysteryEvent("e1", "ufo", "湖面发光", "描述", source_url="https://example.com/e1")
+        related = MysteryEvent("e2", "ufo", "山顶发光", "描述", source_url="https://example.com/e2")
+        hybrid = HybridRetriever([StaticRetriever(events=[source, related])])
+        try:
+            events = hybrid.find_related_events(source)
+        finally:
+            hybrid.close()
+
+        assert [event.event_id for event in events] == ["e2"]
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+摄取流水线测试：使用本地HTTP服务提供文章页面，走完抓取到存储的全部阶段
+"""
+
+import asyncio
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from crawler.http_cache import HTTPResponseCache
+from crawler.ingest import IngestPipeline
+from crawler.transport import CrawlTransport
+
+
+ARTICLE_HTML = """<html><head><title>湖面上空的发光物体</title>
+<meta name="author" content="记者"><meta property="article:published_time" content="2024-01-16"></head>
+<body><article><h1>湖面上空的发光物体</h1>
+<p>2024年1月15日晚上8点，多名目击者在湖边看到一个发光的圆盘形物体在湖面上空悬停，随后快速向北移动。</p>
+<p>一位目击者表示，物体发出低沉的嗡嗡声，持续约三分钟，附近车辆的收音机出现了明显的干扰。</p>
+<p>当地气象部门称当晚没有异常天气，机场雷达记录仍在调取中，研究人员计划走访更多目击者。</p>
+</article></body></html>"""
+
+
+class ArticleHandler(BaseHTTPRequestHandler):
+    """返回固定文章页面，带ETag并支持条件请求"""
+
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        ArticleHandler.requests.append(self.path)
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        payload = ARTICLE_HTML.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def article_server():
+    ArticleHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ArticleHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+class TestIngestPipeline:
+    """摄取流水线测试"""
+
+    def test_ingests_one_document_with_default_scorer(self, article_server, tmp_path):
+        stored = []
+        pipeline = IngestPipeline(
+            transport=CrawlTransport(),
+            http_cache=HTTPResponseCache(str(tmp_path / "http_cache.db")),
+            sinks=[stored.extend],
+            min_text_length=50
+        )
+
+        url = f"{article_server}/news/1"
+        asyncio.run(pipeline.run([url, url], source_type="news"))
+
+        # 重复提交的URL在抓取前被丢弃
+        assert len(stored) == 1
+        assert ArticleHandler.requests == ["/news/1"]
+        document = stored[0]
+        assert document.url == url
+        assert document.source_type == "news"
+        assert document.chunks
+        assert 0.0 <= document.credibility_score <= 1.0
+        assert document.metadata["credibility"]["credibility_score"] == document.credibility_score
+
+        metrics = pipeline.get_metrics()
+        assert metrics["completed"] == 1
+        assert metrics["stages"]["fetch"]["dropped"] == 1
+
+    def test_validators_are_cached_only_after_sinks_succeed(self, article_server, tmp_path):
+        cache = HTTPResponseCache(str(tmp_path / "http_cache.db"))
+        stored = []
+        available = {"value": False}
+
+        def sink(documents):
+            if not available["value"]:
+                raise ConnectionError("index unavailable")
+            stored.extend(documents)
+
+        def run():
+            pipeline = IngestPipeline(
+                transport=CrawlTransport(), http_cache=cache, sinks=[sink],
+                scorer=lambda text, url, publish_date: {"credibility_score": 0.5},
+                min_text_length=50
+            )
+            asyncio.run(pipeline.run([f"{article_server}/news/1"]))
+
+        run()
+        # 写入失败的页面没有缓存校验器，下次不会被304跳过
+        assert cache.conditional_headers(f"{article_server}/news/1") == {}
+
+        available["value"] = True
+        run()
+        assert len(stored) == 1
+        assert cache.conditional_headers(f"{article_server}/news/1") == {"If-None-Match": '"v1"'}
+
+        run()
+        assert len(stored) == 1
+        assert ArticleHandler.requests == ["/news/1"] * 3
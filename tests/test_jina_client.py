@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Jina客户端测试：使用本地HTTP服务模拟Jina Reader的限流、服务端错误和请求错误
+"""
+
+import asyncio
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import aiohttp
+import pytest
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import crawler.jina_client as jina_client
+from crawler.jina_client import AsyncJinaClient
+from crawler.transport import AdaptiveRateLimiter
+
+
+class FakeReader(BaseHTTPRequestHandler):
+    """按请求体中的URL返回预设的状态码序列，最后一个状态码之后一直返回200"""
+
+    statuses = {}
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        url = body["url"]
+        FakeReader.requests.append(url)
+        pending = FakeReader.statuses.get(url, [])
+        status = pending.pop(0) if pending else 200
+        payload = f"content of {url}".encode("utf-8") if status == 200 else b"error"
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "1")
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def reader(monkeypatch):
+    FakeReader.statuses = {}
+    FakeReader.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeReader)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(jina_client, "JINA_READER_URL", f"http://127.0.0.1:{server.server_port}/")
+    yield FakeReader
+    server.shutdown()
+
+
+def _client(**kwargs):
+    rate_limiter = AdaptiveRateLimiter(initial_rate=100.0, max_rate=100.0)
+    return AsyncJinaClient(api_key="test", max_retries=2, rate_limiter=rate_limiter, **kwargs)
+
+
+def _crawl(url, **kwargs):
+    async def run():
+        async with _client() as client:
+            return await client.crawl(url, return_format="text", use_cache=False, **kwargs)
+    return asyncio.run(run())
+
+
+class TestAsyncJinaClient:
+    """异步Jina客户端重试测试"""
+
+    def test_client_errors_are_not_retried(self, reader):
+        reader.statuses["https://example.com/bad"] = [400]
+
+        with pytest.raises(aiohttp.ClientResponseError) as excinfo:
+            _crawl("https://example.com/bad")
+
+        assert excinfo.value.status == 400
+        assert reader.requests == ["https://example.com/bad"]
+
+    def test_server_errors_are_retried(self, reader):
+        reader.statuses["https://example.com/flaky"] = [503]
+
+        assert _crawl("https://example.com/flaky") == "content of https://example.com/flaky"
+        assert reader.requests == ["https://example.com/flaky"] * 2
+
+    def test_rate_limit_slows_down_and_retries(self, reader):
+        reader.statuses["https://example.com/busy"] = [429]
+
+        async def run():
+            async with _client() as client:
+                content = await client.crawl("https://example.com/busy", use_cache=False)
+                return content, client.rate_limiter
+
+        content, rate_limiter = asyncio.run(run())
+
+        assert content == "content of https://example.com/busy"
+        assert rate_limiter.throttled == 1
+        assert rate_limiter.rate < 100.0
+
+    def test_retries_stop_at_max_retries(self, reader):
+        reader.statuses["https://example.com/down"] = [429, 429, 429, 429]
+
+        with pytest.raises(aiohttp.ClientResponseError) as excinfo:
+            _crawl("https://example.com/down")
+
+        assert excinfo.value.status == 429
+        assert len(reader.requests) == 3
+
+    def test_crawl_many_reports_failures_per_url(self, reader):
+        reader.statuses["https://example.com/missing"] = [404]
+        urls = ["https://example.com/a", "https://example.com/missing", "https://example.com/b"]
+
+        async def run():
+            async with _client(max_concurrency=2) as client:
+                return [result async for result in client.crawl_many(urls, return_format="text", use_cache=False)]
+
+        results = {result.url: result for result in asyncio.run(run())}
+
+        assert set(results) == set(urls)
+        assert results["https://example.com/a"].content == "content of https://example.com/a"
+        assert not results["https://example.com/missing"].ok
+        assert results["https://example.com/b"].ok
+        assert reader.requests.count("https://example.com/missing") == 1
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Neo4j检索器测试：用假驱动记录Cypher查询，检查BM25索引回填、CONTAINS回退和事件查询条件
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import rag.neo4j_retriever as neo4j_retriever
+from rag.bm25_index import BM25Index
+from rag.neo4j_retriever import BACKFILL_DAY_QUERY, Neo4jRetriever
+
+
+DOCUMENTS = [
+    {"id": "doc_1", "title": "湖面UFO", "content": "glowing orb over the lake", "credibility_score": 0.8},
+    {"id": "doc_2", "title": "古宅怪声", "content": "strange noises in an old house", "credibility_score": 0.6},
+]
+
+
+class FakeResult(list):
+    def consume(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def run(self, cypher, **params):
+        self.driver.queries.append((cypher, params))
+        return FakeResult(self.driver.respond(cypher, params))
+
+
+class FakeDriver:
+    def __init__(self, documents=(), events=()):
+        self.queries = []
+        self.documents = list(documents)
+        self.events = list(events)
+
+    def session(self):
+        return FakeSession(self)
+
+    def close(self):
+        pass
+
+    def respond(self, cypher, params):
+        if "RETURN e ORDER BY" in cypher:
+            return [{"e": event} for event in self.events]
+        if "count(d) AS total" in cypher:
+            return [{"total": len(self.documents)}]
+        if "d.id IN $ids" in cypher and "contents" in cypher:
+            return [{**d, "contents": []} for d in self.documents if d["id"] in params["ids"]]
+        if "$last_id" in cypher:
+            rows = [d for d in self.documents if d["id"] > params["last_id"]][:params["batch_size"]]
+            return [{**row, "contents": []} for row in rows]
+        if "d.id IN $ids" in cypher:
+            return [{"d": d, "chunks": []} for d in self.documents if d["id"] in params["ids"]]
+        if "CONTAINS $query" in cypher:
+            return [
+                {"d": d, "chunks": []} for d in self.documents
+                if params["query"] in d["title"] or params["query"] in d["content"]
+            ]
+        return []
+
+
+@pytest.fixture
+def fake_driver(monkeypatch):
+    monkeypatch.setenv("NEO4J_PASSWORD", "test")
+    holder = {}
+
+    def driver(*args, **kwargs):
+        return holder["driver"]
+
+    monkeypatch.setattr(neo4j_retriever.GraphDatabase, "driver", driver)
+
+    def install(documents=(), events=()):
+        holder["driver"] = FakeDriver(documents, events)
+        return holder["driver"]
+
+    return install
+
+
+class TestTextIndex:
+    """BM25文本索引测试"""
+
+    def test_empty_index_is_backfilled_on_startup(self, fake_driver):
+        fake_driver(DOCUMENTS)
+        index = BM25Index()
+
+        retriever = Neo4jRetriever(text_index=index)
+
+        assert len(index) == 2
+        documents = retriever.query_relevant_documents("lake")
+        assert [document.id for document in documents] == ["doc_1"]
+        assert documents[0].metadata["bm25_score"] > 0
+
+    def test_populated_index_is_not_rebuilt(self, fake_driver):
+        driver = fake_driver(DOCUMENTS)
+        index = BM25Index()
+        index.add("doc_2", "strange noises in an old house", fields={"id": "doc_2"})
+
+        Neo4jRetriever(text_index=index)
+
+        assert not any("$last_id" in cypher for cypher, _ in driver.queries)
+        assert len(index) == 1
+
+    def test_new_documents_are_synced_incrementally(self, fake_driver):
+        driver = fake_driver(DOCUMENTS)
+        index = BM25Index()
+        retriever = Neo4jRetriever(text_index=index, text_index_sync_interval=0)
+        driver.documents.append({"id": "doc_3", "title": "湖畔光球", "content": "a second glowing orb near the lake"})
+        driver.queries.clear()
+
+        documents = retriever.query_relevant_documents("orb")
+
+        assert [document.id for document in documents] == ["doc_1", "doc_3"]
+        # 只取缺失文档的内容
+        fetches = [params["ids"] for cypher, params in driver.queries if "contents" in cypher]
+        assert fetches == [["doc_3"]]
+
+        driver.queries.clear()
+        retriever.query_relevant_documents("orb")
+        # 数量一致时不分页比对
+        assert not any("$last_id" in cypher for cypher, _ in driver.queries)
+
+        driver.documents = driver.documents[1:]
+        assert [document.id for document in retriever.query_relevant_documents("orb")] == ["doc_3"]
+        assert sorted(index.doc_ids()) == ["doc_2", "doc_3"]
+
+    def test_sync_is_throttled(self, fake_driver):
+        driver = fake_driver(DOCUMENTS)
+        retriever = Neo4jRetriever(text_index=BM25Index())
+        driver.documents.append({"id": "doc_3", "title": "湖畔光球", "content": "orb"})
+
+        retriever.query_relevant_documents("orb")
+
+        assert not any("count(d)" in cypher for cypher, _ in driver.queries)
+
+    def test_empty_index_falls_back_to_contains(self, fake_driver):
+        driver = fake_driver()
+        retriever = Neo4jRetriever(text_index=BM25Index())
+        driver.documents = list(DOCUMENTS)
+
+        documents = retriever.query_relevant_documents("old house")
+
+        assert [document.id for document in documents] == ["doc_2"]
+        assert "CONTAINS $query" in driver.queries[-1][0]
+
+
+class TestQueryMysteryEvents:
+    """神秘事件查询测试"""
+
+    def test_startup_backfills_event_days(self, fake_driver):
+        driver = fake_driver()
+
+        Neo4jRetriever(batch_size=500)
+
+        assert (BACKFILL_DAY_QUERY, {"batch_size": 500}) in driver.queries
+
+    def test_backfill_failure_does_not_block_startup(self, fake_driver, monkeypatch):
+        driver = fake_driver()
+        original = driver.respond
+
+        def respond(cypher, params):
+            if cypher == BACKFILL_DAY_QUERY:
+                raise RuntimeError("Neo.ClientError.Statement.SyntaxError")
+            return original(cypher, params)
+
+        monkeypatch.setattr(driver, "respond", respond)
+
+        Neo4jRetriever()
+
+    def test_date_range_uses_day_index(self, fake_driver):
+        driver = fake_driver(events=[{"event_id": "e1", "title": "湖面发光", "date": "2024-01-15T20:00:00"}])
+        retriever = Neo4jRetriever()
+
+        events = retriever.query_mystery_events(
+            "", date_range=(datetime(2024, 1, 1, 12), datetime(2024, 1, 31)), min_credibility=0.5
+        )
+
+        cypher, params = driver.queries[-1]
+        assert cypher.startswith("MATCH (e:MysteryEvent)")
+        assert "e.day >= date($start_date) AND e.day <= date($end_date)" in cypher
+        assert params == {"min_credibility": 0.5, "start_date": "2024-01-01", "end_date": "2024-01-31"}
+        assert [event.event_id for event in events] == ["e1"]
+        assert events[0].date == datetime(2024, 1, 15, 20)
+
+    def test_location_matches_location_nodes_or_location_string(self, fake_driver):
+        driver = fake_driver()
+        retriever = Neo4jRetriever()
+
+        retriever.query_mystery_events("", location="Lake (North)")
+
+        cypher, params = driver.queries[-1]
+        assert "location_text_index" in cypher
+        assert "UNION" in cypher and "e.location CONTAINS $location_text" in cypher
+        # 子查询结束后先WITH再WHERE，否则是语法错误
+        assert "RETURN e } WITH DISTINCT e WHERE e.credibility_score >= $min_credibility" in cypher
+        assert params["location"] == "Lake \\(North\\)"
+        assert params["location_text"] == "Lake (North)"
+
+    def test_text_and_location_filter_fulltext_hits(self, fake_driver):
+        driver = fake_driver()
+        retriever = Neo4jRetriever()
+
+        retriever.query_mystery_events("glowing orb", location="北京", near=(39.9, 116.4), radius_km=10)
+
+        cypher, params = driver.queries[-1]
+        assert "event_text_index" in cypher
+        assert "(e.location CONTAINS $location_text OR EXISTS" in cypher
+        assert "ORDER BY score DESC" in cypher
+        assert params["query"] == "glowing orb"
+        assert params["radius_meters"] == 10000
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解析进程池测试：进程内与进程池解析、链接回传、在途任务上限和预编译选择器
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urljoin
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from crawler.parser_pool import ParserPool, css, make_soup
+
+
+PAGE = """<html><head><title>湖面发光物体</title></head>
+<body><a href="/news/1">一</a><a href="https://example.com/news/2">二</a><span>无链接</span></body></html>"""
+
+
+class LinkParser:
+    """模拟爬虫：解析标题并把发现的链接记到_collected_links"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self._collected_links = []
+
+    def parse(self, html, url):
+        if self.delay:
+            time.sleep(self.delay)
+        soup = make_soup(html)
+        self._collected_links.extend(urljoin(url, a["href"]) for a in css("a[href]").select(soup))
+        return {"title": soup.title.string, "pid": os.getpid()}
+
+
+def _parse(pool, parser, count=1):
+    async def run():
+        return await asyncio.gather(*(pool.parse(parser.parse, PAGE, "https://example.com/") for _ in range(count)))
+    return asyncio.run(run())
+
+
+class TestParserPool:
+    """解析进程池测试"""
+
+    def test_inline_parsing(self):
+        pool = ParserPool(max_workers=0)
+        parser = LinkParser()
+
+        [(result, links)] = _parse(pool, parser)
+
+        assert result == {"title": "湖面发光物体", "pid": os.getpid()}
+        assert links == ["https://example.com/news/1", "https://example.com/news/2"]
+
+    def test_worker_process_returns_result_and_links(self):
+        pool = ParserPool(max_workers=1)
+        parser = LinkParser()
+        try:
+            [(result, links)] = _parse(pool, parser)
+        finally:
+            pool.close()
+
+        assert result["title"] == "湖面发光物体"
+        assert result["pid"] != os.getpid()
+        assert links == ["https://example.com/news/1", "https://example.com/news/2"]
+        # 链接在工作进程的副本上收集，通过返回值带回
+        assert parser._collected_links == []
+
+    def test_pending_tasks_are_bounded(self):
+        pool = ParserPool(max_workers=2, max_pending=1)
+        parser = LinkParser(delay=0.1)
+        try:
+            _parse(pool, parser)  # 预热工作进程
+            start = time.monotonic()
+            results = _parse(pool, parser, count=4)
+            elapsed = time.monotonic() - start
+        finally:
+            pool.close()
+
+        assert len(results) == 4
+        # 同时只有一个任务在途，两个工作进程也只能串行
+        assert elapsed >= 0.4
+
+    def test_pool_can_be_reused_after_close(self):
+        pool = ParserPool(max_workers=1)
+        parser = LinkParser()
+        try:
+            _parse(pool, parser)
+            pool.close()
+            assert pool._executor is None
+            [(result, _)] = _parse(pool, parser)
+        finally:
+            pool.close()
+
+        assert result["title"] == "湖面发光物体"
+
+
+class TestSelectors:
+    """预编译选择器测试"""
+
+    def test_selectors_are_compiled_once(self):
+        assert css("a[href]") is css("a[href]")
+        soup = make_soup(PAGE)
+        assert [a["href"] for a in css("a[href]").select(soup)] == ["/news/1", "https://example.com/news/2"]
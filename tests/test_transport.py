@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬虫传输层测试：Retry-After解析、令牌桶与AIMD限速，以及用本地HTTP服务验证429重试和按主机并发上限
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config.mystery_config import DataSourceConfig, DataSourceType
+from crawler.transport import AdaptiveRateLimiter, CrawlTransport, TokenBucket, retry_after_seconds
+
+
+class TestRetryAfter:
+    """Retry-After解析测试"""
+
+    def test_seconds_with_floor(self):
+        assert retry_after_seconds({"Retry-After": "3"}, attempt=0) == 3.0
+        assert retry_after_seconds({"Retry-After": "0"}, attempt=0) == 1.0
+
+    def test_missing_or_date_backs_off_exponentially(self):
+        assert retry_after_seconds({}, attempt=0) == 2.0
+        assert retry_after_seconds({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}, attempt=2) == 8.0
+
+
+class TestTokenBucket:
+    """令牌桶测试"""
+
+    def test_burst_then_refill_rate(self):
+        bucket = TokenBucket(rate_per_minute=600, capacity=2)
+
+        async def take(count):
+            start = time.monotonic()
+            for _ in range(count):
+                await bucket.acquire()
+            return time.monotonic() - start
+
+        # 容量内的突发不等待，之后按每秒10个发放
+        assert asyncio.run(take(2)) < 0.05
+        assert 0.15 < asyncio.run(take(2)) < 0.5
+
+    def test_pause_blocks_until_deadline(self):
+        bucket = TokenBucket(rate_per_minute=6000, capacity=5)
+        bucket.pause(0.2)
+
+        async def take():
+            start = time.monotonic()
+            await bucket.acquire()
+            return time.monotonic() - start
+
+        assert asyncio.run(take()) >= 0.19
+
+
+class TestAdaptiveRateLimiter:
+    """AIMD速率控制测试"""
+
+    def test_additive_increase_multiplicative_decrease(self):
+        limiter = AdaptiveRateLimiter(initial_rate=1.0, min_rate=0.3, max_rate=1.15, increase=0.1)
+
+        limiter.on_success()
+        assert limiter.rate == pytest.approx(1.1)
+        limiter.on_success()
+        assert limiter.rate == pytest.approx(1.15)
+        limiter.on_throttle()
+        limiter.on_throttle()
+        assert limiter.rate == pytest.approx(0.3)
+        assert limiter.throttled == 2
+
+    def test_slots_are_spaced_by_rate(self):
+        limiter = AdaptiveRateLimiter(initial_rate=20.0, max_rate=20.0)
+
+        async def take(count):
+            start = time.monotonic()
+            await asyncio.gather(*(limiter.acquire() for _ in range(count)))
+            return time.monotonic() - start
+
+        # 第一个立即发放，其余每0.05秒一个
+        assert 0.15 < asyncio.run(take(5)) < 0.5
+
+
+class TransportHandler(BaseHTTPRequestHandler):
+    """/busy先返回一次429，/slow记录同时在处理的请求数"""
+
+    lock = threading.Lock()
+    active = 0
+    max_active = 0
+    throttled_once = False
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/busy" and not TransportHandler.throttled_once:
+            TransportHandler.throttled_once = True
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/slow":
+            with TransportHandler.lock:
+                TransportHandler.active += 1
+                TransportHandler.max_active = max(TransportHandler.max_active, TransportHandler.active)
+            time.sleep(0.1)
+            with TransportHandler.lock:
+                TransportHandler.active -= 1
+        payload = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def transport_server():
+    TransportHandler.active = 0
+    TransportHandler.max_active = 0
+    TransportHandler.throttled_once = False
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TransportHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+class TestCrawlTransport:
+    """共享传输层测试"""
+
+    def test_rate_limited_response_is_retried(self, transport_server):
+        transport = CrawlTransport(default_rate_limit=6000)
+
+        async def fetch():
+            await transport.open()
+            try:
+                async with transport.get(f"{transport_server}/busy") as response:
+                    return response.status, await response.text()
+            finally:
+                await transport.close()
+
+        assert asyncio.run(fetch()) == (200, "ok")
+        host = transport_server.split("//")[1]
+        stats = transport.get_stats()[host]
+        assert (stats["requests"], stats["throttled"]) == (2, 1)
+        assert transport.session is None
+
+    def test_concurrency_is_limited_per_host(self, transport_server):
+        transport = CrawlTransport(connections_per_host=2, default_rate_limit=6000, burst=10)
+
+        async def fetch_all():
+            await transport.open()
+            try:
+                async def fetch():
+                    async with transport.get(f"{transport_server}/slow") as response:
+                        return response.status
+                return await asyncio.gather(*(fetch() for _ in range(6)))
+            finally:
+                await transport.close()
+
+        assert asyncio.run(fetch_all()) == [200] * 6
+        assert TransportHandler.max_active == 2
+
+    def test_register_source_keeps_strictest_limit(self):
+        transport = CrawlTransport()
+        transport.register_source(DataSourceConfig("a", DataSourceType.NEWS, "https://example.com/a", rate_limit=30))
+        transport.register_source(DataSourceConfig("b", DataSourceType.NEWS, "https://example.com/b", rate_limit=60))
+
+        assert transport._rate_limits == {"example.com": 30}
+
+    def test_request_requires_open_session(self):
+        transport = CrawlTransport()
+
+        async def fetch():
+            async with transport.get("http://127.0.0.1:9/"):
+                pass
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(fetch())
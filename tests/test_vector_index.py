@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+IVF向量索引测试：自动训练、元数据过滤、墓碑替换和重新打开
+"""
+
+import os
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from rag.vector_index import VectorFilter, VectorIndex
+
+
+DIMENSION = 16
+
+
+def _vectors(count, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(count, DIMENSION)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _records(count, offset=0):
+    return [
+        {
+            "key": f"doc_{i}#0",
+            "kind": "chunk",
+            "doc_id": f"doc_{i}",
+            "content": f"片段{i}",
+            "event_type": "ufo" if i % 2 == 0 else "ghost",
+            "credibility": 0.9 if i % 3 == 0 else 0.4,
+            "published_at": datetime(2024, 1, 1 + i % 28),
+        }
+        for i in range(offset, offset + count)
+    ]
+
+
+class RecordingConnection:
+    """记录执行的SQL的连接代理"""
+
+    def __init__(self, connection, statements):
+        self._connection = connection
+        self._statements = statements
+
+    def execute(self, sql, *args):
+        self._statements.append(sql)
+        return self._connection.execute(sql, *args)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+class TestVectorIndex:
+    """向量索引测试"""
+
+    def test_exact_search_before_training(self, tmp_path):
+        index = VectorIndex(str(tmp_path / "index"), nlist=4, train_threshold=1000)
+        vectors = _vectors(50)
+        index.add(vectors, _records(50))
+
+        results = index.search(vectors[7], top_k=3)
+
+        assert not index.trained
+        assert results[0][1]["key"] == "doc_7#0"
+        assert results[0][0] == pytest.approx(1.0, abs=1e-5)
+        assert [score for score, _ in results] == sorted((score for score, _ in results), reverse=True)
+
+    def test_training_assigns_lists_and_probes(self, tmp_path):
+        index = VectorIndex(str(tmp_path / "index"), nlist=4, nprobe=4, train_threshold=200)
+        vectors = _vectors(240)
+        index.add(vectors[:120], _records(120))
+        assert not index.trained
+
+        index.add(vectors[120:], _records(120, offset=120))
+
+        assert index.trained
+        assert index.get_stats()["nlist"] == 4
+        assert sum(len(rows) for rows in index._lists.values()) == 240
+        assert -1 not in index._lists
+        # 扫描全部列表时结果与精确检索一致
+        for i in (3, 150, 239):
+            assert index.search(vectors[i], top_k=1)[0][1]["key"] == f"doc_{i}#0"
+
+    def test_vectors_added_after_training_are_searchable(self, tmp_path):
+        index = VectorIndex(str(tmp_path / "index"), nlist=4, nprobe=1, train_threshold=100)
+        index.add(_vectors(100), _records(100))
+        extra = _vectors(1, seed=42)
+
+        index.add(extra, _records(1, offset=500))
+
+        assert index.search(extra[0], top_k=1, nprobe=4)[0][1]["key"] == "doc_500#0"
+
+    def test_filters(self, tmp_path):
+        index = VectorIndex(str(tmp_path / "index"), nlist=4, train_threshold=1000)
+        vectors = _vectors(60)
+        index.add(vectors, _records(60))
+
+        results = index.search(
+            vectors[6], top_k=60,
+            filters=VectorFilter(kind="chunk", event_types=["ufo"], min_credibility=0.8,
+                                 date_from=datetime(2024, 1, 5), date_to=datetime(2024, 1, 20))
+        )
+
+        assert results
+        for _, record in results:
+            assert record["event_type"] == "ufo"
+            assert record["credibility"] >= 0.8
+            assert "2024-01-05" <= record["published_at"] <= "2024-01-20T00:00:00"
+        assert index.search(vectors[0], filters=VectorFilter(doc_ids=["missing"])) == []
+
+    def test_kind_filter_does_not_query_metadata(self, tmp_path):
+        index = VectorIndex(str(tmp_path / "index"), nlist=4, nprobe=4, train_threshold=100)
+        vectors = _vectors(120)
+        records = _records(120)
+        for i in range(0, 120, 3):
+            records[i]["kind"] = "event"
+        index.add(vectors, records)
+        statements = []
+        connection = index._conn
+        index._conn = RecordingConnection(connection, statements)
+
+        results = index.search(vectors[9], top_k=5, filters=VectorFilter(kind="event"))
+
+        assert results[0][1]["key"] == "doc_9#0"
+        assert all(record["kind"] == "event" for _, record in results)
+        assert not any("SELECT row FROM entries WHERE" in sql for sql in statements)
+        assert index.search(vectors[9], filters=VectorFilter(kind="missing")) == []
+
+    def test_unselective_filter_is_applied_after_probing(self, tmp_path):
+        index = VectorIndex(str(tmp_path / "index"), nlist=4, nprobe=4, train_threshold=100, exact_search_limit=10)
+        vectors = _vectors(120)
+        index.add(vectors, _records(120))
+
+        results = index.search(vectors[6], top_k=5, filters=VectorFilter(event_types=["ufo"]))
+
+        assert results[0][1]["key"] == "doc_6#0"
+        assert len(results) == 5
+        assert all(record["event_type"] == "ufo" for _, record in results)
+
+    def test_replace_and_delete_use_tombstones(self, tmp_path):
+        index = VectorIndex(str(tmp_path / "index"), nlist=4, train_threshold=1000)
+        vectors = _vectors(10)
+        index.add(vectors, _records(10))
+        size = os.path.getsize(tmp_path / "index" / "vectors.f32")
+
+        replacement = _vectors(1, seed=7)
+        index.add(replacement, [{**_records(1, offset=3)[0], "content": "新片段"}])
+        removed = index.delete(doc_id="doc_4")
+
+        assert removed == 1
+        assert len(index) == 9
+        assert index.get_stats()["rows"] == 11
+        # 替换只追加新行，不重写向量文件
+        assert os.path.getsize(tmp_path / "index" / "vectors.f32") == size + DIMENSION * 4
+        assert np.allclose(index.get_vector("doc_3#0"), replacement[0])
+        assert index.get_vector("doc_4#0") is None
+        keys = [record["key"] for _, record in index.search(vectors[4], top_k=10)]
+        assert "doc_4#0" not in keys
+        assert keys.count("doc_3#0") == 1
+
+    def test_reopen_restores_state(self, tmp_path):
+        path = str(tmp_path / "index")
+        index = VectorIndex(path, nlist=4, train_threshold=100, embedder_name="hash-16")
+        vectors = _vectors(120)
+        index.add(vectors, _records(120))
+        index.delete(keys=["doc_5#0"])
+        index.close()
+
+        reopened = VectorIndex(path, nlist=4, embedder_name="hash-16")
+
+        assert reopened.trained
+        assert reopened.dimension == DIMENSION
+        assert len(reopened) == 119
+        assert reopened.search(vectors[8], top_k=1)[0][1]["key"] == "doc_8#0"
+        assert reopened.get_vector("doc_5#0") is None
+        with pytest.raises(ValueError):
+            VectorIndex(path, embedder_name="other-model")
+
+    def test_reopen_discards_uncommitted_vectors(self, tmp_path):
+        path = str(tmp_path / "index")
+        index = VectorIndex(path, train_threshold=1000)
+        index.add(_vectors(5), _records(5))
+        index.close()
+        # 模拟写入向量后、提交元数据前崩溃
+        with open(os.path.join(path, "vectors.f32"), "ab") as f:
+            f.write(_vectors(2, seed=3).tobytes())
+
+        reopened = VectorIndex(path)
+
+        assert reopened.get_stats()["rows"] == 5
+        assert os.path.getsize(os.path.join(path, "vectors.f32")) == 5 * DIMENSION * 4
+
+    def test_failed_add_keeps_rows_aligned(self, tmp_path, monkeypatch):
+        index = VectorIndex(str(tmp_path / "index"), train_threshold=1000)
+        vectors = _vectors(4)
+        index.add(vectors[:1], _records(1))
+        vectors_path = tmp_path / "index" / "vectors.f32"
+
+        with pytest.raises(KeyError):
+            index.add(vectors[1:2], [{"kind": "chunk"}])
+        assert os.path.getsize(vectors_path) == DIMENSION * 4
+
+        def fail(column, values):
+            raise sqlite3.OperationalError("database is locked")
+
+        monkeypatch.setattr(index, "_tombstone", fail)
+        with pytest.raises(sqlite3.OperationalError):
+            index.add(vectors[2:3], _records(1, offset=2))
+        monkeypatch.undo()
+        assert os.path.getsize(vectors_path) == DIMENSION * 4
+
+        index.add(vectors[3:4], _records(1, offset=3))
+
+        assert np.allclose(index.get_vector("doc_3#0"), vectors[3])
+        assert index.search(vectors[3], top_k=1)[0][1]["key"] == "doc_3#0"
+        assert index.search(vectors[3], top_k=1)[0][0] == pytest.approx(1.0, abs=1e-5)
+
+    def test_dimension_mismatch_is_rejected(self, tmp_path):
+        index = VectorIndex(str(tmp_path / "index"), dimension=DIMENSION)
+
+        with pytest.raises(ValueError):
+            index.add(np.ones((1, DIMENSION + 1), dtype=np.float32), _records(1))
@@ -17,6 +17,34 @@ from tools.decorators import log_io
 
 logger = logging.getLogger(__name__)
 
+# 现象特征词典
+PHENOMENON_FEATURES: Dict[str, List[str]] = {
+    "light": ["光", "发光", "闪光", "光球", "光柱", "light", "glow", "flash", "beam", "orb"],
+    "sound": ["声音", "噪音", "嗡嗡声", "轰鸣", "sound", "noise", "hum", "buzz", "roar"],
+    "movement": ["移动", "飞行", "悬浮", "消失", "movement", "flying", "hovering", "vanish"],
+    "shape": ["圆形", "三角形", "椭圆", "碟形", "圆盘", "circular", "triangular", "oval", "disc"],
+    "size": ["巨大", "小型", "中等", "huge", "small", "medium", "large", "tiny"],
+    "color": ["红色", "蓝色", "白色", "绿色", "橙色", "red", "blue", "white", "green", "orange"],
+    "electromagnetic": ["电磁", "干扰", "静电", "electromagnetic", "interference", "static"],
+    "temperature": ["温度", "冷", "热", "temperature", "cold", "hot", "warm", "cool"]
+}
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """使用Haversine公式计算两点间距离（公里）"""
+    R = 6371  # 地球半径（公里）
+    
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    delta_lat = math.radians(lat2 - lat1)
+    delta_lon = math.radians(lon2 - lon1)
+    
+    a = (math.sin(delta_lat / 2) ** 2 +
+         math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon / 2) ** 2)
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    
+    return R * c
+
 
 @dataclass
 class EventCorrelation:
@@ -69,16 +97,7 @@ class CorrelationAnalyzer(BaseTool):
         self.config = config or MysteryEventConfig()
         
         # 现象特征词典
-        self.phenomenon_features = {
-            "light": ["光", "发光", "闪光", "光球", "光柱", "light", "glow", "flash", "beam", "orb"],
-            "sound": ["声音", "噪音", "嗡嗡声", "轰鸣", "sound", "noise", "hum", "buzz", "roar"],
-            "movement": ["移动", "飞行", "悬浮", "消失", "movement", "flying", "hovering", "vanish"],
-            "shape": ["圆形", "三角形", "椭圆", "碟形", "圆盘", "circular", "triangular", "oval", "disc"],
-            "size": ["巨大", "小型", "中等", "huge", "small", "medium", "large", "tiny"],
-            "color": ["红色", "蓝色", "白色", "绿色", "橙色", "red", "blue", "white", "green", "orange"],
-            "electromagnetic": ["电磁", "干扰", "静电", "electromagnetic", "interference", "static"],
-            "temperature": ["温度", "冷", "热", "temperature", "cold", "hot", "warm", "cool"]
-        }
+        self.phenomenon_features = PHENOMENON_FEATURES
     
     def _run(self, events_data: str, correlation_types: List[str] = None) -> str:
         """运行关联分析
@@ -413,18 +432,7 @@ class CorrelationAnalyzer(BaseTool):
     
     def _calculate_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """使用Haversine公式计算两点间距离（公里）"""
-        R = 6371  # 地球半径（公里）
-        
-        lat1_rad = math.radians(lat1)
-        lat2_rad = math.radians(lat2)
-        delta_lat = math.radians(lat2 - lat1)
-        delta_lon = math.radians(lon2 - lon1)
-        
-        a = (math.sin(delta_lat / 2) ** 2 +
-             math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon / 2) ** 2)
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-        
-        return R * c
+        return haversine_km(lat1, lon1, lat2, lon2)
     
     def _limit_correlations_per_event(self, correlations: List[EventCorrelation]) -> List[EventCorrelation]:
         """限制每个事件的最大关联数"""
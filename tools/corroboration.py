@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+# SPDX-License-Identifier: MIT
+
+import hashlib
+import logging
+import math
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Set
+from urllib.parse import urlparse
+
+from config.mystery_config import MysteryEventConfig
+from tools.correlation import PHENOMENON_FEATURES, haversine_km
+
+logger = logging.getLogger(__name__)
+
+# 英文关键词按单词边界匹配（"red"不匹配"occurred"，"hot"不匹配"photo"），中文关键词按子串匹配
+_PHENOMENON_PATTERNS = [
+    (keyword.lower(), re.compile(rf"\b{re.escape(keyword.lower())}\b") if keyword.isascii() else None)
+    for keywords in PHENOMENON_FEATURES.values()
+    for keyword in keywords
+]
+
+
+@dataclass
+class CorroborationResult:
+    """跨文档佐证结果"""
+    doc_id: str
+    cluster_id: str  # 事件簇ID（簇根文档ID）
+    cluster_size: int  # 簇内文档数
+    independent_sources: int  # 独立来源数（按注册域名去重）
+    corroborating_sources: List[str]  # 除自身外的佐证来源域名
+    agreement_score: float  # 独立来源一致性评分 (0-1)
+    matched_dimensions: Dict[str, int] = field(default_factory=dict)  # 各维度匹配次数
+
+
+@dataclass
+class _DocumentEntry:
+    """索引内部的文档记录"""
+    doc_id: str
+    source: str
+    timestamp: Optional[datetime]
+    location: Optional[Dict[str, float]]
+    phenomena: Set[str]  # 命中的具体现象关键词
+    block_keys: List[str]
+
+
+class CorroborationIndex:
+    """增量式跨文档佐证索引
+
+    文档到达时只与共享哈希分块键的候选文档比较，避免全量两两比较。
+    分块键由时间桶、地理网格和现象关键词两两组合后哈希得到，
+    匹配的文档通过并查集合并成事件簇，簇内独立来源数即佐证强度。
+    仅时间接近不足以判定为同一事件，还必须在地理位置或具体现象上一致。
+    """
+
+    def __init__(
+        self,
+        config: Optional[MysteryEventConfig] = None,
+        geo_cell_degrees: float = 1.0,
+        min_matched_dimensions: int = 2,
+        max_block_size: int = 500
+    ):
+        """初始化佐证索引
+
+        Args:
+            config: 神秘事件配置（使用其中的时间窗口和地理半径）
+            geo_cell_degrees: 地理网格边长（度）
+            min_matched_dimensions: 判定为同一事件所需匹配的最少维度数
+            max_block_size: 单个分块的最大文档数，超过后不再作为候选来源
+        """
+        self.config = config or MysteryEventConfig()
+        self.time_window = timedelta(days=self.config.time_window_days)
+        self.geo_cell_degrees = geo_cell_degrees
+        self.min_matched_dimensions = min_matched_dimensions
+        self.max_block_size = max_block_size
+
+        self._blocks: Dict[str, List[str]] = defaultdict(list)
+        self._documents: Dict[str, _DocumentEntry] = {}
+        self._parent: Dict[str, str] = {}
+        self._cluster_sources: Dict[str, Set[str]] = {}
+        self._cluster_members: Dict[str, List[str]] = {}
+        self._matched_dimensions: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add_document(
+        self,
+        doc_id: str,
+        content: str,
+        source_url: str = "",
+        timestamp: Optional[datetime] = None,
+        location: Optional[Dict[str, float]] = None,
+        phenomena: Optional[List[str]] = None
+    ) -> CorroborationResult:
+        """增量加入一篇文档并返回其当前的佐证结果
+
+        Args:
+            doc_id: 文档ID
+            content: 文档文本
+            source_url: 来源URL
+            timestamp: 事件发生时间
+            location: 事件位置 {"lat": float, "lon": float}
+            phenomena: 额外的现象描述词
+
+        Returns:
+            CorroborationResult对象
+        """
+        if doc_id in self._documents:
+            return self.get_result(doc_id)
+
+        entry = _DocumentEntry(
+            doc_id=doc_id,
+            source=self._normalize_source(source_url) or f"unknown:{doc_id}",
+            timestamp=timestamp,
+            location=location if self._valid_location(location) else None,
+            phenomena=self._extract_phenomena(content, phenomena),
+            block_keys=[]
+        )
+        entry.block_keys = self._blocking_keys(entry, neighbours=False)
+        candidates = self._candidates(entry)
+        self._register(doc_id, entry)
+
+        # 只比较共享分块键的候选文档
+        for candidate_id in candidates:
+            matched = self._matched_dimension_names(entry, self._documents[candidate_id])
+            if len(matched) >= self.min_matched_dimensions and matched != ["temporal"]:
+                for dimension in matched:
+                    self._matched_dimensions[doc_id][dimension] += 1
+                    self._matched_dimensions[candidate_id][dimension] += 1
+                self._union(doc_id, candidate_id)
+
+        for key in entry.block_keys:
+            self._blocks[key].append(doc_id)
+
+        return self.get_result(doc_id)
+
+    def get_result(self, doc_id: str) -> Optional[CorroborationResult]:
+        """获取文档当前的佐证结果（随后续文档到达而更新）"""
+        entry = self._documents.get(doc_id)
+        if not entry:
+            return None
+
+        root = self._find(doc_id)
+        sources = self._cluster_sources[root]
+        independent = len(sources)
+
+        return CorroborationResult(
+            doc_id=doc_id,
+            cluster_id=root,
+            cluster_size=len(self._cluster_members[root]),
+            independent_sources=independent,
+            corroborating_sources=sorted(s for s in sources if s != entry.source),
+            agreement_score=self._agreement_score(independent),
+            matched_dimensions=dict(self._matched_dimensions.get(doc_id, {}))
+        )
+
+    def get_clusters(self, min_sources: int = 2) -> List[Dict[str, Any]]:
+        """列出独立来源数不少于min_sources的事件簇"""
+        clusters = []
+        for root, members in self._cluster_members.items():
+            if self._find(root) != root:
+                continue
+            sources = self._cluster_sources[root]
+            if len(sources) >= min_sources:
+                clusters.append({
+                    "cluster_id": root,
+                    "documents": list(members),
+                    "independent_sources": sorted(sources),
+                    "agreement_score": self._agreement_score(len(sources))
+                })
+        clusters.sort(key=lambda c: len(c["independent_sources"]), reverse=True)
+        return clusters
+
+    def _register(self, doc_id: str, entry: _DocumentEntry):
+        """登记文档为单例簇"""
+        self._documents[doc_id] = entry
+        self._parent[doc_id] = doc_id
+        self._cluster_sources[doc_id] = {entry.source}
+        self._cluster_members[doc_id] = [doc_id]
+
+    def _find(self, doc_id: str) -> str:
+        """并查集查找（带路径压缩）"""
+        root = doc_id
+        while self._parent[root] != root:
+            root = self._parent[root]
+        while self._parent[doc_id] != root:
+            self._parent[doc_id], doc_id = root, self._parent[doc_id]
+        return root
+
+    def _union(self, doc_a: str, doc_b: str):
+        """合并两个事件簇"""
+        root_a, root_b = self._find(doc_a), self._find(doc_b)
+        if root_a == root_b:
+            return
+        # 小簇并入大簇，合并代价与小簇大小成正比
+        if len(self._cluster_members[root_a]) > len(self._cluster_members[root_b]):
+            root_a, root_b = root_b, root_a
+        self._parent[root_a] = root_b
+        self._cluster_sources[root_b] |= self._cluster_sources.pop(root_a)
+        self._cluster_members[root_b].extend(self._cluster_members.pop(root_a))
+
+    def _candidates(self, entry: _DocumentEntry) -> Set[str]:
+        """通过相邻分块键收集候选文档"""
+        candidates: Set[str] = set()
+        for key in self._blocking_keys(entry, neighbours=True):
+            block = self._blocks.get(key)
+            if block and len(block) <= self.max_block_size:
+                candidates.update(block)
+        candidates.discard(entry.doc_id)
+        return candidates
+
+    def _blocking_keys(self, entry: _DocumentEntry, neighbours: bool) -> List[str]:
+        """生成分块键
+
+        插入时只使用文档所在的桶；查询时额外探测相邻时间桶和地理网格，
+        以免落在桶边界两侧的同一事件被漏掉。
+        """
+        time_buckets = self._time_buckets(entry.timestamp, neighbours)
+        geo_cells = self._geo_cells(entry.location, neighbours)
+        phenomena = sorted(entry.phenomena)
+
+        raw_keys = []
+        for t in time_buckets:
+            for g in geo_cells:
+                raw_keys.append(f"tg|{t}|{g}")
+            for p in phenomena:
+                raw_keys.append(f"tp|{t}|{p}")
+        for g in geo_cells:
+            for p in phenomena:
+                raw_keys.append(f"gp|{g}|{p}")
+
+        return [hashlib.md5(key.encode('utf-8')).hexdigest()[:16] for key in raw_keys]
+
+    def _time_buckets(self, timestamp: Optional[datetime], neighbours: bool) -> List[int]:
+        if not timestamp:
+            return []
+        window_seconds = max(self.time_window.total_seconds(), 1)
+        bucket = int(self._epoch_seconds(timestamp) // window_seconds)
+        return [bucket - 1, bucket, bucket + 1] if neighbours else [bucket]
+
+    def _geo_cells(self, location: Optional[Dict[str, float]], neighbours: bool) -> List[str]:
+        if not location:
+            return []
+        lat_cell = math.floor(location["lat"] / self.geo_cell_degrees)
+        lon_cell = math.floor(location["lon"] / self.geo_cell_degrees)
+        offsets = (-1, 0, 1) if neighbours else (0,)
+        return [f"{lat_cell + dlat}:{lon_cell + dlon}" for dlat in offsets for dlon in offsets]
+
+    def _matched_dimension_names(self, entry: _DocumentEntry, other: _DocumentEntry) -> List[str]:
+        """精确校验候选文档在哪些维度上与新文档一致"""
+        matched = []
+
+        if entry.timestamp and other.timestamp:
+            time_diff = abs(self._epoch_seconds(entry.timestamp) - self._epoch_seconds(other.timestamp))
+            if time_diff <= self.time_window.total_seconds():
+                matched.append("temporal")
+
+        if entry.location and other.location:
+            distance = haversine_km(
+                entry.location["lat"], entry.location["lon"],
+                other.location["lat"], other.location["lon"]
+            )
+            if distance <= self.config.location_radius_km:
+                matched.append("geographical")
+
+        if entry.phenomena and other.phenomena:
+            overlap = len(entry.phenomena & other.phenomena) / len(entry.phenomena | other.phenomena)
+            if overlap >= 0.5:
+                matched.append("phenomenological")
+
+        return matched
+
+    def _extract_phenomena(self, content: str, phenomena: Optional[List[str]]) -> Set[str]:
+        """提取具体现象关键词（被更长的命中词包含的中文词不单独计入，如"发光"中的"光"）"""
+        text_lower = f"{content} {' '.join(phenomena or [])}".lower()
+        found = {
+            keyword for keyword, pattern in _PHENOMENON_PATTERNS
+            if (pattern.search(text_lower) if pattern is not None else keyword in text_lower)
+        }
+        return {
+            keyword for keyword in found
+            if keyword.isascii() or not any(keyword != other and keyword in other for other in found)
+        }
+
+    def _agreement_score(self, independent_sources: int) -> float:
+        """独立来源一致性评分：单一来源为0，来源越多越接近1"""
+        corroborating = max(0, independent_sources - 1)
+        return corroborating / (corroborating + 2)
+
+    @staticmethod
+    def _normalize_source(source_url: str) -> str:
+        """将来源URL归一化为注册域名，用于判断来源是否独立"""
+        if not source_url:
+            return ""
+        domain = urlparse(source_url).netloc.lower() or source_url.lower()
+        domain = domain.split(':')[0]
+        if domain.startswith('www.'):
+            domain = domain[4:]
+        parts = domain.split('.')
+        # 处理 xxx.com.cn 之类的二级后缀
+        if len(parts) >= 3 and parts[-2] in ("com", "org", "net", "gov", "edu", "co", "ac"):
+            return ".".join(parts[-3:])
+        return ".".join(parts[-2:])
+
+    @staticmethod
+    def _valid_location(location: Optional[Dict[str, float]]) -> bool:
+        """经纬度都必须是有限数值且在合法范围内（None、字符串、NaN都视为无位置）"""
+        if not isinstance(location, dict):
+            return False
+        lat, lon = location.get("lat"), location.get("lon")
+        for value in (lat, lon):
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                return False
+        return -90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0
+
+    @staticmethod
+    def _epoch_seconds(timestamp: datetime) -> float:
+        if timestamp.tzinfo is not None:
+            return timestamp.timestamp()
+        return (timestamp - datetime(1970, 1, 1)).total_seconds()
@@ -7,58 +7,171 @@ Web crawling tool for mysterious event research.
 Provides web content extraction and processing capabilities.
 """
 
+import codecs
 import logging
-import requests
-from typing import Dict, Any, Optional, List
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Iterator
 from urllib.parse import urljoin, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
 from langchain_core.tools import tool
 
+from crawler.http_cache import HTTPResponseCache, get_shared_http_cache
+from crawler.parser_pool import make_soup
+from crawler.readability_extractor import ReadabilityExtractor
 from .decorators import mystery_tool
 
 logger = logging.getLogger(__name__)
 
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""", re.IGNORECASE)
+
+
+def _decode_html(body: bytes, headers) -> str:
+    """Decode an HTML body using the header charset, then <meta charset>, then detection.
+
+    requests reports ISO-8859-1 for any text/* response without a charset, which
+    garbles UTF-8 and GBK pages, so that default is never used.
+    """
+    candidates = []
+    if "charset" in headers.get("content-type", "").lower():
+        candidates.append(requests.utils.get_encoding_from_headers(headers))
+    candidates.extend(match.decode("ascii") for match in _META_CHARSET.findall(body[:4096]))
+    candidates.append(requests.compat.chardet.detect(body).get("encoding"))
+    for encoding in candidates:
+        try:
+            name = codecs.lookup(encoding or "").name
+        except LookupError:
+            continue
+        # Browsers treat GB2312/GBK labels as GB18030, which covers the extended characters
+        if name in ("gb2312", "gbk"):
+            name = "gb18030"
+        return body.decode(name, errors="replace")
+    return body.decode("utf-8", errors="replace")
+
 
 class MysteryWebCrawler:
     """Web crawler specialized for mysterious event content."""
     
-    def __init__(self):
+    def __init__(
+        self,
+        http_cache: Optional[HTTPResponseCache] = None,
+        extractor: Optional[ReadabilityExtractor] = None,
+        pool_size: int = 32
+    ):
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        # Size the connection pool for concurrent batch crawls
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.extractor = extractor or ReadabilityExtractor()
+        self._http_cache = http_cache
+    
+    @property
+    def http_cache(self) -> Optional[HTTPResponseCache]:
+        """HTTP response cache, defaulting to the shared on-disk cache."""
+        return self._http_cache if self._http_cache is not None else get_shared_http_cache()
+    
+    def _get(self, url: str, timeout: float, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """GET with a total per-URL deadline.
+        
+        requests' own timeout only bounds each socket operation, so a slow
+        server trickling bytes could hold a worker indefinitely. The body is
+        streamed and abandoned once the deadline passes.
+        """
+        deadline = time.monotonic() + timeout
+        response = self.session.get(url, timeout=timeout, headers=headers, stream=True)
+        chunks = []
+        try:
+            for chunk in response.iter_content(chunk_size=65536):
+                chunks.append(chunk)
+                if time.monotonic() > deadline:
+                    raise requests.Timeout(f"Timed out after {timeout}s reading {url}")
+        finally:
+            response.close()
+        response._content = b"".join(chunks)
+        return response
+    
+    def _fetch(self, url: str, timeout: float):
+        """Fetch a page, revalidating cached copies with conditional headers.
+        
+        Returns:
+            Tuple of (body, headers, status_code, cache_status) where cache_status
+            is "revalidated" when the cached body was reused after a 304.
+        """
+        cache = self.http_cache
+        headers = cache.conditional_headers(url) if cache else {}
+        response = self._get(url, timeout, headers=headers)
+        
+        if response.status_code == 304 and cache:
+            entry = cache.revalidated(url, response.headers)
+            if entry:
+                headers = requests.structures.CaseInsensitiveDict(response.headers)
+                headers['content-type'] = entry.content_type
+                return entry.body, headers, 200, "revalidated"
+            # Cache entry vanished between lookup and response; fetch unconditionally
+            response = self._get(url, timeout)
+        
+        response.raise_for_status()
+        if cache:
+            cache.store(url, response.content, response.headers)
+        return response.content, response.headers, response.status_code, "miss"
     
     def extract_content(self, url: str, timeout: int = 30) -> Dict[str, Any]:
         """Extract content from a web page.
         
         Args:
             url: URL to crawl
-            timeout: Request timeout in seconds
+            timeout: Total time budget for the request in seconds
             
         Returns:
             Dict containing extracted content and metadata
         """
         try:
-            response = self.session.get(url, timeout=timeout)
-            response.raise_for_status()
+            body, headers, status_code, cache_status = self._fetch(url, timeout)
+            
+            # Unchanged page: skip re-extraction and reuse the previous result
+            if cache_status == "revalidated":
+                cached = self.http_cache.get_parsed(url, self.__class__.__name__)
+                if cached:
+                    cached["metadata"]["cache"] = cache_status
+                    return cached
+            
+            html = _decode_html(body, headers)
+            article = self.extractor.extract_article(html, url)
+            links, images = self._extract_links_and_images(html, url)
             
-            # Mock content extraction (in real implementation, use BeautifulSoup or similar)
             content = {
                 "url": url,
-                "title": f"Mystery Content from {urlparse(url).netloc}",
-                "text": f"Extracted content from {url}. This would contain the actual web page content in a real implementation.",
+                "title": article.title or f"Mystery Content from {urlparse(url).netloc}",
+                "text": article.plain_text,
+                "markdown": article.to_markdown(),
                 "metadata": {
-                    "status_code": response.status_code,
-                    "content_type": response.headers.get('content-type', ''),
-                    "content_length": len(response.content),
-                    "last_modified": response.headers.get('last-modified', ''),
+                    "status_code": status_code,
+                    "content_type": headers.get('content-type', ''),
+                    "content_length": len(body),
+                    "last_modified": headers.get('last-modified', ''),
+                    "cache": cache_status,
+                    "author": article.author,
+                    "publication_date": article.publication_date.isoformat() if article.publication_date else None,
+                    "source_type": article.source_type,
+                    "credibility_score": article.credibility_score,
+                    "event_type": article.event_type,
+                    "mystery_keywords": article.mystery_keywords,
                 },
-                "links": [],  # Would extract links in real implementation
-                "images": [],  # Would extract images in real implementation
-                "timestamp": None
+                "links": links,
+                "images": images,
+                "timestamp": datetime.now().isoformat()
             }
             
-            from datetime import datetime
-            content["timestamp"] = datetime.now().isoformat()
+            if self.http_cache:
+                self.http_cache.store_parsed(url, self.__class__.__name__, content)
             
             return content
             
@@ -70,31 +183,62 @@ class MysteryWebCrawler:
                 "timestamp": None
             }
     
-    def batch_crawl(self, urls: List[str], max_workers: int = 5) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _extract_links_and_images(html: str, url: str):
+        soup = make_soup(html)
+        links = list(dict.fromkeys(
+            urljoin(url, a['href']) for a in soup.find_all('a', href=True)
+            if not a['href'].startswith(('#', 'javascript:', 'mailto:'))
+        ))
+        images = list(dict.fromkeys(urljoin(url, img['src']) for img in soup.find_all('img', src=True)))
+        return links, images
+    
+    def iter_crawl(self, urls: List[str], max_workers: int = 5, timeout: int = 30) -> Iterator[Dict[str, Any]]:
+        """Crawl URLs concurrently, yielding each result as soon as it completes.
+        
+        Args:
+            urls: List of URLs to crawl
+            max_workers: Maximum number of concurrent workers
+            timeout: Total time budget per URL in seconds
+            
+        Yields:
+            Extracted content dictionaries in completion order; each carries
+            its position in ``urls`` under "index"
+        """
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mystery-crawl")
+        try:
+            futures = {executor.submit(self.extract_content, url, timeout): (i, url) for i, url in enumerate(urls)}
+            for future in as_completed(futures):
+                index, url = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"Error in batch crawl for {url}: {str(e)}")
+                    result = {
+                        "url": url,
+                        "error": str(e),
+                        "timestamp": None
+                    }
+                result["index"] = index
+                yield result
+        finally:
+            # Abandoned iteration should not keep queued URLs running
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def batch_crawl(self, urls: List[str], max_workers: int = 5, timeout: int = 30) -> List[Dict[str, Any]]:
         """Crawl multiple URLs concurrently.
         
         Args:
             urls: List of URLs to crawl
             max_workers: Maximum number of concurrent workers
+            timeout: Total time budget per URL in seconds
             
         Returns:
-            List of extracted content dictionaries
+            List of extracted content dictionaries, in input order
         """
-        results = []
-        
-        # Simple sequential implementation (in real implementation, use ThreadPoolExecutor)
-        for url in urls:
-            try:
-                content = self.extract_content(url)
-                results.append(content)
-            except Exception as e:
-                logger.error(f"Error in batch crawl for {url}: {str(e)}")
-                results.append({
-                    "url": url,
-                    "error": str(e),
-                    "timestamp": None
-                })
-        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(urls)
+        for result in self.iter_crawl(urls, max_workers, timeout):
+            results[result["index"]] = result
         return results
 
 
@@ -124,6 +268,12 @@ def crawl_tool(
     try:
         content = _crawler.extract_content(url, timeout)
         
+        # Links and images are always extracted; only return what was asked for
+        if not extract_links:
+            content.pop("links", None)
+        if not extract_images:
+            content.pop("images", None)
+        
         # Add extraction flags to metadata
         if "metadata" not in content:
             content["metadata"] = {}
@@ -149,28 +299,38 @@ def batch_crawl_tool(
     max_workers: int = 5,
     timeout: int = 30
 ) -> Dict[str, Any]:
-    """Crawl multiple URLs for mystery research.
+    """Crawl multiple URLs concurrently for mystery research.
+    
+    Progress is logged as each page completes.
     
     Args:
         urls: List of URLs to crawl
         max_workers: Maximum number of concurrent workers
-        timeout: Request timeout in seconds
+        timeout: Total time budget per URL in seconds
         
     Returns:
         Dict containing batch crawl results
     """
     try:
-        results = _crawler.batch_crawl(urls, max_workers)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(urls)
+        completed = 0
+        for result in _crawler.iter_crawl(urls, max_workers, timeout):
+            results[result["index"]] = result
+            completed += 1
+            status = "failed" if "error" in result else "ok"
+            logger.info(f"Batch crawl progress {completed}/{len(urls)}: {result['url']} ({status})")
         
         # Calculate statistics
         successful = sum(1 for r in results if "error" not in r)
         failed = len(results) - successful
+        cache = _crawler.http_cache
         
         return {
             "total_urls": len(urls),
             "successful": successful,
             "failed": failed,
             "results": results,
+            "cache_stats": cache.get_stats() if cache else None,
             "timestamp": None
         }
         
@@ -233,7 +393,6 @@ def mystery_site_crawler(
                     "timestamp": None
                 }
                 
-                from datetime import datetime
                 mock_result["timestamp"] = datetime.now().isoformat()
                 results.append(mock_result)
         
@@ -12,6 +12,13 @@ from urllib.parse import urlparse
 from langchain_core.tools import BaseTool, tool
 
 from config.mystery_config import MysteryEventConfig, DataSourceConfig, DataSourceType
+from tools.corroboration import CorroborationIndex, CorroborationResult
+from tools.credibility_pipeline import (
+    CredibilityPipeline,
+    CredibilityStage,
+    CredibilityWeights,
+    FeatureRecorder
+)
 from tools.decorators import log_io
 
 logger = logging.getLogger(__name__)
@@ -34,15 +41,37 @@ class CredibilityAnalyzer(BaseTool):
     """信息可信度分析工具"""
     name: str = "credibility_analyzer"
     description: str = "Analyze the credibility of mystery event information based on multiple criteria."
-    
-    def __init__(self, config: Optional[MysteryEventConfig] = None):
+    config: Optional[MysteryEventConfig] = None
+    weights: Optional[CredibilityWeights] = None
+    feature_recorder: Optional[FeatureRecorder] = None
+    corroboration_weight: float = 0.15
+    reliable_domains: Dict[str, float] = {}
+    professional_terms: Dict[str, List[str]] = {}
+    pipeline: Optional[CredibilityPipeline] = None
+
+    def __init__(
+        self,
+        config: Optional[MysteryEventConfig] = None,
+        enabled_stages: Optional[List[str]] = None,
+        weights: Optional[CredibilityWeights] = None,
+        record_features: bool = False
+    ):
         """初始化可信度分析器
         
         Args:
             config: 神秘事件配置
+            enabled_stages: 只启用这些评分阶段（None表示全部启用），
+                例如 ["source", "overall"] 用于热路径上的仅来源评分
+            weights: 评分权重
+            record_features: 是否记录每次评分的特征向量以便导出
         """
         super().__init__()
         self.config = config or MysteryEventConfig()
+        self.weights = weights or CredibilityWeights()
+        self.feature_recorder = FeatureRecorder() if record_features else None
+        
+        # 跨文档佐证评分在总体评分中的权重
+        self.corroboration_weight = 0.15
         
         # 可靠来源域名列表
         self.reliable_domains = {
@@ -93,6 +122,11 @@ class CredibilityAnalyzer(BaseTool):
             "ancient": ["archaeology", "carbon dating", "stratigraphy", "artifact", "civilization",
                        "考古学", "碳定年", "地层学", "文物", "文明"]
         }
+        
+        # 评分流水线
+        self.pipeline = self._build_pipeline()
+        if enabled_stages is not None:
+            self.pipeline.configure(enabled_stages=enabled_stages)
     
     def _run(self, content: str, source_url: str = "", publish_date: str = "") -> str:
         """运行可信度分析
@@ -123,71 +157,213 @@ class CredibilityAnalyzer(BaseTool):
             logger.error(error_msg)
             return json.dumps({"error": error_msg}, ensure_ascii=False)
     
-    def analyze_credibility(self, content: str, source_url: str = "", publish_date: str = "") -> CredibilityScore:
+    def analyze_credibility(self, content: str, source_url: str = "", publish_date: str = "",
+                            corroboration: Optional[CorroborationResult] = None) -> CredibilityScore:
         """分析内容的可信度
         
         Args:
             content: 要分析的内容
             source_url: 来源URL
             publish_date: 发布日期
+            corroboration: 跨文档佐证结果（来自CorroborationIndex）
             
         Returns:
-            CredibilityScore对象
+            CredibilityScore对象，被禁用阶段对应的评分为默认值0.5
         """
-        # 1. 来源可信度评分
-        source_score = self._analyze_source_credibility(source_url)
-        
-        # 2. 内容逻辑性评分
-        logic_score = self._analyze_content_logic(content)
-        
-        # 3. 专业术语使用评分
-        term_score = self._analyze_professional_terms(content)
-        
-        # 4. 细节丰富度评分
-        detail_score = self._analyze_detail_richness(content)
-        
-        # 5. 时效性评分
-        temporal_score = self._analyze_temporal_relevance(publish_date)
-        
-        # 综合内容评分
-        content_score = (logic_score * 0.4 + term_score * 0.3 + detail_score * 0.3)
-        
-        # 计算总体评分
-        overall_score = (
-            source_score * 0.3 +
-            content_score * 0.4 +
-            temporal_score * 0.3
-        )
-        
-        # 生成评分因子详情
-        factors = {
-            "source_analysis": self._get_source_analysis(source_url),
-            "content_analysis": {
-                "logic_issues": self._detect_logic_issues(content),
-                "professional_terms_count": self._count_professional_terms(content),
-                "detail_indicators": self._get_detail_indicators(content),
-                "word_count": len(content.split()),
-                "sentence_count": len(re.split(r'[.!?。！？]', content))
-            },
-            "temporal_analysis": self._get_temporal_analysis(publish_date)
+        result = self.pipeline.run({
+            "content": content,
+            "source_url": source_url,
+            "publish_date": publish_date,
+            "corroboration": corroboration
+        })
+        features = result.features
+        
+        if self.feature_recorder is not None:
+            self.feature_recorder.record({"source_url": source_url, "publish_date": publish_date}, result)
+        
+        # 生成评分因子详情（只包含已执行阶段的结果）
+        factors: Dict[str, Any] = {}
+        if "source_analysis" in features:
+            factors["source_analysis"] = features["source_analysis"]
+        content_analysis = {
+            key: features[key]
+            for key in ("logic_issues", "professional_terms_count", "detail_indicators",
+                        "word_count", "sentence_count")
+            if key in features
+        }
+        if content_analysis:
+            factors["content_analysis"] = content_analysis
+        if "temporal_analysis" in features:
+            factors["temporal_analysis"] = features["temporal_analysis"]
+        if "corroboration_details" in features:
+            factors["corroboration"] = features["corroboration_details"]
+        factors["pipeline"] = {
+            "executed_stages": result.executed_stages,
+            "skipped_stages": result.skipped_stages,
+            "timings_ms": result.timings_ms
         }
         
         # 生成改进建议
         recommendations = self._generate_recommendations(
-            source_score, logic_score, term_score, detail_score, temporal_score
+            features.get("source_score"), features.get("logic_score"), features.get("term_score"),
+            features.get("detail_score"), features.get("temporal_score")
         )
+        if corroboration is not None and corroboration.independent_sources < 2:
+            recommendations.append("该事件暂无其他独立来源佐证，建议寻找更多独立报道进行交叉验证")
         
         return CredibilityScore(
-            overall_score=overall_score,
-            source_score=source_score,
-            content_score=content_score,
-            temporal_score=temporal_score,
-            detail_score=detail_score,
-            logic_score=logic_score,
+            overall_score=features.get("overall_score", 0.5),
+            source_score=features.get("source_score", 0.5),
+            content_score=features.get("content_score", 0.5),
+            temporal_score=features.get("temporal_score", 0.5),
+            detail_score=features.get("detail_score", 0.5),
+            logic_score=features.get("logic_score", 0.5),
             factors=factors,
             recommendations=recommendations
         )
     
+    def get_stage_stats(self) -> Dict[str, Dict[str, float]]:
+        """获取各评分阶段的累计耗时统计"""
+        return self.pipeline.get_stage_stats()
+    
+    def export_features(self, path: str) -> str:
+        """将记录的特征向量导出为列式文件，用于离线调整权重"""
+        if self.feature_recorder is None:
+            raise RuntimeError("Feature recording is disabled. Pass record_features=True.")
+        return self.feature_recorder.export(path)
+    
+    def _build_pipeline(self) -> CredibilityPipeline:
+        """构建默认的可信度评分流水线"""
+        stages = [
+            CredibilityStage(
+                name="source", func=self._source_stage,
+                inputs=["source_url"], outputs=["source_score", "source_analysis"],
+                description="来源域名可信度"
+            ),
+            CredibilityStage(
+                name="logic", func=self._logic_stage,
+                inputs=["content"], outputs=["logic_score", "logic_issues"],
+                description="矛盾、夸张与连贯性"
+            ),
+            CredibilityStage(
+                name="terms", func=self._terms_stage,
+                inputs=["content"], outputs=["term_score", "professional_terms_count"],
+                description="专业术语使用"
+            ),
+            CredibilityStage(
+                name="detail", func=self._detail_stage,
+                inputs=["content"],
+                outputs=["detail_score", "detail_indicators", "word_count", "sentence_count"],
+                description="时间、地点、数字等细节"
+            ),
+            CredibilityStage(
+                name="temporal", func=self._temporal_stage,
+                inputs=["publish_date"], outputs=["temporal_score", "temporal_analysis"],
+                description="发布时效性"
+            ),
+            CredibilityStage(
+                name="content", func=self._content_stage,
+                inputs=["logic_score", "term_score", "detail_score"], outputs=["content_score"],
+                description="内容子评分加权"
+            ),
+            CredibilityStage(
+                name="overall", func=self._overall_stage,
+                inputs=["source_score", "content_score", "temporal_score"], outputs=["overall_score"],
+                description="总体评分加权"
+            ),
+            CredibilityStage(
+                name="corroboration", func=self._corroboration_stage,
+                inputs=["corroboration", "overall_score"],
+                outputs=["overall_score", "corroboration_score", "corroboration_details"],
+                description="跨文档佐证加分"
+            ),
+        ]
+        return CredibilityPipeline(
+            stages, raw_inputs=["content", "source_url", "publish_date", "corroboration"]
+        )
+    
+    def _source_stage(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        source_url = ctx["source_url"]
+        return {
+            "source_score": self._analyze_source_credibility(source_url),
+            "source_analysis": self._get_source_analysis(source_url)
+        }
+    
+    def _logic_stage(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        content = ctx["content"]
+        return {
+            "logic_score": self._analyze_content_logic(content),
+            "logic_issues": self._detect_logic_issues(content)
+        }
+    
+    def _terms_stage(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        content = ctx["content"]
+        return {
+            "term_score": self._analyze_professional_terms(content),
+            "professional_terms_count": self._count_professional_terms(content)
+        }
+    
+    def _detail_stage(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        content = ctx["content"]
+        return {
+            "detail_score": self._analyze_detail_richness(content),
+            "detail_indicators": self._get_detail_indicators(content),
+            "word_count": len(content.split()),
+            "sentence_count": len(re.split(r'[.!?。！？]', content))
+        }
+    
+    def _temporal_stage(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        publish_date = ctx["publish_date"]
+        return {
+            "temporal_score": self._analyze_temporal_relevance(publish_date),
+            "temporal_analysis": self._get_temporal_analysis(publish_date)
+        }
+    
+    def _content_stage(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        score = self._weighted_average(ctx, {
+            "logic_score": self.weights.logic,
+            "term_score": self.weights.terms,
+            "detail_score": self.weights.detail
+        })
+        return {"content_score": score} if score is not None else {}
+    
+    def _overall_stage(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        score = self._weighted_average(ctx, {
+            "source_score": self.weights.source,
+            "content_score": self.weights.content,
+            "temporal_score": self.weights.temporal
+        })
+        return {"overall_score": score} if score is not None else {}
+    
+    def _corroboration_stage(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        """跨文档佐证：独立来源越多，总体评分越高（只加分，不惩罚单一来源）"""
+        corroboration = ctx.get("corroboration")
+        if corroboration is None or "overall_score" not in ctx:
+            return {}
+        overall_score = ctx["overall_score"]
+        overall_score += (1 - overall_score) * corroboration.agreement_score * self.corroboration_weight
+        return {
+            "overall_score": overall_score,
+            "corroboration_score": corroboration.agreement_score,
+            "corroboration_details": {
+                "cluster_id": corroboration.cluster_id,
+                "cluster_size": corroboration.cluster_size,
+                "independent_sources": corroboration.independent_sources,
+                "corroborating_sources": corroboration.corroborating_sources,
+                "agreement_score": corroboration.agreement_score,
+                "matched_dimensions": corroboration.matched_dimensions
+            }
+        }
+    
+    @staticmethod
+    def _weighted_average(ctx: Dict[str, Any], weights: Dict[str, float]) -> Optional[float]:
+        """对已产出的评分做加权平均，缺失项（阶段被禁用）的权重按比例重新分配"""
+        available = {key: weight for key, weight in weights.items() if key in ctx}
+        total_weight = sum(available.values())
+        if not available or total_weight <= 0:
+            return None
+        return sum(ctx[key] * weight for key, weight in available.items()) / total_weight
+    
     def _analyze_source_credibility(self, source_url: str) -> float:
         """分析来源可信度"""
         if not source_url:
@@ -458,25 +634,25 @@ class CredibilityAnalyzer(BaseTool):
         except ValueError:
             return {"date": "invalid", "age_days": "unknown", "freshness": "unknown"}
     
-    def _generate_recommendations(self, source_score: float, logic_score: float, 
-                                term_score: float, detail_score: float, 
-                                temporal_score: float) -> List[str]:
-        """生成改进建议"""
+    def _generate_recommendations(self, source_score: Optional[float], logic_score: Optional[float], 
+                                term_score: Optional[float], detail_score: Optional[float], 
+                                temporal_score: Optional[float]) -> List[str]:
+        """生成改进建议（未执行阶段的评分为None，不生成对应建议）"""
         recommendations = []
         
-        if source_score < 0.6:
+        if source_score is not None and source_score < 0.6:
             recommendations.append("建议寻找更可靠的信息来源，如学术机构、政府部门或权威媒体")
         
-        if logic_score < 0.6:
+        if logic_score is not None and logic_score < 0.6:
             recommendations.append("内容存在逻辑问题，建议核实信息的一致性和合理性")
         
-        if term_score < 0.4:
+        if term_score is not None and term_score < 0.4:
             recommendations.append("缺乏专业术语，建议补充相关领域的专业描述")
         
-        if detail_score < 0.5:
+        if detail_score is not None and detail_score < 0.5:
             recommendations.append("细节不够丰富，建议添加具体的时间、地点、数据等信息")
         
-        if temporal_score < 0.5:
+        if temporal_score is not None and temporal_score < 0.5:
             recommendations.append("信息较为陈旧，建议寻找更新的相关报道或研究")
         
         if not recommendations:
@@ -485,6 +661,16 @@ class CredibilityAnalyzer(BaseTool):
         return recommendations
 
 
+def _parse_event_time(value: Any) -> Optional[datetime]:
+    """解析事件时间，无法解析时返回None"""
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
 @tool
 @log_io
 def analyze_information_credibility(
@@ -520,7 +706,8 @@ def filter_reliable_information(
     """筛选可靠信息
     
     Args:
-        information_list: 信息列表，每个元素包含content, source_url, publish_date等字段
+        information_list: 信息列表，每个元素包含content, source_url, publish_date等字段，
+            可选的event_time(ISO格式)、location({"lat", "lon"})和phenomena用于跨文档佐证
         min_credibility: 最小可信度阈值
     
     Returns:
@@ -528,15 +715,34 @@ def filter_reliable_information(
     """
     try:
         analyzer = CredibilityAnalyzer()
+        corroboration_index = CorroborationIndex(analyzer.config)
         reliable_info = []
         filtered_info = []
         
-        for info in information_list:
+        # 先增量建立佐证索引，使每条信息都能看到全部独立来源
+        doc_ids = []
+        for i, info in enumerate(information_list):
+            doc_id = str(info.get('id') or f"info_{i}")
+            doc_ids.append(doc_id)
+            corroboration_index.add_document(
+                doc_id=doc_id,
+                content=info.get('content', ''),
+                source_url=info.get('source_url', ''),
+                # 发布时间不等于事件发生时间，不用它判定时间维度
+                timestamp=_parse_event_time(info.get('event_time')),
+                location=info.get('location'),
+                phenomena=info.get('phenomena')
+            )
+        
+        for doc_id, info in zip(doc_ids, information_list):
             content = info.get('content', '')
             source_url = info.get('source_url', '')
             publish_date = info.get('publish_date', '')
             
-            score = analyzer.analyze_credibility(content, source_url, publish_date)
+            score = analyzer.analyze_credibility(
+                content, source_url, publish_date,
+                corroboration=corroboration_index.get_result(doc_id)
+            )
             
             info_with_score = info.copy()
             info_with_score['credibility_score'] = score.overall_score
@@ -544,6 +750,7 @@ def filter_reliable_information(
                 'source_score': score.source_score,
                 'content_score': score.content_score,
                 'temporal_score': score.temporal_score,
+                'corroboration': score.factors.get('corroboration'),
                 'recommendations': score.recommendations
             }
             
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+# SPDX-License-Identifier: MIT
+
+import logging
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CredibilityStage:
+    """可信度特征阶段
+
+    每个阶段声明自己读取的输入键和产出的输出键，
+    由CredibilityPipeline按顺序执行并单独计时。
+    """
+    name: str
+    func: Callable[[Dict[str, Any]], Dict[str, Any]]
+    inputs: List[str]
+    outputs: List[str]
+    enabled: bool = True
+    description: str = ""
+
+
+@dataclass
+class CredibilityWeights:
+    """可信度评分权重"""
+    # 内容评分 = 各子评分的加权平均
+    logic: float = 0.4
+    terms: float = 0.3
+    detail: float = 0.3
+    # 总体评分 = 各维度评分的加权平均
+    source: float = 0.3
+    content: float = 0.4
+    temporal: float = 0.3
+
+
+@dataclass
+class PipelineResult:
+    """一次流水线运行的结果"""
+    features: Dict[str, Any]  # 所有阶段的输出
+    timings_ms: Dict[str, float]  # 各阶段耗时（毫秒）
+    executed_stages: List[str]
+    skipped_stages: List[str] = field(default_factory=list)
+
+
+class CredibilityPipeline:
+    """可插拔的可信度特征流水线"""
+
+    def __init__(self, stages: List[CredibilityStage], raw_inputs: Iterable[str]):
+        """初始化流水线
+
+        Args:
+            stages: 按执行顺序排列的阶段列表
+            raw_inputs: 调用方直接提供的原始输入键
+        """
+        self.stages = stages
+        self.raw_inputs = set(raw_inputs)
+        self.stage_stats: Dict[str, Dict[str, float]] = {
+            stage.name: {"calls": 0, "total_ms": 0.0} for stage in stages
+        }
+        self._validate()
+
+    def _validate(self):
+        """检查每个阶段的输入都由原始输入或更早的阶段产出"""
+        available = set(self.raw_inputs)
+        names = set()
+        for stage in self.stages:
+            if stage.name in names:
+                raise ValueError(f"Duplicate credibility stage: {stage.name}")
+            names.add(stage.name)
+            missing = [key for key in stage.inputs if key not in available]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown inputs: {missing}")
+            available.update(stage.outputs)
+
+    @property
+    def stage_names(self) -> List[str]:
+        return [stage.name for stage in self.stages]
+
+    @property
+    def enabled_stages(self) -> List[str]:
+        return [stage.name for stage in self.stages if stage.enabled]
+
+    def configure(self, enabled_stages: Optional[Iterable[str]] = None,
+                  disabled_stages: Optional[Iterable[str]] = None):
+        """启用或禁用阶段
+
+        Args:
+            enabled_stages: 只启用这些阶段（None表示不改变）
+            disabled_stages: 额外禁用的阶段
+        """
+        known = set(self.stage_names)
+        for names in (enabled_stages, disabled_stages):
+            unknown = set(names or []) - known
+            if unknown:
+                raise ValueError(f"Unknown credibility stages: {sorted(unknown)}")
+
+        if enabled_stages is not None:
+            enabled = set(enabled_stages)
+            for stage in self.stages:
+                stage.enabled = stage.name in enabled
+        for stage in self.stages:
+            if disabled_stages and stage.name in disabled_stages:
+                stage.enabled = False
+
+    def run(self, inputs: Dict[str, Any]) -> PipelineResult:
+        """按顺序执行所有启用的阶段
+
+        禁用阶段完全不执行，其输出不会出现在结果中，
+        下游阶段需自行处理缺失的可选输入。
+        """
+        context = dict(inputs)
+        timings: Dict[str, float] = {}
+        executed: List[str] = []
+        skipped: List[str] = []
+
+        for stage in self.stages:
+            if not stage.enabled:
+                skipped.append(stage.name)
+                continue
+
+            start = time.perf_counter()
+            outputs = stage.func(context) or {}
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            context.update({key: outputs[key] for key in stage.outputs if key in outputs})
+            timings[stage.name] = elapsed_ms
+            executed.append(stage.name)
+
+            stats = self.stage_stats[stage.name]
+            stats["calls"] += 1
+            stats["total_ms"] += elapsed_ms
+
+        features = {key: value for key, value in context.items() if key not in self.raw_inputs}
+        return PipelineResult(
+            features=features,
+            timings_ms=timings,
+            executed_stages=executed,
+            skipped_stages=skipped
+        )
+
+    def get_stage_stats(self) -> Dict[str, Dict[str, float]]:
+        """获取各阶段的累计调用次数与平均耗时"""
+        return {
+            name: {
+                "calls": stats["calls"],
+                "total_ms": stats["total_ms"],
+                "avg_ms": stats["total_ms"] / stats["calls"] if stats["calls"] else 0.0
+            }
+            for name, stats in self.stage_stats.items()
+        }
+
+
+class FeatureRecorder:
+    """特征向量记录器，用于离线调参
+
+    每次评分追加一行（标识列 + 数值特征 + 各阶段耗时），
+    最终以列式格式（Parquet/Feather）或CSV导出。
+    """
+
+    def __init__(self):
+        self.rows: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def record(self, identifiers: Dict[str, Any], result: PipelineResult):
+        """记录一次流水线运行的特征向量"""
+        row = dict(identifiers)
+        for key, value in result.features.items():
+            # 只导出标量特征，详情类结构保留在factors中
+            if isinstance(value, (int, float, bool, str)) or value is None:
+                row[key] = value
+        for stage_name, elapsed_ms in result.timings_ms.items():
+            row[f"time_ms_{stage_name}"] = elapsed_ms
+        self.rows.append(row)
+
+    def export(self, path: str) -> str:
+        """导出特征表
+
+        Args:
+            path: 输出路径，后缀决定格式（.parquet/.feather/.csv）
+
+        Returns:
+            实际写入的文件路径
+        """
+        import pandas as pd
+
+        output_path = Path(path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        frame = pd.DataFrame(self.rows)
+
+        suffix = output_path.suffix.lower()
+        if suffix == ".parquet":
+            frame.to_parquet(output_path, index=False)
+        elif suffix == ".feather":
+            frame.reset_index(drop=True).to_feather(output_path)
+        else:
+            frame.to_csv(output_path, index=False)
+
+        logger.info(f"Exported {len(frame)} credibility feature rows to {output_path}")
+        return str(output_path)
+
+    def clear(self):
+        self.rows.clear()
@@ -3,18 +3,48 @@
 
 import json
 import logging
-from typing import Dict, List, Any, Optional, Union
-from dataclasses import dataclass, asdict
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple, Union
+from dataclasses import dataclass
 from datetime import datetime
+from urllib.parse import quote
 import hashlib
 
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from langchain_core.tools import BaseTool, tool
 
 from config.mystery_config import MysteryEventConfig
+from rag.elasticsearch_retriever import INDEX_MAPPINGS, INDEX_SETTINGS
+from config.tools import (
+    ELASTICSEARCH_BULK_CHUNK_BYTES,
+    ELASTICSEARCH_BULK_MAX_ACTIONS,
+    ELASTICSEARCH_BULK_WORKERS,
+    ELASTICSEARCH_PASSWORD,
+    ELASTICSEARCH_URL,
+    ELASTICSEARCH_USER,
+    STORAGE_OUTBOX_BATCH_SIZE,
+    STORAGE_OUTBOX_DB,
+    STORAGE_OUTBOX_ENABLED,
+)
 from tools.decorators import log_io
+from tools.outbox import Sink, StorageOutbox
 
 logger = logging.getLogger(__name__)
 
+# 标签和关系类型会拼入Cypher，只允许合法标识符
+IDENTIFIER_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# 可变长度路径的最大深度，防止遍历整个图
+MAX_RELATED_DEPTH = 5
+
 
 @dataclass
 class GraphNode:
@@ -45,39 +75,58 @@ class GraphData:
 
 
 class Neo4jStorage(BaseTool):
-    """Neo4j图数据库存储工具"""
+    """Neo4j图数据库存储工具
+
+    节点按标签、关系按（类型, 起点标签, 终点标签）分组，每组用UNWIND批量写入，
+    每批一个托管写事务；返回结果中逐条列出写入失败的节点和关系。
+    """
     name: str = "neo4j_storage"
     description: str = "Store and query data in Neo4j graph database."
+    config: Optional[MysteryEventConfig] = None
+    driver: Any = None
+    batch_size: int = 1000
     
-    def __init__(self, config: Optional[MysteryEventConfig] = None):
+    def __init__(
+        self,
+        config: Optional[MysteryEventConfig] = None,
+        driver: Any = None,
+        batch_size: Optional[int] = None
+    ):
         """初始化Neo4j存储
         
         Args:
             config: 神秘事件配置
+            driver: 已创建的Neo4j驱动（测试或共享连接时传入）
+            batch_size: 每个写事务的行数（默认读取NEO4J_BATCH_SIZE）
         """
         super().__init__()
         self.config = config or MysteryEventConfig()
-        self.driver = None
-        self._initialize_connection()
+        self.batch_size = batch_size or int(os.getenv("NEO4J_BATCH_SIZE", "1000"))
+        self.driver = driver
+        if self.driver is None:
+            self._initialize_connection()
     
     def _initialize_connection(self):
         """初始化数据库连接"""
         try:
-            # 这里应该使用真实的Neo4j驱动，但为了演示，我们使用模拟
-            # from neo4j import GraphDatabase
-            # self.driver = GraphDatabase.driver(
-            #     self.config.neo4j_config["uri"],
-            #     auth=(self.config.neo4j_config["username"], self.config.neo4j_config["password"])
-            # )
-            
-            # 模拟连接
-            self.driver = "mock_neo4j_driver"
-            logger.info("Neo4j connection initialized (mock)")
+            from neo4j import GraphDatabase
+            self.driver = GraphDatabase.driver(
+                self.config.neo4j_uri,
+                auth=(self.config.neo4j_user, self.config.neo4j_password),
+                max_connection_pool_size=int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+            )
+            logger.info("Neo4j connection initialized")
             
         except Exception as e:
             logger.error(f"Failed to initialize Neo4j connection: {e}")
             self.driver = None
     
+    def close(self):
+        """关闭数据库连接"""
+        if self.driver is not None:
+            self.driver.close()
+            self.driver = None
+    
     def _run(self, operation: str, data: str = None, query: str = None) -> str:
         """运行Neo4j操作
         
@@ -112,94 +161,181 @@ class Neo4jStorage(BaseTool):
     def _store_data(self, data: str) -> str:
         """存储数据到Neo4j"""
         try:
-            graph_data = json.loads(data)
-            
-            # 解析图数据
-            nodes = graph_data.get("nodes", [])
-            relationships = graph_data.get("relationships", [])
-            
-            # 模拟存储节点
-            stored_nodes = []
-            for node_data in nodes:
-                node = GraphNode(
-                    id=node_data.get("id", ""),
-                    label=node_data.get("label", ""),
-                    properties=node_data.get("properties", {}),
-                    node_type=node_data.get("node_type", "unknown")
-                )
-                
-                # 在真实实现中，这里会执行Cypher CREATE语句
-                cypher_query = self._generate_create_node_cypher(node)
-                logger.info(f"Would execute: {cypher_query}")
-                
-                stored_nodes.append(asdict(node))
-            
-            # 模拟存储关系
-            stored_relationships = []
-            for rel_data in relationships:
-                relationship = GraphRelationship(
-                    id=rel_data.get("id", ""),
-                    source_id=rel_data.get("source_id", ""),
-                    target_id=rel_data.get("target_id", ""),
-                    relationship_type=rel_data.get("relationship_type", ""),
-                    properties=rel_data.get("properties", {}),
-                    weight=rel_data.get("weight", 1.0)
-                )
-                
-                # 在真实实现中，这里会执行Cypher MATCH + CREATE语句
-                cypher_query = self._generate_create_relationship_cypher(relationship)
-                logger.info(f"Would execute: {cypher_query}")
-                
-                stored_relationships.append(asdict(relationship))
-            
-            return json.dumps({
-                "status": "success",
-                "stored_nodes": len(stored_nodes),
-                "stored_relationships": len(stored_relationships),
-                "nodes": stored_nodes,
-                "relationships": stored_relationships
-            }, ensure_ascii=False)
+            return json.dumps(self.store_graph_data(json.loads(data)), ensure_ascii=False)
             
         except Exception as e:
             error_msg = f"Failed to store data in Neo4j. Error: {repr(e)}"
             logger.error(error_msg)
             return json.dumps({"error": error_msg}, ensure_ascii=False)
     
-    def _query_data(self, query: str) -> str:
+    def store_graph_data(self, graph_data: Dict[str, Any], batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """写入{"nodes": [...], "relationships": [...]}格式的图数据"""
+        nodes = [
+            GraphNode(
+                id=node_data.get("id", ""),
+                label=node_data.get("label", ""),
+                properties=node_data.get("properties", {}),
+                node_type=node_data.get("node_type", "unknown")
+            )
+            for node_data in graph_data.get("nodes", [])
+        ]
+        relationships = [
+            GraphRelationship(
+                id=rel_data.get("id", ""),
+                source_id=rel_data.get("source_id", ""),
+                target_id=rel_data.get("target_id", ""),
+                relationship_type=rel_data.get("relationship_type", ""),
+                properties=rel_data.get("properties", {}),
+                weight=rel_data.get("weight", 1.0)
+            )
+            for rel_data in graph_data.get("relationships", [])
+        ]
+        # 分批写入时关系端点可能在更早的批次中，用关系上携带的标签提示匹配
+        known_labels = {}
+        for rel_data in graph_data.get("relationships", []):
+            if rel_data.get("source_label"):
+                known_labels[rel_data.get("source_id", "")] = rel_data["source_label"]
+            if rel_data.get("target_label"):
+                known_labels[rel_data.get("target_id", "")] = rel_data["target_label"]
+        return self.store_graph(nodes, relationships, batch_size, known_labels)
+    
+    def store_graph(
+        self,
+        nodes: List[GraphNode],
+        relationships: List[GraphRelationship],
+        batch_size: Optional[int] = None,
+        known_labels: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """批量写入节点和关系
+        
+        Args:
+            nodes: 节点列表（按id合并，属性覆盖更新）
+            relationships: 关系列表（按id合并）
+            batch_size: 每个写事务的行数
+            known_labels: 不在本次nodes中的关系端点的标签（节点id -> 标签）
+            
+        Returns:
+            写入统计和逐条失败信息
+        """
+        batch_size = batch_size or self.batch_size
+        failures: List[Dict[str, Any]] = []
+        stored_nodes = 0
+        stored_relationships = 0
+        
+        node_groups: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        labels: Dict[str, str] = {
+            node_id: label for node_id, label in (known_labels or {}).items() if IDENTIFIER_PATTERN.match(label)
+        }
+        for node in nodes:
+            if not node.id or not IDENTIFIER_PATTERN.match(node.label):
+                failures.append({"kind": "node", "id": node.id, "error": f"Invalid node id or label: {node.label!r}"})
+                continue
+            labels[node.id] = node.label
+            node_groups[node.label].append({
+                "id": node.id,
+                "node_type": node.node_type,
+                "properties": _to_neo4j_properties(node.properties)
+            })
+        
+        with self.driver.session() as session:
+            for label in node_groups:
+                session.run(f"CREATE INDEX {label.lower()}_id_index IF NOT EXISTS FOR (n:{label}) ON (n.id)")
+            
+            for label, rows in node_groups.items():
+                query = (
+                    f"UNWIND $rows AS row MERGE (n:{label} {{id: row.id}}) "
+                    "SET n += row.properties, n.node_type = row.node_type RETURN row.id AS id"
+                )
+                stored, failed = self._write_rows(session, query, rows, batch_size, "node")
+                stored_nodes += stored
+                failures.extend(failed)
+            
+            # 端点标签已知时带上标签匹配，可以用上id索引
+            rel_groups: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = defaultdict(list)
+            for relationship in relationships:
+                if not IDENTIFIER_PATTERN.match(relationship.relationship_type):
+                    failures.append({
+                        "kind": "relationship", "id": relationship.id,
+                        "error": f"Invalid relationship type: {relationship.relationship_type!r}"
+                    })
+                    continue
+                key = (
+                    relationship.relationship_type,
+                    labels.get(relationship.source_id, ""),
+                    labels.get(relationship.target_id, "")
+                )
+                rel_groups[key].append({
+                    "id": relationship.id,
+                    "source_id": relationship.source_id,
+                    "target_id": relationship.target_id,
+                    "weight": relationship.weight,
+                    "properties": _to_neo4j_properties(relationship.properties)
+                })
+            
+            for (relationship_type, source_label, target_label), rows in rel_groups.items():
+                source = f"a:{source_label}" if source_label else "a"
+                target = f"b:{target_label}" if target_label else "b"
+                query = (
+                    f"UNWIND $rows AS row MATCH ({source} {{id: row.source_id}}) MATCH ({target} {{id: row.target_id}}) "
+                    f"MERGE (a)-[r:{relationship_type} {{id: row.id}}]->(b) "
+                    "SET r += row.properties, r.weight = row.weight RETURN row.id AS id"
+                )
+                stored, failed = self._write_rows(session, query, rows, batch_size, "relationship")
+                stored_relationships += stored
+                failures.extend(failed)
+        
+        return {
+            "status": "success" if not failures else ("partial" if stored_nodes or stored_relationships else "failed"),
+            "stored_nodes": stored_nodes,
+            "stored_relationships": stored_relationships,
+            "failed_count": len(failures),
+            "failures": failures
+        }
+    
+    def _write_rows(
+        self,
+        session,
+        query: str,
+        rows: List[Dict[str, Any]],
+        batch_size: int,
+        kind: str
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """分批执行UNWIND写入，返回（成功数, 逐条失败）；查询需返回写入行的id"""
+        stored = 0
+        failures: List[Dict[str, Any]] = []
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            try:
+                written = session.execute_write(
+                    lambda tx: {record["id"] for record in tx.run(query, rows=batch)}
+                )
+            except Exception as e:
+                # 驱动自带重试后仍失败的瞬时错误（TransientError、ServiceUnavailable、SessionExpired）
+                # 向上抛出由调用方整批重试，不能当作逐条失败吞掉
+                if _is_retryable(e):
+                    raise
+                logger.error(f"Neo4j {kind} batch of {len(batch)} rows failed: {e}")
+                failures.extend({"kind": kind, "id": row["id"], "error": str(e)} for row in batch)
+                continue
+            stored += len(written)
+            failures.extend(
+                {"kind": kind, "id": row["id"], "error": "source or target node not found"}
+                for row in batch if row["id"] not in written
+            )
+        return stored, failures
+    
+    def _query_data(self, query: str, parameters: Optional[Dict[str, Any]] = None) -> str:
         """查询Neo4j数据"""
         try:
-            # 在真实实现中，这里会执行Cypher查询
-            logger.info(f"Would execute query: {query}")
-            
-            # 模拟查询结果
-            mock_results = [
-                {
-                    "node": {
-                        "id": "event_001",
-                        "label": "UFO Sighting",
-                        "properties": {
-                            "title": "UFO目击事件",
-                            "date": "2023-01-15",
-                            "location": "北京市"
-                        }
-                    }
-                },
-                {
-                    "relationship": {
-                        "type": "OCCURRED_AT",
-                        "properties": {
-                            "confidence": 0.9
-                        }
-                    }
-                }
-            ]
+            with self.driver.session() as session:
+                results = [record.data() for record in session.run(query, parameters or {})]
             
             return json.dumps({
                 "status": "success",
                 "query": query,
-                "results": mock_results,
-                "count": len(mock_results)
-            }, ensure_ascii=False)
+                "results": results,
+                "count": len(results)
+            }, ensure_ascii=False, default=str)
             
         except Exception as e:
             error_msg = f"Failed to query Neo4j data. Error: {repr(e)}"
@@ -207,17 +343,26 @@ class Neo4jStorage(BaseTool):
             return json.dumps({"error": error_msg}, ensure_ascii=False)
     
     def _update_data(self, data: str) -> str:
-        """更新Neo4j数据"""
+        """更新Neo4j数据（{"id", "properties"} 或其列表）"""
         try:
             update_data = json.loads(data)
+            items = update_data if isinstance(update_data, list) else [update_data]
+            rows = [
+                {"id": item["id"], "properties": _to_neo4j_properties(item.get("properties", {}))}
+                for item in items if item.get("id")
+            ]
             
-            # 模拟更新操作
-            logger.info(f"Would update data: {update_data}")
+            with self.driver.session() as session:
+                stored, failures = self._write_rows(
+                    session,
+                    "UNWIND $rows AS row MATCH (n {id: row.id}) SET n += row.properties RETURN row.id AS id",
+                    rows, self.batch_size, "node"
+                )
             
             return json.dumps({
-                "status": "success",
-                "updated_items": 1,
-                "message": "Data updated successfully"
+                "status": "success" if not failures else "partial",
+                "updated_items": stored,
+                "failures": failures
             }, ensure_ascii=False)
             
         except Exception as e:
@@ -226,16 +371,21 @@ class Neo4jStorage(BaseTool):
             return json.dumps({"error": error_msg}, ensure_ascii=False)
     
     def _delete_data(self, data: str) -> str:
-        """删除Neo4j数据"""
+        """删除Neo4j数据（{"id"} 或 {"ids": [...]}），同时删除相连的关系"""
         try:
             delete_data = json.loads(data)
+            ids = delete_data.get("ids") or ([delete_data["id"]] if delete_data.get("id") else [])
             
-            # 模拟删除操作
-            logger.info(f"Would delete data: {delete_data}")
+            with self.driver.session() as session:
+                deleted = session.execute_write(
+                    lambda tx: tx.run(
+                        "UNWIND $ids AS id MATCH (n {id: id}) DETACH DELETE n RETURN count(*) AS deleted", ids=ids
+                    ).single()["deleted"]
+                )
             
             return json.dumps({
                 "status": "success",
-                "deleted_items": 1,
+                "deleted_items": deleted,
                 "message": "Data deleted successfully"
             }, ensure_ascii=False)
             
@@ -243,56 +393,107 @@ class Neo4jStorage(BaseTool):
             error_msg = f"Failed to delete Neo4j data. Error: {repr(e)}"
             logger.error(error_msg)
             return json.dumps({"error": error_msg}, ensure_ascii=False)
-    
-    def _generate_create_node_cypher(self, node: GraphNode) -> str:
-        """生成创建节点的Cypher语句"""
-        properties_str = ", ".join([f"{k}: ${k}" for k in node.properties.keys()])
-        return f"CREATE (n:{node.label} {{id: '{node.id}', {properties_str}}})"
-    
-    def _generate_create_relationship_cypher(self, relationship: GraphRelationship) -> str:
-        """生成创建关系的Cypher语句"""
-        properties_str = ", ".join([f"{k}: ${k}" for k in relationship.properties.keys()])
-        return (
-            f"MATCH (a {{id: '{relationship.source_id}'}}), (b {{id: '{relationship.target_id}'}}) "
-            f"CREATE (a)-[r:{relationship.relationship_type} {{id: '{relationship.id}', {properties_str}}}]->(b)"
-        )
+
+
+def _to_neo4j_properties(properties: Dict[str, Any]) -> Dict[str, Any]:
+    """Neo4j属性只支持基本类型及其列表，嵌套结构转为JSON字符串"""
+    converted = {}
+    for key, value in (properties or {}).items():
+        if value is None or isinstance(value, (str, int, float, bool)):
+            converted[key] = value
+        elif isinstance(value, (list, tuple)) and all(isinstance(item, (str, int, float, bool)) for item in value):
+            converted[key] = list(value)
+        else:
+            converted[key] = json.dumps(value, ensure_ascii=False, default=str)
+    return converted
+
+
+@dataclass
+class BulkItemResult:
+    """_bulk请求中单个操作的结果"""
+    id: Optional[str]
+    ok: bool
+    status: int
+    error: Optional[str] = None
+    action: str = "index"
 
 
 class ElasticsearchStorage(BaseTool):
-    """Elasticsearch存储工具"""
+    """Elasticsearch存储工具
+
+    写入走_bulk接口：文档流按字节数和操作数切块，多个块由线程池并行提交，
+    被拒绝（429）的条目退避后重试，最终逐条报告失败。
+    事件写入（index_events）前按INDEX_MAPPINGS建好索引，不让动态映射推断字段类型。
+    """
     name: str = "elasticsearch_storage"
     description: str = "Store and search data in Elasticsearch."
+    config: Optional[MysteryEventConfig] = None
+    client: Any = None
+    url: str = ELASTICSEARCH_URL
+    timeout: float = 30.0
+    chunk_bytes: int = ELASTICSEARCH_BULK_CHUNK_BYTES
+    max_actions: int = ELASTICSEARCH_BULK_MAX_ACTIONS
+    workers: int = ELASTICSEARCH_BULK_WORKERS
+    max_retries: int = 3
+    event_indices: Any = None
     
-    def __init__(self, config: Optional[MysteryEventConfig] = None):
+    def __init__(
+        self,
+        config: Optional[MysteryEventConfig] = None,
+        url: Optional[str] = None,
+        chunk_bytes: Optional[int] = None,
+        max_actions: Optional[int] = None,
+        workers: Optional[int] = None
+    ):
         """初始化Elasticsearch存储
         
         Args:
             config: 神秘事件配置
+            url: Elasticsearch地址（默认读取ELASTICSEARCH_URL）
+            chunk_bytes: 每个_bulk请求体的最大字节数
+            max_actions: 每个_bulk请求的最大操作数
+            workers: 并行提交_bulk请求的线程数
         """
         super().__init__()
         self.config = config or MysteryEventConfig()
+        self.url = (url or ELASTICSEARCH_URL).rstrip("/")
+        self.chunk_bytes = chunk_bytes or ELASTICSEARCH_BULK_CHUNK_BYTES
+        self.max_actions = max_actions or ELASTICSEARCH_BULK_MAX_ACTIONS
+        self.workers = workers or ELASTICSEARCH_BULK_WORKERS
         self.client = None
+        self.event_indices = set()
         self._initialize_connection()
     
     def _initialize_connection(self):
-        """初始化Elasticsearch连接"""
+        """初始化Elasticsearch连接（带连接池的HTTP会话）"""
         try:
-            # 这里应该使用真实的Elasticsearch客户端，但为了演示，我们使用模拟
-            # from elasticsearch import Elasticsearch
-            # self.client = Elasticsearch(
-            #     [self.config.elasticsearch_config["host"]],
-            #     http_auth=(self.config.elasticsearch_config["username"], 
-            #               self.config.elasticsearch_config["password"])
-            # )
-            
-            # 模拟连接
-            self.client = "mock_elasticsearch_client"
-            logger.info("Elasticsearch connection initialized (mock)")
+            session = requests.Session()
+            if ELASTICSEARCH_USER:
+                session.auth = (ELASTICSEARCH_USER, ELASTICSEARCH_PASSWORD)
+            session.headers.update({"Content-Type": "application/json"})
+            retry_strategy = Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[502, 503, 504],
+                allowed_methods=["GET", "POST", "PUT", "DELETE"],
+            )
+            adapter = HTTPAdapter(
+                pool_connections=self.workers, pool_maxsize=self.workers * 2, max_retries=retry_strategy
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self.client = session
+            logger.info(f"Elasticsearch connection initialized: {self.url}")
             
         except Exception as e:
             logger.error(f"Failed to initialize Elasticsearch connection: {e}")
             self.client = None
     
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+    
     def _run(self, operation: str, index: str = "mystery_events", data: str = None, query: str = None) -> str:
         """运行Elasticsearch操作
         
@@ -325,6 +526,154 @@ class ElasticsearchStorage(BaseTool):
             logger.error(error_msg)
             return json.dumps({"error": error_msg}, ensure_ascii=False)
     
+    def _chunk_actions(
+        self, actions: Iterable[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]
+    ) -> Iterator[List[Tuple[Dict[str, Any], Optional[Dict[str, Any]], bytes]]]:
+        """把（操作头, 文档）流按字节数和操作数切块，每项附带序列化后的NDJSON行"""
+        chunk: List[Tuple[Dict[str, Any], Optional[Dict[str, Any]], bytes]] = []
+        size = 0
+        for header, source in actions:
+            line = json.dumps(header, ensure_ascii=False).encode("utf-8") + b"\n"
+            if source is not None:
+                line += json.dumps(source, ensure_ascii=False, default=str).encode("utf-8") + b"\n"
+            if chunk and (size + len(line) > self.chunk_bytes or len(chunk) >= self.max_actions):
+                yield chunk
+                chunk, size = [], 0
+            chunk.append((header, source, line))
+            size += len(line)
+        if chunk:
+            yield chunk
+    
+    def _send_chunk(
+        self, chunk: List[Tuple[Dict[str, Any], Optional[Dict[str, Any]], bytes]]
+    ) -> List[BulkItemResult]:
+        """提交一个_bulk请求，429拒绝的条目退避后重试"""
+        results: List[BulkItemResult] = []
+        pending = chunk
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.client.post(
+                    f"{self.url}/_bulk",
+                    data=b"".join(line for _, _, line in pending),
+                    headers={"Content-Type": "application/x-ndjson"},
+                    timeout=self.timeout
+                )
+                if response.status_code == 429 and attempt < self.max_retries:
+                    time.sleep(0.5 * 2 ** attempt)
+                    continue
+                response.raise_for_status()
+                items = response.json().get("items", [])
+            except Exception as e:
+                logger.error(f"Bulk request with {len(pending)} actions failed: {e}")
+                results.extend(
+                    BulkItemResult(id=_action_id(header), ok=False, status=0, error=str(e), action=_action_name(header))
+                    for header, _, _ in pending
+                )
+                return results
+            
+            retry = []
+            for (header, source, line), item in zip(pending, items):
+                action, outcome = next(iter(item.items()))
+                status = outcome.get("status", 0)
+                if status == 429 and attempt < self.max_retries:
+                    retry.append((header, source, line))
+                    continue
+                error = outcome.get("error")
+                if isinstance(error, dict):
+                    error = f"{error.get('type')}: {error.get('reason')}"
+                results.append(BulkItemResult(
+                    id=outcome.get("_id"), ok=200 <= status < 300, status=status, error=error, action=action
+                ))
+            if not retry:
+                return results
+            pending = retry
+            time.sleep(0.5 * 2 ** attempt)
+        return results
+    
+    def streaming_bulk(
+        self, actions: Iterable[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]
+    ) -> Iterator[BulkItemResult]:
+        """串行提交_bulk请求，逐条产出结果（不在内存中积累整个文档流）"""
+        for chunk in self._chunk_actions(actions):
+            yield from self._send_chunk(chunk)
+    
+    def parallel_bulk(
+        self, actions: Iterable[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]
+    ) -> Iterator[BulkItemResult]:
+        """由workers个线程并行提交_bulk请求，最多2*workers个块在途"""
+        if self.workers <= 1:
+            yield from self.streaming_bulk(actions)
+            return
+        
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="es-bulk")
+        try:
+            in_flight = set()
+            for chunk in self._chunk_actions(actions):
+                if len(in_flight) >= self.workers * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from future.result()
+                in_flight.add(executor.submit(self._send_chunk, chunk))
+            for future in as_completed(in_flight):
+                yield from future.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def ensure_event_index(self, index: str) -> bool:
+        """事件索引不存在时按INDEX_SETTINGS/INDEX_MAPPINGS创建，返回是否新建"""
+        if index in self.event_indices:
+            return False
+        response = self.client.head(f"{self.url}/{quote(index)}", timeout=self.timeout)
+        created = False
+        if response.status_code != 200:
+            response = self.client.put(
+                f"{self.url}/{quote(index)}",
+                json={"settings": INDEX_SETTINGS, "mappings": INDEX_MAPPINGS},
+                timeout=self.timeout
+            )
+            # 并发创建时其他进程可能已建好
+            if not (response.status_code == 400 and "resource_already_exists" in response.text):
+                response.raise_for_status()
+                created = True
+                logger.info(f"Created Elasticsearch index {index}")
+        self.event_indices.add(index)
+        return created
+    
+    def index_events(self, index: str, events: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """确保事件索引的映射后，把事件转换为索引文档（见event_document）批量写入"""
+        self.ensure_event_index(index)
+        return self.bulk_index(index, (event_document(event) for event in events))
+    
+    def bulk_index(self, index: str, documents: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """批量索引文档
+        
+        Args:
+            index: 索引名称
+            documents: 文档流，有id字段时用作文档ID，否则按内容生成
+            
+        Returns:
+            索引统计和逐条失败信息
+        """
+        def actions() -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+            for doc in documents:
+                doc_id = doc.get("id") or self._generate_doc_id(doc)
+                yield {"index": {"_index": index, "_id": doc_id}}, {**doc, "indexed_at": datetime.now().isoformat()}
+        
+        indexed = 0
+        failures = []
+        for result in self.parallel_bulk(actions()):
+            if result.ok:
+                indexed += 1
+            else:
+                failures.append({"id": result.id, "status": result.status, "error": result.error})
+        
+        return {
+            "status": "success" if not failures else ("partial" if indexed else "failed"),
+            "indexed_documents": indexed,
+            "failed_count": len(failures),
+            "failures": failures
+        }
+    
     def _index_data(self, index: str, data: str) -> str:
         """索引数据到Elasticsearch"""
         try:
@@ -333,28 +682,7 @@ class ElasticsearchStorage(BaseTool):
             if not isinstance(documents, list):
                 documents = [documents]
             
-            indexed_docs = []
-            for doc in documents:
-                # 生成文档ID
-                doc_id = doc.get("id") or self._generate_doc_id(doc)
-                
-                # 添加时间戳
-                doc["indexed_at"] = datetime.now().isoformat()
-                
-                # 在真实实现中，这里会调用client.index()
-                logger.info(f"Would index document {doc_id} to index {index}")
-                
-                indexed_docs.append({
-                    "id": doc_id,
-                    "index": index,
-                    "document": doc
-                })
-            
-            return json.dumps({
-                "status": "success",
-                "indexed_documents": len(indexed_docs),
-                "documents": indexed_docs
-            }, ensure_ascii=False)
+            return json.dumps(self.bulk_index(index, documents), ensure_ascii=False)
             
         except Exception as e:
             error_msg = f"Failed to index data in Elasticsearch. Error: {repr(e)}"
@@ -366,40 +694,22 @@ class ElasticsearchStorage(BaseTool):
         try:
             search_query = json.loads(query) if query else {"match_all": {}}
             
-            # 在真实实现中，这里会调用client.search()
-            logger.info(f"Would search index {index} with query: {search_query}")
-            
-            # 模拟搜索结果
-            mock_hits = [
-                {
-                    "_id": "doc_001",
-                    "_score": 1.0,
-                    "_source": {
-                        "title": "UFO目击报告",
-                        "description": "在北京上空发现不明飞行物",
-                        "event_type": "UFO",
-                        "location": {"lat": 39.9042, "lon": 116.4074},
-                        "timestamp": "2023-01-15T20:30:00Z"
-                    }
-                },
-                {
-                    "_id": "doc_002",
-                    "_score": 0.8,
-                    "_source": {
-                        "title": "神秘光球现象",
-                        "description": "多名目击者报告看到发光球体",
-                        "event_type": "UFO",
-                        "location": {"lat": 39.9000, "lon": 116.4000},
-                        "timestamp": "2023-01-16T21:00:00Z"
-                    }
-                }
-            ]
+            response = self.client.post(
+                f"{self.url}/{index}/_search", json={"query": search_query}, timeout=self.timeout
+            )
+            response.raise_for_status()
+            body = response.json()
+            hits = body.get("hits", {})
+            total = hits.get("total", 0)
             
             return json.dumps({
                 "status": "success",
-                "total_hits": len(mock_hits),
-                "max_score": max(hit["_score"] for hit in mock_hits) if mock_hits else 0,
-                "hits": mock_hits
+                "total_hits": total.get("value", 0) if isinstance(total, dict) else total,
+                "max_score": hits.get("max_score") or 0,
+                "hits": [
+                    {"_id": hit.get("_id"), "_score": hit.get("_score"), "_source": hit.get("_source", {})}
+                    for hit in hits.get("hits", [])
+                ]
             }, ensure_ascii=False)
             
         except Exception as e:
@@ -416,8 +726,11 @@ class ElasticsearchStorage(BaseTool):
             if not doc_id:
                 return json.dumps({"error": "Document ID is required for update"}, ensure_ascii=False)
             
-            # 在真实实现中，这里会调用client.update()
-            logger.info(f"Would update document {doc_id} in index {index}")
+            response = self.client.post(
+                f"{self.url}/{index}/_update/{quote(str(doc_id), safe='')}",
+                json={"doc": update_data}, timeout=self.timeout
+            )
+            response.raise_for_status()
             
             return json.dumps({
                 "status": "success",
@@ -439,13 +752,16 @@ class ElasticsearchStorage(BaseTool):
             if not doc_id:
                 return json.dumps({"error": "Document ID is required for deletion"}, ensure_ascii=False)
             
-            # 在真实实现中，这里会调用client.delete()
-            logger.info(f"Would delete document {doc_id} from index {index}")
+            response = self.client.delete(
+                f"{self.url}/{index}/_doc/{quote(str(doc_id), safe='')}", timeout=self.timeout
+            )
+            if response.status_code != 404:
+                response.raise_for_status()
             
             return json.dumps({
-                "status": "success",
+                "status": "success" if response.status_code != 404 else "not_found",
                 "deleted_document": doc_id,
-                "message": "Document deleted successfully"
+                "message": "Document deleted successfully" if response.status_code != 404 else "Document not found"
             }, ensure_ascii=False)
             
         except Exception as e:
@@ -460,18 +776,319 @@ class ElasticsearchStorage(BaseTool):
         return hashlib.md5(content.encode('utf-8')).hexdigest()
 
 
+def _action_name(header: Dict[str, Any]) -> str:
+    return next(iter(header))
+
+
+def _action_id(header: Dict[str, Any]) -> Optional[str]:
+    return next(iter(header.values())).get("_id")
+
+
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_encode(latitude: float, longitude: float, precision: int = 7) -> str:
+    """经纬度编码为geohash（precision=7约150米见方）"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value, interval = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (interval[0] + interval[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            interval[0] = mid
+        else:
+            bits <<= 1
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def _normalize_name(name: str) -> str:
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", name)).strip().casefold()
+
+
+def _short_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class GraphBuilder:
+    """事件到图数据的流式转换器
+
+    证人按规范化姓名、地点按geohash（无坐标时按规范化地址）生成规范键，同一实体
+    在整个构建过程中只产出一次节点，所有提及它的事件都连到这一个节点上。
+    只记录已产出的节点ID，不保留完整图数据。
+    """
+
+    def __init__(self, geohash_precision: int = 7):
+        """初始化图构建器
+
+        Args:
+            geohash_precision: 地点合并的geohash精度，越小合并范围越大
+        """
+        self.geohash_precision = geohash_precision
+        self._emitted: set = set()
+
+    def event_id(self, event: Dict[str, Any]) -> str:
+        if event.get("id"):
+            return str(event["id"])
+        # 无ID的事件按内容生成稳定ID，重复写入时可以合并
+        return "event_" + _short_hash(json.dumps(event, sort_keys=True, ensure_ascii=False, default=str))
+
+    def person_id(self, name: str) -> str:
+        return "person_" + _short_hash(_normalize_name(name))
+
+    def location_id(self, event: Dict[str, Any]) -> Optional[str]:
+        location = event.get("location")
+        if isinstance(location, dict) and location.get("lat") is not None and location.get("lon") is not None:
+            return "location_" + geohash_encode(float(location["lat"]), float(location["lon"]), self.geohash_precision)
+        address = location if isinstance(location, str) else event.get("address")
+        if address:
+            return "location_" + _short_hash(_normalize_name(address))
+        return None
+
+    def _node(self, node_id: str, label: str, node_type: str, properties: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if node_id in self._emitted:
+            return None
+        self._emitted.add(node_id)
+        return {"id": node_id, "label": label, "node_type": node_type, "properties": properties}
+
+    def convert_event(self, event: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """转换单个事件，返回（新出现的节点, 关系）"""
+        nodes: List[Dict[str, Any]] = []
+        relationships: List[Dict[str, Any]] = []
+        event_id = self.event_id(event)
+
+        # 创建事件节点
+        event_node = self._node(event_id, "Event", "event", {
+            "title": event.get("title", ""),
+            "description": event.get("description", ""),
+            "event_type": event.get("event_type", ""),
+            "timestamp": event.get("timestamp", ""),
+            "credibility_score": event.get("credibility_score", 0.0)
+        })
+        if event_node:
+            nodes.append(event_node)
+
+        # 创建位置节点和关系
+        location_id = self.location_id(event)
+        if location_id:
+            location = event["location"] if isinstance(event.get("location"), dict) else {}
+            location_node = self._node(location_id, "Location", "location", {
+                "latitude": location.get("lat", 0),
+                "longitude": location.get("lon", 0),
+                "address": event.get("address", "") or (event["location"] if isinstance(event.get("location"), str) else ""),
+                "country": event.get("country", ""),
+                "region": event.get("region", "")
+            })
+            if location_node:
+                nodes.append(location_node)
+            relationships.append({
+                "id": f"rel_{event_id}_{location_id}",
+                "source_id": event_id,
+                "target_id": location_id,
+                "source_label": "Event",
+                "target_label": "Location",
+                "relationship_type": "OCCURRED_AT",
+                "properties": {"confidence": 1.0}
+            })
+
+        # 创建人物节点和关系，单次提及的可信度记录在关系上
+        for witness in event.get("witnesses") or []:
+            if isinstance(witness, str):
+                witness = {"name": witness}
+            name = (witness.get("name") or "").strip()
+            if not name:
+                continue
+            witness_id = self.person_id(name)
+            witness_node = self._node(witness_id, "Person", "person", {"name": name, "role": "witness"})
+            if witness_node:
+                nodes.append(witness_node)
+            relationships.append({
+                "id": f"rel_{witness_id}_{event_id}",
+                "source_id": witness_id,
+                "target_id": event_id,
+                "source_label": "Person",
+                "target_label": "Event",
+                "relationship_type": "WITNESSED",
+                "properties": {"confidence": witness.get("credibility", 0.5)}
+            })
+
+        return nodes, relationships
+
+    def iter_batches(self, events: Iterable[Dict[str, Any]], batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """按事件数分批产出{"nodes", "relationships"}；关系引用的节点在同批或更早的批次中"""
+        nodes: List[Dict[str, Any]] = []
+        relationships: List[Dict[str, Any]] = []
+        count = 0
+        for event in events:
+            event_nodes, event_relationships = self.convert_event(event)
+            nodes.extend(event_nodes)
+            relationships.extend(event_relationships)
+            count += 1
+            if count >= batch_size:
+                yield {"nodes": nodes, "relationships": relationships}
+                nodes, relationships, count = [], [], 0
+        if nodes or relationships:
+            yield {"nodes": nodes, "relationships": relationships}
+
+
+def _is_retryable(error: Exception) -> bool:
+    """neo4j驱动的Neo4jError和DriverError都提供is_retryable()"""
+    is_retryable = getattr(error, "is_retryable", None)
+    return callable(is_retryable) and bool(is_retryable())
+
+
+def _failed_event_ids(batch: Dict[str, Any], failures: List[Dict[str, Any]]) -> set:
+    """把一批中失败的节点和关系映射回所属事件：关系归属它连接的事件，实体节点归属所有连到它的事件"""
+    failed = {failure["id"] for failure in failures}
+    events = {node["id"] for node in batch["nodes"] if node["label"] == "Event" and node["id"] in failed}
+    for relationship in batch["relationships"]:
+        if relationship["source_label"] == "Event":
+            event_id, entity_id = relationship["source_id"], relationship["target_id"]
+        else:
+            event_id, entity_id = relationship["target_id"], relationship["source_id"]
+        if relationship["id"] in failed or entity_id in failed:
+            events.add(event_id)
+    return events
+
+
+def store_event_graph(
+    storage: Neo4jStorage, events: Iterable[Dict[str, Any]], batch_size: int = 500
+) -> Dict[str, Any]:
+    """用GraphBuilder分批转换事件并写入Neo4j，汇总各批结果；failed_events为有节点或关系写入失败的事件ID"""
+    summary = {"stored_nodes": 0, "stored_relationships": 0, "failures": [], "failed_events": set()}
+    for batch in GraphBuilder().iter_batches(events, batch_size):
+        result = storage.store_graph_data(batch)
+        summary["stored_nodes"] += result["stored_nodes"]
+        summary["stored_relationships"] += result["stored_relationships"]
+        summary["failures"].extend(result["failures"])
+        summary["failed_events"] |= _failed_event_ids(batch, result["failures"])
+    summary["failed_events"] = sorted(summary["failed_events"])
+    summary["failed_count"] = len(summary["failures"])
+    summary["status"] = "success" if not summary["failures"] else (
+        "partial" if summary["stored_nodes"] or summary["stored_relationships"] else "failed"
+    )
+    return summary
+
+
+def neo4j_sink(storage: Neo4jStorage) -> Sink:
+    """发件箱的Neo4j写入函数：连接不可用、瞬时错误或整批失败时抛出异常，否则返回
+    事件节点、关系或关联的人物/地点节点写入失败的事件ID，由发件箱重试或转入死信"""
+    def write(events: List[Dict[str, Any]]) -> List[str]:
+        if storage.driver is None:
+            raise ConnectionError("Neo4j connection not available")
+        result = store_event_graph(storage, events)
+        if result["status"] == "failed":
+            raise RuntimeError(f"Neo4j write failed: {result['failures'][0]['error']}")
+        failed = set(result["failed_events"])
+        return [event["id"] for event in events if str(event["id"]) in failed]
+    return write
+
+
+def event_document(event: Dict[str, Any]) -> Dict[str, Any]:
+    """把事件转换为mystery_events索引的文档
+
+    location在索引中是geo_point，只保留{"lat", "lon"}；地名字符串（或位置字典中的
+    address/name）写入address字段，避免整条文档被mapper_parsing_exception拒绝。
+    """
+    document = dict(event)
+    location = document.pop("location", None)
+    if isinstance(location, dict):
+        lat = location.get("lat", location.get("latitude"))
+        lon = location.get("lon", location.get("longitude"))
+        try:
+            if lat is not None and lon is not None:
+                document["location"] = {"lat": float(lat), "lon": float(lon)}
+        except (TypeError, ValueError):
+            pass
+        location = location.get("address") or location.get("name")
+    if isinstance(location, str) and location.strip() and not document.get("address"):
+        document["address"] = location.strip()
+    return document
+
+
+def elasticsearch_sink(storage: ElasticsearchStorage, index: str = "mystery_events") -> Sink:
+    """发件箱的Elasticsearch写入函数：请求失败或被限流时抛出异常整批重试，否则返回被拒绝的文档ID"""
+    def write(events: List[Dict[str, Any]]) -> List[str]:
+        result = storage.index_events(index, events)
+        transient = [failure for failure in result["failures"] if failure["status"] in (0, 429)]
+        if transient:
+            raise RuntimeError(f"Elasticsearch bulk write failed: {transient[0]['error']}")
+        return [failure["id"] for failure in result["failures"]]
+    return write
+
+
+_storage_outboxes: Dict[str, StorageOutbox] = {}
+_storage_outbox_lock = threading.Lock()
+
+
+def get_storage_outbox(
+    db_path: Optional[str] = None,
+    neo4j_storage: Optional[Neo4jStorage] = None,
+    elasticsearch_storage: Optional[ElasticsearchStorage] = None
+) -> StorageOutbox:
+    """进程内按数据库路径共享的存储发件箱，首次调用时创建并启动投递线程
+
+    Args:
+        db_path: 发件箱SQLite路径，默认为STORAGE_OUTBOX_DB
+        neo4j_storage: 创建发件箱时Neo4j目标使用的存储，默认按默认配置新建
+        elasticsearch_storage: 创建发件箱时Elasticsearch目标使用的存储，默认按默认配置新建
+    """
+    db_path = db_path or STORAGE_OUTBOX_DB
+    key = os.path.abspath(db_path)
+    with _storage_outbox_lock:
+        outbox = _storage_outboxes.get(key)
+        if outbox is None:
+            outbox = StorageOutbox(
+                db_path,
+                {
+                    "neo4j": neo4j_sink(neo4j_storage or Neo4jStorage()),
+                    "elasticsearch": elasticsearch_sink(elasticsearch_storage or ElasticsearchStorage())
+                },
+                batch_size=STORAGE_OUTBOX_BATCH_SIZE
+            )
+            outbox.start()
+            _storage_outboxes[key] = outbox
+        return outbox
+
+
 class GraphStorageManager:
-    """图存储管理器"""
+    """图存储管理器
+    
+    启用发件箱时，事件追加到本地发件箱即返回，由后台线程分别投递到Neo4j和
+    Elasticsearch；任一存储暂时不可用只会增加其积压，恢复后自动补齐。
+    """
     
-    def __init__(self, config: Optional[MysteryEventConfig] = None):
+    def __init__(self, config: Optional[MysteryEventConfig] = None, outbox: Optional[StorageOutbox] = None):
         """初始化图存储管理器
         
         Args:
             config: 神秘事件配置
+            outbox: 存储发件箱；为空且STORAGE_OUTBOX_ENABLED时在首次写入时打开共享发件箱
         """
         self.config = config or MysteryEventConfig()
         self.neo4j_storage = Neo4jStorage(config)
         self.elasticsearch_storage = ElasticsearchStorage(config)
+        self._outbox = outbox
+    
+    @property
+    def outbox(self) -> Optional[StorageOutbox]:
+        """存储发件箱，默认在首次使用时用本管理器的存储打开共享发件箱"""
+        if self._outbox is None and STORAGE_OUTBOX_ENABLED:
+            self._outbox = get_storage_outbox(
+                neo4j_storage=self.neo4j_storage, elasticsearch_storage=self.elasticsearch_storage
+            )
+        return self._outbox
     
     def store_mystery_events(self, events_data: str) -> Dict[str, Any]:
         """存储神秘事件数据
@@ -484,102 +1101,59 @@ class GraphStorageManager:
         """
         try:
             events = json.loads(events_data)
+            if isinstance(events, dict):
+                events = [events]
             
-            # 转换为图数据格式
-            graph_data = self._convert_to_graph_data(events)
+            if self.outbox is not None:
+                return self.enqueue_events(events)
             
-            # 存储到Neo4j
-            neo4j_result = self.neo4j_storage._store_data(json.dumps(graph_data, ensure_ascii=False))
+            # 分批转换并存储到Neo4j
+            neo4j_result = self.store_graph_batches(events)
             
             # 存储到Elasticsearch
-            es_result = self.elasticsearch_storage._index_data("mystery_events", events_data)
+            es_result = self.elasticsearch_storage.index_events("mystery_events", events)
             
             return {
-                "neo4j_result": json.loads(neo4j_result),
-                "elasticsearch_result": json.loads(es_result)
+                "neo4j_result": neo4j_result,
+                "elasticsearch_result": es_result
             }
             
         except Exception as e:
             logger.error(f"Failed to store mystery events: {e}")
             return {"error": str(e)}
     
-    def _convert_to_graph_data(self, events: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """将事件数据转换为图数据格式"""
-        nodes = []
-        relationships = []
+    def enqueue_events(self, events: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """把事件追加到发件箱，落盘后即返回
         
+        事件ID作为幂等键并写回事件（Neo4j节点ID和Elasticsearch文档ID都用它），
+        重放时两个存储都按ID覆盖写入。
+        """
+        builder = GraphBuilder()
+        records = []
         for event in events:
-            # 创建事件节点
-            event_node = {
-                "id": event.get("id", f"event_{len(nodes)}"),
-                "label": "Event",
-                "node_type": "event",
-                "properties": {
-                    "title": event.get("title", ""),
-                    "description": event.get("description", ""),
-                    "event_type": event.get("event_type", ""),
-                    "timestamp": event.get("timestamp", ""),
-                    "credibility_score": event.get("credibility_score", 0.0)
-                }
-            }
-            nodes.append(event_node)
-            
-            # 创建位置节点和关系
-            if "location" in event and event["location"]:
-                location_id = f"location_{event['id']}"
-                location_node = {
-                    "id": location_id,
-                    "label": "Location",
-                    "node_type": "location",
-                    "properties": {
-                        "latitude": event["location"].get("lat", 0),
-                        "longitude": event["location"].get("lon", 0),
-                        "address": event.get("address", ""),
-                        "country": event.get("country", ""),
-                        "region": event.get("region", "")
-                    }
-                }
-                nodes.append(location_node)
-                
-                # 创建事件-位置关系
-                location_rel = {
-                    "id": f"rel_{event_node['id']}_{location_id}",
-                    "source_id": event_node["id"],
-                    "target_id": location_id,
-                    "relationship_type": "OCCURRED_AT",
-                    "properties": {
-                        "confidence": 1.0
-                    }
-                }
-                relationships.append(location_rel)
-            
-            # 创建人物节点和关系
-            if "witnesses" in event:
-                for witness in event["witnesses"]:
-                    witness_id = f"person_{witness.get('name', 'unknown')}"
-                    witness_node = {
-                        "id": witness_id,
-                        "label": "Person",
-                        "node_type": "person",
-                        "properties": {
-                            "name": witness.get("name", ""),
-                            "role": "witness",
-                            "credibility": witness.get("credibility", 0.5)
-                        }
-                    }
-                    nodes.append(witness_node)
-                    
-                    # 创建目击关系
-                    witness_rel = {
-                        "id": f"rel_{witness_id}_{event_node['id']}",
-                        "source_id": witness_id,
-                        "target_id": event_node["id"],
-                        "relationship_type": "WITNESSED",
-                        "properties": {
-                            "confidence": witness.get("credibility", 0.5)
-                        }
-                    }
-                    relationships.append(witness_rel)
+            key = builder.event_id(event)
+            records.append((key, {**event, "id": key}))
+        seq = self.outbox.append(records)
+        return {"status": "accepted", "queued_events": len(records), "outbox_seq": seq}
+    
+    def get_outbox_stats(self) -> Dict[str, Any]:
+        """发件箱各目标的积压和失败统计"""
+        if self.outbox is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.outbox.get_stats()}
+    
+    def store_graph_batches(self, events: Iterable[Dict[str, Any]], batch_size: int = 500) -> Dict[str, Any]:
+        """流式构建图数据并逐批写入Neo4j，返回汇总结果"""
+        return store_event_graph(self.neo4j_storage, events, batch_size)
+    
+    @staticmethod
+    def convert_to_graph_data(events: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """将事件数据转换为图数据格式（实体去重，见GraphBuilder）"""
+        nodes = []
+        relationships = []
+        for batch in GraphBuilder().iter_batches(events, batch_size=max(1, len(events))):
+            nodes.extend(batch["nodes"])
+            relationships.extend(batch["relationships"])
         
         return {
             "nodes": nodes,
@@ -687,21 +1261,19 @@ def query_related_events(
         JSON格式的相关事件
     """
     try:
-        # 构建Cypher查询
-        if relationship_types:
-            rel_filter = "|".join(relationship_types)
-            cypher_query = (
-                f"MATCH (e:Event {{id: '{event_id}'}})-[r:{rel_filter}*1..{max_depth}]-(related) "
-                "RETURN related, r"
-            )
-        else:
-            cypher_query = (
-                f"MATCH (e:Event {{id: '{event_id}'}})-[r*1..{max_depth}]-(related) "
-                "RETURN related, r"
-            )
+        # 关系类型和深度不能参数化，校验后再拼入Cypher
+        invalid = [t for t in relationship_types or [] if not IDENTIFIER_PATTERN.match(t)]
+        if invalid:
+            raise ValueError(f"Invalid relationship types: {invalid}")
+        depth = min(max(int(max_depth), 1), MAX_RELATED_DEPTH)
+        rel_filter = ":" + "|".join(relationship_types) if relationship_types else ""
+        cypher_query = (
+            f"MATCH (e:Event {{id: $event_id}})-[r{rel_filter}*1..{depth}]-(related) "
+            "RETURN related, r"
+        )
         
         storage = Neo4jStorage()
-        result = storage._query_data(cypher_query)
+        result = storage._query_data(cypher_query, {"event_id": event_id})
         
         return result
         
@@ -0,0 +1,294 @@
+# Copyright (c) 2025 Lingjing Project
+# SPDX-License-Identifier: MIT
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 写入函数：接收一批记录，返回写入失败的幂等键（整批失败时应抛出异常）
+Sink = Callable[[List[Dict[str, Any]]], Iterable[str]]
+
+
+class StorageOutbox:
+    """本地持久化发件箱（SQLite WAL）
+
+    写入方只把记录追加到发件箱并提交即返回；每个存储目标（sink）有独立的后台
+    线程，按序号分批投递并持久化自己的确认位置，进程重启后从确认位置继续重放。
+    记录带幂等键（如事件ID），目标端按键覆盖写入，重放不会产生重复。
+    单条记录反复失败达到max_attempts后转入死信表，不阻塞后续记录。
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        sinks: Dict[str, Sink],
+        batch_size: int = 500,
+        poll_interval: float = 1.0,
+        max_attempts: int = 5,
+        max_backoff: float = 60.0
+    ):
+        """初始化发件箱
+
+        Args:
+            db_path: SQLite数据库路径
+            sinks: 目标名 -> 写入函数
+            batch_size: 每次投递的最大记录数
+            poll_interval: 没有新记录时的等待间隔（秒）
+            max_attempts: 单条记录转入死信前的最大尝试次数
+            max_backoff: 整批失败时的最大退避时间（秒）
+        """
+        self.db_path = db_path
+        self.sinks = dict(sinks)
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._stop = threading.Event()
+        self._workers: Dict[str, threading.Thread] = {}
+        self._sink_state: Dict[str, Dict[str, Any]] = {
+            name: {"delivered": 0, "retrying": 0, "failed_batches": 0, "last_error": None, "last_batch_ms": 0.0}
+            for name in self.sinks
+        }
+        self._init_schema()
+
+    def _init_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # 追加确认前必须落盘
+            self._conn.execute("PRAGMA synchronous=FULL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS outbox (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS sink_offsets (
+                    sink TEXT PRIMARY KEY,
+                    acked_seq INTEGER NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS sink_attempts (
+                    sink TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    attempts INTEGER NOT NULL,
+                    last_error TEXT,
+                    PRIMARY KEY (sink, seq)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS dead_letters (
+                    sink TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    key TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    error TEXT,
+                    failed_at REAL NOT NULL,
+                    PRIMARY KEY (sink, seq)
+                )
+            """)
+            # 新目标从当前末尾之后开始，避免把历史记录全部重放到新目标
+            head = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM outbox").fetchone()[0]
+            for name in self.sinks:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO sink_offsets (sink, acked_seq, updated_at) VALUES (?, ?, ?)",
+                    (name, head, time.time())
+                )
+
+    def append(self, records: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        """在一个事务中追加(幂等键, 记录)，提交后返回最后一条的序号"""
+        now = time.time()
+        rows = [(key, json.dumps(record, ensure_ascii=False, default=str), now) for key, record in records]
+        if not rows:
+            return self.head_seq()
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT INTO outbox (key, payload, created_at) VALUES (?, ?, ?)", rows)
+            seq = self._conn.execute("SELECT MAX(seq) FROM outbox").fetchone()[0]
+        with self._wakeup:
+            self._wakeup.notify_all()
+        return seq
+
+    def head_seq(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM outbox").fetchone()[0]
+
+    def acked_seq(self, sink: str) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT acked_seq FROM sink_offsets WHERE sink = ?", (sink,)).fetchone()
+        return row[0] if row else 0
+
+    def _pending(self, sink: str) -> List[Tuple[int, str, Dict[str, Any]]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, key, payload FROM outbox WHERE seq > "
+                "(SELECT acked_seq FROM sink_offsets WHERE sink = ?) ORDER BY seq LIMIT ?",
+                (sink, self.batch_size)
+            ).fetchall()
+        return [(seq, key, json.loads(payload)) for seq, key, payload in rows]
+
+    def deliver(self, sink: str) -> int:
+        """向一个目标投递下一批记录，返回处理的记录数；整批失败时抛出异常且不推进确认位置"""
+        batch = self._pending(sink)
+        if not batch:
+            return 0
+
+        # 同一批内同一键只投递最新的记录
+        latest: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        for seq, key, record in batch:
+            latest[key] = (seq, record)
+        started = time.monotonic()
+        failed_keys = set(self.sinks[sink]([record for _, record in latest.values()]) or ())
+        self._sink_state[sink]["last_batch_ms"] = round((time.monotonic() - started) * 1000, 3)
+
+        now = time.time()
+        retrying = 0
+        with self._lock, self._conn:
+            acked = batch[-1][0]
+            for key in failed_keys:
+                if key not in latest:
+                    continue
+                seq, record = latest[key]
+                row = self._conn.execute(
+                    "SELECT attempts FROM sink_attempts WHERE sink = ? AND seq = ?", (sink, seq)
+                ).fetchone()
+                attempts = (row[0] if row else 0) + 1
+                if attempts >= self.max_attempts:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO dead_letters (sink, seq, key, payload, error, failed_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (sink, seq, key, json.dumps(record, ensure_ascii=False, default=str),
+                         f"failed {attempts} times", now)
+                    )
+                    self._conn.execute("DELETE FROM sink_attempts WHERE sink = ? AND seq = ?", (sink, seq))
+                    logger.error(f"Outbox record {key} moved to dead letters for {sink}")
+                else:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO sink_attempts (sink, seq, attempts, last_error) VALUES (?, ?, ?, ?)",
+                        (sink, seq, attempts, "item failed")
+                    )
+                    retrying += 1
+                    # 只确认到第一条需要重试的记录之前
+                    acked = min(acked, seq - 1)
+            self._conn.execute(
+                "UPDATE sink_offsets SET acked_seq = MAX(acked_seq, ?), updated_at = ? WHERE sink = ?",
+                (acked, now, sink)
+            )
+        self._sink_state[sink]["delivered"] += len(latest) - len(failed_keys)
+        self._sink_state[sink]["retrying"] = retrying
+        return len(batch)
+
+    def compact(self) -> int:
+        """删除所有目标都已确认的记录，返回删除数"""
+        with self._lock, self._conn:
+            # 只看当前配置的目标，已移除目标的旧确认位置不阻塞压缩
+            placeholders = ", ".join("?" for _ in self.sinks)
+            low = self._conn.execute(
+                f"SELECT MIN(acked_seq) FROM sink_offsets WHERE sink IN ({placeholders})", tuple(self.sinks)
+            ).fetchone()[0] or 0
+            cursor = self._conn.execute("DELETE FROM outbox WHERE seq <= ?", (low,))
+            self._conn.execute("DELETE FROM sink_attempts WHERE seq <= ?", (low,))
+            return cursor.rowcount
+
+    def replay(self, sink: str, from_seq: int = 0):
+        """把目标的确认位置退回from_seq，之后的记录会重新投递（需尚未被压缩）"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE sink_offsets SET acked_seq = ?, updated_at = ? WHERE sink = ?", (from_seq, time.time(), sink)
+            )
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def _run_sink(self, sink: str):
+        backoff = 0.0
+        while not self._stop.is_set():
+            try:
+                delivered = self.deliver(sink)
+                backoff = 0.0
+                if delivered:
+                    self.compact()
+                    # 有待重试的记录时稍等再投递，不立即耗尽重试次数
+                    if self._sink_state[sink]["retrying"]:
+                        self._stop.wait(self.poll_interval)
+                    continue
+            except Exception as e:
+                state = self._sink_state[sink]
+                state["failed_batches"] += 1
+                state["last_error"] = str(e)
+                backoff = min(self.max_backoff, max(self.poll_interval, backoff * 2))
+                logger.warning(f"Outbox delivery to {sink} failed, retrying in {backoff:.1f}s: {e}")
+                self._stop.wait(backoff)
+                continue
+            with self._wakeup:
+                self._wakeup.wait(self.poll_interval)
+
+    def start(self):
+        """为每个目标启动后台投递线程（重启后从持久化的确认位置继续）"""
+        self._stop.clear()
+        for sink in self.sinks:
+            worker = self._workers.get(sink)
+            if worker is None or not worker.is_alive():
+                worker = threading.Thread(target=self._run_sink, args=(sink,), name=f"outbox-{sink}", daemon=True)
+                self._workers[sink] = worker
+                worker.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for worker in self._workers.values():
+            worker.join(timeout=timeout)
+        self._workers.clear()
+
+    def close(self):
+        self.stop()
+        with self._lock:
+            self._conn.close()
+
+    def wait_until_drained(self, timeout: float = 30.0) -> bool:
+        """等待所有目标追上末尾，超时返回False"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            head = self.head_seq()
+            if all(self.acked_seq(sink) >= head for sink in self.sinks):
+                return True
+            time.sleep(0.05)
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """每个目标的积压数、最早未投递记录的等待时间和失败情况"""
+        now = time.time()
+        with self._lock:
+            head = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM outbox").fetchone()[0]
+            offsets = dict(self._conn.execute("SELECT sink, acked_seq FROM sink_offsets").fetchall())
+            dead = dict(self._conn.execute("SELECT sink, COUNT(*) FROM dead_letters GROUP BY sink").fetchall())
+            sinks = {}
+            for sink in self.sinks:
+                acked = offsets.get(sink, 0)
+                pending, oldest = self._conn.execute(
+                    "SELECT COUNT(*), MIN(created_at) FROM outbox WHERE seq > ?", (acked,)
+                ).fetchone()
+                sinks[sink] = {
+                    "acked_seq": acked,
+                    "lag_records": pending,
+                    "lag_seconds": round(now - oldest, 3) if oldest else 0.0,
+                    "dead_letters": dead.get(sink, 0),
+                    "running": sink in self._workers and self._workers[sink].is_alive(),
+                    **self._sink_state[sink]
+                }
+        return {"head_seq": head, "sinks": sinks}
@@ -8,9 +8,10 @@ Provides document retrieval and knowledge base search capabilities.
 """
 
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional
 from langchain_core.tools import tool
 
+from rag.bm25_index import BM25Index
 from .decorators import mystery_tool
 
 logger = logging.getLogger(__name__)
@@ -19,7 +20,13 @@ logger = logging.getLogger(__name__)
 class MysteryRetriever:
     """Retriever for mystery research knowledge base."""
     
-    def __init__(self):
+    def __init__(self, index: Optional[BM25Index] = None):
+        """Initialize the retriever.
+
+        Args:
+            index: BM25 index backing search; an in-memory index is built if omitted
+        """
+        self.index = index or BM25Index()
         self.knowledge_base = {
             "ufo_sightings": [
                 {
@@ -69,57 +76,73 @@ class MysteryRetriever:
             ]
         }
     
-    def search(self, query: str, category: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
-        """Search the knowledge base for relevant documents.
+        for category, docs in self.knowledge_base.items():
+            for doc in docs:
+                self._index_document(category, doc)
+        self.index.commit()
+
+    def _index_document(self, category: str, doc: Dict[str, Any]):
+        text = " ".join([
+            doc.get("description", ""),
+            doc.get("location", ""),
+            " ".join(tag.replace("_", " ") for tag in doc.get("tags", []))
+        ])
+        self.index.add(doc["id"], text, title=doc.get("title", ""), fields={**doc, "category": category})
+
+    def add_documents(self, category: str, docs: List[Dict[str, Any]]) -> int:
+        """Add or replace documents in the knowledge base and index them incrementally.
+
+        Args:
+            category: Knowledge base category
+            docs: Documents with at least an "id" and "title"
+
+        Returns:
+            Number of documents indexed
+        """
+        bucket = self.knowledge_base.setdefault(category, [])
+        for doc in docs:
+            for other_category, other_docs in self.knowledge_base.items():
+                other_docs[:] = [existing for existing in other_docs if existing["id"] != doc["id"]]
+            bucket.append(doc)
+            self._index_document(category, doc)
+        self.index.commit()
+        return len(docs)
+
+    def search(
+        self,
+        query: str,
+        category: Optional[str] = None,
+        limit: int = 10,
+        predicate: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> List[Dict[str, Any]]:
+        """Search the knowledge base for relevant documents using BM25.
         
         Args:
             query: Search query
             category: Optional category filter
             limit: Maximum number of results
+            predicate: Optional filter applied to candidates in score order
             
         Returns:
             List of relevant documents
         """
+        def accept(doc: Dict[str, Any]) -> bool:
+            if category and doc.get("category") != category:
+                return False
+            return predicate is None or predicate(doc)
+
+        if not query.strip():
+            # An empty query matches everything, as the substring scorer did
+            results = [
+                {**doc, "category": cat} for cat, docs in self.knowledge_base.items() for doc in docs
+            ]
+            return [doc for doc in results if accept(doc)][:limit]
+
         results = []
-        query_lower = query.lower()
-        
-        # Determine which categories to search
-        categories_to_search = [category] if category else self.knowledge_base.keys()
-        
-        for cat in categories_to_search:
-            if cat not in self.knowledge_base:
-                continue
-                
-            for doc in self.knowledge_base[cat]:
-                # Simple text matching (in real implementation, use vector similarity)
-                score = 0
-                
-                # Check title
-                if query_lower in doc["title"].lower():
-                    score += 0.5
-                
-                # Check description
-                if query_lower in doc["description"].lower():
-                    score += 0.3
-                
-                # Check location
-                if query_lower in doc["location"].lower():
-                    score += 0.2
-                
-                # Check tags
-                for tag in doc.get("tags", []):
-                    if query_lower in tag.lower():
-                        score += 0.1
-                
-                if score > 0:
-                    result_doc = doc.copy()
-                    result_doc["relevance_score"] = score
-                    result_doc["category"] = cat
-                    results.append(result_doc)
-        
-        # Sort by relevance score and limit results
-        results.sort(key=lambda x: x["relevance_score"], reverse=True)
-        return results[:limit]
+        for score, _, doc in self.index.search(query, limit=limit, predicate=accept):
+            doc["relevance_score"] = round(score, 4)
+            results.append(doc)
+        return results
     
     def get_by_id(self, doc_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve a document by its ID.
@@ -338,29 +361,24 @@ def advanced_search_tool(
         tags = filters.get("tags", [])
         limit = filters.get("limit", 10)
         
-        # Start with basic search
-        results = _retriever.search(query, category, limit * 2)  # Get more to filter
-        
-        # Apply additional filters
-        filtered_results = []
-        for result in results:
+        def matches(result: Dict[str, Any]) -> bool:
             # Credibility filter
             if result.get("credibility", 0) < min_credibility:
-                continue
+                return False
             
             # Witnesses filter
             if result.get("witnesses", 0) < min_witnesses:
-                continue
+                return False
             
             # Location filter
             if location and location.lower() not in result.get("location", "").lower():
-                continue
+                return False
             
             # Tags filter
             if tags:
                 result_tags = [tag.lower() for tag in result.get("tags", [])]
                 if not any(tag.lower() in result_tags for tag in tags):
-                    continue
+                    return False
             
             # Date range filter (simplified)
             if date_range:
@@ -369,11 +387,15 @@ def advanced_search_tool(
                 result_date = result.get("date")
                 
                 if start_date and result_date and result_date < start_date:
-                    continue
+                    return False
                 if end_date and result_date and result_date > end_date:
-                    continue
+                    return False
             
-            filtered_results.append(result)
+            return True
+        
+        # Filters are applied while walking the ranked candidates, so matches
+        # below the first page of results are not lost
+        filtered_results = _retriever.search(query, category, limit, predicate=matches)
         
         # Limit final results
         filtered_results = filtered_results[:limit]
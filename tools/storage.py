@@ -12,6 +12,9 @@ from typing import Dict, List, Any, Optional
 from langchain_core.tools import tool
 
 from .graph_storage import (
+    ElasticsearchStorage,
+    Neo4jStorage,
+    store_event_graph,
     store_in_neo4j,
     store_in_elasticsearch,
     store_mystery_events_graph,
@@ -157,35 +160,55 @@ def batch_storage_tool(
         batch_size = storage_config.get("batch_size", 100)
         enable_neo4j = storage_config.get("enable_neo4j", True)
         enable_elasticsearch = storage_config.get("enable_elasticsearch", True)
+        index = storage_config.get("index", "mystery_events")
         
-        # Process events in batches
-        for i in range(0, len(events), batch_size):
-            batch = events[i:i + batch_size]
-            
-            # Store in Neo4j
-            if enable_neo4j:
-                try:
-                    neo4j_result = store_in_neo4j(batch)
-                    if results["neo4j_results"] is None:
-                        results["neo4j_results"] = {"stored_count": 0, "relationships_count": 0}
-                    results["neo4j_results"]["stored_count"] += neo4j_result.get("stored_count", 0)
-                    results["neo4j_results"]["relationships_count"] += neo4j_result.get("relationships_count", 0)
-                except Exception as e:
-                    results["errors"].append(f"Neo4j batch {i//batch_size + 1}: {str(e)}")
-            
-            # Store in Elasticsearch
-            if enable_elasticsearch:
-                try:
-                    es_result = store_in_elasticsearch(batch)
-                    if results["elasticsearch_results"] is None:
-                        results["elasticsearch_results"] = {"indexed_count": 0}
-                    results["elasticsearch_results"]["indexed_count"] += es_result.get("indexed_count", 0)
-                except Exception as e:
-                    results["errors"].append(f"Elasticsearch batch {i//batch_size + 1}: {str(e)}")
+        # Each backend batches internally (UNWIND transactions / _bulk chunks)
+        if enable_neo4j:
+            neo4j_storage = Neo4jStorage(batch_size=batch_size)
+            try:
+                if not neo4j_storage.driver:
+                    raise ConnectionError("Neo4j connection not available")
+                neo4j_result = store_event_graph(neo4j_storage, events, batch_size)
+                results["neo4j_results"] = {
+                    "stored_count": neo4j_result["stored_nodes"],
+                    "relationships_count": neo4j_result["stored_relationships"],
+                    "failures": neo4j_result["failures"]
+                }
+                results["errors"].extend(
+                    f"Neo4j {failure['kind']} {failure['id']}: {failure['error']}"
+                    for failure in neo4j_result["failures"]
+                )
+            except Exception as e:
+                results["errors"].append(f"Neo4j: {str(e)}")
+            finally:
+                neo4j_storage.close()
+        
+        if enable_elasticsearch:
+            es_storage = ElasticsearchStorage(
+                chunk_bytes=storage_config.get("chunk_bytes"),
+                max_actions=storage_config.get("max_actions") or batch_size,
+                workers=storage_config.get("workers")
+            )
+            try:
+                if not es_storage.client:
+                    raise ConnectionError("Elasticsearch connection not available")
+                es_result = es_storage.index_events(index, events)
+                results["elasticsearch_results"] = {
+                    "indexed_count": es_result["indexed_documents"],
+                    "failures": es_result["failures"]
+                }
+                results["errors"].extend(
+                    f"Elasticsearch document {failure['id']}: {failure['error']}"
+                    for failure in es_result["failures"]
+                )
+            except Exception as e:
+                results["errors"].append(f"Elasticsearch: {str(e)}")
+            finally:
+                es_storage.close()
         
         # Calculate success count
-        neo4j_count = results.get("neo4j_results", {}).get("stored_count", 0)
-        es_count = results.get("elasticsearch_results", {}).get("indexed_count", 0)
+        neo4j_count = (results["neo4j_results"] or {}).get("stored_count", 0)
+        es_count = (results["elasticsearch_results"] or {}).get("indexed_count", 0)
         results["success_count"] = max(neo4j_count, es_count)
         
         logger.info(f"Batch storage completed: {results['success_count']}/{len(events)} events stored")
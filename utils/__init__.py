@@ -5,5 +5,6 @@
 
 from .json_utils import repair_json_output
 from .logger import setup_logger, get_logger
+from .cache import TTLCache
 
-__all__ = ['repair_json_output', 'setup_logger', 'get_logger']
\ No newline at end of file
+__all__ = ['repair_json_output', 'setup_logger', 'get_logger', 'TTLCache']
\ No newline at end of file
@@ -0,0 +1,168 @@
+# Copyright (c) 2025 Lingjing Project
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class _LoadAbandoned(Exception):
+    """加载方被取消，通知等待方重新发起加载"""
+
+
+class TTLCache:
+    """带过期时间的LRU缓存，支持单飞（single-flight）加载
+
+    同一个键的并发加载只执行一次，其余调用方等待并共享结果；加载失败不缓存，
+    异常会传给所有等待方。线程与asyncio两种调用方式共享同一份缓存数据。
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0):
+        """初始化缓存
+
+        Args:
+            maxsize: 最大条目数，超出时淘汰最久未使用的条目
+            ttl: 条目有效期（秒），<=0表示不缓存（仍做单飞合并）
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._async_inflight: Dict[Tuple[int, Hashable], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._get_locked(key)
+        return default if value is _MISSING else value
+
+    def _get_locked(self, key: Hashable) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return _MISSING
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return _MISSING
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """删除指定键，key为None时清空缓存"""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """命中则返回缓存值，否则加载；并发的相同键只调用一次loader"""
+        with self._lock:
+            value = self._get_locked(key)
+            if value is not _MISSING:
+                return value
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            self.loads += 1
+            value = loader()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def aget_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """get_or_load的异步版本，在同一事件循环内做单飞合并
+
+        加载方被取消时不取消等待方，由第一个醒来的等待方接手重新加载。
+        """
+        loop = asyncio.get_running_loop()
+        inflight_key = (id(loop), key)
+        while True:
+            with self._lock:
+                value = self._get_locked(key)
+                if value is not _MISSING:
+                    return value
+                future = self._async_inflight.get(inflight_key)
+                owner = future is None
+                if owner:
+                    future = loop.create_future()
+                    self._async_inflight[inflight_key] = future
+
+            if owner:
+                break
+            try:
+                # shield：等待方被取消时不影响正在进行的加载
+                return await asyncio.shield(future)
+            except _LoadAbandoned:
+                continue
+
+        try:
+            self.loads += 1
+            value = await loader()
+        except asyncio.CancelledError:
+            future.set_exception(_LoadAbandoned())
+            future.exception()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 没有等待方时避免“异常未被获取”的警告
+            future.exception()
+            raise
+        else:
+            self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._async_inflight.pop(inflight_key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }